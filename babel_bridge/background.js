@@ -5,6 +5,13 @@ let socket = null;
 const PORT = 6789;
 const WS_URL = `ws://localhost:${PORT}`;
 const RECONNECT_INTERVAL = 5000;
+const MAX_RECONNECT_INTERVAL = 60000; // Desktop app not running: back off instead of polling every 5s
+let reconnectDelay = RECONNECT_INTERVAL;
+
+// Text entry state per tab (from text_entry.js) and the last state sent to the desktop app
+const editingByTab = {};
+let activeTabId = null;
+let sentEditing = false;
 
 // Connect to the local Python server
 function connect() {
@@ -12,12 +19,15 @@ function connect() {
 
     socket.onopen = () => {
         console.log("Babel Bridge Connected to Desktop App");
+        reconnectDelay = RECONNECT_INTERVAL;
+        sentEditing = false; // The desktop app starts from "not editing" on each connection
         checkActiveTab(); // Immediate check on connect
     };
 
     socket.onclose = () => {
         console.log("Babel Bridge Disconnected. Retrying...");
-        setTimeout(connect, RECONNECT_INTERVAL);
+        setTimeout(connect, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_INTERVAL);
     };
 
     socket.onerror = (err) => {
@@ -31,6 +41,8 @@ function checkActiveTab() {
     chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
         if (tabs && tabs.length > 0) {
             const tab = tabs[0];
+            activeTabId = tab.id;
+            sendTextEntry(!!editingByTab[tab.id]);
             if (tab.url) {
                 const app = detectApp(tab.url);
                 sendContext(app, tab.url);
@@ -53,6 +65,18 @@ function sendContext(app, url) {
     }
 }
 
+// Send text entry state on transitions only
+function sendTextEntry(editing) {
+    if (editing === sentEditing) return;
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({
+            event: "text_entry",
+            editing: editing
+        }));
+        sentEditing = editing;
+    }
+}
+
 // Determine app from URL
 function detectApp(url) {
     if (!url) return "null";
@@ -72,6 +96,8 @@ function detectApp(url) {
 chrome.tabs.onActivated.addListener(async (activeInfo) => {
     try {
         const tab = await chrome.tabs.get(activeInfo.tabId);
+        activeTabId = tab.id;
+        sendTextEntry(!!editingByTab[tab.id]);
         if (tab.url) {
             const app = detectApp(tab.url);
             sendContext(app, tab.url);
@@ -83,8 +109,26 @@ chrome.tabs.onActivated.addListener(async (activeInfo) => {
 
 // Listener for URL Updates (e.g. navigation within Tab)
 chrome.tabs.onUpdated.addListener((tabId, changeInfo, tab) => {
+    if (changeInfo.status === 'loading') {
+        // Navigation: the page's text field (and its content script) are gone
+        delete editingByTab[tabId];
+        if (tabId === activeTabId) sendTextEntry(false);
+    }
     if (changeInfo.status === 'complete' && tab.active) {
         const app = detectApp(tab.url);
         sendContext(app, tab.url);
     }
 });
+
+// Text field focus reports from the content script
+chrome.runtime.onMessage.addListener((message, sender) => {
+    if (message.event !== "text_entry" || !sender.tab) return;
+    editingByTab[sender.tab.id] = message.editing;
+    if (sender.tab.id === activeTabId) {
+        sendTextEntry(message.editing);
+    }
+});
+
+chrome.tabs.onRemoved.addListener((tabId) => {
+    delete editingByTab[tabId];
+});
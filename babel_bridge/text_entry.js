@@ -0,0 +1,60 @@
+// Babel Bridge - Text Entry Content Script
+// Tells the desktop app when a text field has focus, so it lets typing pass
+// through untranslated. Debounced, and sent only when the state changes.
+
+const DEBOUNCE_MS = 80; // focusout/focusin pairs while tabbing between fields collapse into one report
+
+// Always-focused key sinks some apps keep off screen to receive canvas shortcuts: not text entry
+const KEY_SINKS = [
+    "textarea.focus-target", // Figma canvas
+];
+
+const TEXT_INPUT_TYPES = new Set([
+    "text", "search", "email", "url", "tel", "password", "number", ""
+]);
+
+let reported = false;
+let timer = null;
+
+// Focused element, looking inside open shadow roots
+function deepActiveElement() {
+    let element = document.activeElement;
+    while (element && element.shadowRoot && element.shadowRoot.activeElement) {
+        element = element.shadowRoot.activeElement;
+    }
+    return element;
+}
+
+function isTextEntry(element) {
+    if (!element || element === document.body) return false;
+    if (KEY_SINKS.some((selector) => element.matches(selector))) return false;
+
+    const tag = element.tagName;
+    if (tag === "TEXTAREA") return !element.readOnly && !element.disabled;
+    if (tag === "INPUT") {
+        return TEXT_INPUT_TYPES.has((element.getAttribute("type") || "").toLowerCase())
+            && !element.readOnly && !element.disabled;
+    }
+    return element.isContentEditable || element.getAttribute("role") === "textbox";
+}
+
+function evaluate() {
+    timer = null;
+    const editing = isTextEntry(deepActiveElement());
+    if (editing === reported) return;
+    reported = editing;
+    try {
+        chrome.runtime.sendMessage({ event: "text_entry", editing: editing });
+    } catch (e) {
+        // Extension reloaded: this script is orphaned until the page reloads
+    }
+}
+
+function schedule() {
+    if (timer !== null) clearTimeout(timer);
+    timer = setTimeout(evaluate, DEBOUNCE_MS);
+}
+
+document.addEventListener("focusin", schedule, true);
+document.addEventListener("focusout", schedule, true);
+schedule();
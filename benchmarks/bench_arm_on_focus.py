@@ -0,0 +1,119 @@
+"""
+Keystroke cost in a non-target app (text editor, IDE), before and after
+arming hooks only while a target app is focused.
+
+Before ("arm_on_focus": false): every trigger is hooked globally, so ctrl+z in
+an editor is swallowed, debounced and re-injected through _safe_inject.
+After: the hotkey isn't installed outside target apps and the key goes
+straight through; the price moves to arm/disarm on focus changes.
+
+Also checks that a focus flip while a re-injection of a hooked trigger is
+still playing leaves that trigger registered exactly once (the real
+`keyboard` keeps one remover per hotkey: a second registration would leak).
+
+Run: python benchmarks/bench_arm_on_focus.py
+"""
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from fixtures import make_config_manager, make_observer
+
+
+def make(arm_on_focus):
+    config_manager = make_config_manager()
+    config_manager.config["arm_on_focus"] = arm_on_focus
+    observer = make_observer(config_manager)
+    observer.debounce_interval = 0
+    observer.is_active_context = False
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    return observer
+
+
+def keystroke_cost(observer, iterations):
+    def type_ctrl_z():
+        sim.keyboard.tap("ctrl+z")
+    samples = harness.sample_latencies(type_ctrl_z, iterations)
+    observer._remove_local_hooks()
+    return samples
+
+
+def arm_cycle_cost(iterations=2000):
+    observer = make(True)
+
+    def focus_in_and_out():
+        observer.is_active_context = True
+        observer._sync_armed()
+        observer.is_active_context = False
+        observer._sync_armed()
+    samples = harness.sample_latencies(focus_in_and_out, iterations)
+    observer._remove_local_hooks()
+    return samples
+
+
+def registrations_after_flip(trigger="ctrl+z"):
+    """Net add_hotkey registrations of `trigger` after disarm + re-arm during its own re-injection."""
+    observer = make(True)
+    observer.scheduler.start()
+    observer.is_active_context = True
+    observer._sync_armed()
+    handle = observer.keymap.trigger(trigger)
+    count = [0]
+    add_hotkey, remove_hotkey = sim.keyboard.add_hotkey, sim.keyboard.remove_hotkey
+
+    def counted_add(hotkey, *args, **kwargs):
+        count[0] += hotkey == handle
+        return add_hotkey(hotkey, *args, **kwargs)
+
+    def counted_remove(hotkey):
+        remove_hotkey(hotkey)
+        count[0] -= hotkey == handle
+
+    sim.keyboard.add_hotkey, sim.keyboard.remove_hotkey = counted_add, counted_remove
+    try:
+        count[0] = 1 # Registered by the arm above
+        observer._safe_inject(trigger, trigger) # Unhooks, plays on the scheduler, re-hooks when done
+        observer.is_active_context = False
+        observer._sync_armed()
+        observer.is_active_context = True
+        observer._sync_armed()
+        time.sleep(0.5) # The macro takes a few ms
+    finally:
+        sim.keyboard.add_hotkey, sim.keyboard.remove_hotkey = add_hotkey, remove_hotkey
+        observer.stop()
+    return count[0]
+
+
+def main():
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+
+    # Real InjectionModule: the re-injection sleeps are the point of the comparison
+    before = keystroke_cost(make(False), 20)
+    after = keystroke_cost(make(True), 20000)
+    cycle = arm_cycle_cost()
+
+    print("\nctrl+z typed in a non-target app")
+    print("--------------------------------")
+    for label, samples in (("always armed (before)", before), ("arm on focus (after)", after)):
+        print(f"  {label:<22}  p50 {harness.percentile(samples, 50) / 1000:10.2f} us"
+              f"  p99 {harness.percentile(samples, 99) / 1000:10.2f} us")
+    print("\nFocus change into and out of a target app (arm + disarm, shipped profile)")
+    print(f"  p50 {harness.percentile(cycle, 50) / 1000:.2f} us  p99 {harness.percentile(cycle, 99) / 1000:.2f} us"
+          "  (includes mouse hook thread start/stop)")
+
+    registered = registrations_after_flip()
+    print(f"\nctrl+z registrations after a focus flip during its re-injection: {registered} (expected 1)")
+    if registered != 1:
+        print("FAIL: re-injection re-hooked a trigger that arming had already registered")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
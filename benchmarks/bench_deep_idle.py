@@ -0,0 +1,112 @@
+"""
+Deep idle on the simulated backend.
+
+1. Wakeups per second and CPU time of Babel's threads with a target app
+   running (but not focused) vs. no target running (deep idle). Context
+   polls, zoom gestures, the hook watchdog and the process snapshot all run
+   on the observer's scheduler, so its wakeup counter covers them.
+2. RSS in deep idle.
+3. Wake latency when a target starts: via a process-start notification
+   (the WMI path on Windows) and via the snapshot fallback.
+4. Processes whose names only contain a target's ("Figma Helper.exe",
+   "chromedriver.exe") do not wake it.
+
+Run: python benchmarks/bench_deep_idle.py
+"""
+import sys
+import threading
+import time
+
+import psutil
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.process_watcher import ProcessWatcher
+from fixtures import make_observer, NullWebListener
+
+WINDOW = 2.0
+
+
+def wakeups(observer):
+    return observer.scheduler.wakeups
+
+
+def measure_window(observer):
+    before = wakeups(observer)
+    cpu = time.process_time()
+    time.sleep(WINDOW)
+    return (wakeups(observer) - before) / WINDOW, (time.process_time() - cpu) / WINDOW * 100.0
+
+
+def wait_for(condition, timeout=5.0):
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError
+        time.sleep(0.0005)
+    return time.perf_counter() - start
+
+
+def main():
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    observer = make_observer()
+    observer.web_listener = NullWebListener()
+    observer.process_watcher = ProcessWatcher(
+        observer.config_manager.get_semantic_targets(), observer._on_targets_changed,
+        poll_interval=0.25, use_events=False, list_pids=sim.list_pids, process_name=sim.process_name)
+
+    photoshop = sim.start_process("Photoshop.exe")
+    observer.start()
+    assert not observer.deep_idle
+    awake_rate, awake_cpu = measure_window(observer)
+
+    sim.exit_process(photoshop)
+    wait_for(lambda: observer.deep_idle)
+    idle_rate, idle_cpu = measure_window(observer)
+    threads = threading.active_count()
+    rss = psutil.Process().memory_info().rss
+
+    # Start notification (WMI on Windows): straight into the watcher
+    samples = []
+    for _ in range(20):
+        start = time.perf_counter()
+        observer.process_watcher.process_started(90000 + len(samples), "Photoshop.exe")
+        samples.append((time.perf_counter() - start) * 1e6)
+        observer.process_watcher.process_exited(90000 + len(samples) - 1)
+        wait_for(lambda: observer.deep_idle)
+    # Look-alike executables: matched by exact name, they leave Babel asleep
+    lookalikes = [sim.start_process(name) for name in ("Figma Helper.exe", "chromedriver.exe", "notphotoshop.exe")]
+    time.sleep(observer.process_watcher.poll_interval * 3)
+    stayed_idle = observer.deep_idle
+    for lookalike in lookalikes:
+        sim.exit_process(lookalike)
+
+    # Snapshot fallback: bounded by the poll interval
+    pid = sim.start_process("Photoshop.exe")
+    snapshot_ms = wait_for(lambda: not observer.deep_idle) * 1000
+    sim.exit_process(pid)
+
+    observer.stop()
+
+    print("\nIdle cost (simulated backend)")
+    print("-----------------------------")
+    print(f"  target running, not focused   {awake_rate:7.1f} wakeups/s   cpu {awake_cpu:5.2f}%")
+    print(f"  no target (deep idle)         {idle_rate:7.1f} wakeups/s   cpu {idle_cpu:5.2f}%")
+    print(f"  RSS in deep idle              {rss / 1048576:7.1f} MB")
+    print(f"  threads in deep idle          {threads:7d}")
+    print("\nWake latency when a target starts (hooks re-installed)")
+    print(f"  start notification   p50 {harness.percentile(samples, 50):8.1f} us   max {max(samples):8.1f} us")
+    print(f"  snapshot fallback    {snapshot_ms:8.1f} ms (poll interval {observer.process_watcher.poll_interval * 1000:.0f} ms)")
+    print(f"\nLook-alike processes (Figma Helper.exe, chromedriver.exe, ...): {'stayed in deep idle' if stayed_idle else 'WOKE UP'}")
+    if not stayed_idle:
+        print("FAIL: a process merely containing a target's name woke Babel")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
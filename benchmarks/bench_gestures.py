@@ -0,0 +1,165 @@
+"""
+Mouse button gestures (core/gestures.py) on the simulated backend.
+
+The custom profile with "undo": "custom: xbutton1" and the shipped "pan"
+action (Figma's middle-button drag, Photoshop's Space+Drag), focused on
+Photoshop. A 1000 Hz synthetic trace goes through the installed mouse hook
+on a ManualClock: idle motion, middle-button drags and side-button clicks.
+
+Reports the hook cost per event (idle move, drag move, button) and checks
+that each drag became space + left-button drag in Photoshop, that drag
+motion was coalesced to at most one injected move per frame ending on the
+last hardware position, and that shadow mode passes everything through.
+
+Run: python benchmarks/bench_gestures.py [--drags 20] [--seconds 1.0]
+"""
+import argparse
+import math
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.gestures import WM_MOUSEMOVE, WM_MBUTTONDOWN, WM_MBUTTONUP, WM_XBUTTONDOWN, WM_XBUTTONUP
+from core.injector import MacroPlayer
+from core.scheduler import Scheduler, ManualClock
+from fixtures import make_config_manager, make_observer
+
+RATE = 1000 # Hz, a gaming mouse's report rate
+
+
+def make():
+    config_manager = make_config_manager()
+    config_manager.config["active_profile"] = "custom.json"
+    config_manager.apply_profile_delta("custom.json", {"undo": "custom: xbutton1"})
+    observer = make_observer(config_manager)
+    clock = ManualClock()
+    observer.scheduler = Scheduler(clock)
+    observer.clock = clock
+    observer.macros = MacroPlayer(observer.scheduler)
+    observer.gestures.scheduler = observer.scheduler
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+    deadline = time.perf_counter() + 2.0
+    while not sim.mouse_hook_count() and time.perf_counter() < deadline:
+        time.sleep(0.001) # The hook installs on its own message-loop thread
+    return observer, clock
+
+
+def trace(drags, seconds):
+    """[(label, msg, delta, x, y)] at RATE: idle motion, then per drag a circle with the middle button, then a side click."""
+    events = []
+    samples = int(seconds * RATE)
+    for d in range(drags):
+        for i in range(samples // 4):
+            events.append(("idle move", WM_MOUSEMOVE, 0, 400 + i % 50, 300))
+        events.append(("button", WM_MBUTTONDOWN, 0, 400, 300))
+        for i in range(samples):
+            angle = 2 * math.pi * i / samples
+            events.append(("drag move", WM_MOUSEMOVE, 0, 400 + int(200 * math.cos(angle)) + d,
+                           300 + int(200 * math.sin(angle))))
+        events.append(("button", WM_MBUTTONUP, 0, events[-1][3], events[-1][4]))
+        events.append(("button", WM_XBUTTONDOWN, 1, 400, 300))
+        events.append(("button", WM_XBUTTONUP, 1, 400, 300))
+    return events
+
+
+def run(observer, clock, events):
+    """Feeds the trace at RATE. Returns {label: [ns]}, blocked count and the clock times of injected moves."""
+    costs = {}
+    blocked = 0
+    move_times = []
+    move_to = observer.injection_module.move_to
+    observer.injection_module.move_to = lambda x, y: (move_times.append(clock.now), move_to(x, y))
+    for label, msg, delta, x, y in events:
+        clock.advance(1.0 / RATE)
+        observer.scheduler.advance()
+        start = time.perf_counter_ns()
+        allowed = sim.emit_mouse(msg, delta, x, y)
+        costs.setdefault(label, []).append(time.perf_counter_ns() - start)
+        blocked += not allowed
+    clock.advance(0.2)
+    observer.scheduler.advance()
+    observer.injection_module.move_to = move_to
+    return costs, blocked, move_times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drags", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=1.0, help="duration of each drag")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+
+    observer, clock = make()
+    table = observer.snapshot.gestures
+    print("\nPhotoshop gesture table")
+    for rule in sorted(table.rules.values()):
+        print(f"  {rule.trigger:<14} -> {rule.output}")
+
+    events = trace(args.drags, args.seconds)
+    sim.keyboard.injected.clear()
+    sim.mouse.moves.clear()
+    sim.mouse.buttons.clear()
+    costs, blocked, move_times = run(observer, clock, events)
+    frame = observer.gestures.frame_interval
+    drag_moves = len(costs["drag move"])
+    injected_keys = list(sim.keyboard.injected)
+
+    print(f"\n{len(events)} events at {RATE} Hz ({args.drags} drags of {args.seconds:.1f}s)")
+    for label, samples in costs.items():
+        print(f"  {label:<10} x{len(samples):<6}  p50 {harness.percentile(samples, 50) / 1000:6.2f} us"
+              f"  p99 {harness.percentile(samples, 99) / 1000:6.2f} us")
+
+    gaps = [b - a for a, b in zip(move_times, move_times[1:])]
+    # Within a frame only the flush on release can follow a timed flush early
+    early = sum(1 for gap in gaps if gap < frame - 0.0015)
+    print(f"\nDrag motion: {drag_moves} hardware moves -> {len(sim.mouse.moves)} injected "
+          f"({len(sim.mouse.moves) / (args.drags * args.seconds):.0f}/s, frame {frame * 1000:.1f} ms), "
+          f"{early} flushed early (button releases)")
+    print(f"Buttons injected: {sim.mouse.buttons[:2]} ... ({len(sim.mouse.buttons)} total)")
+    print(f"Keys injected: {injected_keys[:3]} ... ({len(injected_keys)} total)")
+
+    failures = []
+    per_drag = args.seconds / frame + 2
+    if len(sim.mouse.moves) > args.drags * per_drag:
+        failures.append(f"more than {per_drag:.0f} injected moves per drag")
+    if early > args.drags:
+        failures.append("moves injected faster than one per frame")
+    if sim.mouse.moves[-1] != (events[-3][3], events[-3][4]):
+        failures.append("drag did not end on the last hardware position")
+    if sim.mouse.buttons != [("press", "left"), ("release", "left")] * args.drags:
+        failures.append("middle-button drag did not become a left-button drag")
+    if injected_keys.count(("press", "space")) != args.drags or injected_keys.count(("release", "space")) != args.drags:
+        failures.append("space not held for each pan")
+    if sum(1 for kind, key in injected_keys if kind == "press" and key == "z") != args.drags:
+        failures.append("xbutton1 did not send ctrl+z")
+    expected_blocked = drag_moves + 4 * args.drags
+    if blocked != expected_blocked:
+        failures.append(f"{blocked} events blocked, expected {expected_blocked}")
+
+    # Shadow mode: the same trace passes through untouched
+    observer.set_shadow_mode(True)
+    sim.mouse.moves.clear()
+    sim.mouse.buttons.clear()
+    _, shadow_blocked, _ = run(observer, clock, events[:len(events) // args.drags])
+    report = observer.set_shadow_mode(False)
+    print(f"\nShadow mode: {shadow_blocked} blocked, {len(sim.mouse.moves)} moves injected, "
+          f"would translate {[(e['trigger'], e['output'], e['count']) for e in report['would_translate']]}")
+    if shadow_blocked or sim.mouse.moves or sim.mouse.buttons:
+        failures.append("shadow mode suppressed or injected mouse input")
+
+    observer._remove_local_hooks()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
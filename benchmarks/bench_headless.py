@@ -0,0 +1,154 @@
+"""
+Headless mode (core/daemon.py) against the tray build, each in its own
+process on the simulated backend.
+
+Each child starts the way main.py does: config, ContextManager,
+InjectionModule, InputObserver (hotkeys registered, observer started) and
+the control channel. Then the headless child runs the Daemon; the tray
+child builds ui.tray_icon.TrayIcon first (its menu loop is not run), and
+is measured by the same Daemon. The parent waits for the steady-state
+measurement over the control channel, then stops the child with
+"shutdown".
+
+Checks:
+- headless: no UI module (ui, pystray, PIL, tkinter) is loaded, RSS and
+  the number of loaded modules stay within --rss-mb / --modules;
+- tray build (when pystray and PIL are installed): headless uses less
+  memory and loads fewer modules;
+- "shutdown" stops the instance and the process exits cleanly.
+
+Run: python benchmarks/bench_headless.py [--rss-mb 40] [--modules 300] [--steady-s 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import harness
+
+BENCH = os.path.abspath(__file__)
+
+
+def child(build, root, address, steady_after):
+    from core import sim_backend
+    sim_backend.install()
+    from core import logger
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    from config.config_manager import ConfigManager
+    from core.context import ContextManager
+    from core.control_channel import ControlServer
+    from core.daemon import Daemon
+    from core.injector import InjectionModule
+    from core.observer import InputObserver
+    from fixtures import NullWebListener
+
+    config_manager = ConfigManager(root)
+    observer = InputObserver(ContextManager(), config_manager, InjectionModule())
+    # The WebSocket server API differs between websockets versions; its module is loaded in both builds
+    observer.web_listener = NullWebListener()
+    observer.register_hotkeys()
+    observer.start()
+    control_server = ControlServer(config_manager, observer, address)
+    control_server.start()
+    if build == "tray":
+        try:
+            from ui.tray_icon import TrayIcon
+            TrayIcon(config_manager, observer, address)
+        except Exception as e: # pystray / PIL missing, or no display to attach the icon to
+            print(json.dumps({"unavailable": f"{type(e).__name__}: {e}"}), flush=True)
+            observer.stop()
+            control_server.stop()
+            return 3
+    print(json.dumps({"ready": True}), flush=True)
+    Daemon(observer, control_server, steady_after).run()
+    return 0
+
+
+def run_build(build, steady_after, timeout=60.0):
+    """Starts one child, waits for its steady state, shuts it down. Returns the measurement."""
+    from core.control_channel import ControlClient
+    from fixtures import make_project_root
+
+    root = make_project_root()
+    address = os.path.join(tempfile.mkdtemp(prefix="babel-headless-"), "control.sock")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, BENCH, "--child", build, root, address, str(steady_after)],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    first = json.loads(process.stdout.readline() or "{}")
+    if "unavailable" in first or not first.get("ready"):
+        process.wait(timeout)
+        return {"build": build, "unavailable": first.get("unavailable") or process.stderr.read()[-500:]}
+
+    steady = None
+    with ControlClient(address) as client:
+        while steady is None and time.perf_counter() - started < timeout:
+            time.sleep(0.1)
+            steady = client.request("metrics")["daemon"]["steady"]
+        status = client.request("status")
+        stop_started = time.perf_counter()
+        client.request("shutdown")
+    exit_code = process.wait(timeout)
+    stopped_ms = (time.perf_counter() - stop_started) * 1000.0
+    return dict(steady or {}, build=build, exit_code=exit_code, shutdown_ms=stopped_ms,
+                hooks=len(status.get("registered_triggers", [])), stderr=process.stderr.read()[-500:])
+
+
+def main(argv=None):
+    if argv is None and len(sys.argv) > 1 and sys.argv[1] == "--child":
+        build, root, address, steady_after = sys.argv[2:6]
+        return child(build, root, address, float(steady_after))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rss-mb", type=float, default=40.0, help="headless RSS budget at steady state")
+    parser.add_argument("--modules", type=int, default=300, help="headless budget of loaded modules")
+    parser.add_argument("--steady-s", type=float, default=2.0, help="seconds after start-up to measure")
+    args = parser.parse_args(argv)
+    failures = []
+
+    headless = run_build("headless", args.steady_s)
+    tray = run_build("tray", args.steady_s)
+
+    print(f"\n{'build':<10} {'RSS MB':>8} {'modules':>8} {'UI modules':>11} {'shutdown ms':>12}")
+    for result in (headless, tray):
+        if "unavailable" in result:
+            print(f"{result['build']:<10} unavailable: {result['unavailable']}")
+            continue
+        print(f"{result['build']:<10} {result.get('rss_bytes', 0) / 1048576:8.1f} {result.get('modules', 0):8d} "
+              f"{len(result.get('ui_modules', [])):11d} {result['shutdown_ms']:12.0f}")
+
+    if "unavailable" in headless:
+        failures.append(f"headless child failed to start: {headless['unavailable']}")
+    else:
+        rss_mb = headless.get("rss_bytes", 0) / 1048576
+        if not headless.get("rss_bytes"):
+            failures.append("headless child never reported its steady state")
+        if headless.get("ui_modules"):
+            failures.append(f"UI modules loaded in headless mode: {headless['ui_modules']}")
+        if rss_mb > args.rss_mb:
+            failures.append(f"headless RSS {rss_mb:.1f} MB over the {args.rss_mb:.0f} MB budget")
+        if headless.get("modules", 0) > args.modules:
+            failures.append(f"headless loads {headless['modules']} modules, budget {args.modules}")
+        if headless["exit_code"] != 0 or headless["shutdown_ms"] > 5000:
+            failures.append(f"headless shutdown: exit code {headless['exit_code']} after {headless['shutdown_ms']:.0f} ms "
+                            f"{headless['stderr']}")
+        if not headless["hooks"]:
+            failures.append("headless instance registered no hotkeys")
+
+    if "unavailable" not in tray and "unavailable" not in headless:
+        saved_mb = (tray["rss_bytes"] - headless["rss_bytes"]) / 1048576
+        print(f"\nHeadless saves {saved_mb:.1f} MB RSS and {tray['modules'] - headless['modules']} modules per instance")
+        if headless["rss_bytes"] >= tray["rss_bytes"] or headless["modules"] >= tray["modules"]:
+            failures.append("headless is not smaller than the tray build")
+    elif "unavailable" in tray:
+        print("\nTray build not measured here (needs pystray and PIL): only the headless budgets are checked")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
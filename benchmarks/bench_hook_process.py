@@ -0,0 +1,258 @@
+"""
+Hook latency with the main process kept busy: in-process hooks vs the
+isolated hook process (core/hook_process.py).
+
+A feeder process plays the OS: it timestamps synthetic key events and sends
+them down a pipe. A "hook thread" wakes on each event and runs the hotkey
+callback. Latency = feeder timestamp -> callback done. While it runs, the
+main process spins JSON-parsing threads (stand-ins for the WebSocket loop,
+context poller and config reloads) that fight for the GIL.
+
+Injection is replaced by a no-op so only dispatch + decision is measured.
+Also checks the event flags the hook process reports: a press dropped by
+the debounce must not be reported as translated. And that a table many times
+the command ring, published twice while the ring is full, reaches the hook
+process whole (the newer one) once it drains the ring.
+
+Run: python benchmarks/bench_hook_process.py [--events 1000]
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.hook_process import (ShmRing, HookProcessHost, TableParts, EVENT, MSG_EVENT, MSG_TABLE, MSG_TABLE_PART,
+                               FLAG_TRANSLATED, FLAG_DEBOUNCED)
+from fixtures import NullInjector
+
+TRIGGER = "ctrl+d"
+TABLE = {"triggers": [TRIGGER], "active": True, "app": "photoshop", "lookup": {TRIGGER: "ctrl+j"}}
+
+
+def feeder(conn, events, interval):
+    for _ in range(events):
+        conn.send_bytes(str(time.perf_counter()).encode())
+        time.sleep(interval)
+    conn.send_bytes(b"stop")
+
+
+def hook_thread(conn, keyboard, record):
+    """Wakes per feeder event, like the OS hook thread, and runs the hotkey callback."""
+    while True:
+        message = conn.recv_bytes()
+        if message == b"stop":
+            break
+        sent = float(message)
+        keyboard.tap(TRIGGER)
+        record(int((time.perf_counter() - sent) * 1e6))
+
+
+def isolated_child(cmd_ring_name, event_ring_name, cmd_signal, event_signal, settings, feed):
+    """Same as hook_process_main, with the feeder wired into the simulated keyboard."""
+    from core.hook_process import raise_priority
+    raise_priority()
+    sim = sim_backend.install()
+    from core.hook_process_engine import HookProcessEngine
+
+    event_ring = ShmRing(event_ring_name)
+    cmd_ring = ShmRing(cmd_ring_name)
+
+    def emit(payload):
+        if event_ring.push(payload):
+            event_signal.release()
+
+    engine = HookProcessEngine(settings, lambda payload: None)
+    engine.injection_module = NullInjector()
+    engine.debounce_interval = 0
+    engine.start()
+
+    cmd_signal.acquire()
+    engine.apply_table(json.loads(cmd_ring.pop()[len(MSG_TABLE):]))
+    emit(b"R") # ready
+
+    hook_thread(feed, sim.keyboard, lambda us: emit(MSG_EVENT + EVENT.pack(1, us, 0)))
+    emit(b"D") # done
+    engine.stop()
+    event_ring.close()
+    cmd_ring.close()
+
+
+def busy_main(stop_event, threads=3):
+    payload = json.dumps({"profiles": {f"p{i}": {"settings": {f"a{j}": "figma" for j in range(50)}} for i in range(20)}})
+
+    def spin():
+        while not stop_event.is_set():
+            json.loads(payload)
+
+    workers = [threading.Thread(target=spin, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def run_in_process(events, interval, busy):
+    from fixtures import make_observer
+    observer = make_observer()
+    observer.injection_module = NullInjector()
+    observer.debounce_interval = 0
+    observer.is_active_context = True
+    observer.mapping_lookup = dict(TABLE["lookup"])
+    observer.register_hotkeys() # Armed: target app focused
+
+    ctx = multiprocessing.get_context("spawn")
+    receive, send = ctx.Pipe(duplex=False)
+    samples = []
+    stop_event = threading.Event()
+    if busy:
+        busy_main(stop_event)
+    proc = ctx.Process(target=feeder, args=(send, events, interval), daemon=True)
+    proc.start()
+    hook_thread(receive, sim.keyboard, samples.append)
+    stop_event.set()
+    proc.join()
+    observer.stop()
+    return samples
+
+
+def run_isolated(events, interval, busy):
+    ctx = multiprocessing.get_context("spawn")
+    cmd_ring = ShmRing()
+    event_ring = ShmRing(capacity=1 << 20)
+    cmd_signal = ctx.Semaphore(0)
+    event_signal = ctx.Semaphore(0)
+    receive, send = ctx.Pipe(duplex=False)
+
+    child = ctx.Process(target=isolated_child, args=(
+        cmd_ring.name, event_ring.name, cmd_signal, event_signal, {"watchdog": {"enabled": False}}, receive))
+    child.start()
+    cmd_ring.push(MSG_TABLE + json.dumps(TABLE).encode())
+    cmd_signal.release()
+
+    def next_message():
+        while True:
+            message = event_ring.pop()
+            if message is not None:
+                return message
+            event_signal.acquire()
+
+    assert next_message() == b"R"
+    stop_event = threading.Event()
+    if busy:
+        busy_main(stop_event)
+    feed = ctx.Process(target=feeder, args=(send, events, interval), daemon=True)
+    feed.start()
+
+    samples = []
+    while True:
+        message = next_message()
+        if message == b"D":
+            break
+        samples.append(EVENT.unpack_from(message, 1)[1])
+    stop_event.set()
+    feed.join()
+    child.join(timeout=5)
+    cmd_ring.close()
+    event_ring.close()
+    return samples
+
+
+def reported_flags():
+    """Flags the hook process engine reports for a press and a repeat inside the debounce interval."""
+    from core.hook_process_engine import HookProcessEngine
+    messages = []
+    engine = HookProcessEngine({"watchdog": {"enabled": False}}, messages.append)
+    engine.injection_module = NullInjector()
+    engine.debounce_interval = 60.0
+    engine.start()
+    engine.apply_table(TABLE)
+    sim.keyboard.tap(TRIGGER)
+    sim.keyboard.tap(TRIGGER)
+    engine.stop()
+    return [EVENT.unpack_from(m, len(MSG_EVENT))[2] for m in messages if m.startswith(MSG_EVENT)]
+
+
+def large_table_delivery(ring_bytes=4096, rules=2000):
+    """
+    Publishes two tables of ~`rules` rules through a `ring_bytes` command ring
+    without draining in between, then drains like the hook process does
+    (MSG_DRAINED after each pass). Returns (tables applied, host summary).
+    """
+    host = HookProcessHost({"cmd_ring_bytes": ring_bytes})
+    host._cmd_ring = ShmRing(capacity=ring_bytes)
+    host._cmd_signal = threading.Semaphore(0)
+    host.running = True # No process: this thread plays the hook process
+    tables = [dict(TABLE, lookup={f"ctrl+alt+{i}": f"ctrl+shift+{i}" for i in range(rules)}, version=v)
+              for v in (1, 2)]
+    for table in tables:
+        host.publish_table(table)
+
+    applied = []
+    parts = TableParts()
+    for _ in range(10000):
+        message = host._cmd_ring.pop()
+        while message is not None:
+            if message[:1] == MSG_TABLE:
+                applied.append(json.loads(message[1:]))
+            elif message[:1] == MSG_TABLE_PART:
+                table = parts.add(message)
+                if table is not None:
+                    applied.append(table)
+            message = host._cmd_ring.pop()
+        if not host._pending:
+            break
+        host._flush_tables() # What the event reader does on MSG_DRAINED
+    summary = host.summary()
+    host._cmd_ring.close()
+    return [t.get("version") for t in applied], tables[-1] in applied, summary
+
+
+def summarize(label, samples):
+    return (label, harness.percentile(samples, 50), harness.percentile(samples, 99), max(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000, help="key events per scenario")
+    events = parser.parse_args(argv).events
+    logger.configure({"level": "ERROR", "file": None, "console": False})
+    interval = 0.001
+
+    rows = [
+        summarize("in-process, idle main", run_in_process(events, interval, busy=False)),
+        summarize("in-process, busy main", run_in_process(events, interval, busy=True)),
+        summarize("isolated,   idle main", run_isolated(events, interval, busy=False)),
+        summarize("isolated,   busy main", run_isolated(events, interval, busy=True)),
+    ]
+    print("\nHook latency, event -> callback done (us)")
+    print(f"  {'scenario':<24}{'p50':>8}{'p99':>8}{'max':>8}")
+    for label, p50, p99, worst in rows:
+        print(f"  {label:<24}{p50:>8}{p99:>8}{worst:>8}")
+
+    failures = []
+    versions, newest_whole, summary = large_table_delivery()
+    print(f"\nLarge table through a 4 KiB command ring: applied versions {versions}, "
+          f"{summary['table_chunks']} chunks, {summary['dropped_tables']} superseded")
+    if versions != [2] or not newest_whole:
+        failures.append("a table larger than the command ring did not arrive whole (or an older one was applied)")
+
+    flags = reported_flags()
+    expected = [FLAG_TRANSLATED, FLAG_DEBOUNCED]
+    got = [f & (FLAG_TRANSLATED | FLAG_DEBOUNCED) for f in flags]
+    print(f"\nReported flags, press then debounced repeat: {got} (expected {expected})")
+    if got != expected:
+        failures.append("hook process events misreport translated / debounced presses")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+What keyboard.add_hotkey makes of the hotkeys KeyMap.trigger builds.
+
+core/keymap.py hands `keyboard` pre-resolved hotkeys, and the package runs
+whatever it gets through parse_hotkey again. A shape it misreads registers a
+different hotkey: a length-1 tuple of steps is flattened into ONE key made of
+every scan code, so 'ctrl+d' would fire (and be suppressed) on ctrl alone or
+d alone.
+
+Checks:
+- the real keyboard package's parse_hotkey (when installed) reads every
+  trigger of the shipped profiles, plus a few edge cases, as one step with
+  one key per part: the modifier's codes, or the key's layout scan code.
+  Names are resolved through the simulated backend's tables (the OS tables
+  need Windows or root), so the codes compare with KeyMap's; the parser is
+  the real one;
+- the simulated backend's parse_hotkey gives what keyboard 0.13.5 gives for
+  every shape, the broken ones included, so the other benchmarks register
+  hotkeys the way Windows would and catch shape regressions.
+
+Run: python benchmarks/bench_hotkey_shape.py
+"""
+import argparse
+import sys
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.action_mapper import ActionMapper
+from core.gestures import is_mouse_trigger
+from core.keymap import KeyMap, MODIFIERS
+from core.sequences import is_sequence
+from fixtures import make_config_manager
+
+EDGE_CASES = ["ctrl+d", "ctrl+shift+z", "d", "ctrl", "space+d", "alt+f4"]
+
+# keyboard 0.13.5 parse_hotkey on scan codes (ctrl = 29/97, d = 32)
+KNOWN_SHAPES = [
+    ((((29, 97), (32,)),), (((29, 97, 32),),)), # One step wrapped once more: flattened into one key
+    (((29, 97), (32,)), ((29, 97), (32,))),     # Nested: taken as two parsed steps
+    ((29, 32), (((29,), (32,)),)),              # Flat: one step, one key per element
+    ((32,), (((32,),),)),
+    (32, (((32,),),)),
+]
+
+
+def real_parser():
+    """The installed keyboard package, its names resolved like the simulated backend's. None if missing."""
+    try:
+        import keyboard # Not core.backend's: that one is the simulation
+    except ImportError:
+        return None
+    keyboard.key_to_scan_codes = sim.keyboard.key_to_scan_codes
+    return keyboard
+
+
+def configured_triggers():
+    triggers = ActionMapper(make_config_manager()).get_all_configured_triggers()
+    strokes = set(EDGE_CASES)
+    for trigger in triggers:
+        if trigger and not is_mouse_trigger(trigger):
+            strokes.update(trigger.lower().split(", ") if is_sequence(trigger) else [trigger.lower()])
+    return sorted(strokes)
+
+
+def expected(keymap, combo):
+    parts = combo.split('+')
+    return (tuple(sim.keyboard.key_to_scan_codes(p) for p in parts if p in MODIFIERS)
+            + tuple((keymap.key(p).scan,) for p in parts if p not in MODIFIERS),)
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args(argv)
+    logger.configure({"level": "ERROR", "file": None, "console": False})
+    failures = []
+
+    for hotkey, want in KNOWN_SHAPES:
+        got = sim.keyboard.parse_hotkey(hotkey)
+        if got != want:
+            failures.append(f"simulated parse_hotkey({hotkey!r}) = {got}, keyboard 0.13.5 gives {want}")
+    print(f"Simulated parser vs keyboard 0.13.5: {len(KNOWN_SHAPES)} shapes")
+
+    keyboard = real_parser()
+    if keyboard is None:
+        print("keyboard package not installed: triggers only checked with the simulated parser")
+    keymap = KeyMap(0)
+    combos = configured_triggers()
+    for combo in combos:
+        trigger = keymap.trigger(combo)
+        want = expected(keymap, combo)
+        parsers = [("simulated", sim.keyboard.parse_hotkey)]
+        if keyboard is not None:
+            parsers.append(("keyboard", keyboard.parse_hotkey))
+            for shape in (trigger, (trigger,), combo):
+                if keyboard.parse_hotkey(shape) != sim.keyboard.parse_hotkey(shape):
+                    failures.append(f"parsers disagree on {shape!r}")
+        for label, parse in parsers:
+            got = parse(trigger)
+            if got != want:
+                failures.append(f"{label} parse_hotkey({trigger!r}) for '{combo}' = {got}, expected {want}")
+    print(f"Triggers checked: {len(combos)} (parsers: simulated{', keyboard ' + keyboard.version if keyboard else ''})")
+
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Idle-cost budget on the simulated backend.
+
+Runs the engine idle for N seconds twice, with a target app running but not
+focused and with no target running (deep idle), samples CPU % and wakeups/s
+per component (core/idle_cost.py, the same snapshot as `babel_ctl.py idle`)
+and fails when a phase exceeds its budget.
+
+With a target running but no input, the context poll backs off to
+`context_poll.idle_interval_s` (1s), so the awake budget is a few wakeups/s
+rather than the 20/s of a fixed 50ms poll. The first keystroke after that
+must bring the poll back at once: a focus change made while idle is
+published within --wake-ms of it.
+
+Run: python benchmarks/bench_idle_cost.py [--seconds 5] [--output idle.json]
+         [--awake-wakeups 5] [--awake-cpu 3.0] [--idle-wakeups 5] [--idle-cpu 1.0] [--wake-ms 100]
+"""
+import argparse
+import json
+import sys
+import time
+
+import harness # Puts src/ on sys.path
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.context import ContextManager
+from core.idle_cost import format_summary
+from core.process_watcher import ProcessWatcher
+from fixtures import make_observer, NullWebListener
+
+
+def idle_phase(observer, seconds):
+    observer.get_idle_cost() # Starts the window
+    time.sleep(seconds)
+    return observer.get_idle_cost()
+
+
+class Foreground(ContextManager):
+    """ContextManager whose foreground app is `app` (None: no target focused)."""
+    def __init__(self, app=None):
+        super().__init__()
+        self.app = app
+
+    def is_target_active(self, target_list=None):
+        return self.app is not None and self.app in (target_list or self.target_apps)
+
+
+def wake_latency(observer, timeout=3.0):
+    """ms from the first keystroke after idle until a target focused meanwhile is published."""
+    observer.context_manager.app = "photoshop"
+    start = time.perf_counter()
+    sim.keyboard.tap("a")
+    while not observer.snapshot.active and time.perf_counter() - start < timeout:
+        time.sleep(0.001)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def check(label, snapshot, max_wakeups, max_cpu):
+    print(f"\n{label}\n{'-' * len(label)}")
+    print(format_summary(snapshot))
+    failures = []
+    if snapshot["wakeups_per_s"] > max_wakeups:
+        failures.append(f"{label}: {snapshot['wakeups_per_s']:.1f} wakeups/s > {max_wakeups}")
+    if snapshot["cpu_pct"] > max_cpu:
+        failures.append(f"{label}: {snapshot['cpu_pct']:.2f}% CPU > {max_cpu}%")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="idle time per phase")
+    parser.add_argument("--awake-wakeups", type=float, default=5.0)
+    parser.add_argument("--awake-cpu", type=float, default=3.0)
+    parser.add_argument("--idle-wakeups", type=float, default=5.0)
+    parser.add_argument("--idle-cpu", type=float, default=1.0) # One 10ms CPU tick is 0.2% of 5s
+    parser.add_argument("--wake-ms", type=float, default=100.0, help="budget from first input to context poll")
+    parser.add_argument("--output", help="write both snapshots as JSON")
+    args = parser.parse_args(argv)
+
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    logger.start()
+    observer = make_observer()
+    observer.context_manager = Foreground()
+    observer.web_listener = NullWebListener()
+    # Shipped lifecycle settings, with the simulated process table
+    observer.process_watcher = ProcessWatcher(
+        observer.config_manager.get_semantic_targets(), observer._on_targets_changed,
+        poll_interval=1.0, use_events=False, list_pids=sim.list_pids, process_name=sim.process_name)
+
+    photoshop = sim.start_process("Photoshop.exe")
+    observer.start()
+    awake = idle_phase(observer, args.seconds)
+    resting = observer._context_timer.interval
+    wake_ms = wake_latency(observer)
+    observer.context_manager.app = None
+
+    sim.exit_process(photoshop)
+    while not observer.deep_idle:
+        time.sleep(0.01)
+    deep_idle = idle_phase(observer, args.seconds)
+    observer.stop()
+    logger.shutdown()
+
+    failures = check("Target running, not focused", awake, args.awake_wakeups, args.awake_cpu)
+    failures += check("No target running (deep idle)", deep_idle, args.idle_wakeups, args.idle_cpu)
+    print(f"\nContext poll at rest every {resting:.2f}s; first keystroke -> focus change published in {wake_ms:.1f} ms")
+    if wake_ms > args.wake_ms:
+        failures.append(f"focus change published {wake_ms:.1f} ms after the first keystroke > {args.wake_ms} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"awake": awake, "deep_idle": deep_idle}, f, indent=4)
+
+    if failures:
+        print("\nOver budget:\n  " + "\n  ".join(failures))
+        return 1
+    print("\nWithin budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
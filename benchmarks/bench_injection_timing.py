@@ -0,0 +1,105 @@
+"""
+Per-app injection timing (core/injection_timing.py) on the simulated backend.
+
+1. The observer publishes the timing of the focused app from the app
+   registry in the shipped semantic_config.json: Photoshop keeps the
+   20/10 ms pacing, Figma in the browser gets none.
+2. Chord latency (MacroPlayer play -> last step) with each app's timing on
+   the real scheduler: the delay is only paid where the registry asks for it.
+3. Calibration (utils/calibrate_injection.py) against stand-in apps with
+   known needs finds exactly those needs.
+
+Run: python benchmarks/bench_injection_timing.py [--chords 30] [--trials 10]
+"""
+import argparse
+import queue
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.injection_timing import InjectionTiming, DEFAULT_TIMING, calibrate
+from core.injector import InjectionModule, MacroPlayer
+from core.scheduler import Scheduler
+from fixtures import make_observer
+from utils.calibrate_injection import StandInApp
+
+
+def published_timings(observer):
+    """{label: snapshot.timing} for Photoshop (desktop) and Figma (desktop, web)."""
+    timings = {}
+    for label, app, web in (("photoshop", "photoshop", False), ("figma desktop", "figma", False), ("figma web", "figma", True)):
+        observer._context_web = web
+        observer._update_mappings_for_context(app, active=True)
+        timings[label] = observer.snapshot.timing
+    return timings
+
+
+def chord_latency(injector, macros, timing, chords):
+    """ms from play() to the last step of `chords` ctrl+j injections, one at a time."""
+    steps = injector.compile("ctrl+j", timing)
+    samples = []
+    for _ in range(chords):
+        done = queue.Queue()
+        start = time.perf_counter_ns()
+        macros.play(steps, done.put)
+        done.get(timeout=2)
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chords", type=int, default=30)
+    parser.add_argument("--trials", type=int, default=10, help="chords per calibration candidate")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    failures = []
+
+    timings = published_timings(make_observer())
+    print("\nPublished timing per context (gap / settle ms, restore)")
+    for label, timing in timings.items():
+        print(f"  {label:<14} {timing.gap * 1000:5.1f} / {timing.settle * 1000:5.1f}  {timing.restore_modifiers}")
+    if timings["photoshop"] != DEFAULT_TIMING:
+        failures.append("photoshop lost its 20/10 ms pacing")
+    if timings["figma web"].gap or timings["figma web"].settle:
+        failures.append("browser figma still pays injection delays")
+
+    scheduler = Scheduler()
+    scheduler.start()
+    injector = InjectionModule()
+    macros = MacroPlayer(scheduler)
+    print(f"\nctrl+j injection, {args.chords} chords per app")
+    latencies = {}
+    for label, timing in timings.items():
+        samples = chord_latency(injector, macros, timing, args.chords)
+        latencies[label] = harness.percentile(samples, 50)
+        print(f"  {label:<14} p50 {latencies[label]:6.2f} ms  p99 {harness.percentile(samples, 99):6.2f} ms")
+    if latencies["figma web"] > 5:
+        failures.append("browser figma chords are not immediate")
+
+    print(f"\nCalibration against stand-in apps ({args.trials} chords per candidate)")
+    for need_gap, need_settle in ((15, 5), (0, 0), (5, 20)):
+        target = StandInApp(need_gap / 1000.0, need_settle / 1000.0)
+        start = time.perf_counter()
+        timing, results = calibrate(injector, macros, target, trials=args.trials)
+        target.close()
+        expected = InjectionTiming(need_gap / 1000.0, need_settle / 1000.0, True)
+        found = f"{timing.gap * 1000:.0f} / {timing.settle * 1000:.0f} ms" if timing else "none"
+        print(f"  needs {need_gap:>2} / {need_settle:>2} ms -> found {found} "
+              f"({len(results)} candidates, {time.perf_counter() - start:.1f}s)")
+        if timing != expected:
+            failures.append(f"calibration for {need_gap}/{need_settle} ms found {found}")
+    scheduler.stop()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Linux evdev/uinput backend (core/linux_backend.py), end to end.
+
+The full observer runs on the Linux backend with Photoshop focused
+(figma_to_photoshop profile). Input comes from a loopback source and
+everything the backend re-emits is read back:
+
+- with a writable /dev/uinput, the source is a second uinput device that the
+  backend grabs like a real keyboard/mouse, and the output is read from the
+  event node of Babel's virtual device (the kernel path a desktop sees);
+- otherwise (containers, CI) the same reader thread and output code run on
+  pipes that carry input_event frames.
+
+Reports write-to-read latency (p50/p99) for a passed-through key, a
+translated chord (ctrl+d -> ctrl+j) and a mouse move, and checks that
+translated keys never leak, that every chord arrives as one frame (one
+SYN_REPORT), and that nothing else is emitted. Also checks that installing
+the backend patched nothing global: core modules get it through
+core/backend.py, while ctypes and sys.modules keep the real packages.
+
+Run: python benchmarks/bench_linux_backend.py [--iterations 2000] [--pipe]
+"""
+import argparse
+import ctypes
+import os
+import select
+import sys
+import time
+
+import harness
+from core import linux_backend
+
+backend = linux_backend.install()
+
+from core import logger
+from core.linux_backend import (EV_KEY, EV_REL, EV_SYN, SYN_REPORT, REL_X, REL_Y, INPUT_EVENT, InputDevice,
+                                UInputDevice, pack_frame)
+from fixtures import make_observer
+
+CTRL, KEY_A, KEY_D, KEY_J = 29, 30, 32, 36
+
+
+class FrameReader:
+    """Splits the output stream into frames at SYN_REPORT."""
+    def __init__(self, fd):
+        self.fd = fd
+        self.buffer = b""
+        self.pending = []
+
+    def next_frame(self, timeout=1.0):
+        size = INPUT_EVENT.size
+        deadline = time.monotonic() + timeout
+        while True:
+            while len(self.buffer) >= size:
+                _, _, kind, code, value = INPUT_EVENT.unpack_from(self.buffer)
+                self.buffer = self.buffer[size:]
+                if kind == EV_SYN and code == SYN_REPORT:
+                    if self.pending:
+                        frame, self.pending = self.pending, []
+                        return frame
+                elif kind in (EV_KEY, EV_REL):
+                    self.pending.append((kind, code, value))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                return None
+            self.buffer += os.read(self.fd, 4096)
+
+
+def open_uinput_loopback(settings):
+    """Source uinput device -> grabbed by the backend -> Babel's uinput device -> its event node."""
+    source = UInputDevice.create("babel-bench-source")
+    time.sleep(0.3) # udev creates the event nodes
+    backend.start(settings, devices=[InputDevice.open(source.event_node())])
+    time.sleep(0.3)
+    out_fd = os.open(backend.output.event_node(), os.O_RDONLY | os.O_NONBLOCK)
+    return (lambda events: source.write(events)), out_fd, source.close
+
+
+def open_pipe_loopback(settings):
+    src_r, src_w = os.pipe()
+    out_r, out_w = os.pipe()
+    device = InputDevice(src_r, None, "babel-bench-source", grab=False)
+    backend.start(settings, devices=[device], output=UInputDevice(out_w, "babel-bench-output", setup=False))
+    return (lambda events: os.write(src_w, pack_frame(events))), out_r, lambda: os.close(src_w)
+
+
+def make():
+    observer = make_observer()
+    observer.debounce_interval = 0
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+    observer.scheduler.start()
+    deadline = time.perf_counter() + 2.0
+    while not backend.mouse_hook_count() and time.perf_counter() < deadline:
+        time.sleep(0.001) # The hook installs on its own message-loop thread
+    return observer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--pipe", action="store_true", help="pipe loopback even if /dev/uinput is writable")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+
+    settings = {"layout": "de", "foreground": "none"}
+    use_uinput = not args.pipe and os.access("/dev/uinput", os.W_OK)
+    send, out_fd, close_source = (open_uinput_loopback if use_uinput else open_pipe_loopback)(settings)
+    reader = FrameReader(out_fd)
+    observer = make()
+    print(f"\nLoopback: {'uinput' if use_uinput else 'pipe (no writable /dev/uinput)'}")
+
+    latencies = {"key passthrough": [], "chord translated": [], "mouse move": []}
+    failures = []
+
+    def roundtrip(label, events, expected):
+        start = time.perf_counter_ns()
+        send(events)
+        frame = reader.next_frame()
+        if label:
+            latencies[label].append(time.perf_counter_ns() - start)
+        if frame != expected:
+            failures.append(f"{label or 'key'}: got {frame}, expected {expected}")
+
+    for _ in range(args.iterations):
+        roundtrip("key passthrough", [(EV_KEY, KEY_A, 1)], [(EV_KEY, KEY_A, 1)])
+        roundtrip(None, [(EV_KEY, KEY_A, 0)], [(EV_KEY, KEY_A, 0)])
+
+        roundtrip(None, [(EV_KEY, CTRL, 1)], [(EV_KEY, CTRL, 1)])
+        # ctrl is physically held and part of the output: only j goes out, down and up behind one SYN
+        roundtrip("chord translated", [(EV_KEY, KEY_D, 1)], [(EV_KEY, KEY_J, 1), (EV_KEY, KEY_J, 0)])
+        send([(EV_KEY, KEY_D, 0)]) # Swallowed with its key-down
+        roundtrip(None, [(EV_KEY, CTRL, 0)], [(EV_KEY, CTRL, 0)])
+
+        roundtrip("mouse move", [(EV_REL, REL_X, 5), (EV_REL, REL_Y, -3)], [(EV_REL, REL_X, 5), (EV_REL, REL_Y, -3)])
+        if len(failures) > 10:
+            break
+
+    leftover = reader.next_frame(timeout=0.2)
+    if leftover:
+        failures.append(f"unexpected output {leftover}")
+
+    print(f"{args.iterations} iterations, write -> read back")
+    for label, samples in latencies.items():
+        print(f"  {label:<18} p50 {harness.percentile(samples, 50) / 1000:7.1f} us"
+              f"  p99 {harness.percentile(samples, 99) / 1000:7.1f} us")
+    summary = backend.summary()
+    print(f"\nBackend: {summary['frames']} frames in, {summary['output_writes']} writes out "
+          f"({summary['output_events']} events), {summary['suppressed']} suppressed")
+    injected = latencies["chord translated"]
+    if summary["suppressed"] < 2 * len(injected):
+        failures.append("translated key-downs/ups were not all suppressed")
+
+    patched = [name for name in ("keyboard", "mouse", "win32gui", "win32process")
+               if sys.modules.get(name) is getattr(backend, name)]
+    if getattr(ctypes, "windll", None) is backend.windll:
+        patched.append("ctypes.windll")
+    if patched:
+        failures.append(f"install() patched global state: {patched}")
+
+    observer._remove_local_hooks()
+    observer.scheduler.stop()
+    backend.stop()
+    close_source()
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Measures what logging adds to a hook callback.
+
+The callback body mirrors the fast path of InputObserver._handle_dynamic_hotkey
+(debounce check + lookup). We compare it bare, with a disabled debug call,
+with an enabled info call (ring append) and with the old synchronous print().
+
+Run: python benchmarks/bench_logger.py
+"""
+import io
+import sys
+import time
+
+import harness
+from core import logger
+
+lookup = {"ctrl+d": "ctrl+j", "esc": "ctrl+d", "ctrl+z": "ctrl+z"}
+last_trigger_times = {}
+
+
+def bare_callback(trigger="ctrl+d"):
+    now = time.time()
+    if now - last_trigger_times.get(trigger, 0) < -1:
+        return None
+    last_trigger_times[trigger] = now
+    return lookup.get(trigger, trigger)
+
+
+def main():
+    logger.configure({"level": "INFO", "file": None, "console": False})
+    quiet = logger.get_logger("bench-debug-off")
+    loud = logger.get_logger("bench-info-on")
+    hub = logger.get_hub()
+
+    def without_logging():
+        target = bare_callback()
+        return target
+
+    def with_disabled_debug():
+        target = bare_callback()
+        quiet.debug("Translated %s -> %s", "ctrl+d", target)
+
+    def with_ring_info():
+        target = bare_callback()
+        loud.info("Translated %s -> %s", "ctrl+d", target)
+        if len(hub.buffer) > 4096:
+            hub.buffer.clear() # keep the ring from saturating during the run
+
+    sink = io.StringIO()
+
+    def with_print():
+        target = bare_callback()
+        print(f"Translated ctrl+d -> {target}", file=sink)
+        if sink.tell() > 1 << 20:
+            sink.seek(0)
+            sink.truncate()
+
+    rows = [
+        ("no logging", harness.time_per_call(without_logging)),
+        ("+ disabled debug", harness.time_per_call(with_disabled_debug)),
+        ("+ enabled info (ring)", harness.time_per_call(with_ring_info)),
+        ("+ print() (old path)", harness.time_per_call(with_print)),
+    ]
+    harness.report("Hook callback cost with logging", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
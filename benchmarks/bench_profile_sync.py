@@ -0,0 +1,294 @@
+"""
+Fleet profile sync (core/profile_sync.py) against a local stand-in server.
+
+The stand-in serves a fleet layer over a synthetic 1000-action config: a
+studio profile setting every action, --teams team layers on top of it and
+an app registry entry. It answers If-None-Match with 304, `since=<version>`
+with a delta against that version and gzips when asked. The client runs
+through the real HTTP stack on loopback.
+
+1. Startup against a server that never answers: load_cache() and start()
+   return at once, the fetch times out on the sync thread.
+2. First fetch (full layer), then unchanged polls (304), then a team
+   layer edit (delta): bytes on the wire and apply latency for each, and
+   the observer's compiled mappings after the delta must equal those of
+   a fresh observer over the same profiles.
+3. An app registry change re-publishes the focused app's injection timing.
+4. The cache file is complete JSON with no temp file left behind, and a
+   fresh ConfigManager loading it resolves the same settings offline.
+5. A delta based on a version other than the client's makes it refetch
+   the full layer.
+
+Run: python benchmarks/bench_profile_sync.py [--teams 20] [--polls 50]
+"""
+import argparse
+import copy
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import harness
+from core import sim_backend
+
+sim_backend.install()
+
+from core import logger
+from core.profile_sync import ProfileSyncClient
+from config.config_manager import ConfigManager
+from fixtures import NullInjector, make_observer, make_synthetic_project_root
+
+ACTIONS = [f"action_{i:04d}" for i in range(1000)]
+
+
+def fleet_layer(teams):
+    profiles = {"studio.json": {"settings": {a: "figma" for a in ACTIONS}}}
+    for t in range(teams):
+        profiles[f"team{t:02d}.json"] = {"parents": ["studio.json"],
+                                         "settings": {ACTIONS[(t * 31 + k) % 1000]: "photoshop" for k in range(40)}}
+    return {"profiles": profiles, "apps": {"photoshop": {"injection": {"gap_ms": 20, "settle_ms": 10}}}}
+
+
+class FleetServer:
+    """Stand-in fleet endpoint. publish(layer) makes a new version; old versions stay diffable."""
+    def __init__(self, hang=False):
+        self.versions = {}
+        self.order = []
+        self.hang = hang
+        self.force_base = None # Answer every `since` with a delta against this version instead
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/fleet"
+        threading.Thread(target=self.httpd.serve_forever, name="bench-fleet", daemon=True).start()
+
+    def publish(self, layer, version=None):
+        version = version or f"v{len(self.order) + 1}"
+        self.versions[version] = copy.deepcopy(layer)
+        self.order.append(version)
+        return version
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, request):
+        if self.hang:
+            time.sleep(30)
+            return
+        current = self.order[-1]
+        since = parse_qs(urlparse(request.path).query).get("since", [None])[0]
+        self.requests.append(since)
+        if request.headers.get("If-None-Match") == f'"{current}"':
+            request.send_response(304)
+            request.send_header("ETag", f'"{current}"')
+            request.end_headers()
+            return
+        if since and self.force_base:
+            base = self.force_base
+            payload = dict(self.diff(self.versions[base], self.versions[current]), version=current, base=base)
+        elif since in self.versions:
+            payload = dict(self.diff(self.versions[since], self.versions[current]), version=current, base=since)
+        else:
+            payload = dict(self.versions[current], version=current, full=True)
+        body = json.dumps(payload).encode("utf-8")
+        gzipped = "gzip" in (request.headers.get("Accept-Encoding") or "")
+        if gzipped:
+            body = gzip.compress(body)
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("ETag", f'"{current}"')
+        if gzipped:
+            request.send_header("Content-Encoding", "gzip")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    @staticmethod
+    def diff(old, new):
+        delta = {}
+        for kind in ("profiles", "apps"):
+            entries = {name: entry for name, entry in new[kind].items() if old[kind].get(name) != entry}
+            entries.update({name: None for name in old[kind] if name not in new[kind]})
+            delta[kind] = entries
+        return delta
+
+
+def make_client(root, url, timeout=5):
+    config_manager = ConfigManager(root)
+    config_manager.config["active_profile"] = "team03.json"
+    client = ProfileSyncClient(config_manager, {"url": url, "timeout_s": timeout, "interval_s": 3600})
+    return config_manager, client
+
+
+def check_startup(root, failures):
+    server = FleetServer(hang=True)
+    server.publish({"profiles": {}, "apps": {}})
+    config_manager, client = make_client(root, server.url, timeout=0.5)
+    start = time.perf_counter()
+    client.load_cache()
+    client.start()
+    startup_ms = (time.perf_counter() - start) * 1000
+    deadline = time.time() + 3
+    while not client.stats["errors"] and time.time() < deadline:
+        time.sleep(0.01)
+    client.stop()
+    server.close()
+    print(f"\nStartup against a hanging server: {startup_ms:.2f} ms (fetch errors on the sync thread: {client.stats['errors']})")
+    if startup_ms > 50:
+        failures.append(f"startup took {startup_ms:.0f} ms with an unreachable server")
+    if not client.stats["errors"]:
+        failures.append("the hanging fetch never timed out")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--polls", type=int, default=50)
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    failures = []
+
+    root = make_synthetic_project_root()
+    check_startup(root, failures)
+
+    server = FleetServer()
+    layer = fleet_layer(args.teams)
+    server.publish(layer)
+    config_manager, client = make_client(root, server.url)
+    observer = make_observer(config_manager, NullInjector())
+    client.on_applied = observer.apply_fleet_changes
+    observer.profile_sync = client
+    observer._update_mappings_for_context("photoshop", active=True)
+    print(f"\nFleet layer: {len(layer['profiles'])} profiles, {len(layer['apps'])} apps; active profile team03.json")
+
+    rows = []
+    outcome = client.fetch_once()
+    rows.append(("full", outcome, client.stats["bytes_in"], client.stats["apply_ms_last"]))
+    if outcome != "full" or config_manager.get_user_profile()["settings"] != observer_settings(layer, "team03.json"):
+        failures.append(f"first fetch: {outcome}, active profile not resolved from the fleet layer")
+
+    bytes_before = client.stats["bytes_in"]
+    poll_ms = []
+    for _ in range(args.polls):
+        start = time.perf_counter()
+        outcome = client.fetch_once()
+        poll_ms.append((time.perf_counter() - start) * 1000)
+        if outcome != "not_modified":
+            failures.append(f"unchanged poll returned {outcome}")
+            break
+    rows.append((f"{args.polls} polls", "not_modified", client.stats["bytes_in"] - bytes_before, None))
+
+    layer["profiles"]["team03.json"]["settings"].update({ACTIONS[k]: "figma" for k in range(93, 133)})
+    layer["profiles"]["team03.json"]["settings"][ACTIONS[500]] = "photoshop"
+    server.publish(layer)
+    bytes_before = client.stats["bytes_in"]
+    outcome = client.fetch_once()
+    rows.append(("team edit", outcome, client.stats["bytes_in"] - bytes_before, client.stats["apply_ms_last"]))
+    if outcome != "delta":
+        failures.append(f"team layer edit fetched as {outcome}, expected a delta")
+
+    print(f"\n{'update':<12} {'outcome':<14} {'bytes':>8} {'apply ms':>9}")
+    for label, kind, size, apply_ms in rows:
+        print(f"{label:<12} {kind:<14} {size:8d} {apply_ms if apply_ms is not None else '-':>9}")
+    print(f"304 poll round trip p50 {harness.percentile(poll_ms, 50):.2f} ms  p99 {harness.percentile(poll_ms, 99):.2f} ms")
+
+    if context_rules(observer) != reference_rules(layer):
+        failures.append("observer mappings after the delta differ from a fresh observer over the same layer")
+    if context_rules(observer) == reference_rules(fleet_layer(args.teams)):
+        failures.append("the delta did not change the compiled mappings")
+
+    layer["apps"]["photoshop"] = {"injection": {"gap_ms": 5, "settle_ms": 5}}
+    server.publish(layer)
+    client.fetch_once()
+    timing = observer.snapshot.timing
+    print(f"App registry change: photoshop timing now {timing.gap * 1000:.0f} / {timing.settle * 1000:.0f} ms")
+    if (round(timing.gap * 1000), round(timing.settle * 1000)) != (5, 5):
+        failures.append("app registry change did not re-publish the injection timing")
+
+    cache_dir = os.path.dirname(client.cache_path)
+    leftovers = [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
+    with open(client.cache_path, "r", encoding="utf-8") as f:
+        cached = json.load(f)
+    offline, offline_client = make_client(root, "http://127.0.0.1:9/unreachable")
+    offline_client.load_cache()
+    print(f"Cache: {os.path.getsize(client.cache_path)} bytes, version {cached['version']}, temp files left: {len(leftovers)}")
+    if leftovers or cached["version"] != server.order[-1]:
+        failures.append("cache file incomplete or temp file left behind")
+    if offline.get_user_profile()["settings"] != config_manager.get_user_profile()["settings"]:
+        failures.append("a restart from the cache resolves different settings")
+
+    # A server answering with a delta against some other version (e.g. restored from a backup)
+    layer["profiles"]["team03.json"]["settings"][ACTIONS[501]] = "photoshop"
+    server.publish(layer)
+    server.force_base = server.order[0]
+    server.requests.clear()
+    outcome = client.fetch_once()
+    server.force_base = None
+    print(f"Delta on a base we don't have: {outcome} (requests with since={server.requests})")
+    if outcome != "full" or server.requests[-1] is not None:
+        failures.append(f"delta on a foreign base fetched as {outcome}, expected a full refetch")
+    if config_manager.get_user_profile()["settings"][ACTIONS[501]] != "photoshop":
+        failures.append("full refetch after a foreign base not applied")
+
+    # A local edit of a fleet profile would be dropped on save: it is refused instead
+    try:
+        config_manager.apply_profile_delta("team03.json", {ACTIONS[502]: "figma"})
+        refused = False
+    except ValueError:
+        refused = True
+    print(f"Local delta to a fleet profile: {'refused' if refused else 'ACCEPTED'}")
+    if not refused:
+        failures.append("a delta to a fleet profile was accepted (it would vanish on the next load)")
+
+    print(f"\nSync counters: {client.summary()}")
+    server.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def observer_settings(layer, name):
+    profiles = layer["profiles"]
+    settings = {}
+    for parent in profiles[name].get("parents", []):
+        settings.update(observer_settings(layer, parent))
+    settings.update(profiles[name]["settings"])
+    return settings
+
+
+def context_rules(observer):
+    """
+    The photoshop context's compiled rules, order-free (the synthetic config
+    reuses triggers across actions, so which rule wins a shared trigger in
+    the lookup depends on compile order).
+    """
+    return sorted((r["action"], r["input"], r["output"]) for r in observer.action_mapper.get_mappings_for_context("photoshop"))
+
+
+def reference_rules(layer):
+    """Rules of a fresh observer over `layer`, compiled from scratch."""
+    config_manager = ConfigManager(make_synthetic_project_root())
+    config_manager.config["active_profile"] = "team03.json"
+    config_manager.apply_fleet(layer, full=True)
+    observer = make_observer(config_manager, NullInjector())
+    observer._update_mappings_for_context("photoshop", active=True)
+    return context_rules(observer)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+On-demand sampling profiler (core/profiler.py) on the simulated backend.
+
+1. Off: no thread and no sys.setprofile/settrace hook once a run ends.
+   Reports the keyboard hook callback of a translated shortcut before,
+   during and after a run.
+2. A run while the engine works: the scheduler thread plus a worker busy in
+   a known function. The collapsed-stack file must name the threads, put
+   the busy function at the top of the non-idle samples and sample close
+   to the requested rate (a CPU-bound thread holding the GIL delays each
+   wakeup by up to the interpreter's switch interval). Reports the cost of
+   one sample of every thread.
+3. stop() ends a run early and still writes its samples.
+
+Run: python benchmarks/bench_profiler.py [--seconds 2] [--interval-ms 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from fixtures import NullInjector, make_config_manager, make_observer
+
+
+def make():
+    observer = make_observer(make_config_manager(), NullInjector())
+    observer.debounce_interval = 0
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+    trigger = next(t for t, output in sorted(observer.snapshot.lookup.items())
+                   if output != t and t in observer.registered_triggers and "+" in t and "wheel" not in t)
+    return observer, trigger
+
+
+def busy_loop(stop):
+    total = 0
+    while not stop.is_set():
+        total += sum(i * i for i in range(200))
+    return total
+
+
+def run_profile(observer, seconds, path, stop_after=None):
+    done = threading.Event()
+    result = {}
+
+    def on_done(value):
+        result.update(value)
+        done.set()
+
+    observer.start_profile(seconds, path, on_done)
+    if stop_after is not None:
+        time.sleep(stop_after)
+        observer.profiler.stop()
+    done.wait(seconds + 5)
+    return result
+
+
+def read_folded(path):
+    stacks = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, count = line.rstrip("\n").rsplit(" ", 1)
+            stacks[stack] = int(count)
+    return stacks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    failures = []
+    root = tempfile.mkdtemp(prefix="babel-profile-")
+
+    observer, trigger = make()
+    observer.profiler.interval = args.interval_ms / 1000.0
+    tap = lambda: sim.keyboard.tap(trigger)
+    threads_before = threading.active_count()
+    before = harness.time_per_call(tap, 20000)
+
+    observer.scheduler.start()
+    observer.start_profile(args.seconds, os.path.join(root, "during.folded"))
+    during = harness.time_per_call(tap, 20000)
+    observer.profiler.stop()
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="bench-busy", daemon=True)
+    worker.start()
+    path = os.path.join(root, "run.folded")
+    result = run_profile(observer, args.seconds, path)
+    stop.set()
+    worker.join()
+    observer.scheduler.stop()
+
+    after = harness.time_per_call(tap, 20000)
+    idle_threads = threading.active_count()
+
+    print(f"\n{trigger} hook callback: {before:.0f} ns before any run, {during:.0f} ns while sampling, "
+          f"{after:.0f} ns after")
+    print(f"Run: {result.get('samples')} samples in {result.get('seconds')}s "
+          f"({result.get('rate_hz')} Hz, {1000 / args.interval_ms:.0f} Hz requested), "
+          f"{result.get('sample_us')} us per sample of all threads, {result.get('stacks')} distinct stacks")
+    print(f"  samples per thread: {result.get('threads')}")
+    for label, count in result.get("top", [])[:5]:
+        print(f"  {count:6d}  {label}")
+
+    if not result.get("path"):
+        failures.append(f"run produced no file: {result}")
+    else:
+        stacks = read_folded(path)
+        threads = {stack.split(";", 1)[0] for stack in stacks}
+        if not {"bench-busy", "babel-scheduler", "MainThread"} <= threads:
+            failures.append(f"threads missing from the profile: {sorted(threads)}")
+        if any(not count for count in stacks.values()):
+            failures.append("empty stack counts in the collapsed file")
+        if not result["top"] or not result["top"][0][0].startswith(("busy_loop", "<genexpr>")):
+            failures.append(f"busy worker is not the top frame: {result['top'][:2]}")
+        # A CPU-bound thread keeps the GIL for up to sys.getswitchinterval() before the sampler gets it back
+        expected_hz = 1000 / max(args.interval_ms, 2 * sys.getswitchinterval() * 1000)
+        if result["rate_hz"] < 0.5 * expected_hz:
+            failures.append(f"sampled at {result['rate_hz']} Hz")
+    if idle_threads > threads_before or any(t.name == "babel-profiler" for t in threading.enumerate()):
+        failures.append("profiler thread still alive after its run")
+    if sys.getprofile() is not None or sys.gettrace() is not None:
+        failures.append("a profile/trace hook is installed")
+
+    started = time.perf_counter()
+    early = run_profile(observer, 30, os.path.join(root, "early.folded"), stop_after=0.3)
+    elapsed = time.perf_counter() - started
+    print(f"\nstop() after 0.3s of a 30s run: returned in {elapsed:.2f}s with {early.get('samples')} samples")
+    if elapsed > 2 or not early.get("samples") or not os.path.exists(os.path.join(root, "early.folded")):
+        failures.append("stop() did not end the run early with its samples written")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Layered profile resolution (config/profile_resolver.py).
+
+Two synthetic hierarchies over a 1000-action config:
+- deep:   one chain of --depth layers, each overriding a few actions;
+- studio: a base profile, --teams team layers and --people personal
+          profiles (each with one team parent, every fifth also inheriting
+          a shared "extras" layer).
+
+Reports the cold resolution time of every profile, the memoised lookup
+cost, the memory held by the memo, and what a change costs: editing the
+base (everything below it re-resolves), a team layer (only its members) or
+a personal profile (only itself). Every resolved profile is checked against
+a naive, unmemoised flatten.
+
+Run: python benchmarks/bench_profiles.py [--depth 64] [--teams 20] [--people 480]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import harness
+from core import sim_backend
+
+sim_backend.install()
+
+from core import logger
+from config.profile_resolver import ProfileResolver
+
+ACTIONS = [f"action_{i:04d}" for i in range(1000)]
+CHOICES = ("figma", "photoshop", "custom: f13")
+
+
+def deep_profiles(depth):
+    profiles = {"layer000.json": {"settings": {a: "figma" for a in ACTIONS}}}
+    for level in range(1, depth):
+        overrides = {ACTIONS[(level * 7 + k) % len(ACTIONS)]: CHOICES[level % 3] for k in range(5)}
+        profiles[f"layer{level:03d}.json"] = {"parents": [f"layer{level - 1:03d}.json"], "settings": overrides}
+    return profiles
+
+
+def studio_profiles(teams, people):
+    profiles = {
+        "studio.json": {"settings": {a: "figma" for a in ACTIONS}},
+        "extras.json": {"settings": {ACTIONS[k]: "custom: f13" for k in range(0, 1000, 50)}},
+    }
+    for t in range(teams):
+        profiles[f"team{t:02d}.json"] = {"parents": ["studio.json"],
+                                         "settings": {ACTIONS[(t * 31 + k) % 1000]: "photoshop" for k in range(40)}}
+    for p in range(people):
+        parents = [f"team{p % teams:02d}.json"] + (["extras.json"] if p % 5 == 0 else [])
+        profiles[f"person{p:03d}.json"] = {"parents": parents,
+                                           "settings": {ACTIONS[(p * 13 + k) % 1000]: CHOICES[k % 3] for k in range(3)}}
+    return profiles
+
+
+def naive_settings(profiles, name):
+    settings = {}
+    for parent in profiles[name].get("parents", []):
+        settings.update(naive_settings(profiles, parent))
+    settings.update(profiles[name]["settings"])
+    return settings
+
+
+def measure(label, profiles, edits):
+    resolver = ProfileResolver(lambda: profiles)
+    names = list(profiles)
+
+    tracemalloc.start()
+    start = time.perf_counter_ns()
+    for name in names:
+        resolver.resolve(name)
+    cold_ms = (time.perf_counter_ns() - start) / 1e6
+    memo_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    leaf = names[-1]
+    hit_ns = harness.time_per_call(lambda: resolver.settings(leaf), 100000)
+    print(f"\n{label}: {len(names)} profiles")
+    print(f"  cold resolve of all    {cold_ms:8.2f} ms  ({cold_ms * 1000 / len(names):.1f} us per profile, "
+          f"{resolver.stats['flattened']} flattens)")
+    print(f"  memoised lookup        {hit_ns:8.0f} ns")
+    print(f"  memo memory            {memo_bytes / 1024:8.0f} KiB")
+
+    failures = [f"{label}: {name} differs from a naive flatten" for name in names
+                if resolver.settings(name) != naive_settings(profiles, name)]
+
+    for edited in edits:
+        profiles[edited]["settings"][ACTIONS[0]] = "photoshop"
+        start = time.perf_counter_ns()
+        stale = resolver.invalidate(edited)
+        flattened = resolver.stats["flattened"]
+        for name in names:
+            resolver.resolve(name)
+        elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+        expected = {edited} | {n for n in names if edited in resolver.lineage(n)}
+        print(f"  edit {edited:<20} {len(stale):4d} invalidated, re-resolve {elapsed_ms:7.2f} ms "
+              f"({resolver.stats['flattened'] - flattened} flattens)")
+        if stale != expected:
+            failures.append(f"{label}: editing {edited} invalidated {len(stale)} profiles, expected {len(expected)}")
+        failures += [f"{label}: {name} stale after editing {edited}" for name in names
+                     if resolver.settings(name) != naive_settings(profiles, name)]
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=64)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--people", type=int, default=480)
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+
+    depth = args.depth
+    failures = measure(f"deep (chain of {depth})", deep_profiles(depth),
+                       ["layer000.json", f"layer{depth // 2:03d}.json", f"layer{depth - 1:03d}.json"])
+    failures += measure(f"studio ({args.teams} teams)", studio_profiles(args.teams, args.people),
+                        ["studio.json", "team03.json", "extras.json", f"person{args.people - 1:03d}.json"])
+
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
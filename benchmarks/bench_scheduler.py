@@ -0,0 +1,180 @@
+"""
+The timer-wheel scheduler (core/scheduler.py).
+
+1. Insert + cancel + fire cost of the bare timer wheel vs. a binary heap
+   (both with 10ms advance steps; the heap cancels lazily).
+2. Firing lateness of the scheduler thread (real clock).
+3. Idle: an empty scheduler thread never wakes.
+4. Zoom gesture and injection macro timelines on a ManualClock: exact,
+   deterministic step times, no sleeps in the hook thread.
+
+Run: python benchmarks/bench_scheduler.py
+"""
+import heapq
+import random
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.injector import InjectionModule, MacroPlayer
+from core.mouse_hook import WM_MOUSEWHEEL
+from core.scheduler import Scheduler, ManualClock, Timer, TimerWheel
+from fixtures import make_observer
+
+TIMERS = 50000
+
+
+def delays(count, seed=7):
+    rng = random.Random(seed)
+    # Mostly short deadlines (debounce, injection steps), some long ones (sticky zoom, probes)
+    return [rng.choice((rng.uniform(0, 0.1), rng.uniform(0, 2.0), rng.uniform(0, 60.0))) for _ in range(count)]
+
+
+def wheel_cost(values, resolution=0.001):
+    wheel = TimerWheel()
+    fired = []
+    start = time.perf_counter()
+    timers = []
+    for d in values:
+        timer = Timer(None, d, None, ())
+        timer.expires = int(d / resolution) + 1
+        wheel.insert(timer)
+        timers.append(timer)
+    for timer in timers[::3]:
+        wheel.remove(timer)
+    tick = 0
+    while wheel.size:
+        tick += 10
+        due = []
+        wheel.advance(tick, due)
+        fired.extend(timer.deadline for timer in due)
+    return (time.perf_counter() - start) * 1e9 / len(values), fired
+
+
+def heap_cost(values):
+    now = 0.0
+    fired = []
+    start = time.perf_counter()
+    heap = []
+    entries = []
+    for seq, d in enumerate(values):
+        entry = [d, seq, d, True] # Same bookkeeping as a Timer: deadline, order, payload, live flag
+        heapq.heappush(heap, entry)
+        entries.append(entry)
+    for entry in entries[::3]:
+        entry[3] = False # Lazy cancel: dead entries stay until popped
+    while heap:
+        now += 0.01
+        while heap and heap[0][0] <= now:
+            _, _, d, alive = heapq.heappop(heap)
+            if alive:
+                fired.append(d)
+    return (time.perf_counter() - start) * 1e9 / len(values), fired
+
+
+def lateness(count=200):
+    scheduler = Scheduler()
+    scheduler.start()
+    samples = []
+    rng = random.Random(3)
+    for _ in range(count):
+        deadline = time.monotonic() + rng.uniform(0.001, 0.02)
+        done = []
+        scheduler.call_at(deadline, lambda: done.append(time.monotonic()))
+        while not done:
+            time.sleep(0.001)
+        samples.append((done[0] - deadline) * 1e6)
+    scheduler.stop()
+    return samples
+
+
+def idle_wakeups(window=1.0):
+    scheduler = Scheduler()
+    scheduler.start()
+    time.sleep(0.05)
+    before = scheduler.wakeups
+    time.sleep(window)
+    wakeups = scheduler.wakeups - before
+    scheduler.stop()
+    return wakeups
+
+
+def run_manual(scheduler, clock, until, step=0.001):
+    while clock.now < until:
+        clock.advance(step)
+        scheduler.advance()
+
+
+def zoom_timeline():
+    """Three wheel notches 100ms apart with ctrl held, then nothing."""
+    clock = ManualClock(1000.0)
+    observer = make_observer()
+    observer.scheduler = Scheduler(clock)
+    observer.clock = clock
+    observer._publish_snapshot(active=True, app="photoshop", lookup={"ctrl+wheel": "alt+wheel"})
+    events = []
+    injection = observer.injection_module
+    injection.press_key = lambda name: events.append((round((clock.now - 1000.0) * 1000), "press", name))
+    injection.release_key = lambda name: events.append((round((clock.now - 1000.0) * 1000), "release", name))
+    sim.keyboard.held.add("ctrl")
+    wheel_steps = len(sim.mouse.wheel_steps)
+    for _ in range(3):
+        suppressed = not observer._on_low_level_mouse({"msg": WM_MOUSEWHEEL, "delta": 120})
+        assert suppressed
+        run_manual(observer.scheduler, clock, clock.now + 0.1)
+    run_manual(observer.scheduler, clock, clock.now + 1.5)
+    sim.keyboard.held.discard("ctrl")
+    assert observer.zoom_phase is None
+    return events, len(sim.mouse.wheel_steps) - wheel_steps, observer.scheduler.fired
+
+
+def macro_timeline():
+    clock = ManualClock()
+    scheduler = Scheduler(clock)
+    player = MacroPlayer(scheduler)
+    injection = InjectionModule()
+    times = []
+    steps = [(delay, lambda f=func, a=args: (times.append(round(clock.now * 1000)), f(*a)), ())
+             for delay, func, args in injection.compile("ctrl+shift+j")]
+    done = []
+    player.play(steps, done.append)
+    run_manual(scheduler, clock, 0.2)
+    assert done == [None]
+    return times
+
+
+def main():
+    logger.configure({"level": "ERROR", "file": None, "console": False})
+    values = delays(TIMERS)
+    wheel_ns, wheel_fired = wheel_cost(values)
+    heap_ns, heap_fired = heap_cost(values)
+    assert sorted(wheel_fired) == sorted(heap_fired)
+    print("\nTimer insert + cancel 1/3 + fire (per timer)")
+    print("--------------------------------------------")
+    print(f"  timer wheel   {wheel_ns:8.0f} ns")
+    print(f"  binary heap   {heap_ns:8.0f} ns")
+
+    samples = lateness()
+    print("\nScheduler thread lateness (1-20ms deadlines)")
+    print(f"  p50 {harness.percentile(samples, 50):8.1f} us   p99 {harness.percentile(samples, 99):8.1f} us")
+
+    wakeups = idle_wakeups()
+    print(f"\nEmpty scheduler: {wakeups} wakeups in 1s")
+
+    events, wheel_flushes, fired = zoom_timeline()
+    print("\nZoom gesture on a ManualClock (ms since first notch)")
+    for at, kind, key in events:
+        print(f"  {at:6d}  {kind:<7} {key}")
+    print(f"  {wheel_flushes} wheel flushes, {fired} timers fired for the whole gesture")
+
+    print("\nctrl+shift+j macro step times (ms):", macro_timeline())
+    return 0 if wakeups == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Multi-stroke triggers (core/sequences.py).
+
+1. Matching cost per key against tries of 10 .. 100k sequences: the matcher
+   only ever looks at the children of one node, so it stays flat.
+2. The shipped custom profile with "layer_up": "custom: alt+l, u" and
+   "layer_down": "custom: alt+l, d" on the simulated backend, ManualClock:
+   a completed sequence, a broken one (buffered strokes replayed in order,
+   the breaking key after them) and a timed-out one.
+
+Run: python benchmarks/bench_sequences.py
+"""
+import random
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.injector import MacroPlayer
+from core.scheduler import Scheduler, ManualClock
+from core.sequences import SequenceTrie, SequenceMatcher, SEPARATOR
+from fixtures import make_config_manager, make_observer, NullInjector
+
+KEYS = [chr(c) for c in range(ord("a"), ord("z") + 1)] + [str(d) for d in range(10)]
+LEADERS = ["alt+l", "alt+k", "ctrl+space", "ctrl+alt+m"]
+
+
+def synthetic_sequences(count, seed=11):
+    rng = random.Random(seed)
+    sequences = set()
+    while len(sequences) < count:
+        strokes = [rng.choice(LEADERS)] + [rng.choice(KEYS) for _ in range(rng.randint(1, 4))]
+        sequences.add(SEPARATOR.join(strokes))
+    return sorted(sequences)
+
+
+def matching_cost(count, keys=200000):
+    sequences = synthetic_sequences(count)
+    trie = SequenceTrie(sequences)
+    matched = []
+    matcher = SequenceMatcher(trie, Scheduler(ManualClock()), lambda t, s: matched.append(t),
+                              lambda t, s, extra: None)
+    # Type the sequences themselves (every key walks the trie), one after another
+    stream = []
+    rng = random.Random(5)
+    while len(stream) < keys:
+        stream.extend(rng.choice(sequences).split(SEPARATOR))
+    stream = stream[:keys]
+    start_set = trie.starts()
+    start = time.perf_counter()
+    for stroke in stream:
+        if not matcher.feed(stroke) and stroke in start_set:
+            matcher.start(stroke)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1e9 / len(stream), len(matched)
+
+
+class RecordingInjector(NullInjector):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def inject(self, command, timing=None):
+        self.sent.append(command)
+
+    def compile(self, command, timing=None):
+        return [(0.0, self.inject, (command,))]
+
+
+def profile_timelines():
+    config_manager = make_config_manager()
+    config_manager.config["active_profile"] = "custom.json"
+    config_manager.apply_profile_delta("custom.json", {"layer_up": "custom: alt+l, u", "layer_down": "custom: alt+l, d"})
+    injector = RecordingInjector()
+    observer = make_observer(config_manager, injector)
+    clock = ManualClock()
+    observer.scheduler = Scheduler(clock)
+    observer.clock = clock
+    observer.macros = MacroPlayer(observer.scheduler)
+    observer.sequences.scheduler = observer.scheduler
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+
+    def run(keys, settle=0.0):
+        injector.sent.clear()
+        for key in keys:
+            clock.advance(0.3) # Past the debounce window of the previous key
+            observer.scheduler.advance()
+            sim.keyboard.tap(key)
+        clock.advance(settle)
+        observer.scheduler.advance()
+        return list(injector.sent)
+
+    return {
+        "alt+l, u (layer up)": run(["alt+l", "u"]),
+        "alt+l, d (layer down)": run(["alt+l", "d"]),
+        "alt+l, x (no such sequence)": run(["alt+l", "x"]),
+        "alt+l, then nothing": run(["alt+l"], settle=observer.sequence_timeout + 0.01),
+        "ctrl+r (plain trigger)": run(["ctrl+r"]),
+    }
+
+
+def main():
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    print("\nMatching cost per key")
+    print("---------------------")
+    costs = []
+    for count in (10, 100, 1000, 10000, 100000):
+        ns, matched = matching_cost(count)
+        costs.append(ns)
+        print(f"  {count:>7} sequences  {ns:8.0f} ns/key  ({matched} matched)")
+
+    print("\nShipped custom profile, simulated keyboard (what reaches the app)")
+    timelines = profile_timelines()
+    for label, sent in timelines.items():
+        print(f"  {label:<28} -> {sent}")
+
+    expected = {
+        "alt+l, u (layer up)": ["ctrl+ä"],
+        "alt+l, d (layer down)": ["ctrl+#"],
+        "alt+l, x (no such sequence)": ["alt+l", "x"],
+        "alt+l, then nothing": ["alt+l"],
+        "ctrl+r (plain trigger)": ["ctrl+z"],
+    }
+    flat = max(costs) < 2.0 * min(costs)
+    print(f"\nCost spread across trie sizes: {max(costs) / min(costs):.2f}x")
+    return 0 if timelines == expected and flat else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Shadow (observe-only) mode on the simulated backend.
+
+Types a trace of the shipped profile's triggers (plus debounced repeats)
+into a focused Photoshop with shadow mode on and checks that nothing was
+suppressed or injected, then prints the would-be decisions and their cost
+from the ShadowReport, next to the same trace typed with shadow mode off.
+
+Run: python benchmarks/bench_shadow.py [--events 20000]
+"""
+import argparse
+import sys
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.gestures import is_mouse_trigger
+from core.scheduler import ManualClock
+from core.shadow import format_summary
+from fixtures import make_observer, NullInjector
+
+
+def make(shadow):
+    sim.keyboard.unhook_all()
+    sim.keyboard.reset_injected()
+    observer = make_observer(injection_module=NullInjector() if not shadow else None)
+    observer.set_shadow_mode(shadow)
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+    observer.clock = ManualClock() # Typing speed comes from the trace, not the wall clock
+    return observer
+
+
+def trace(observer, count):
+    """(key, seconds since the previous key): one shortcut every 300ms, every fourth one a quick repeat."""
+    triggers = sorted(t for t in observer.registered_triggers if not is_mouse_trigger(t))
+    return [(triggers[(i - (i % 4 == 3)) % len(triggers)], 0.05 if i % 4 == 3 else 0.3) for i in range(count)]
+
+
+def type_trace(observer, keys):
+    events = iter(keys)
+
+    def tap():
+        key, gap = next(events)
+        observer.clock.advance(gap)
+        sim.keyboard.tap(key)
+    return harness.sample_latencies(tap, len(keys))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+
+    # Shadow run: real InjectionModule, so any injection would show up in sim.keyboard.injected
+    observer = make(True)
+    keys = trace(observer, args.events)
+    suppressing = len(sim.keyboard.suppressing)
+    shadow_samples = type_trace(observer, keys)
+    injected = len(sim.keyboard.injected)
+    summary = observer.set_shadow_mode(False)
+    observer._remove_local_hooks()
+
+    live = make(False)
+    live_samples = type_trace(live, keys)
+    live._remove_local_hooks()
+
+    print("\nShadow run")
+    print("----------")
+    print(format_summary(summary))
+    if "path" in summary:
+        print(f"report: {summary['path']}")
+    print(f"\nsuppressing hotkeys while shadowing: {suppressing}, keys injected: {injected}")
+    print("\nPer key (hook callback incl. decision)")
+    for label, samples in (("shadow", shadow_samples), ("live (null injector)", live_samples)):
+        print(f"  {label:<22}  p50 {harness.percentile(samples, 50) / 1000:8.2f} us"
+              f"  p99 {harness.percentile(samples, 99) / 1000:8.2f} us")
+
+    if suppressing or injected or summary["events"] != len(keys):
+        print("\nShadow mode suppressed or injected input (or lost events).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Fleet telemetry (core/telemetry.py) load test against the stand-in
+collector (utils/telemetry_collector.py).
+
+--clients simulated machines each have their own flight recorder, spool
+directory and Telemetry instance. Every client writes --rounds flush
+intervals of synthetic hook decisions (translations, pass-throughs,
+debounces, injections, a few failures) into its flight recorder, flushes
+after each round and uploads at the end; uploads run --parallel at a time
+against one collector.
+
+Checks:
+- every counter the collector merged equals the sum of what the clients
+  recorded, and every merged histogram has exactly the buckets of one
+  histogram fed all samples (so fleet percentiles are exact to the bucket);
+- a client whose collector is unreachable keeps its spool under the cap
+  (oldest segments dropped and counted) and delivers the rest once the
+  collector is back;
+- sub-microsecond decision costs keep their resolution in the histograms;
+- a flush (and so stop()) does not wait for an upload stuck on a
+  collector that never answers.
+
+Reports the flush cost per decision, spool bytes per batch, upload
+compression and the collector's ingest rate.
+
+Run: python benchmarks/bench_telemetry.py [--clients 300] [--rounds 6] [--decisions 400] [--parallel 32]
+"""
+import argparse
+import collections
+import concurrent.futures
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import harness
+from core import sim_backend
+
+sim_backend.install()
+
+from core import logger
+from core import flight_recorder
+from core.flight_recorder import FlightRecorder
+from core.shadow import CostHistogram
+from core.telemetry import Spool, Telemetry
+from utils.telemetry_collector import make_server
+
+TRIGGERS = [f"ctrl+{chr(c)}" for c in range(ord("a"), ord("u"))]
+ACTIONS = {trigger: f"action_{i:02d}" for i, trigger in enumerate(TRIGGERS)}
+APPS = ("photoshop", "figma")
+
+
+class Client:
+    """One simulated machine: flight recorder + Telemetry, and what it recorded."""
+    def __init__(self, index, root, collector, max_spool_kb=4096):
+        self.index = index
+        self.flight = FlightRecorder(capacity=4096)
+        spool = Spool(f"{root}/client{index:04d}", max_total_bytes=max_spool_kb * 1024)
+        self.telemetry = Telemetry(self.flight, spool, collector, f"client{index:04d}", action_of=ACTIONS.get)
+        self.random = random.Random(index)
+        self.expected = collections.Counter() # (counter group, key) -> count
+        self.decision_costs = collections.defaultdict(CostHistogram)
+        self.flush_ns = 0
+
+    def play_round(self, decisions):
+        rand = self.random
+        record = self.flight.record
+        for _ in range(decisions):
+            trigger = rand.choice(TRIGGERS)
+            app = rand.choice(APPS)
+            roll = rand.random()
+            cost_us = int(rand.lognormvariate(3.5, 0.6)) # ~33 us median hook decision
+            if roll < 0.6:
+                record(flight_recorder.TRANSLATED, trigger, 1, app, "ctrl+z", 1, cost_us * 1000)
+                self.expected[("actions", ACTIONS[trigger])] += 1
+                self.decision_costs[ACTIONS[trigger]].add(cost_us * 1000)
+                name = "translated"
+            elif roll < 0.85:
+                record(flight_recorder.PASS_UNMAPPED, trigger, 1, app, None, 1, cost_us * 1000)
+                name = "pass_unmapped"
+            elif roll < 0.97:
+                record(flight_recorder.DEBOUNCED, trigger, 1, app, None, 1, cost_us * 1000)
+                self.expected[("drops", "debounced")] += 1
+                name = "debounced"
+            else:
+                record(flight_recorder.INJECT_FAILED, trigger, 1, None, "ctrl+z", 1, 60000 * 1000)
+                self.expected[("drops", "inject_failed")] += 1
+                self.expected[("decisions", "inject_failed")] += 1
+                continue
+            self.expected[("decisions", name)] += 1
+            self.expected[("contexts", app, name)] += 1
+        start = time.perf_counter_ns()
+        self.telemetry.flush()
+        self.flush_ns += time.perf_counter_ns() - start
+
+
+def check_resolution(root, failures):
+    """Decisions of 200-950 ns must not collapse into a zero bucket."""
+    client = Client(20000, root, None)
+    reference = CostHistogram()
+    for cost_ns in range(200, 1000, 50):
+        client.flight.record(flight_recorder.TRANSLATED, "ctrl+a", 1, "photoshop", "ctrl+z", 1, cost_ns)
+        reference.add(cost_ns)
+    batch = client.telemetry.flush()
+    histogram = CostHistogram.from_dict(batch["histograms"]["decision_us"][ACTIONS["ctrl+a"]])
+    print(f"\nSub-microsecond costs: p50 {histogram.percentile(50)} ns over {histogram.count} decisions")
+    if histogram.counts != reference.counts:
+        failures.append(f"sub-microsecond costs lost resolution: {dict(histogram.counts)}")
+
+
+def check_flush_during_upload(root, failures, timeout=2.0):
+    """An upload hanging on the collector must not hold up flush() / stop()."""
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen(8) # Accepts connections (in the backlog), never answers
+    client = Client(20001, root, f"http://127.0.0.1:{silent.getsockname()[1]}/ingest")
+    client.telemetry.timeout = timeout
+    client.play_round(50)
+    uploader = threading.Thread(target=client.telemetry.upload, name="bench-upload", daemon=True)
+    uploader.start()
+    time.sleep(0.2) # Request sent, waiting for the response
+    client.flight.record(flight_recorder.TRANSLATED, "ctrl+a", 1, "photoshop", "ctrl+z", 1, 1000)
+    start = time.perf_counter()
+    client.telemetry.flush()
+    flush_ms = (time.perf_counter() - start) * 1000.0
+    uploader.join()
+    silent.close()
+    print(f"Flush while an upload waits on a silent collector: {flush_ms:.1f} ms (upload timeout {timeout:.0f} s)")
+    if flush_ms > 100:
+        failures.append(f"flush waited {flush_ms:.0f} ms for an upload in flight")
+
+
+def merged_counter(counters, key):
+    value = counters
+    for part in key:
+        value = value.get(part, {}) if isinstance(value, dict) else 0
+    return value or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=6, help="flush intervals per client")
+    parser.add_argument("--decisions", type=int, default=400, help="hook decisions per client and round")
+    parser.add_argument("--parallel", type=int, default=32, help="concurrent uploads")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "ERROR", "file": None, "console": False})
+    failures = []
+
+    server, aggregate = make_server(port=0)
+    threading.Thread(target=server.serve_forever, name="bench-collector", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    root = tempfile.mkdtemp(prefix="babel-telemetry-")
+
+    clients = [Client(i, root, url) for i in range(args.clients)]
+    start = time.perf_counter()
+    for client in clients:
+        for _ in range(args.rounds):
+            client.play_round(args.decisions)
+    record_s = time.perf_counter() - start
+    decisions = args.clients * args.rounds * args.decisions
+    flush_ns = sum(client.flush_ns for client in clients)
+    spool_bytes = sum(client.telemetry.spool.stats["bytes"] for client in clients)
+    batches = sum(client.telemetry.spool.stats["batches"] for client in clients)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(args.parallel) as pool:
+        sent = sum(pool.map(lambda client: client.telemetry.upload(), clients))
+    upload_s = time.perf_counter() - start
+    raw = sum(client.telemetry.stats["raw_bytes"] for client in clients)
+    upload_errors = sum(client.telemetry.stats["upload_errors"] for client in clients)
+    wire = server.received["bytes"]
+
+    print(f"\n{args.clients} clients x {args.rounds} rounds x {args.decisions} decisions = {decisions} decisions "
+          f"(recorded and flushed in {record_s:.1f}s)")
+    print(f"  flush cost          {flush_ns / decisions:8.0f} ns per decision, off the hook threads")
+    print(f"  spool               {spool_bytes / batches:8.0f} bytes per batch ({batches} batches)")
+    print(f"  upload              {raw / 1024:8.0f} KiB raw -> {wire / 1024:.0f} KiB gzipped ({raw / max(wire, 1):.1f}x)")
+    print(f"  collector ingest    {sent} segments / {batches} batches in {upload_s:.2f}s "
+          f"({batches / upload_s:.0f} batches/s, {args.parallel} concurrent clients, {upload_errors} failed uploads)")
+
+    summary = aggregate.summary()
+    expected = collections.Counter()
+    for client in clients:
+        expected.update(client.expected)
+    wrong = [key for key, count in expected.items() if merged_counter(summary["counters"], key) != count]
+    if summary["clients"] != args.clients or summary["batches"] != batches or summary["records"] != decisions:
+        failures.append(f"collector saw {summary['clients']} clients / {summary['batches']} batches / "
+                        f"{summary['records']} records")
+    if wrong:
+        failures.append(f"{len(wrong)} merged counters differ, e.g. {wrong[0]}")
+
+    reference = collections.defaultdict(CostHistogram)
+    for client in clients:
+        for action, histogram in client.decision_costs.items():
+            reference[action].merge(histogram)
+    merged = aggregate.histograms["decision_us"]
+    mismatched = [action for action in reference if merged[action].counts != reference[action].counts]
+    if mismatched:
+        failures.append(f"merged histograms differ from the reference for {mismatched[:3]}")
+    sample = sorted(reference)[0]
+    print(f"  fleet {sample}  {merged[sample].summary()}")
+
+    # Collector down: the spool stays under its cap, then drains once it is back
+    cap_kb = 8
+    offline = Client(10000, root, "http://127.0.0.1:9/unreachable", max_spool_kb=cap_kb)
+    offline.telemetry.spool.max_file_bytes = 2048
+    offline.telemetry.timeout = 0.5
+    for _ in range(60):
+        offline.play_round(50)
+    offline.telemetry.upload()
+    pending = offline.telemetry.spool.pending_bytes()
+    spool_stats = offline.telemetry.spool.stats
+    print(f"\nCollector unreachable: spool {pending} bytes pending (cap {cap_kb} KiB + one open segment), "
+          f"{spool_stats['dropped_segments']} segments dropped, {offline.telemetry.stats['upload_errors']} failed uploads")
+    if pending > cap_kb * 1024 + offline.telemetry.spool.max_file_bytes:
+        failures.append(f"spool grew to {pending} bytes past its cap")
+    if not spool_stats["dropped_segments"]:
+        failures.append("spool over its cap dropped nothing")
+    batches_before = aggregate.batches
+    offline.telemetry.collector = url
+    offline.telemetry.upload()
+    delivered = aggregate.batches - batches_before
+    print(f"Collector back: {delivered} batches delivered, spool now {offline.telemetry.spool.pending_bytes()} bytes")
+    if not delivered or offline.telemetry.spool.pending_bytes():
+        failures.append("spooled batches not delivered after the collector came back")
+
+    check_resolution(root, failures)
+    check_flush_during_upload(root, failures)
+
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(root, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Text entry pass-through on the simulated backend.
+
+Web apps: the WebContextListener's connection handler on its own event
+loop thread, fed what the Babel Bridge sends (context_change, then
+text_entry on each focus transition). Desktop apps: the edit control (and
+opt-in caret) heuristic of ContextManager against the simulated GetGUIThreadInfo.
+
+Checks:
+- focusing a text field disarms the keyboard hotkeys: keys typed there
+  never reach a Babel callback (no suppress-and-reinject), while the mouse
+  hook (zoom, gestures) stays installed;
+- leaving it re-arms them and shortcuts translate again;
+- repeated reports of the same state change nothing, and a dropped bridge
+  connection ends text entry;
+- the desktop heuristic switches the same way for a desktop target app,
+  a caret in a custom control only with "caret" on;
+- switching into an app whose text field has focus publishes the app and
+  its text entry state in the same snapshot.
+
+Reports the bridge report -> disarm / re-arm latency and the cost of a
+keystroke while armed and while typing in a text field.
+
+Run: python benchmarks/bench_text_entry.py [--rounds 20]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.context import ContextManager
+from core.web_listener import WebContextListener
+from fixtures import NullInjector, make_config_manager, make_observer
+
+
+class FocusedApp(ContextManager):
+    """ContextManager whose foreground process is `app` (the caret heuristic is the real one)."""
+    def __init__(self, app=None):
+        super().__init__()
+        self.app = app
+
+    def is_target_active(self, target_list=None):
+        return bool(self.app) and any(t.lower() in self.app for t in (target_list or self.target_apps))
+
+
+class BridgeConnection:
+    """One Babel Bridge connection: the listener's handler runs on a loop thread, send() feeds it messages."""
+    def __init__(self, listener):
+        self.loop = asyncio.new_event_loop()
+        self.queue = asyncio.Queue()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(listener._handler(self),),
+                                       name="bench-bridge", daemon=True)
+        self.thread.start()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    def send(self, **message):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, json.dumps(message))
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        self.thread.join()
+
+
+def wait_for(predicate, timeout=3.0):
+    start = time.perf_counter()
+    while not predicate():
+        if time.perf_counter() - start > timeout:
+            return None
+        time.sleep(0.0005)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def make(context_manager):
+    observer = make_observer(make_config_manager(), NullInjector())
+    observer.context_manager = context_manager
+    observer.debounce_interval = 0
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    return observer
+
+
+def translating_trigger(observer):
+    return next(t for t, output in sorted(observer.snapshot.lookup.items())
+                if output != t and t in observer.registered_triggers and "+" in t and "wheel" not in t)
+
+
+def web(rounds, failures):
+    observer = make(FocusedApp())
+    listener = WebContextListener()
+    listener.on_text_entry = observer._on_bridge_text_entry
+    observer.web_listener = listener
+    observer.scheduler.start()
+    observer._start_context_polling()
+    bridge = BridgeConnection(listener)
+    send = bridge.send
+
+    send(event="context_change", app="photoshop", url="https://photoshop.adobe.com/id/abc")
+    wait_for(lambda: observer.snapshot.active and observer.hooks_armed)
+    trigger = translating_trigger(observer)
+    mouse_hook = sim.mouse_hook_count() > 0
+
+    disarm_ms, rearm_ms = [], []
+    for _ in range(rounds):
+        send(event="text_entry", editing=True)
+        disarm_ms.append(wait_for(lambda: not observer.hooks_armed) or float("inf"))
+        send(event="text_entry", editing=False)
+        rearm_ms.append(wait_for(lambda: observer.hooks_armed) or float("inf"))
+
+    tap = lambda: sim.keyboard.tap(trigger)
+    armed_ns = harness.time_per_call(tap, 5000)
+    translated = observer.metrics["translated"]
+    send(event="text_entry", editing=True)
+    wait_for(lambda: not observer.hooks_armed)
+    hotkeys = observer.metrics["hotkeys"]
+    editing_ns = harness.time_per_call(tap, 5000)
+    typed_through = observer.metrics["hotkeys"] - hotkeys
+    mouse_kept = sim.mouse_hook_count() > 0
+    switches = observer.metrics["text_entry_switches"]
+    for _ in range(10):
+        send(event="text_entry", editing=True) # An outdated bridge could repeat itself: no effect
+    time.sleep(0.2)
+    repeated = observer.metrics["text_entry_switches"] - switches
+
+    send(event="text_entry", editing=False)
+    wait_for(lambda: observer.hooks_armed)
+    tap()
+    translated_after = observer.metrics["translated"] - translated
+    send(event="text_entry", editing=True)
+    wait_for(lambda: not observer.hooks_armed)
+    bridge.close()
+    dropped_ms = wait_for(lambda: not listener.text_entry and not observer.snapshot.editing)
+    observer.scheduler.stop()
+
+    print(f"\nWeb (bridge): {rounds} focus/blur rounds of a text field in Photoshop on the web, trigger {trigger}")
+    print(f"  report -> keyboard hotkeys disarmed  p50 {harness.percentile(sorted(disarm_ms), 50):6.2f} ms  "
+          f"max {max(disarm_ms):6.2f} ms")
+    print(f"  report -> re-armed                   p50 {harness.percentile(sorted(rearm_ms), 50):6.2f} ms  "
+          f"max {max(rearm_ms):6.2f} ms")
+    print(f"  keystroke, armed (translated)        {armed_ns:8.0f} ns")
+    print(f"  keystroke, typing in a text field    {editing_ns:8.0f} ns  ({typed_through} Babel callbacks)")
+    print(f"  bridge reports received {listener.text_entry_reports}, text entry switches {observer.metrics['text_entry_switches']}")
+
+    if max(disarm_ms + rearm_ms) > 500:
+        failures.append("a text entry report took longer than 500 ms to apply")
+    if typed_through:
+        failures.append(f"{typed_through} keys typed in a text field reached a Babel callback")
+    if mouse_hook and not mouse_kept:
+        failures.append("mouse hook removed while typing in a text field")
+    if repeated:
+        failures.append(f"{repeated} repeated reports switched the text entry state")
+    if translated_after != 1:
+        failures.append("shortcut not translated after leaving the text field")
+    if dropped_ms is None:
+        failures.append("text entry not cleared when the bridge disconnected")
+
+
+def desktop(failures):
+    context = FocusedApp("photoshop.exe")
+    observer = make(context)
+    observer.web_listener.get_active_web_app = lambda: None
+    cases = [
+        ("nothing focused", "", 0, False, False),
+        ("Edit control focused", "Edit", 0, True, True),
+        ("caret in a custom control", "PSViewC", 7, False, True),
+        ("RichEdit focused", "RICHEDIT50W", 0, True, True),
+        ("canvas focused, no caret", "PSViewC", 0, False, False),
+    ]
+    for caret in (False, True):
+        observer.text_entry_caret = caret
+        print(f"\nDesktop (edit controls{', any caret' if caret else ''}), Photoshop focused:")
+        for label, focus_class, caret_hwnd, expected, expected_caret in cases:
+            expected = expected_caret if caret else expected
+            sim.focus_class = focus_class
+            sim.caret_hwnd = caret_hwnd
+            observer._poll_context()
+            snapshot = observer.snapshot
+            state = "text entry, hotkeys disarmed" if snapshot.editing else "hotkeys armed"
+            print(f"  {label:<28} -> {state}")
+            if snapshot.editing != expected or observer.hooks_armed == expected:
+                failures.append(f"desktop heuristic (caret={caret}): {label} gave editing={snapshot.editing}, "
+                                f"armed={observer.hooks_armed}")
+    observer.text_entry_caret = False
+
+    # Switching into an app whose text field has focus: no snapshot may show that app as armed
+    context.app = "figma.exe"
+    sim.focus_class = ""
+    observer._poll_context()
+    published = []
+    publish = observer._publish_snapshot
+    observer._publish_snapshot = lambda **changes: published.append(publish(**changes)) or published[-1]
+    context.app = "photoshop.exe"
+    sim.focus_class = "Edit"
+    observer._poll_context()
+    observer._publish_snapshot = publish
+    stale = [s for s in published if s.app == "photoshop" and not s.editing]
+    print(f"  switch into a focused text field  -> {len(published)} snapshots, {len(stale)} without text entry")
+    if stale or not published:
+        failures.append(f"context switch published {len(stale)} snapshots of the new app without its text entry state")
+
+    sim.focus_class, sim.caret_hwnd = "", 0
+    cost = harness.time_per_call(context.is_text_entry_focused, 20000)
+    print(f"  heuristic cost per context poll      {cost:8.0f} ns")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="text field focus/blur rounds over the bridge")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    failures = []
+
+    web(args.rounds, failures)
+    desktop(failures)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
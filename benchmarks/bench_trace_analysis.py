@@ -0,0 +1,183 @@
+"""
+Offline trace analysis (utils/trace_analysis.py) on a synthetic trace.
+
+The trace mimics weeks of studio use: the shipped profiles' triggers plus
+unhooked chords, repeated presses (some inside the debounce interval),
+zoom wheel bursts and app switches between the target apps and other
+apps. It is written straight into a trace directory, chunk by chunk.
+
+Checks:
+1. Import: two overlapping flight recordings of one session become one
+   trace holding every key press and wheel step exactly once, in order.
+2. Every profile's decisions on a sample agree with the engine
+   (InputObserver replaying the same events on the simulated backend).
+3. Chunking changes nothing: a small trace analysed in odd-sized chunks
+   gives the same report as in one chunk (debounce and bursts carry over).
+4. Throughput of the full analysis (all profiles) over the whole trace.
+
+Run: python benchmarks/bench_trace_analysis.py [--events 20000000] [--verify 20000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+import numpy as np
+
+from core import logger
+from core import flight_recorder
+from core.action_mapper import ActionMapper
+from core.gestures import is_mouse_trigger
+from fixtures import make_config_manager
+from utils import trace_analysis
+
+PROFILES = ["figma_to_photoshop.json", "photoshop_to_figma.json", "custom.json"]
+
+
+def trace_tables(config_manager):
+    """Chords (every profile's keyboard triggers, a few unhooked chords, the wheel) and apps."""
+    chords = set()
+    for profile in PROFILES:
+        config_manager.config["active_profile"] = profile
+        chords |= {t for t in ActionMapper(config_manager).get_all_configured_triggers() if not is_mouse_trigger(t)}
+    config_manager.config["active_profile"] = PROFILES[0]
+    chords = [""] + sorted(chords) + ["ctrl+q", "alt+f4", "ctrl+shift+p", trace_analysis.WHEEL_CHORD]
+    apps = [""] + sorted(config_manager.get_semantic_targets())
+    return chords, apps
+
+
+def write_synthetic(directory, events, chords, apps, seed=7, chunk=1 << 22):
+    rng = np.random.default_rng(seed)
+    trace = trace_analysis.Trace.create(directory, events, chords, apps, {"source": "synthetic"})
+    weights = rng.pareto(1.2, len(chords)) + 0.05 # A few shortcuts dominate, like real use
+    weights[0] = 0
+    weights[-1] *= 4 # Wheel steps
+    weights /= weights.sum()
+    wheel = len(chords) - 1
+    app_weights = np.array([0.3] + [0.7 / (len(apps) - 1)] * (len(apps) - 1))
+    now = int(time.time() * 1e9) - events * 600_000_000
+    chord_carry, app_carry = 1, 1
+    for start in range(0, events, chunk):
+        n = min(chunk, events - start)
+        chord = rng.choice(len(chords), n, p=weights).astype(np.uint16)
+        repeat = rng.random(n) < 0.25
+        repeat[0] = False
+        chord[0] = chord_carry if start else chord[0]
+        chord = chord[np.maximum.accumulate(np.where(repeat, 0, np.arange(n)))]
+        switch = rng.random(n) < 0.003
+        switch[0] = True
+        app = rng.choice(len(apps), n, p=app_weights).astype(np.uint16)
+        app[0] = app_carry if start else app[0]
+        app = app[np.maximum.accumulate(np.where(switch, np.arange(n), 0))]
+
+        gaps = rng.exponential(900e6, n).astype(np.int64)           # Ordinary presses
+        close = repeat & (rng.random(n) < 0.8)
+        gaps[close] = rng.integers(40_000_000, 450_000_000, close.sum()) # Repeats, around the debounce interval
+        steps = chord == wheel
+        gaps[steps & repeat] = rng.integers(8_000_000, 120_000_000, (steps & repeat).sum())
+        gaps += rng.integers(1, 1000, n) # Sub-microsecond jitter: no press lands exactly on an interval
+        times = now + np.cumsum(gaps)
+        now = int(times[-1])
+        chord_carry, app_carry = chord[-1], app[-1]
+        trace.time_ns[start:start + n] = times
+        trace.chord[start:start + n] = chord
+        trace.app[start:start + n] = app
+    trace.close()
+    return trace_analysis.Trace.open(directory)
+
+
+def check_import(root, failures):
+    recorder = flight_recorder.FlightRecorder(capacity=4096)
+    expected = []
+    decisions = [flight_recorder.TRANSLATED, flight_recorder.PASS_UNMAPPED, flight_recorder.DEBOUNCED,
+                 flight_recorder.INJECTED, flight_recorder.WHEEL_SUPPRESSED, flight_recorder.ZOOM_BEGIN]
+    paths = []
+    for i in range(3000):
+        decision = decisions[i % len(decisions)]
+        app = "photoshop" if i % 7 else ""
+        recorder.record(decision, "ctrl+wheel" if decision == flight_recorder.WHEEL_SUPPRESSED else f"ctrl+{i % 5}",
+                        1, app, None)
+        if decision in trace_analysis.KEY_DECISIONS:
+            expected.append((f"ctrl+{i % 5}", app))
+        elif decision == flight_recorder.WHEEL_SUPPRESSED:
+            expected.append((trace_analysis.WHEEL_CHORD, app))
+        if i in (1999, 2999): # Two dumps of the same ring: the second overlaps the first
+            paths.append(os.path.join(root, f"flight-{i}.bfr"))
+            recorder.dump(paths[-1])
+    directory = os.path.join(root, "imported")
+    trace_analysis.import_flight(directory, paths[::-1])
+    added, total = trace_analysis.import_flight(directory, paths[:1]) # Already in: nothing new
+    trace = trace_analysis.Trace.open(directory)
+    got = [(trace.chords[c], trace.apps[a]) for c, a in zip(trace.chord, trace.app)]
+    ordered = bool(np.all(np.diff(trace.time_ns) > 0))
+    print(f"\nImport: 2 overlapping flight recordings -> {len(trace)} events ({len(expected)} recorded), "
+          f"re-import added {added}")
+    if got != expected or not ordered or added:
+        failures.append(f"import: {len(got)} events (expected {len(expected)}), ordered={ordered}, re-import added {added}")
+
+
+def check_chunking(trace, config_manager, failures):
+    whole = trace_analysis.analyse(trace, config_manager, PROFILES, chunk=len(trace))
+    split = trace_analysis.analyse(trace, config_manager, PROFILES, chunk=977)
+    same = whole["trace"] == split["trace"] and whole["profiles"] == split["profiles"]
+    print(f"Chunking: {len(trace)} events in one chunk vs chunks of 977 -> {'same report' if same else 'DIFFERENT'}")
+    if not same:
+        failures.append("report depends on the chunk size")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000_000)
+    parser.add_argument("--verify", type=int, default=20000, help="events per profile replayed through the engine")
+    parser.add_argument("--keep", help="write the trace here and keep it")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    failures = []
+    root = tempfile.mkdtemp(prefix="babel-trace-")
+    try:
+        config_manager = make_config_manager()
+        chords, apps = trace_tables(config_manager)
+        check_import(root, failures)
+
+        small = write_synthetic(os.path.join(root, "small"), 200_000, chords, apps, seed=3)
+        check_chunking(small, config_manager, failures)
+        for profile in PROFILES:
+            result = trace_analysis.verify(small, config_manager, profile, args.verify)
+            print(f"Verify {profile}: {result['events']} events replayed through the engine, "
+                  f"{result['mismatches']} decisions differ")
+            if result["mismatches"]:
+                failures.append(f"verify {profile}: {result['examples']}")
+        del small
+
+        start = time.perf_counter()
+        trace = write_synthetic(args.keep or os.path.join(root, "full"), args.events, chords, apps)
+        written = time.perf_counter() - start
+        report = trace_analysis.analyse(trace, config_manager, PROFILES)
+        print(f"\nSynthetic trace: {len(trace):,} events ({len(trace) * 12 / 1e6:.0f} MB), written in {written:.1f}s")
+        trace_analysis.print_report(report)
+        rate = len(trace) / report["seconds"]
+        print(f"\nAll {len(PROFILES)} profiles + trace statistics: {report['seconds']:.2f}s, {rate / 1e6:.1f}M events/s")
+        decided = sum(report["trace"]["apps"][app]["events"] for app in report["trace"]["apps"])
+        if decided != len(trace):
+            failures.append(f"{decided} events counted of {len(trace)}")
+        for name, profile in report["profiles"].items():
+            if sum(profile["decisions"].values()) != len(trace):
+                failures.append(f"{name}: decisions do not cover every event")
+        del trace
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Pipeline tracing (core/tracing.py) on the simulated backend.
+
+1. Cost: an instrumented call with tracing off (an empty call) and on (one
+   tuple into the bounded buffer), and the keyboard hook callback of a
+   translated shortcut with tracing off and on.
+2. A traced session on the real scheduler: translated shortcuts (hook
+   callback, macro queueing, each injection step), a ctrl+wheel zoom burst
+   (zoom worker cycles) and a context switch (mapping rebuild). The export
+   must be valid Chrome trace-event JSON with named threads, the expected
+   span categories and matched async spans.
+3. The buffer stays bounded: past its capacity the oldest spans are
+   dropped and counted.
+
+Run: python benchmarks/bench_tracing.py [--chords 40] [--wheel 30]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core import tracing
+from core.mouse_hook import WM_MOUSEWHEEL
+from fixtures import NullInjector, make_config_manager, make_observer
+
+
+def make(injector=None):
+    observer = make_observer(make_config_manager(), injector)
+    observer.debounce_interval = 0
+    sim.keyboard.unhook_all()
+    observer.register_hotkeys()
+    observer._update_mappings_for_context("photoshop", active=True)
+    observer._sync_armed()
+    trigger = next(t for t, output in sorted(observer.snapshot.lookup.items())
+                   if output != t and t in observer.registered_triggers and "+" in t and "wheel" not in t)
+    return observer, trigger
+
+
+def hook_cost(tracer, repeat=20000):
+    """ns per keyboard hook callback of a translated shortcut (NullInjector), tracing off and on."""
+    observer, trigger = make(NullInjector())
+    tap = lambda: sim.keyboard.tap(trigger)
+    off = harness.time_per_call(tap, repeat)
+    tracer.start(capacity=repeat * 10)
+    on = harness.time_per_call(tap, repeat)
+    tracer.stop()
+    return trigger, off, on
+
+
+def session(tracer, chords, wheel, path):
+    observer, trigger = make()
+    observer.scheduler.start()
+    tracer.start()
+    for _ in range(chords):
+        sim.keyboard.tap(trigger)
+        time.sleep(0.03)
+    sim.keyboard.held.add("ctrl")
+    for _ in range(wheel):
+        if sim.mouse_hook_count():
+            sim.emit_mouse(WM_MOUSEWHEEL, 120)
+        else:
+            observer._on_low_level_mouse({"msg": WM_MOUSEWHEEL, "delta": 120})
+        time.sleep(0.008)
+    sim.keyboard.held.discard("ctrl")
+    deadline = time.time() + 3
+    while observer.zoom_phase is not None and time.time() < deadline:
+        time.sleep(0.05)
+    observer._update_mappings_for_context("figma", active=True)
+    observer._update_mappings_for_context("photoshop", active=True)
+    result = observer.set_tracing(False, path)
+    observer.scheduler.stop()
+    return trigger, result
+
+
+def check_trace(path, failures):
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    threads = {e["tid"]: e["args"]["name"] for e in events if e.get("ph") == "M" and e["name"] == "thread_name"}
+    spans = [e for e in events if e.get("ph") == "X"]
+    by_category = {}
+    for span in spans:
+        by_category.setdefault(span["cat"], []).append(span)
+        if span["dur"] < 0 or span["tid"] not in threads:
+            failures.append(f"bad span {span}")
+            break
+    begins = {(e["name"], e["id"]) for e in events if e.get("ph") == "b"}
+    ends = {(e["name"], e["id"]) for e in events if e.get("ph") == "e"}
+    names = {span["name"] for span in spans}
+
+    print(f"\nExport: {os.path.getsize(path) / 1024:.0f} KiB, {len(spans)} spans, {len(begins)} async spans, "
+          f"threads: {', '.join(sorted(threads.values()))}")
+    for category, entries in sorted(by_category.items()):
+        top = sorted({e['name'] for e in entries})[:4]
+        print(f"  {category:<10} {len(entries):6d} spans  e.g. {', '.join(top)}")
+    zoom = [s for s in spans if s["name"] == "InputObserver._zoom_flush"]
+    if zoom:
+        lateness = sorted(s["args"]["late_ms"] for s in zoom)
+        print(f"  zoom flush cycles: {len(zoom)}, fired late by p50 {harness.percentile(lateness, 50):.2f} ms, "
+              f"max {lateness[-1]:.2f} ms")
+
+    for category in ("hook", "scheduler", "inject", "context"):
+        if category not in by_category:
+            failures.append(f"no {category} spans in the trace")
+    if not any(name.startswith("keyboard:") for name in names):
+        failures.append("no keyboard hook callback spans")
+    if not zoom:
+        failures.append("no zoom worker cycles traced")
+    if "mapping rebuild" not in names:
+        failures.append("no mapping rebuild spans")
+    if not any(name == "queued" for name, _ in begins) or begins != ends:
+        failures.append("async queue spans missing or unmatched")
+    if "babel-scheduler" not in threads.values():
+        failures.append("scheduler thread not named in the trace")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chords", type=int, default=40)
+    parser.add_argument("--wheel", type=int, default=30, help="ctrl+wheel steps in the zoom burst")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    tracer = tracing.get_tracer()
+    failures = []
+
+    off = harness.time_per_call(lambda: tracer.complete("span", "bench", 0.0, 1.0))
+    tracer.start(capacity=1 << 20)
+    on = harness.time_per_call(lambda: tracer.complete("span", "bench", 0.0, 1.0))
+    tracer.stop()
+    trigger, hook_off, hook_on = hook_cost(tracer)
+    print("\nCost per call")
+    print(f"  complete(), tracing off        {off:8.0f} ns")
+    print(f"  complete(), tracing on         {on:8.0f} ns")
+    print(f"  {trigger} hook callback, off {hook_off:8.0f} ns")
+    print(f"  {trigger} hook callback, on  {hook_on:8.0f} ns  (+{hook_on - hook_off:.0f} ns)")
+    if on > 2000:
+        failures.append(f"recording a span costs {on:.0f} ns")
+
+    path = os.path.join(tempfile.mkdtemp(prefix="babel-trace-"), "trace.json")
+    trigger, result = session(tracer, args.chords, args.wheel, path)
+    print(f"\nSession: {args.chords} x {trigger}, {args.wheel} ctrl+wheel steps, a context switch -> "
+          f"{result['spans']} spans ({result['dropped']} dropped)")
+    check_trace(path, failures)
+
+    tracer.start(capacity=1000)
+    for i in range(5000):
+        tracer.complete("span", "bench", i, i + 1)
+    tracer.stop()
+    summary = tracer.summary()
+    print(f"\nBounded buffer: 5000 spans into 1000 slots -> {summary['buffered']} kept, {summary['dropped']} dropped")
+    if summary["buffered"] != 1000 or summary["dropped"] != 4000 or tracer.events[0][4] != 4000:
+        failures.append("buffer did not keep exactly the newest 1000 spans")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Hook watchdog on the simulated backend.
+
+1. Cost of the timed() wrapper around a hook callback.
+2. Idle user: with both hooks alive and no input, several check intervals
+   pass without a reinstall and without a single injected event (the
+   watchdog never sends input: it would reset the OS idle timer).
+3. Fault path: the keyboard and mouse hooks are silently dropped (as Windows
+   does after LowLevelHooksTimeout) and the user types; measures how long
+   until both are reinstalled and delivering events again.
+4. A callback running past hook_timeout_ms gets its hook reinstalled.
+
+Run: python benchmarks/bench_watchdog.py
+"""
+import sys
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from core.hook_watchdog import HookWatchdog, REINSTALLED
+from core.mouse_hook import WM_MOUSEWHEEL
+from fixtures import make_observer
+
+
+def wrapper_overhead():
+    watchdog = HookWatchdog()
+    monitor = watchdog.register("bench", lambda: None)
+    lookup = {"ctrl+d": "ctrl+j"}
+
+    def callback(trigger="ctrl+d"):
+        return lookup.get(trigger)
+
+    timed = monitor.timed(callback)
+    return [
+        ("bare callback", harness.time_per_call(callback)),
+        ("timed callback", harness.time_per_call(timed)),
+    ]
+
+
+def watched_observer(check_interval, input_grace):
+    observer = make_observer()
+    observer.watchdog = HookWatchdog(check_interval=check_interval, input_grace=input_grace)
+    observer.keyboard_monitor = observer.watchdog.register("keyboard", observer._reinstall_keyboard_hook)
+    observer._timed_hotkey_handler = observer.keyboard_monitor.timed(observer._handle_dynamic_hotkey)
+    observer.is_active_context = True # Hooks are only armed while a target app is focused
+    observer.register_hotkeys()
+    observer.scheduler.start()
+    observer.watchdog.start(observer.scheduler)
+    return observer
+
+
+def reinstalled(observer):
+    return {hook for _, hook, kind, _ in observer.watchdog.incidents if kind == REINSTALLED}
+
+
+def idle(check_interval=0.05, input_grace=0.05, checks=6):
+    """Reinstalls and injected events while nobody touches keyboard or mouse."""
+    injected_mouse = []
+    user32 = sim.windll.user32
+    mouse_event = user32.mouse_event
+    user32.mouse_event = lambda *args: injected_mouse.append(args)
+    try:
+        observer = watched_observer(check_interval, input_grace)
+        sim.keyboard.reset_injected()
+        time.sleep(checks * check_interval)
+        result = (len(reinstalled(observer)), len(sim.keyboard.injected) + len(injected_mouse))
+        observer.stop()
+    finally:
+        user32.mouse_event = mouse_event
+    return result
+
+
+def recovery(check_interval=0.05, input_grace=0.05):
+    observer = watched_observer(check_interval, input_grace)
+    time.sleep(0.1) # Input within the tick resolution of the last heartbeat counts as seen
+
+    sim.keyboard.drop_hook()
+    sim.drop_mouse_hook()
+    sim.keyboard.tap("a") # The user types: the OS sees it, no hook does
+    typed_at = time.perf_counter()
+
+    deadline = typed_at + 20 * (check_interval + input_grace)
+    while time.perf_counter() < deadline and reinstalled(observer) != {"keyboard", "mouse"}:
+        time.sleep(0.005)
+    recovered_ms = (time.perf_counter() - typed_at) * 1000.0
+
+    # Hooks must deliver again after reinstall
+    delivered_keys = sim.keyboard.tap("ctrl+z")
+    wheel_seen = observer.watchdog.monitors["mouse"].callbacks
+    sim.emit_mouse(WM_MOUSEWHEEL, delta=120)
+    delivered_mouse = observer.watchdog.monitors["mouse"].callbacks > wheel_seen
+
+    observer.stop()
+    return recovered_ms, delivered_keys, delivered_mouse
+
+
+def timed_out_callback(hook_timeout_ms=20.0):
+    """Milliseconds from a callback overrunning hook_timeout_ms to its hook being reinstalled, None if never."""
+    from core.scheduler import Scheduler
+    scheduler = Scheduler()
+    watchdog = HookWatchdog(hook_timeout_ms=hook_timeout_ms, check_interval=60.0)
+    done = []
+    monitor = watchdog.register("bench", lambda: done.append(time.perf_counter()))
+    scheduler.start()
+    watchdog.start(scheduler)
+    monitor.timed(lambda: time.sleep(hook_timeout_ms * 2 / 1000.0))()
+    returned_at = time.perf_counter()
+    deadline = returned_at + 1.0
+    while not done and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    watchdog.stop()
+    scheduler.stop()
+    return (done[0] - returned_at) * 1000.0 if done else None
+
+
+def main():
+    logger.configure({"level": "ERROR", "file": None, "console": False})
+    harness.report("Watchdog wrapper cost", wrapper_overhead())
+    failures = []
+
+    reinstalls, injected = idle()
+    print(f"\nIdle user: {reinstalls} reinstalls, {injected} injected events")
+    if reinstalls or injected:
+        failures.append(f"idle: {reinstalls} reinstalls and {injected} injected events")
+
+    recovered_ms, delivered_keys, delivered_mouse = recovery()
+    print(f"Dropped hooks recovered {recovered_ms:.0f} ms after the user typed "
+          f"(keyboard delivering: {delivered_keys}, mouse delivering: {delivered_mouse})")
+    if not (delivered_keys and delivered_mouse):
+        failures.append("dropped hooks not delivering after the user typed")
+
+    timed_out_ms = timed_out_callback()
+    print(f"Timed-out callback: hook reinstalled after "
+          f"{'never' if timed_out_ms is None else f'{timed_out_ms:.1f} ms'}")
+    if timed_out_ms is None:
+        failures.append("a callback past hook_timeout_ms did not get its hook reinstalled")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
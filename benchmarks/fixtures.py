@@ -0,0 +1,105 @@
+"""
+Builders shared by the benchmarks. Import after core.sim_backend.install().
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import harness
+
+SHIPPED_SEMANTIC_CONFIG = os.path.join(harness.SRC_DIR, "config", "semantic_config.json")
+
+
+def make_project_root(semantic_config_path=SHIPPED_SEMANTIC_CONFIG):
+    """Temporary project root laid out like the repo (config.json + src/config/semantic_config.json)."""
+    root = tempfile.mkdtemp(prefix="babel-bench-")
+    os.makedirs(os.path.join(root, "src", "config"))
+    shutil.copy(semantic_config_path, os.path.join(root, "src", "config", "semantic_config.json"))
+    return root
+
+
+def make_config_manager(root=None):
+    from config.config_manager import ConfigManager
+    return ConfigManager(root or make_project_root())
+
+
+def make_observer(config_manager=None, injection_module=None):
+    from core.observer import InputObserver
+    from core.context import ContextManager
+    from core.injector import InjectionModule
+    return InputObserver(ContextManager(), config_manager or make_config_manager(), injection_module or InjectionModule())
+
+
+def write_synthetic_semantic_config(path, actions=1000, apps=50):
+    """
+    Synthetic semantic_config.json: `actions` actions spread over `apps` apps.
+    photoshop and figma define every action (they are the contexts ActionMapper
+    resolves); each action is also defined for a rotating slice of the other apps.
+    """
+    app_names = ["photoshop", "figma"] + [f"app{i:02d}" for i in range(apps - 2)]
+    keys = [chr(c) for c in range(ord("a"), ord("z") + 1)] + [f"f{i}" for i in range(1, 13)]
+    modifier_sets = ["ctrl", "alt", "shift", "ctrl+alt", "ctrl+shift", "alt+shift", "ctrl+alt+shift"]
+
+    definitions = {}
+    for i in range(actions):
+        action = {}
+        for j, app in enumerate(app_names):
+            if app in ("photoshop", "figma") or (i + j) % 5 == 0:
+                mods = modifier_sets[(i + j) % len(modifier_sets)]
+                action[app] = f"{mods}+{keys[(i * 7 + j) % len(keys)]}"
+        definitions[f"action_{i:04d}"] = action
+
+    names = list(definitions)
+    profiles = {
+        "figma_to_photoshop.json": {"settings": {name: "figma" for name in names}},
+        "photoshop_to_figma.json": {"settings": {name: "photoshop" for name in names}},
+        "custom.json": {"settings": {name: ("custom: f13" if k % 100 == 0 else "figma") for k, name in enumerate(names)}},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"system_definitions": {"actions": definitions}, "profiles": profiles}, f)
+
+
+def make_synthetic_project_root(actions=1000, apps=50):
+    root = tempfile.mkdtemp(prefix="babel-bench-")
+    os.makedirs(os.path.join(root, "src", "config"))
+    write_synthetic_semantic_config(os.path.join(root, "src", "config", "semantic_config.json"), actions, apps)
+    return root
+
+
+class NullInjector:
+    """InjectionModule stand-in that only counts: keeps the 60ms of injection sleeps out of lookup timings."""
+    def __init__(self):
+        self.keymap = None
+        self.count = 0
+
+    def inject(self, command, timing=None):
+        self.count += 1
+
+    def compile(self, command, timing=None):
+        return [(0.0, self.inject, (command,))]
+
+    def fallback(self, command):
+        pass
+
+    def press_key(self, name):
+        pass
+
+    def release_key(self, name):
+        pass
+
+
+class NullWebListener:
+    """WebContextListener stand-in: no server thread, no browser connected."""
+    text_entry = False
+    text_entry_reports = 0
+    on_text_entry = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_active_web_app(self):
+        return None
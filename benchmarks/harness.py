@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+# Benchmarks import the app modules the same way main.py does (src/ on sys.path)
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def time_per_call(func, iterations=100000, repeat=5):
+    """
+    Returns the best-of-`repeat` mean cost of func() in nanoseconds.
+    Best-of filters out scheduler noise, which is what we want for hot paths.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            func()
+        elapsed = (time.perf_counter_ns() - start) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def sample_latencies(func, iterations=20000):
+    """Times every call individually. Returns a list of nanoseconds."""
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(iterations):
+        start = clock()
+        func()
+        samples.append(clock() - start)
+    return samples
+
+
+def report(title, rows):
+    """rows: list of (label, value_ns)"""
+    print(f"\n{title}")
+    print("-" * len(title))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value:10.1f} ns")
@@ -0,0 +1,127 @@
+"""
+Concurrency stress test for the published context snapshot.
+
+A writer thread flips the observer between two states as fast as it can:
+    ACTIVE:   target focused, lookup LA (trigger -> photoshop command)
+    INACTIVE: nothing focused, lookup LB left over from another app
+while reader threads replay hotkeys through the real InputObserver
+hotkey handler. A correct decision injects LA[trigger] (active) or the
+trigger itself (pass-through). Injecting LB[trigger] means the handler
+combined the active flag of one state with the lookup of the other.
+
+"fields" mode publishes the state the way the context thread used to:
+active flag, app and lookup one after another. "snapshot" mode publishes
+all three at once. The run fails (exit code 1) if snapshot mode produces
+a single mixed-state translation.
+
+Run: python benchmarks/stress_context_snapshot.py [--seconds 2]
+"""
+import argparse
+import sys
+import threading
+import time
+
+import harness
+from core import sim_backend
+
+sim = sim_backend.install()
+
+from core import logger
+from fixtures import make_observer
+
+LA = {"ctrl+d": "ctrl+j", "ctrl+y": "ctrl+shift+z", "ctrl+g": "ctrl+alt+g"}
+LB = {"ctrl+d": "f13", "ctrl+y": "f14", "ctrl+g": "f15"}
+READERS = 4
+
+
+class CheckingInjector:
+    """Classifies every injection: pass-through, correct translation or mixed state."""
+    def __init__(self):
+        self.keymap = None
+        self.counts = {"passthrough": 0, "translated": 0, "mixed": 0}
+        self.lock = threading.Lock()
+        self.mixed_outputs = set(LB.values())
+
+    def inject(self, command, timing=None):
+        kind = "mixed" if command in self.mixed_outputs else ("translated" if command in LA.values() else "passthrough")
+        with self.lock:
+            self.counts[kind] += 1
+
+    def press_key(self, name):
+        pass
+
+    def release_key(self, name):
+        pass
+
+
+def publish_fields(observer, active):
+    # The old context thread: separate writes, readers can land in between
+    observer.is_active_context = active
+    observer.active_app_name = "photoshop" if active else None
+    observer.mapping_lookup = LA if active else LB
+
+
+def publish_snapshot(observer, active):
+    observer._publish_snapshot(active=active, app="photoshop" if active else None, lookup=LA if active else LB)
+
+
+def run(publish, seconds):
+    injector = CheckingInjector()
+    observer = make_observer(injection_module=injector)
+    observer.debounce_interval = 0
+    observer.arm_on_focus = False # Hotkeys stay registered while the state flips
+    publish(observer, False)
+    observer.register_hotkeys()
+
+    stop = threading.Event()
+    switches = [0]
+
+    def writer():
+        active = True
+        while not stop.is_set():
+            publish(observer, active)
+            active = not active
+            switches[0] += 1
+
+    def reader():
+        triggers = list(LA)
+        i = 0
+        while not stop.is_set():
+            observer._handle_dynamic_hotkey(triggers[i % len(triggers)])
+            i += 1
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    observer._remove_local_hooks()
+    return injector.counts, switches[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="run time per mode")
+    seconds = parser.parse_args(argv).seconds
+    logger.configure({"level": "WARNING", "file": None, "console": False})
+    # Switch threads as often as possible so the writer interleaves with the readers
+    sys.setswitchinterval(1e-6)
+
+    print(f"\nContext switches vs. {READERS} hotkey replay threads, {seconds:.0f}s per mode")
+    print("-" * 60)
+    failed = False
+    for label, publish in (("fields", publish_fields), ("snapshot", publish_snapshot)):
+        counts, switches = run(publish, seconds)
+        total = sum(counts.values())
+        print(f"  {label:<9} switches {switches:8d}  keys {total:8d}  translated {counts['translated']:8d}"
+              f"  passthrough {counts['passthrough']:8d}  MIXED {counts['mixed']:6d}")
+        if publish is publish_snapshot and counts["mixed"]:
+            failed = True
+    print("\nFAIL: mixed-state translations with snapshots" if failed else "\nOK: no mixed-state translation with snapshots")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
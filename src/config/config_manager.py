@@ -1,6 +1,11 @@
+import copy
 import json
 import os
 from pathlib import Path
+from core.logger import get_logger
+from config.profile_resolver import ProfileResolver
+
+log = get_logger("config")
 
 class ConfigManager:
     def __init__(self, project_root):
@@ -19,6 +24,12 @@ class ConfigManager:
             "system_definitions": {},
             "user_profile": {}
         }
+        # Layered profiles ("parents"), flattened once per profile (config/profile_resolver.py)
+        self.profile_resolver = ProfileResolver(lambda: self.semantic_data.get("profiles", {}))
+        # Centrally distributed profiles and app entries (core/profile_sync.py), merged over the
+        # local ones in memory and never written to semantic_config.json
+        self.fleet_layer = {"profiles": {}, "apps": {}}
+        self._fleet_shadowed = {"profiles": {}, "apps": {}} # name -> local entry it hides (None: none)
         
         self.load_config()
         self.load_semantic_config()
@@ -30,7 +41,7 @@ class ConfigManager:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     self.config = json.load(f)
             except Exception as e:
-                print(f"Error loading config.json: {e}. Using defaults.")
+                log.error("Error loading config.json: %s. Using defaults.", e)
                 self.save_config() # Save defaults if failed
         else:
             self.save_config()
@@ -41,11 +52,127 @@ class ConfigManager:
             try:
                 with open(self.semantic_config_path, 'r', encoding='utf-8') as f:
                     self.semantic_data = json.load(f)
-                print("Loaded semantic_config.json")
+                log.info("Loaded semantic_config.json")
             except Exception as e:
-                print(f"Error loading semantic_config.json: {e}")
+                log.error("Error loading semantic_config.json: %s", e)
         else:
-            print("Warning: semantic_config.json not found.")
+            log.warning("semantic_config.json not found.")
+        self.profile_resolver.reset()
+        if any(self.fleet_layer.values()):
+            # The file on disk has no fleet entries: lay them over it again
+            layer = self.fleet_layer
+            self.fleet_layer = {"profiles": {}, "apps": {}}
+            self._fleet_shadowed = {"profiles": {}, "apps": {}}
+            self.apply_fleet(layer, full=True)
+
+    def save_semantic_config(self):
+        """Writes semantic_config.json atomically (temp file + replace), without fleet entries."""
+        tmp_path = self.semantic_config_path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._local_semantic_data(), f, indent=4)
+            os.replace(tmp_path, self.semantic_config_path)
+        except Exception as e:
+            log.error("Error saving semantic_config.json: %s", e)
+
+    def _section(self, kind):
+        if kind == "apps":
+            return self.semantic_data.setdefault("system_definitions", {}).setdefault("apps", {})
+        return self.semantic_data.setdefault("profiles", {})
+
+    def _local_semantic_data(self):
+        """semantic_data as the local file has it: fleet entries swapped back for what they hide."""
+        if not any(self._fleet_shadowed.values()):
+            return self.semantic_data
+        data = dict(self.semantic_data)
+        definitions = data["system_definitions"] = dict(data.get("system_definitions", {}))
+        sections = {"profiles": dict(data.get("profiles", {})), "apps": dict(definitions.get("apps", {}))}
+        for kind, shadowed in self._fleet_shadowed.items():
+            for name, local in shadowed.items():
+                if local is None:
+                    sections[kind].pop(name, None)
+                else:
+                    sections[kind][name] = local
+        data["profiles"] = sections["profiles"]
+        if sections["apps"] or "apps" in definitions:
+            definitions["apps"] = sections["apps"]
+        return data
+
+    def apply_fleet(self, update, full=False):
+        """
+        Merges a fleet update over the local profiles and app registry.
+        Args:
+            update (dict): {"profiles": {name: profile or None}, "apps": {name: entry or None}};
+                           None removes the fleet entry (the local one, if any, shows again).
+            full (bool): `update` is the whole fleet layer: entries missing from it are removed.
+        Returns:
+            dict: {"profiles": changed names, "apps": changed names}
+        """
+        changed = {"profiles": set(), "apps": set()}
+        for kind in ("profiles", "apps"):
+            entries = dict(update.get(kind) or {})
+            layer = self.fleet_layer[kind]
+            shadowed = self._fleet_shadowed[kind]
+            if full:
+                for name in layer:
+                    entries.setdefault(name, None)
+            section = self._section(kind)
+            for name, entry in entries.items():
+                if entry is None:
+                    if name not in layer:
+                        continue
+                    del layer[name]
+                    local = shadowed.pop(name)
+                    if local is None:
+                        section.pop(name, None)
+                    else:
+                        section[name] = local
+                else:
+                    if name not in layer:
+                        shadowed[name] = section.get(name)
+                    layer[name] = entry
+                    if section.get(name) == entry:
+                        continue
+                    section[name] = copy.deepcopy(entry) # Local edits must not reach the layer
+                changed[kind].add(name)
+        for name in changed["profiles"]:
+            self.profile_resolver.invalidate(name)
+        return changed
+
+    def apply_profile_delta(self, profile_name, settings, removed=None):
+        """
+        Patches a profile's own settings in memory. Profiles inheriting from it
+        see the change too (their resolved settings are recomputed on next use).
+        Args:
+            profile_name (str): e.g. 'custom.json'. Created if missing.
+            settings (dict): action_name -> preference, only the changed entries.
+            removed (list): action names to drop from the profile (inherited again, if a parent sets them).
+        Returns:
+            set: Action names whose preference actually changed.
+        Raises:
+            ValueError: the profile comes from the fleet layer. Its local entry is never saved,
+                        so the change would vanish on the next load.
+        """
+        if profile_name in self.fleet_layer["profiles"]:
+            raise ValueError(f"profile {profile_name!r} is managed centrally (fleet sync); "
+                             f"change it there or create a local profile inheriting from it")
+        profiles = self.semantic_data.setdefault("profiles", {})
+        created = profile_name not in profiles
+        profile = profiles.setdefault(profile_name, {"settings": {}})
+        current = profile.setdefault("settings", {})
+
+        changed = set()
+        for action_name, preference in settings.items():
+            if current.get(action_name) != preference:
+                current[action_name] = preference
+                changed.add(action_name)
+        for action_name in removed or []:
+            if action_name in current:
+                del current[action_name]
+                changed.add(action_name)
+        if changed or created:
+            self.profile_resolver.invalidate(profile_name)
+        return changed
 
     def get_system_definitions(self):
         return self.semantic_data.get("system_definitions", {})
@@ -57,13 +184,17 @@ class ConfigManager:
         # 2. Look up in semantic profiles
         profiles = self.semantic_data.get("profiles", {})
         
-        # 3. Return the settings for that profile
+        # 3. Return the settings for that profile, flattened over its parents
         if active_name in profiles:
-             print(f"DEBUG: Using Profile '{active_name}'")
-             return profiles[active_name]
+             log.debug("Using Profile '%s'", active_name)
+             return self.profile_resolver.resolve(active_name)
         else:
-             print(f"Warning: Profile '{active_name}' not found in semantic config. Falling back to first available.")
-             return next(iter(profiles.values())) if profiles else {}
+             log.warning("Profile '%s' not found in semantic config. Falling back to first available.", active_name)
+             return self.profile_resolver.resolve(next(iter(profiles))) if profiles else {}
+
+    def profile_lineage(self, profile_name):
+        """`profile_name` and every profile it inherits from."""
+        return self.profile_resolver.lineage(profile_name)
 
     def get_semantic_targets(self):
         """
@@ -84,7 +215,7 @@ class ConfigManager:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=4)
         except Exception as e:
-            print(f"Error saving config.json: {e}")
+            log.error("Error saving config.json: %s", e)
 
     def set_active_profile(self, profile_filename):
         """Sets a new active profile and reloads."""
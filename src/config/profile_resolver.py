@@ -0,0 +1,138 @@
+from core.logger import get_logger
+
+log = get_logger("config")
+
+
+class ProfileResolver:
+    """
+    Flattens layered profiles and memoises the result per profile.
+
+    A profile may list parents and then only override what it changes:
+
+        "studio.json":   {"settings": {... every action ...}},
+        "team-ui.json":  {"parents": ["studio.json"], "settings": {"group": "photoshop"}},
+        "anna.json":     {"parents": ["team-ui.json", "extras.json"], "settings": {"undo": "custom: ctrl+r"}}
+
+    Parents apply in the order listed (a later parent wins over an earlier
+    one) and the profile's own settings win over all of them. A profile is
+    flattened once: its parents' memoised settings are copied and its own
+    are laid on top, so resolving a deep chain costs one dict copy per
+    layer, once. invalidate(name) after changing a profile drops the memo
+    of that profile and its descendants only.
+
+    Unknown parents and inheritance cycles are logged and skipped.
+    """
+    def __init__(self, get_profiles):
+        self.get_profiles = get_profiles # -> {name: profile}, the live semantic_data["profiles"]
+        self._memo = {}      # name -> resolved profile (own keys + flattened "settings"). Never mutated.
+        self._parents = {}   # name -> parents tuple the children index was built from
+        self._children = {}  # name -> set of profiles listing it as a parent
+        self._indexed = False
+        self.stats = {"flattened": 0, "invalidated": 0}
+
+    def reset(self):
+        """Forgets everything (the whole file was reloaded)."""
+        self._memo = {}
+        self._parents = {}
+        self._children = {}
+        self._indexed = False
+
+    def resolve(self, name):
+        """Resolved profile: the profile's own keys with "settings" flattened over its parents. KeyError if unknown."""
+        resolved = self._memo.get(name)
+        if resolved is None:
+            resolved = self._flatten(name, ())
+        return resolved
+
+    def settings(self, name):
+        return self.resolve(name)["settings"]
+
+    def _flatten(self, name, visiting):
+        profiles = self.get_profiles()
+        profile = profiles[name]
+        settings = {}
+        for parent in self.parents_of(profile):
+            if parent in visiting or parent == name:
+                log.error("Profile inheritance cycle: %s -> %s, ignoring that parent", " -> ".join(visiting + (name,)), parent)
+                continue
+            if parent not in profiles:
+                log.warning("Profile '%s' inherits from unknown profile '%s'", name, parent)
+                continue
+            inherited = self._memo.get(parent)
+            if inherited is None:
+                inherited = self._flatten(parent, visiting + (name,))
+            settings.update(inherited["settings"])
+        settings.update(profile.get("settings", {}))
+        resolved = dict(profile)
+        resolved["settings"] = settings
+        self._memo[name] = resolved
+        self.stats["flattened"] += 1
+        return resolved
+
+    @staticmethod
+    def parents_of(profile):
+        parents = profile.get("parents", ())
+        return (parents,) if isinstance(parents, str) else tuple(parents)
+
+    def lineage(self, name):
+        """`name` and every profile it inherits from (directly or not)."""
+        profiles = self.get_profiles()
+        seen = []
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in seen or current not in profiles:
+                continue
+            seen.append(current)
+            stack.extend(self.parents_of(profiles[current]))
+        return seen
+
+    # --- Invalidation ---
+
+    def _build_index(self):
+        self._parents = {}
+        self._children = {}
+        for name, profile in self.get_profiles().items():
+            self._link(name, self.parents_of(profile))
+        self._indexed = True
+
+    def _link(self, name, parents):
+        for parent in self._parents.get(name, ()):
+            self._children.get(parent, set()).discard(name)
+        self._parents[name] = parents
+        for parent in parents:
+            self._children.setdefault(parent, set()).add(name)
+
+    def descendants(self, name):
+        """Every profile that inherits from `name`, directly or not."""
+        if not self._indexed:
+            self._build_index()
+        found = set()
+        stack = [name]
+        while stack:
+            for child in self._children.get(stack.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        found.discard(name)
+        return found
+
+    def invalidate(self, name):
+        """
+        Call after changing (or adding, or removing) profile `name`: drops the
+        memo of `name` and of its descendants. Returns the invalidated names.
+        """
+        if self._indexed:
+            profile = self.get_profiles().get(name)
+            parents = self.parents_of(profile) if profile is not None else ()
+            if parents != self._parents.get(name):
+                self._link(name, parents)
+        stale = self.descendants(name)
+        stale.add(name)
+        for stale_name in stale:
+            self._memo.pop(stale_name, None)
+        self.stats["invalidated"] += len(stale)
+        return stale
+
+    def memoised(self):
+        return len(self._memo)
@@ -1,4 +1,7 @@
 import json
+from core.logger import get_logger
+
+log = get_logger("mapper")
 
 class ActionMapper:
     def __init__(self, config_manager):
@@ -6,6 +9,7 @@ class ActionMapper:
         # Cache for generated mappings to avoid re-computing every frame if context doesn't change
         self._current_context = None
         self._cached_mappings = []
+        self._action_triggers = {} # action_name -> trigger_key of the compiled profile
 
     def get_mappings_for_context(self, context_app):
         """
@@ -42,47 +46,51 @@ class ActionMapper:
         user_settings = user_profile.get("settings", {})
         
         active_profile_name = self.config_manager.config.get("active_profile", "UNKNOWN")
-        print(f"DEBUG: Generating mappings for Context='{context_key}' using Profile='{active_profile_name}'")
+        log.debug("Generating mappings for Context='%s' using Profile='%s'", context_key, active_profile_name)
 
         for action_name, action_defs in actions.items():
-            # 1. Target Command: What does the active app need?
-            target_command = action_defs.get(context_key)
-            if not target_command:
-                # This action isn't defined for the current app
-                continue
-                
-            # 2. User Trigger: What does the user want to press?
-            preference = user_settings.get(action_name, "figma") # Default to figma if not set? Or skip?
-            
-            trigger_command = None
-            
-            if preference.startswith("custom:"):
-                # "custom: f1" -> extract "f1"
-                trigger_command = preference.split(":", 1)[1].strip()
-            else:
-                # Look up the preference in the definitions
-                # e.g. preference="figma", look up actions[action_name]["figma"]
-                trigger_command = action_defs.get(preference)
-                
-            if not trigger_command:
-                 print(f"  Warning: No trigger found for action '{action_name}' with preference '{preference}'")
-                 continue
-                 
-            # 3. Create Rule
-            # Map even if input == output (Identity) to ensure explicit handling
-            # if trigger_command.lower() != target_command.lower():
-            
-            print(f"  Rule: {action_name} | {trigger_command} -> {target_command}")
-            mappings.append({
-                "input": trigger_command,
-                "output": target_command,
-                "type": action_defs.get("type", "key") # e.g. 'gesture' for zoom
-            })
+            rule = self._build_rule(action_name, action_defs, user_settings, context_key)
+            if rule:
+                mappings.append(rule)
                 
         self._current_context = context_key
         self._cached_mappings = mappings
         return mappings
 
+    def _build_rule(self, action_name, action_defs, user_settings, context_key):
+        """Builds the {input, output, type} rule of one action for one context, or None."""
+        # 1. Target Command: What does the active app need?
+        target_command = action_defs.get(context_key)
+        if not target_command:
+            # This action isn't defined for the current app
+            return None
+            
+        # 2. User Trigger: What does the user want to press?
+        preference = user_settings.get(action_name, "figma") # Default to figma if not set? Or skip?
+        trigger_command = self._resolve_trigger(action_defs, preference)
+            
+        if not trigger_command:
+             log.warning("No trigger found for action '%s' with preference '%s'", action_name, preference)
+             return None
+             
+        # 3. Create Rule
+        # Map even if input == output (Identity) to ensure explicit handling
+        log.debug("Rule: %s | %s -> %s", action_name, trigger_command, target_command)
+        return {
+            "action": action_name,
+            "input": trigger_command,
+            "output": target_command,
+            "type": action_defs.get("type", "key") # e.g. 'gesture' for zoom
+        }
+
+    def _resolve_trigger(self, action_defs, preference):
+        if preference.startswith("custom:"):
+            # "custom: f1" -> extract "f1"
+            return preference.split(":", 1)[1].strip()
+        # Look up the preference in the definitions
+        # e.g. preference="figma", look up actions[action_name]["figma"]
+        return action_defs.get(preference)
+
     def get_all_configured_triggers(self):
         """
         Returns a dictionary of all configured triggers as keys,
@@ -96,14 +104,11 @@ class ActionMapper:
         
         triggers = {} # trigger_key -> metadata
         
+        action_triggers = {} # action_name -> trigger_key
+        
         for action_name, action_defs in actions.items():
             preference = user_settings.get(action_name, "figma")
-            trigger_command = None
-            
-            if preference.startswith("custom:"):
-                trigger_command = preference.split(":", 1)[1].strip()
-            else:
-                trigger_command = action_defs.get(preference)
+            trigger_command = self._resolve_trigger(action_defs, preference)
             
             if trigger_command:
                 # Store lower case key
@@ -111,9 +116,61 @@ class ActionMapper:
                     "action": action_name,
                     "type": action_defs.get("type", "key")
                 }
+                action_triggers[action_name] = trigger_command.lower()
                 
+        self._action_triggers = action_triggers
         return triggers
 
+    def recompile_actions(self, action_names):
+        """
+        Recompiles only the given actions after an in-memory profile change
+        (control channel delta) instead of regenerating everything.
+        Patches the cached mappings of the current context in place.
+
+        Returns:
+            tuple: (old_triggers, new_triggers), each {action_name: trigger_key}
+                   for the touched actions, so the caller can re-hook just those keys.
+        """
+        definitions = self.config_manager.get_system_definitions()
+        actions = definitions.get("actions", {})
+        user_settings = self.config_manager.get_user_profile().get("settings", {})
+
+        old_triggers = {}
+        new_triggers = {}
+        for action_name in action_names:
+            old_triggers[action_name] = self._action_triggers.pop(action_name, None)
+            action_defs = actions.get(action_name)
+            if not action_defs:
+                continue
+            trigger_command = self._resolve_trigger(action_defs, user_settings.get(action_name, "figma"))
+            if trigger_command:
+                self._action_triggers[action_name] = trigger_command.lower()
+                new_triggers[action_name] = trigger_command.lower()
+
+        if self._current_context:
+            touched = set(action_names)
+            mappings = [rule for rule in self._cached_mappings if rule["action"] not in touched]
+            for action_name in action_names:
+                action_defs = actions.get(action_name)
+                if action_defs:
+                    rule = self._build_rule(action_name, action_defs, user_settings, self._current_context)
+                    if rule:
+                        mappings.append(rule)
+            self._cached_mappings = mappings
+
+        return old_triggers, new_triggers
+
+    def get_configured_trigger_keys(self):
+        """Trigger keys of the last compiled profile (see get_all_configured_triggers)."""
+        return set(self._action_triggers.values())
+
+    def get_action_for_trigger(self, trigger_key):
+        """Action name compiled to `trigger_key` (the first one, if several share it), or None."""
+        for action_name, trigger in self._action_triggers.items():
+            if trigger == trigger_key:
+                return action_name
+        return None
+
     def clear_cache(self):
         self._current_context = None
         self._cached_mappings = []
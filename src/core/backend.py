@@ -0,0 +1,81 @@
+"""
+The platform APIs the engine talks to, in one place.
+
+Core modules take `keyboard`, `mouse`, `win32gui`, `win32process`, `windll`
+and `WINFUNCTYPE` from here instead of importing the Windows packages (or
+reaching into ctypes) themselves:
+
+    from core.backend import keyboard, windll
+
+By default these are the real ones: the `keyboard` and `mouse` packages,
+pywin32's win32gui / win32process, ctypes.windll and ctypes.WINFUNCTYPE.
+core/linux_backend.py and core/sim_backend.py route them to their own
+implementations with use(), which must run before the first core module
+imports a name from here (main.py and the benchmarks install first thing).
+Nothing outside this module is patched: ctypes and sys.modules are left
+alone, so other code in the process keeps the real packages.
+
+Where ctypes has no windll (not Windows, no backend installed), `windll` is
+None: Windows-only paths fail with AttributeError, as they did before.
+"""
+import ctypes
+import importlib
+import re
+
+NAMES = ("keyboard", "mouse", "win32gui", "win32process", "windll", "WINFUNCTYPE")
+
+_provider = None
+
+
+def use(provider):
+    """
+    Routes the platform APIs to `provider`, an object with one attribute per
+    name in NAMES (WINFUNCTYPE optional). Must run before core modules import
+    them; names already handed out are not swapped.
+    """
+    global _provider
+    _provider = provider
+
+
+def provider():
+    """The installed backend (LinuxBackend, SimulatedSystem), None for the real APIs."""
+    return _provider
+
+
+def parse_hotkey(hotkey, key_to_scan_codes):
+    """
+    keyboard.parse_hotkey (keyboard 0.13.5) for the backends standing in for
+    the package, so a hotkey shape the real parser mangles is mangled here too:
+    - a number, or anything of length 1, is ONE key: its scan codes flattened;
+    - a flat tuple/list is one step with one key per element;
+    - a tuple/list containing tuples/lists is taken as already parsed steps;
+    - a string is split into steps at ',' and into keys at '+'.
+    Returns ((scan codes of each key, ...) per step, ...).
+    """
+    if isinstance(hotkey, int) or len(hotkey) == 1:
+        return ((key_to_scan_codes(hotkey),),)
+    if isinstance(hotkey, (list, tuple)):
+        if not any(isinstance(key, (list, tuple)) for key in hotkey):
+            return (tuple(key_to_scan_codes(key) for key in hotkey),)
+        return hotkey
+    return tuple(tuple(key_to_scan_codes(key) for key in re.split(r'\s?\+\s?', step))
+                 for step in re.split(r',\s?', hotkey))
+
+
+def _resolve(name):
+    if _provider is not None and hasattr(_provider, name):
+        return getattr(_provider, name)
+    if name == "windll":
+        return getattr(ctypes, "windll", None)
+    if name == "WINFUNCTYPE":
+        # stdcall only exists on Windows; the backends call hooks as plain C functions
+        return getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)
+    return importlib.import_module(name)
+
+
+def __getattr__(name):
+    if name not in NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _resolve(name)
+    globals()[name] = value # Resolved once: later imports are plain attribute lookups
+    return value
@@ -1,6 +1,9 @@
-import win32gui
-import win32process
 import psutil
+from core.backend import win32gui, win32process
+
+GUI_CARETBLINKING = 0x1
+# Window classes of the standard Win32 / WinForms text controls (lower case prefixes)
+EDIT_CLASSES = ("edit", "richedit", "windowsforms10.edit", "windowsforms10.richedit")
 
 class ContextManager:
     def __init__(self):
@@ -41,3 +44,26 @@ class ContextManager:
         except Exception as e:
             # print(f"Context Error: {e}")
             return False
+
+    def is_text_entry_focused(self, caret=False):
+        """
+        Heuristic for desktop apps: the focused control of the foreground
+        thread (GetGUIThreadInfo) is a standard edit control. With `caret`,
+        a thread owning a (blinking) caret counts too; custom canvases may
+        own one, so that is opt-in.
+        Returns False when the platform cannot tell.
+        """
+        get_info = getattr(win32gui, "GetGUIThreadInfo", None)
+        if get_info is None:
+            return False
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            if not hwnd:
+                return False
+            thread_id, _ = win32process.GetWindowThreadProcessId(hwnd)
+            flags, _, focus, _, _, _, caret_hwnd, _ = get_info(thread_id)
+            if caret and (caret_hwnd or flags & GUI_CARETBLINKING):
+                return True
+            return bool(focus) and win32gui.GetClassName(focus).lower().startswith(EDIT_CLASSES)
+        except Exception:
+            return False
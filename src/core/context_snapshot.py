@@ -0,0 +1,69 @@
+from core.gestures import compile_gesture_table
+
+
+class ContextSnapshot:
+    """
+    Everything a hook callback needs to decide what to do with an event, frozen.
+
+    The context thread (and the control channel) build a new snapshot and
+    publish it with a single reference assignment (InputObserver.snapshot).
+    A hook reads `self.snapshot` once per event and uses only that object,
+    so it can never combine the active flag of one context with the lookup
+    of another, and it never takes a lock.
+
+    Fields:
+        context_id  increments whenever app, active or editing flag or lookup change
+        app         detected target app (None if no target is focused)
+        active      a target app is focused
+        editing     a text field of that app has keyboard focus (bridge report or caret heuristic):
+                    keys pass through untranslated
+        lookup      trigger -> output of the current app. Never mutated after publishing.
+        wheel_rule  (trigger_modifier, output_modifier) of the app's wheel mapping, or None
+        gestures    GestureTable of the app's mouse button gestures (core/gestures.py), or None
+        keymap      compiled key table of the current keyboard layout (core/keymap.py)
+        timing      InjectionTiming of the app (core/injection_timing.py), None for the default
+    """
+    __slots__ = ("context_id", "app", "active", "editing", "lookup", "wheel_rule", "gestures", "keymap", "timing")
+
+    def __init__(self, context_id, app, active, lookup, keymap, compiled=None, timing=None, editing=False):
+        set_field = object.__setattr__
+        set_field(self, "context_id", context_id)
+        set_field(self, "app", app)
+        set_field(self, "active", active)
+        set_field(self, "lookup", lookup)
+        # compiled: (wheel_rule, gestures) of the same lookup, carried over by replace()
+        wheel_rule, gestures = compiled or (compile_wheel_rule(lookup), compile_gesture_table(lookup))
+        set_field(self, "wheel_rule", wheel_rule)
+        set_field(self, "gestures", gestures)
+        set_field(self, "keymap", keymap)
+        set_field(self, "timing", timing)
+        set_field(self, "editing", editing)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ContextSnapshot is immutable, publish a new one with replace()")
+
+    def replace(self, **changes):
+        """Returns a new snapshot with `changes` applied (app, active, editing, lookup, keymap, timing)."""
+        app = changes.get("app", self.app)
+        active = changes.get("active", self.active)
+        editing = changes.get("editing", self.editing)
+        lookup = changes.get("lookup", self.lookup)
+        context_id = self.context_id
+        if app != self.app or active != self.active or editing != self.editing or lookup is not self.lookup:
+            context_id += 1
+        compiled = (self.wheel_rule, self.gestures) if lookup is self.lookup else None
+        return ContextSnapshot(context_id, app, active, lookup, changes.get("keymap", self.keymap), compiled,
+                               changes.get("timing", self.timing), editing)
+
+    def __repr__(self):
+        return (f"ContextSnapshot(id={self.context_id}, app={self.app!r}, active={self.active}, editing={self.editing}, "
+                f"rules={len(self.lookup)}, wheel={self.wheel_rule}, "
+                f"gestures={len(self.gestures.rules) if self.gestures else 0})")
+
+
+def compile_wheel_rule(lookup):
+    """'ctrl+wheel' -> 'alt+wheel' becomes ('ctrl', 'alt'). First wheel trigger wins."""
+    for trigger, output in lookup.items():
+        if 'wheel' in trigger:
+            return (trigger.replace('+wheel', '').strip().lower(), output.replace('+wheel', '').strip().lower())
+    return None
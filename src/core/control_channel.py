@@ -0,0 +1,344 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from core.logger import get_logger
+
+log = get_logger("control")
+
+PIPE_NAME = "project-babel"
+
+# Exit codes of ui/editor_window.py, read by the tray
+EDITOR_EXIT_SAVED_TO_DISK = 0   # Legacy path: tray reloads the config from disk
+EDITOR_EXIT_CANCELLED = 1
+EDITOR_EXIT_APPLIED_LIVE = 10   # Delta already applied by the running instance
+
+
+def default_address():
+    """Named pipe on Windows, Unix domain socket elsewhere."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{PIPE_NAME}"
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"{PIPE_NAME}-{uid}.sock")
+
+
+def _family(address):
+    return "AF_PIPE" if address.startswith("\\\\") else "AF_UNIX"
+
+
+def authkey_path(address):
+    """
+    File holding the channel's authkey: next to the socket, or in the
+    per-user temp directory for a named pipe. Readable by the owner only.
+    """
+    if _family(address) == "AF_PIPE":
+        return os.path.join(tempfile.gettempdir(), address.rsplit("\\", 1)[-1] + ".key")
+    return address + ".key"
+
+
+def read_authkey(address):
+    """The running instance's key. FileNotFoundError (an OSError, like a refused connection) if none runs."""
+    with open(authkey_path(address), "rb") as f:
+        return f.read()
+
+
+def _write_authkey(address):
+    """A fresh random key for this instance, created owner-only."""
+    key = os.urandom(32)
+    path = authkey_path(address)
+    try:
+        os.remove(path) # O_CREAT keeps the mode of an existing file
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _instance_listening(address):
+    """True if another instance answers at `address` (a live socket is never taken over)."""
+    try:
+        Client(address, family=_family(address)).close()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+    except (AuthenticationError, EOFError, OSError):
+        return True # Connected, then the handshake failed: someone is listening
+    return True
+
+
+class ControlError(Exception):
+    """Raised on the client side when the running instance reports a failure."""
+    pass
+
+
+class ControlServer:
+    """
+    Local control channel of the running instance.
+
+    Requests and replies are small JSON documents sent as length-prefixed
+    messages over a named pipe / Unix socket:
+        {"cmd": "switch_profile", "profile": "custom.json"}
+        -> {"ok": true, "result": {...}}
+
+    Commands:
+        apply_profile_delta  - patch profile settings in memory, recompile only touched actions
+        switch_profile       - change active_profile without restarting the observer
+        reload               - re-read config files from disk
+        status               - current context / profile / hooks
+        metrics              - observer counters
+        idle_cost            - CPU % and wakeups/s per component since the previous idle_cost
+        flight_dump          - write the decision flight recorder to a file (optional "path")
+        shadow               - shadow mode: "enabled" true/false switches it, without it reports the run so far
+        trace                - pipeline tracing: "enabled" true starts it, false stops it and writes the
+                               Chrome trace (optional "path"); without it reports the tracer state
+        profile              - sampling profiler: "seconds" starts a run (optional "path"), "stop" ends it
+                               early and returns its result; without either reports the profiler state
+        sync                 - fetch the fleet profile layer now (config "sync") and report the sync counters
+        shutdown             - stop a headless instance (main.py --headless; the tray has its own Exit)
+        ping                 - no-op, for round-trip measurements
+    """
+    def __init__(self, config_manager, observer, address=None):
+        self.config_manager = config_manager
+        self.observer = observer
+        self.address = address or default_address()
+        self.running = False
+        self._listener = None
+        self._authkey = None
+        self._thread = None
+        self.started_at = time.time()
+        self.on_shutdown = None # Set by the headless Daemon (core/daemon.py)
+
+        self.handlers = {
+            "apply_profile_delta": self._cmd_apply_profile_delta,
+            "switch_profile": self._cmd_switch_profile,
+            "reload": self._cmd_reload,
+            "status": self._cmd_status,
+            "metrics": self._cmd_metrics,
+            "idle_cost": lambda request: self.observer.get_idle_cost(),
+            "flight_dump": lambda request: self.observer.dump_flight_recording(request.get("path")),
+            "shadow": self._cmd_shadow,
+            "trace": self._cmd_trace,
+            "profile": self._cmd_profile,
+            "sync": self._cmd_sync,
+            "shutdown": self._cmd_shutdown,
+            "ping": lambda request: {"pong": time.time()},
+        }
+
+    def start(self):
+        """
+        Listens at `address`, unless another instance already does. Clients
+        authenticate with a random key written to authkey_path() (owner-only);
+        the Unix socket is created owner-only too (umask 077 around bind()).
+        """
+        if self.running:
+            return
+        family = _family(self.address)
+        if _instance_listening(self.address):
+            log.error("Control channel not started: another instance is listening on %s", self.address)
+            return
+        if family == "AF_UNIX" and os.path.exists(self.address):
+            # Stale socket from a crashed instance (nothing answered on it)
+            os.remove(self.address)
+        umask = os.umask(0o077) if family == "AF_UNIX" else None
+        try:
+            self._authkey = _write_authkey(self.address)
+            self._listener = Listener(self.address, family=family, authkey=self._authkey)
+        except Exception as e:
+            log.error("Control channel unavailable at %s: %s", self.address, e)
+            return
+        finally:
+            if umask is not None:
+                os.umask(umask)
+
+        self.running = True
+        self._thread = threading.Thread(target=self._accept_loop, name="babel-control", daemon=True)
+        self._thread.start()
+        log.info("Control channel listening on %s", self.address)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        # accept() does not return on close() for named pipes: poke it with a dummy client
+        try:
+            Client(self.address, family=_family(self.address), authkey=self._authkey).close()
+        except Exception:
+            pass
+        try:
+            self._listener.close()
+        except Exception:
+            pass
+        try:
+            os.remove(authkey_path(self.address))
+        except OSError:
+            pass
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn = self._listener.accept()
+            except (AuthenticationError, EOFError, BrokenPipeError, ConnectionResetError) as e:
+                # Wrong or no key, or a start-up liveness probe that hung up
+                if self.running:
+                    log.warning("Control client rejected: %s", e or type(e).__name__)
+                continue
+            except Exception as e:
+                if self.running:
+                    log.error("Control accept failed: %s", e)
+                continue
+            if not self.running:
+                conn.close()
+                break
+            # Clients are short-lived (editor, CLI): serve each on its own thread
+            threading.Thread(target=self._serve, args=(conn,), name="babel-control-client", daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                try:
+                    raw = conn.recv_bytes()
+                except (EOFError, OSError):
+                    break
+                conn.send_bytes(json.dumps(self.dispatch(raw)).encode("utf-8"))
+        finally:
+            conn.close()
+
+    def dispatch(self, raw):
+        """Decodes one request and runs its handler. Never raises."""
+        try:
+            request = json.loads(raw)
+            handler = self.handlers.get(request.get("cmd"))
+            if handler is None:
+                return {"ok": False, "error": f"unknown command {request.get('cmd')!r}"}
+            return {"ok": True, "result": handler(request)}
+        except Exception as e:
+            log.error("Control command failed: %s", e)
+            return {"ok": False, "error": str(e)}
+
+    # --- Commands ---
+
+    def _cmd_apply_profile_delta(self, request):
+        profile = request.get("profile") or self.config_manager.config.get("active_profile")
+        changed = self.config_manager.apply_profile_delta(
+            profile,
+            request.get("settings", {}),
+            request.get("removed", [])
+        )
+
+        activate = request.get("activate", False)
+        switched = activate and self.config_manager.config.get("active_profile") != profile
+
+        if switched:
+            self.config_manager.set_active_profile(profile)
+            self.observer.reload_profile()
+        elif changed and profile in self.config_manager.profile_lineage(self.config_manager.config.get("active_profile")):
+            # The active profile or one of the layers it inherits from
+            self.observer.apply_settings_delta(changed)
+
+        if request.get("persist", True):
+            self.config_manager.save_semantic_config()
+
+        log.info("Applied delta to %s: %s", profile, sorted(changed))
+        return {"profile": profile, "changed": sorted(changed), "switched": bool(switched)}
+
+    def _cmd_switch_profile(self, request):
+        profile = request["profile"]
+        if profile not in self.config_manager.semantic_data.get("profiles", {}):
+            raise ValueError(f"unknown profile {profile!r}")
+        self.config_manager.set_active_profile(profile)
+        self.observer.reload_profile()
+        return {"profile": profile}
+
+    def _cmd_reload(self, request):
+        self.config_manager.load_config()
+        self.config_manager.load_semantic_config()
+        self.observer.reload_profile()
+        return {"profile": self.config_manager.config.get("active_profile")}
+
+    def _cmd_status(self, request):
+        status = self.observer.get_status()
+        status["uptime_s"] = round(time.time() - self.started_at, 1)
+        return status
+
+    def _cmd_metrics(self, request):
+        return self.observer.get_metrics()
+
+    def _cmd_shadow(self, request):
+        enabled = request.get("enabled")
+        if enabled is None:
+            return {"shadow": self.observer.shadow, "report": self.observer.get_shadow_report()}
+        final = self.observer.set_shadow_mode(bool(enabled))
+        return {"shadow": self.observer.shadow, "report": final}
+
+    def _cmd_trace(self, request):
+        enabled = request.get("enabled")
+        if enabled is None:
+            return self.observer.tracer.summary()
+        return self.observer.set_tracing(bool(enabled), request.get("path"))
+
+    def _cmd_profile(self, request):
+        if request.get("stop"):
+            return self.observer.profiler.stop()
+        if request.get("seconds") is None:
+            return self.observer.profiler.summary()
+        return self.observer.start_profile(float(request["seconds"]), request.get("path"))
+
+    def _cmd_sync(self, request):
+        profile_sync = self.observer.profile_sync
+        if profile_sync is None:
+            raise ValueError("fleet sync is not configured (config \"sync\": {\"url\": ...})")
+        outcome = profile_sync.fetch_once()
+        return dict(profile_sync.summary(), outcome=outcome)
+
+    def _cmd_shutdown(self, request):
+        if self.on_shutdown is None:
+            raise ValueError("shutdown is for headless instances (main.py --headless); use the tray's Exit")
+        # Only signals the daemon: it stops the engine, then this server, after the reply is sent
+        self.on_shutdown()
+        return {"stopping": True}
+
+
+class ControlClient:
+    """
+    Talks to a running instance. Used by the editor and utils/babel_ctl.py.
+
+    Example:
+        with ControlClient() as client:
+            client.request("switch_profile", profile="custom.json")
+    """
+    def __init__(self, address=None):
+        self.address = address or default_address()
+        self._conn = None
+
+    def connect(self):
+        if self._conn is None:
+            self._conn = Client(self.address, family=_family(self.address), authkey=read_authkey(self.address))
+        return self
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, cmd, **params):
+        """Sends one command and returns its result. Raises ControlError on failure."""
+        self.connect()
+        params["cmd"] = cmd
+        self._conn.send_bytes(json.dumps(params).encode("utf-8"))
+        reply = json.loads(self._conn.recv_bytes())
+        if not reply.get("ok"):
+            raise ControlError(reply.get("error", "unknown error"))
+        return reply.get("result")
@@ -0,0 +1,107 @@
+import signal
+import sys
+import threading
+import time
+import psutil
+from core.logger import get_logger
+
+log = get_logger("daemon")
+
+# Top-level packages of the tray and the editor: never imported by a headless instance
+UI_PACKAGES = ("ui", "pystray", "PIL", "tkinter", "_tkinter")
+
+
+def ui_modules_loaded():
+    """Names of the loaded modules that belong to the tray or the editor."""
+    return sorted(name for name in list(sys.modules) if name.split(".", 1)[0] in UI_PACKAGES)
+
+
+def rss_bytes():
+    return psutil.Process().memory_info().rss
+
+
+class Daemon:
+    """
+    Headless mode (main.py --headless, config "headless": true): the engine,
+    hooks and control channel without a tray, for thin clients and VDI
+    sessions where many users each run an instance. No UI module is imported.
+
+    run() blocks the main thread until stop(): control channel "shutdown"
+    (babel_ctl.py shutdown), SIGTERM or Ctrl+C. `steady_after_s` after
+    start-up, once the engine has settled, RSS and the number of loaded
+    modules are measured once and logged; they are compared with
+    `rss_budget_mb` (0: no budget) and reported by summary().
+
+    config "daemon": {"steady_after_s": 10, "rss_budget_mb": 0}
+    """
+    def __init__(self, observer, control_server=None, steady_after=10.0, rss_budget_mb=0):
+        self.observer = observer
+        self.control_server = control_server
+        self.steady_after = steady_after
+        self.rss_budget_mb = rss_budget_mb
+        self.steady = None # Steady-state measurement, once taken
+        self.started_at = time.time()
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, observer, control_server, settings):
+        settings = settings or {}
+        return cls(observer, control_server, float(settings.get("steady_after_s", 10)),
+                   float(settings.get("rss_budget_mb", 0)))
+
+    def run(self):
+        """Blocks until stop(), then stops the engine and the control channel."""
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda signum, frame: self.stop())
+        if self.control_server:
+            self.control_server.on_shutdown = self.stop
+        self.observer.daemon = self
+        log.info("Running headless (no tray). Stop with babel_ctl.py shutdown, SIGTERM or Ctrl+C.")
+
+        # A blocking wait never sees Ctrl+C on Windows: wake up once a second there
+        wake = 1.0 if sys.platform == "win32" else None
+        deadline = time.monotonic() + self.steady_after
+        while not self._stop.is_set():
+            if self.steady is not None:
+                self._stop.wait(wake)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.measure()
+            else:
+                self._stop.wait(min(remaining, wake) if wake else remaining)
+
+        log.info("Headless instance stopping")
+        self.observer.stop()
+        if self.control_server:
+            self.control_server.stop()
+
+    def stop(self):
+        self._stop.set()
+
+    def measure(self):
+        """Takes the steady-state measurement (RSS, loaded modules) and logs it."""
+        ui = ui_modules_loaded()
+        self.steady = {
+            "rss_bytes": rss_bytes(),
+            "modules": len(sys.modules),
+            "ui_modules": ui,
+            "after_s": round(time.time() - self.started_at, 1),
+        }
+        rss_mb = self.steady["rss_bytes"] / 1048576
+        log.info("Steady state: RSS %.1f MB, %d modules loaded", rss_mb, self.steady["modules"])
+        if ui:
+            log.warning("UI modules loaded in headless mode: %s", ", ".join(ui))
+        if self.rss_budget_mb and rss_mb > self.rss_budget_mb:
+            log.warning("RSS %.1f MB is over the budget of %.0f MB", rss_mb, self.rss_budget_mb)
+        return self.steady
+
+    def summary(self):
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "rss_bytes": rss_bytes(),
+            "modules": len(sys.modules),
+            "rss_budget_mb": self.rss_budget_mb,
+            "steady": self.steady,
+        }
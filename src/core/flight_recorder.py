@@ -0,0 +1,223 @@
+import itertools
+import json
+import struct
+import threading
+import time
+
+# Decisions (one byte per record)
+DEBOUNCED = 1           # same trigger again within debounce_interval: dropped
+PASS_INACTIVE = 2       # no target app focused: trigger re-injected unchanged
+PASS_UNMAPPED = 3       # target app focused, no rule for the trigger: re-injected unchanged
+TRANSLATED = 4          # rule matched: output injected
+INJECTED = 5            # injection finished (duration: whole injection)
+INJECT_FAILED = 6       # injection raised (fallback used)
+WHEEL_SUPPRESSED = 7    # wheel step swallowed for a zoom gesture
+ZOOM_BEGIN = 8          # modifier swap of a zoom gesture
+ZOOM_END = 9            # gesture timed out, modifiers restored
+SEQUENCE_PREFIX = 10    # first stroke of a multi-stroke trigger: later keys buffered
+SEQUENCE_REPLAYED = 11  # sequence broken or timed out: buffered strokes sent on unchanged
+GESTURE_BEGIN = 12      # mouse button gesture pressed: button suppressed, output sent or held
+GESTURE_END = 13        # its button released: held output released
+PASS_EDITING = 14       # text field focused in the target app: trigger re-injected unchanged
+
+DECISION_NAMES = {
+    DEBOUNCED: "debounced",
+    PASS_INACTIVE: "pass_inactive",
+    PASS_UNMAPPED: "pass_unmapped",
+    TRANSLATED: "translated",
+    INJECTED: "injected",
+    INJECT_FAILED: "inject_failed",
+    WHEEL_SUPPRESSED: "wheel_suppressed",
+    ZOOM_BEGIN: "zoom_begin",
+    ZOOM_END: "zoom_end",
+    SEQUENCE_PREFIX: "sequence_prefix",
+    SEQUENCE_REPLAYED: "sequence_replayed",
+    GESTURE_BEGIN: "gesture_begin",
+    GESTURE_END: "gesture_end",
+    PASS_EDITING: "pass_editing",
+}
+
+# Flags
+FLAG_ARMED = 1          # suppressing hooks were armed
+FLAG_DEEP_IDLE = 2
+FLAG_SHADOW = 4         # shadow mode: nothing was suppressed or injected
+
+# seq, time (ns, perf_counter), context_id, event, app, rule, decision, flags, duration (ns)
+RECORD = struct.Struct("<IQIHHHBBQ")
+RECORD_VERSION = 2 # Version 1 dumps: "<IQIHHHBBI", duration in whole microseconds
+
+MAGIC = b"BFR1"
+HEADER_LENGTH = struct.Struct("<I")
+
+
+def _noop(*args):
+    """Bound in place of record() when the recorder is disabled."""
+    pass
+
+
+class FlightRecorder:
+    """
+    Always-on record of every decision the hooks make, for "ctrl+d didn't
+    duplicate" reports.
+
+    Records are fixed-size structs (RECORD) packed into a preallocated ring
+    of `capacity` slots (rounded up to a power of two); the oldest ones are
+    overwritten. Strings (triggers, apps, outputs) are interned once into
+    small integer ids, so a record costs a few dict lookups and a pack_into -
+    no dicts, no formatting on the hook thread. Writers never lock: the slot
+    comes from an itertools.count, which is atomic under the GIL.
+
+    record(decision, event, context_id, app, rule, flags, duration_ns) is a
+    closure over its state (or _noop when disabled), like logger.Channel.
+
+    dump() writes a self-describing file (JSON header with the string table,
+    then the records oldest first); decode()/load() read it back offline
+    (see utils/decode_flight.py).
+    """
+    def __init__(self, capacity=65536, enabled=True):
+        self.capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.enabled = enabled
+        self.buffer = bytearray(RECORD.size * self.capacity if enabled else 0)
+        self._seq = itertools.count()
+        self._written = 0
+        self._ids = {None: 0, "": 0}
+        self._strings = [""]
+        self._intern_lock = threading.Lock()
+        self.record = self._recorder() if enabled else _noop
+
+    @classmethod
+    def from_config(cls, settings):
+        settings = settings or {}
+        return cls(capacity=int(settings.get("capacity", 65536)), enabled=settings.get("enabled", True))
+
+    def intern(self, text):
+        """Integer id of `text` (0 for None / empty). New strings take the lock once."""
+        string_id = self._ids.get(text)
+        if string_id is None:
+            with self._intern_lock:
+                string_id = self._ids.get(text)
+                if string_id is None:
+                    string_id = len(self._strings)
+                    if string_id > 0xFFFF:
+                        return 0xFFFF # Table full: "unknown"
+                    self._strings.append(text)
+                    self._ids[text] = string_id
+        return string_id
+
+    def string(self, string_id):
+        """Text of an interned id ("" if unknown)."""
+        strings = self._strings
+        return strings[string_id] if string_id < len(strings) else ""
+
+    def _recorder(self):
+        pack_into = RECORD.pack_into
+        buffer = self.buffer
+        size = RECORD.size
+        mask = self.capacity - 1
+        seq_counter = self._seq
+        ids = self._ids
+        intern = self.intern
+        clock = time.perf_counter_ns
+        recorder = self
+
+        def record(decision, event, context_id=0, app=None, rule=None, flags=0, duration_ns=0):
+            seq = next(seq_counter)
+            pack_into(buffer, (seq & mask) * size, seq & 0xFFFFFFFF, clock(), context_id,
+                      ids.get(event) or intern(event), ids.get(app) or intern(app), ids.get(rule) or intern(rule),
+                      decision, flags, duration_ns)
+            recorder._written = seq + 1
+        return record
+
+    def records(self):
+        """Raw record tuples currently in the ring, oldest first."""
+        written = self._written
+        count = min(written, self.capacity)
+        start = written - count
+        rows = []
+        for seq in range(start, written):
+            rows.append(RECORD.unpack_from(self.buffer, (seq % self.capacity) * RECORD.size))
+        # A writer may have lapped the ring while we read: keep the order by seq
+        rows.sort(key=lambda row: row[0])
+        return rows
+
+    def records_since(self, seq):
+        """
+        Raw records written from `seq` on, for incremental readers (core/telemetry.py).
+        Returns (rows, next_seq, lost): `lost` records were overwritten before being read.
+        """
+        written = self._written
+        oldest = max(written - self.capacity, 0)
+        start = max(seq, oldest)
+        rows = [RECORD.unpack_from(self.buffer, (index % self.capacity) * RECORD.size) for index in range(start, written)]
+        return rows, written, start - seq
+
+    def dump(self, path, extra=None):
+        """Writes the ring to `path`. Returns the number of records written."""
+        rows = self.records()
+        header = {
+            "version": RECORD_VERSION,
+            "record_format": RECORD.format,
+            "created": time.time(),
+            "perf_ns": time.perf_counter_ns(), # Pairs with "created" to turn record times into wall-clock times
+            "capacity": self.capacity,
+            "written": self._written,
+            "strings": list(self._strings),
+            "decisions": DECISION_NAMES,
+        }
+        header.update(extra or {})
+        encoded = json.dumps(header).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+            for row in rows:
+                f.write(RECORD.pack(*row))
+        return len(rows)
+
+    def summary(self):
+        return {"enabled": self.enabled, "capacity": self.capacity, "written": self._written,
+                "strings": len(self._strings)}
+
+
+def load(path):
+    """Reads a dump: returns (header, [raw record tuples])."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a Babel flight recording")
+    (length,) = HEADER_LENGTH.unpack_from(data, 4)
+    offset = 4 + HEADER_LENGTH.size
+    header = json.loads(data[offset:offset + length])
+    record = struct.Struct(header["record_format"])
+    body = memoryview(data)[offset + length:]
+    rows = [record.unpack_from(body, i) for i in range(0, len(body) - record.size + 1, record.size)]
+    return header, rows
+
+
+def decode(path):
+    """Reads a dump into readable dicts, with wall-clock times."""
+    header, rows = load(path)
+    strings = header["strings"]
+    names = {int(code): name for code, name in header["decisions"].items()}
+    base = header["created"] - header["perf_ns"] / 1e9
+    duration_scale = 1000 if header.get("version", 1) < 2 else 1 # Version 1 recorded microseconds
+
+    def text(string_id):
+        return strings[string_id] if string_id < len(strings) else "?"
+
+    decoded = []
+    for seq, at_ns, context_id, event, app, rule, decision, flags, duration in rows:
+        decoded.append({
+            "seq": seq,
+            "time": base + at_ns / 1e9,
+            "context_id": context_id,
+            "event": text(event),
+            "app": text(app) or None,
+            "rule": text(rule) or None,
+            "decision": names.get(decision, str(decision)),
+            "armed": bool(flags & FLAG_ARMED),
+            "deep_idle": bool(flags & FLAG_DEEP_IDLE),
+            "shadow": bool(flags & FLAG_SHADOW),
+            "duration_ns": duration * duration_scale,
+        })
+    return header, decoded
@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import namedtuple
+
+# Low-level mouse messages
+WM_MOUSEMOVE = 0x0200
+WM_LBUTTONDOWN, WM_LBUTTONUP = 0x0201, 0x0202
+WM_RBUTTONDOWN, WM_RBUTTONUP = 0x0204, 0x0205
+WM_MBUTTONDOWN, WM_MBUTTONUP = 0x0207, 0x0208
+WM_XBUTTONDOWN, WM_XBUTTONUP = 0x020B, 0x020C
+
+# msg -> (button, pressed). X buttons say which one in the high word of mouseData (event "delta").
+BUTTON_MESSAGES = {
+    WM_LBUTTONDOWN: ("lbutton", True), WM_LBUTTONUP: ("lbutton", False),
+    WM_RBUTTONDOWN: ("rbutton", True), WM_RBUTTONUP: ("rbutton", False),
+    WM_MBUTTONDOWN: ("mbutton", True), WM_MBUTTONUP: ("mbutton", False),
+}
+X_BUTTONS = {1: "xbutton1", 2: "xbutton2"}
+
+# Button names follow the Windows virtual keys (VK_MBUTTON, ...) so "ctrl+left" stays the arrow key
+BUTTONS = ("lbutton", "rbutton", "mbutton", "xbutton1", "xbutton2")
+
+# Keys a gesture can be held with. The hook reads them as one bitmask per button press.
+HELD_BITS = {"ctrl": 1, "shift": 2, "alt": 4, "windows": 8, "space": 16}
+_HELD_VKS = ((1, 0x11), (2, 0x10), (4, 0x12), (8, 0x5B), (8, 0x5C), (16, 0x20)) # (bit, virtual key)
+
+# One compiled mapping. keys: keys held for the trigger; out_keys/out_button: what is held
+# instead while the trigger button is down; chord: keyboard output sent once on press.
+GestureRule = namedtuple("GestureRule", "trigger output button mask keys out_keys out_button chord drag")
+
+
+_MOUSE_SUFFIXES = BUTTONS + ("wheel", "drag")
+
+
+def is_mouse_trigger(trigger):
+    """'ctrl+wheel', 'mbutton', 'alt+xbutton1', 'space+drag' - anything the mouse hook handles."""
+    return trigger.endswith(_MOUSE_SUFFIXES)
+
+
+def parse_gesture(text):
+    """'space+drag' -> (keys, button, drag); None if it isn't a button gesture."""
+    parts = [p.strip() for p in text.lower().split('+') if p.strip()]
+    drag = bool(parts) and parts[-1] == "drag"
+    if drag:
+        parts = parts[:-1]
+    if parts and parts[-1] in BUTTONS:
+        button = parts.pop()
+    elif drag:
+        button = "lbutton" # "space+drag" drags with the primary button
+    else:
+        return None
+    return tuple(parts), button, drag
+
+
+def compile_rule(trigger, output):
+    """GestureRule for one lookup entry, or None (wheel rules, identities, keys the hook can't see held)."""
+    parsed = parse_gesture(trigger)
+    if parsed is None or trigger == output:
+        return None
+    keys, button, drag = parsed
+    if any(k not in HELD_BITS for k in keys):
+        return None
+    mask = sum(HELD_BITS[k] for k in keys)
+    out = parse_gesture(output)
+    if out is None:
+        if 'wheel' in output:
+            return None
+        # Keyboard output: one shortcut per press
+        return GestureRule(trigger, output, button, mask, keys, (), None, output, False)
+    out_keys, out_button, out_drag = out
+    return GestureRule(trigger, output, button, mask, keys, out_keys, out_button, None, drag or out_drag)
+
+
+def read_held_mask():
+    """HELD_BITS of the keys held right now (GetAsyncKeyState, like the zoom gesture's modifier check)."""
+    from core.backend import windll
+    state = windll.user32.GetAsyncKeyState
+    mask = 0
+    for bit, vk in _HELD_VKS:
+        if state(vk) & 0x8000:
+            mask |= bit
+    return mask
+
+
+class GestureTable:
+    """
+    Button gestures of one context, compiled when its snapshot is built.
+    rules: (button, held-key mask) -> GestureRule, matched exactly.
+    """
+    __slots__ = ("rules", "buttons")
+
+    def __init__(self, rules):
+        self.rules = {(rule.button, rule.mask): rule for rule in rules}
+        self.buttons = frozenset(rule.button for rule in rules)
+
+
+def compile_gesture_table(lookup):
+    rules = [rule for rule in (compile_rule(t, o) for t, o in lookup.items() if is_mouse_trigger(t)) if rule]
+    return GestureTable(rules) if rules else None
+
+
+class GestureTranslator:
+    """
+    Runs button gestures in the mouse hook.
+
+    A trigger button press is suppressed and mapped to its output: a
+    keyboard shortcut (sent once) or a held output (keys + button) that
+    lasts until the trigger button is released. Trigger keys that are not
+    part of the output are released while it is held and restored after,
+    like the zoom gesture's modifier swap.
+
+    While a drag is held, the hook suppresses hardware motion and keeps only
+    the latest position; one absolute move per frame (frame_interval, on the
+    scheduler) carries it. A 1000 Hz mouse then costs ~frame_rate injected
+    events per second instead of 1000. Injected events pass untouched.
+
+    Output runs on the scheduler thread, in order. `injector` provides
+    press_key/release_key/press_button/release_button/move_to, send(rule)
+    injects a rule's chord and held_mask() reads the held keys as a
+    HELD_BITS mask. on_decision(rule, begin, cost_ns) sees every trigger
+    press and release, also in shadow mode (where nothing is suppressed).
+    """
+    def __init__(self, scheduler, injector, send, held_mask=read_held_mask, frame_interval=1 / 120.0):
+        self.scheduler = scheduler
+        self.injector = injector
+        self.held_mask = held_mask
+        self.send = send
+        self.frame_interval = frame_interval
+        self.shadow = False
+        self.on_decision = None
+        self.held = {} # trigger button -> GestureRule in progress
+        self.dragging = 0
+        self._position = None
+        self._flush_timer = None
+        self._lock = threading.Lock()
+        self.counters = {"presses": 0, "moves_in": 0, "moves_out": 0}
+
+    def handle(self, event, table):
+        """Hook fast path. Returns True to let the event through."""
+        msg = event['msg']
+        if msg == WM_MOUSEMOVE:
+            if not self.dragging or event.get('injected'):
+                return True
+            return self._coalesce(event['x'], event['y'])
+
+        if msg == WM_XBUTTONDOWN or msg == WM_XBUTTONUP:
+            button, pressed = X_BUTTONS.get(event['delta']), msg == WM_XBUTTONDOWN
+        else:
+            info = BUTTON_MESSAGES.get(msg)
+            if info is None:
+                return True
+            button, pressed = info
+        if event.get('injected'):
+            return True
+
+        start_ns = time.perf_counter_ns()
+        if not pressed:
+            with self._lock:
+                rule = self.held.pop(button, None)
+                if rule is not None and rule.drag and not self.shadow:
+                    self.dragging -= 1
+            if rule is None:
+                return True
+            if self.on_decision:
+                self.on_decision(rule, False, time.perf_counter_ns() - start_ns)
+            if self.shadow:
+                return True
+            self.scheduler.call_soon(self._end, rule)
+            return False
+
+        if table is None or button not in table.buttons:
+            return True
+        rule = table.rules.get((button, self.held_mask()))
+        if rule is None:
+            return True
+        self.counters["presses"] += 1
+        if self.on_decision:
+            self.on_decision(rule, True, time.perf_counter_ns() - start_ns)
+        with self._lock:
+            self.held[button] = rule
+            if rule.drag and not self.shadow:
+                self.dragging += 1
+        if self.shadow:
+            return True
+        self.scheduler.call_soon(self._begin, rule)
+        return False
+
+    def _coalesce(self, x, y):
+        self.counters["moves_in"] += 1
+        with self._lock:
+            self._position = (x, y)
+            if self._flush_timer is None:
+                self._flush_timer = self.scheduler.call_later(self.frame_interval, self._flush)
+        return False
+
+    def _flush(self):
+        with self._lock:
+            position, self._position = self._position, None
+            self._flush_timer = None
+        if position is not None:
+            self.counters["moves_out"] += 1
+            self.injector.move_to(*position)
+
+    def _begin(self, rule):
+        if rule.chord:
+            self.send(rule)
+            return
+        held = self.held_mask()
+        for key in rule.keys:
+            if key not in rule.out_keys and held & HELD_BITS[key]:
+                self.injector.release_key(key)
+        for key in rule.out_keys:
+            if key not in rule.keys:
+                self.injector.press_key(key)
+        self.injector.press_button(rule.out_button)
+
+    def _end(self, rule):
+        if rule.chord:
+            return # The shortcut went out on press; the button's release is just swallowed
+        if rule.drag:
+            # Last position first, so the drag ends where the pointer is
+            with self._lock:
+                if self._flush_timer is not None and not self.dragging:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            self._flush()
+        self.injector.release_button(rule.out_button)
+        for key in reversed(rule.out_keys):
+            if key not in rule.keys:
+                self.injector.release_key(key)
+        held = self.held_mask()
+        for key in rule.keys:
+            if key not in rule.out_keys and held & HELD_BITS[key]:
+                self.injector.press_key(key) # Still physically held: give it back
+
+    def cancel(self):
+        """Releases everything in progress (mouse hook removed mid-gesture)."""
+        with self._lock:
+            held = list(self.held.values())
+            self.held.clear()
+            self.dragging = 0
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._position = None
+        if not self.shadow:
+            for rule in held:
+                self.scheduler.call_soon(self._end, rule)
+
+    def summary(self):
+        return dict(self.counters, held=len(self.held), frame_interval_ms=round(self.frame_interval * 1000, 2))
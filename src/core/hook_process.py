@@ -0,0 +1,364 @@
+import collections
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+from multiprocessing import shared_memory
+from core.logger import get_logger
+
+log = get_logger("hookproc")
+
+# Message tags (first byte of every ring message)
+MSG_TABLE = b"T"   # main -> hook process: compiled active-context table (JSON)
+MSG_TABLE_PART = b"P" # main -> hook process: one chunk of a table too large for one message (TABLE_PART + JSON slice)
+MSG_QUIT = b"Q"    # main -> hook process: unhook and exit
+MSG_DUMP = b"D"    # main -> hook process: write the flight recorder to the path that follows
+MSG_EVENT = b"E"   # hook process -> main: one handled hotkey (EVENT struct + trigger)
+MSG_DRAINED = b"A" # hook process -> main: command ring emptied, pending table chunks can follow
+
+# Chunk index, chunk count
+TABLE_PART = struct.Struct("<II")
+
+# kind, latency in microseconds, flags (FLAG_*)
+EVENT = struct.Struct("<BIB")
+EVENT_HOTKEY = 1
+
+FLAG_TRANSLATED = 1 # Rule matched and its output injected (shadow mode: would have been)
+FLAG_ACTIVE = 2
+FLAG_SHADOW = 4 # Shadow mode: observed only, the main process keeps the report
+FLAG_DEBOUNCED = 8 # Dropped as a repeat within the debounce interval: nothing injected
+
+
+class ShmRing:
+    """
+    Single-producer / single-consumer message ring in shared memory.
+
+    Layout: [head u64][tail u64][capacity u64][data ...]
+    `head` and `tail` are running byte counts; only the producer writes head and
+    only the consumer writes tail, so no lock is needed. Messages are
+    length-prefixed and never wrap: when one does not fit before the end of the
+    buffer, a SKIP marker sends the reader back to offset 0.
+
+    A full ring drops the message (push returns False) instead of blocking the
+    hook thread.
+    """
+    HEADER = struct.Struct("<QQQ")
+    LENGTH = struct.Struct("<I")
+    SKIP = 0xFFFFFFFF
+
+    def __init__(self, name=None, capacity=1 << 16):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER.size + capacity)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0, capacity)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.capacity = self.HEADER.unpack_from(self.buf, 0)[2]
+        self.base = self.HEADER.size
+
+    def _head(self):
+        return struct.unpack_from("<Q", self.buf, 0)[0]
+
+    def _tail(self):
+        return struct.unpack_from("<Q", self.buf, 8)[0]
+
+    def push(self, payload):
+        """Producer side. Returns False if the ring is full."""
+        head = self._head()
+        tail = self._tail()
+        capacity = self.capacity
+        need = self.LENGTH.size + len(payload)
+        if need > capacity:
+            raise ValueError("message larger than ring")
+
+        pos = head % capacity
+        waste = capacity - pos if pos + need > capacity else 0
+        if head + waste + need - tail > capacity:
+            return False
+
+        if waste:
+            if waste >= self.LENGTH.size:
+                self.LENGTH.pack_into(self.buf, self.base + pos, self.SKIP)
+            head += waste
+            pos = 0
+
+        offset = self.base + pos
+        self.LENGTH.pack_into(self.buf, offset, len(payload))
+        self.buf[offset + self.LENGTH.size:offset + need] = payload
+        # Publish only after the payload is in place
+        struct.pack_into("<Q", self.buf, 0, head + need)
+        return True
+
+    def max_message(self):
+        """Largest payload push() accepts without raising."""
+        return self.capacity - self.LENGTH.size
+
+    def pop(self):
+        """Consumer side. Returns the next message (bytes) or None."""
+        tail = self._tail()
+        if tail == self._head():
+            return None
+        capacity = self.capacity
+        pos = tail % capacity
+
+        if capacity - pos < self.LENGTH.size:
+            tail += capacity - pos
+            pos = 0
+        else:
+            length = self.LENGTH.unpack_from(self.buf, self.base + pos)[0]
+            if length == self.SKIP:
+                tail += capacity - pos
+                pos = 0
+
+        offset = self.base + pos
+        length = self.LENGTH.unpack_from(self.buf, offset)[0]
+        payload = bytes(self.buf[offset + self.LENGTH.size:offset + self.LENGTH.size + length])
+        struct.pack_into("<Q", self.buf, 8, tail + self.LENGTH.size + length)
+        return payload
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class TableParts:
+    """Reassembles a table sent as MSG_TABLE_PART chunks (hook process side)."""
+    def __init__(self):
+        self.parts = []
+
+    def add(self, message):
+        """Takes one MSG_TABLE_PART message. Returns the table once its last chunk arrived, else None."""
+        index, count = TABLE_PART.unpack_from(message, 1)
+        if index == 0:
+            self.parts = [] # A newer table restarts; leftovers of a superseded one are dropped
+        if index != len(self.parts):
+            return None # Tail of a table superseded mid-way
+        self.parts.append(message[1 + TABLE_PART.size:])
+        if len(self.parts) < count:
+            return None
+        data, self.parts = b"".join(self.parts), []
+        return json.loads(data)
+
+
+def raise_priority():
+    """Best effort: the hook process should win the CPU over everything else Babel does."""
+    try:
+        if sys.platform == "win32":
+            import psutil
+            psutil.Process().nice(psutil.HIGH_PRIORITY_CLASS)
+        else:
+            os.nice(-10)
+    except Exception as e:
+        log.warning("Could not raise hook process priority: %s", e)
+
+
+def hook_process_main(cmd_ring_name, event_ring_name, cmd_signal, event_signal, settings):
+    """Entry point of the hook process."""
+    from core import logger
+    logger.configure(settings.get("logging"), settings.get("project_root", "."))
+    logger.start()
+    raise_priority()
+    if settings.get("simulate"):
+        from core import sim_backend
+        sim_backend.install()
+    from core.hook_process_engine import HookProcessEngine
+
+    cmd_ring = ShmRing(cmd_ring_name)
+    event_ring = ShmRing(event_ring_name)
+
+    def emit(payload):
+        if event_ring.push(payload):
+            event_signal.release()
+
+    engine = HookProcessEngine(settings, emit)
+    engine.start()
+    parent = multiprocessing.parent_process()
+    parts = TableParts()
+
+    try:
+        while True:
+            # Wake on new commands; the timeout only exists to notice a dead parent
+            if not cmd_signal.acquire(timeout=2.0):
+                if parent is not None and not parent.is_alive():
+                    break
+                continue
+            message = cmd_ring.pop()
+            while message is not None:
+                tag = message[:1]
+                if tag == MSG_TABLE:
+                    engine.apply_table(json.loads(message[1:]))
+                elif tag == MSG_TABLE_PART:
+                    table = parts.add(message)
+                    if table is not None:
+                        engine.apply_table(table)
+                elif tag == MSG_DUMP:
+                    engine.flight.dump(message[1:].decode("utf-8"), {"process": "hooks"})
+                elif tag == MSG_QUIT:
+                    return
+                message = cmd_ring.pop()
+            emit(MSG_DRAINED)
+    finally:
+        engine.stop()
+        cmd_ring.close()
+        event_ring.close()
+
+
+class HookProcessHost:
+    """
+    Main-process side of the isolated hook process.
+
+    The hook process only holds the compiled table of the active context
+    (triggers, lookup, active flag) and runs the keyboard/mouse hooks plus the
+    translation fast path, so nothing in this process (WebSocket loop, context
+    poller, tray, JSON parsing) can hold the GIL while a hook is waiting.
+
+    Table updates go down one ShmRing, handled-event records come back on
+    another. Each ring has a semaphore so neither side has to poll. A table
+    larger than a quarter of the command ring is sent as MSG_TABLE_PART
+    chunks. What does not fit in the ring stays pending (only the latest
+    table: a newer one replaces it) and goes out when the hook process
+    reports the ring drained.
+    """
+    def __init__(self, settings=None, on_event=None):
+        self.settings = dict(settings or {})
+        self.on_event = on_event
+        self.process = None
+        self.running = False
+        self._cmd_ring = None
+        self._event_ring = None
+        self._cmd_signal = None
+        self._event_signal = None
+        self._reader = None
+        self._push_lock = threading.Lock() # Several main threads publish tables
+        self._pending = collections.deque() # Messages of the latest table not in the ring yet
+
+        self.events = 0
+        self.dropped_tables = 0 # Replaced by a newer table before they were fully sent
+        self.table_chunks = 0
+        self.max_latency_us = 0
+
+    def start(self):
+        if self.running:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._cmd_ring = ShmRing(capacity=self.settings.get("cmd_ring_bytes", 1 << 16))
+        self._event_ring = ShmRing(capacity=self.settings.get("event_ring_bytes", 1 << 18))
+        self._cmd_signal = ctx.Semaphore(0)
+        self._event_signal = ctx.Semaphore(0)
+
+        self.process = ctx.Process(
+            target=hook_process_main,
+            args=(self._cmd_ring.name, self._event_ring.name, self._cmd_signal, self._event_signal, self.settings),
+            name="babel-hooks",
+            daemon=True
+        )
+        self.process.start()
+        self.running = True
+        self._reader = threading.Thread(target=self._read_events, name="babel-hook-events", daemon=True)
+        self._reader.start()
+        log.info("Hook process started (pid %s)", self.process.pid)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._send(MSG_QUIT)
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._event_signal.release() # Unblock the reader
+        if self._reader:
+            self._reader.join(timeout=1.0)
+        self._cmd_ring.close()
+        self._event_ring.close()
+
+    def publish_table(self, table):
+        """
+        Sends the compiled table of the active context to the hook process.
+        Never fails on size or a full ring: the rest is sent once the hook
+        process drained the ring.
+        """
+        if not self.running:
+            return
+        messages = self._table_messages(json.dumps(table, separators=(",", ":")).encode("utf-8"))
+        with self._push_lock:
+            if self._pending:
+                self.dropped_tables += 1
+            self._pending = collections.deque(messages)
+        self._flush_tables()
+
+    def _table_messages(self, data):
+        limit = self._cmd_ring.max_message() // 4 - 1 - TABLE_PART.size
+        if len(data) <= limit:
+            return [MSG_TABLE + data]
+        count = -(-len(data) // limit)
+        self.table_chunks += count
+        return [MSG_TABLE_PART + TABLE_PART.pack(i, count) + data[i * limit:(i + 1) * limit] for i in range(count)]
+
+    def _flush_tables(self):
+        """Pushes pending table messages while they fit (publishing threads, event reader)."""
+        sent = False
+        with self._push_lock:
+            pending = self._pending
+            while pending and self._cmd_ring.push(pending[0]):
+                pending.popleft()
+                sent = True
+            waiting = bool(pending)
+        if sent:
+            self._cmd_signal.release()
+        if waiting:
+            log.debug("Hook process command ring full, rest of the table waits for it to drain")
+
+    def dump_flight(self, path):
+        """Asks the hook process to write its flight recorder to `path` (asynchronously)."""
+        if self.running:
+            self._send(MSG_DUMP + path.encode("utf-8"))
+
+    def _send(self, payload):
+        with self._push_lock:
+            ok = self._cmd_ring.push(payload)
+        if ok:
+            self._cmd_signal.release()
+        return ok
+
+    def _read_events(self):
+        while self.running:
+            self._event_signal.acquire()
+            ring = self._event_ring
+            if not self.running or ring is None:
+                break
+            message = ring.pop()
+            while message is not None:
+                if message[:1] == MSG_DRAINED:
+                    if self._pending:
+                        self._flush_tables()
+                elif message[:1] == MSG_EVENT:
+                    kind, latency_us, flags = EVENT.unpack_from(message, 1)
+                    trigger = message[1 + EVENT.size:].decode("utf-8")
+                    self.events += 1
+                    if latency_us > self.max_latency_us:
+                        self.max_latency_us = latency_us
+                    if self.on_event:
+                        self.on_event(kind, trigger, latency_us, flags)
+                message = ring.pop()
+
+    def summary(self):
+        return {
+            "pid": self.process.pid if self.process else None,
+            "alive": bool(self.process and self.process.is_alive()),
+            "events": self.events,
+            "max_latency_us": self.max_latency_us,
+            "dropped_tables": self.dropped_tables,
+            "table_chunks": self.table_chunks,
+            "pending_table": len(self._pending),
+        }
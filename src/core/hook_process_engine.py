@@ -0,0 +1,112 @@
+import time
+from core.backend import keyboard
+from core.observer import InputObserver
+from core.injector import InjectionModule
+from core.injection_timing import InjectionTiming
+from core import flight_recorder
+from core.hook_process import MSG_EVENT, EVENT, EVENT_HOTKEY, FLAG_TRANSLATED, FLAG_ACTIVE, FLAG_SHADOW, FLAG_DEBOUNCED
+
+
+class _TableConfig:
+    """Minimal stand-in for ConfigManager: the hook process never reads config files."""
+    def __init__(self, settings):
+        self.config = settings
+
+    def get_system_definitions(self):
+        return {} # App timings arrive with each table
+
+
+class HookProcessEngine(InputObserver):
+    """
+    InputObserver running inside the isolated hook process.
+
+    It keeps the hooks, the translation fast path and zoom gestures, but has
+    no context poller, no web listener and no ActionMapper: all of that state
+    arrives from the main process as a compiled table (see HookProcessHost).
+    """
+    def __init__(self, settings, emit):
+        super().__init__(None, _TableConfig(settings), InjectionModule())
+        self.emit = emit
+        self.table_triggers = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.register_hotkeys()
+        # No context polling here: the scheduler only runs zoom, injection and watchdog timers
+        self.scheduler.start()
+        if self.watchdog_enabled:
+            self.watchdog.start(self.scheduler)
+
+    def register_hotkeys(self):
+        self.registered_triggers = set(self.table_triggers)
+        self._install_hooks()
+
+    def reload_profile(self):
+        # Used by the watchdog after reinstalling the keyboard hook
+        try:
+            keyboard.unhook_all_hotkeys()
+        except Exception:
+            pass
+        self._live_hotkeys.clear()
+        self.hooks_armed = False
+        self.register_hotkeys()
+
+    def apply_table(self, table):
+        """Swaps in a table published by the main process."""
+        if table.get("idle"):
+            # Main process saw the last target app exit: no hooks until one starts again
+            if not self.deep_idle:
+                self.deep_idle = True
+                self.watchdog.stop()
+                self._publish_snapshot(active=False)
+                self._remove_local_hooks()
+            return
+        if self.deep_idle:
+            self.deep_idle = False
+            self.table_triggers = None # Forces a re-hook below
+            if self.watchdog_enabled:
+                self.watchdog.start(self.scheduler)
+
+        layout_changed = False
+        layout_id = table.get("layout", self.keymap.layout_id)
+        if layout_id != self.keymap.layout_id:
+            # Main process saw an input-language change: re-hook with that layout's codes
+            self.keymap = self.keymaps.get(layout_id)
+            self.injection_module.keymap = self.keymap
+            layout_changed = True
+
+        triggers = table.get("triggers", self.table_triggers or [])
+        if layout_changed or triggers != self.table_triggers:
+            self.table_triggers = triggers
+            self.reload_profile()
+
+        # Shadow mode follows the main process (re-hooks without suppression)
+        self.set_shadow_mode(table.get("shadow", False))
+
+        # One snapshot: the hook thread never sees the new flag with the old lookup
+        timing = table.get("timing")
+        self._publish_snapshot(lookup=table.get("lookup", {}), app=table.get("app"), active=table.get("active", False),
+                               editing=table.get("editing", False), timing=InjectionTiming(*timing) if timing else None)
+        self._sync_armed()
+
+    def _finish_shadow_report(self):
+        # The main process keeps the report, from the events sent over
+        self.shadow_report = None
+        return None
+
+    def _handle_dynamic_hotkey(self, trigger):
+        snapshot = self.snapshot
+        start = time.perf_counter()
+        decision = self._dispatch_hotkey(trigger)
+        latency_us = int((time.perf_counter() - start) * 1e6)
+
+        flags = FLAG_ACTIVE if snapshot.active else 0
+        if self.shadow:
+            flags |= FLAG_SHADOW
+        if decision == flight_recorder.TRANSLATED:
+            flags |= FLAG_TRANSLATED
+        elif decision == flight_recorder.DEBOUNCED:
+            flags |= FLAG_DEBOUNCED
+        self.emit(MSG_EVENT + EVENT.pack(EVENT_HOTKEY, min(latency_us, 0xFFFFFFFF), flags) + trigger.encode("utf-8"))
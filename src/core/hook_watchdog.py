@@ -0,0 +1,276 @@
+import collections
+import ctypes
+import threading
+import time
+from core import tracing
+from core.backend import windll
+from core.logger import get_logger
+
+log = get_logger("watchdog")
+
+# Incident kinds
+SLOW_CALLBACK = "slow_callback"
+HOOK_LOST = "hook_lost"
+REINSTALLED = "reinstalled"
+REINSTALL_FAILED = "reinstall_failed"
+
+# Hooks that together see every kind of user input: only then can input no hook saw mean a lost hook
+INPUT_HOOKS = frozenset(("keyboard", "mouse"))
+# GetLastInputInfo counts in GetTickCount milliseconds (10-16ms resolution)
+TICK_SLACK = 0.05
+
+
+class LASTINPUTINFO(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint32)]
+
+
+def last_input_age():
+    """
+    Seconds since the last keyboard or mouse input the OS saw (physical or
+    injected), None where the platform cannot tell.
+    """
+    try:
+        user32 = windll.user32
+        kernel32 = windll.kernel32
+        info = LASTINPUTINFO(ctypes.sizeof(LASTINPUTINFO))
+        if not user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        return ((kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+    except (AttributeError, OSError):
+        return None
+
+
+class HookMonitor:
+    """
+    Health state of one input hook (keyboard or mouse).
+
+    The hook calls beat() for every event it sees (directly or through a
+    timed() wrapper), so `last_beat` advancing proves the OS is still
+    delivering events to us. `suspect` holds the reason once the hook is
+    thought lost; the next check reinstalls it.
+    """
+    __slots__ = ("name", "reinstall", "watchdog", "last_beat", "suspect",
+                 "callbacks", "slow_callbacks", "max_callback_ms", "reinstalls")
+
+    def __init__(self, name, reinstall, watchdog):
+        self.name = name
+        self.reinstall = reinstall  # callable: removes and re-installs the hook
+        self.watchdog = watchdog
+        self.last_beat = watchdog.clock()
+        self.suspect = None
+        self.callbacks = 0
+        self.slow_callbacks = 0
+        self.max_callback_ms = 0.0
+        self.reinstalls = 0
+
+    def beat(self, *args):
+        self.last_beat = self.watchdog.clock()
+
+    def timed(self, callback):
+        """
+        Wraps a hook callback: counts it as a heartbeat and measures it
+        against the watchdog budget. The wrapper returns callback's result.
+        Traced as a "<hook>:<callback>" span (core/tracing.py).
+        """
+        watchdog = self.watchdog
+        tracer = tracing.get_tracer()
+        span_name = f"{self.name}:{getattr(callback, '__name__', 'callback').strip('_')}"
+
+        def wrapper(*args):
+            clock = watchdog.clock
+            start = clock()
+            result = callback(*args)
+            end = clock()
+            tracer.complete(span_name, "hook", start, end)
+            self.last_beat = end
+            self.callbacks += 1
+            elapsed_ms = (end - start) * 1000.0
+            if elapsed_ms > self.max_callback_ms:
+                self.max_callback_ms = elapsed_ms
+            if elapsed_ms > watchdog.budget_ms:
+                self.slow_callbacks += 1
+                watchdog.record(self.name, SLOW_CALLBACK, round(elapsed_ms, 2))
+            if elapsed_ms >= watchdog.hook_timeout_ms:
+                # Past LowLevelHooksTimeout Windows may already have removed the hook
+                self.suspect = f"callback took {elapsed_ms:.0f}ms"
+                watchdog.wake()
+            return result
+        return wrapper
+
+
+class HookWatchdog:
+    """
+    Detects input hooks that Windows removed (callbacks exceeding
+    LowLevelHooksTimeout get unhooked without notice) and reinstalls them.
+
+    It never injects input: synthetic events reset the OS idle timer (no
+    screen lock, no display sleep) and reach other apps. A hook is suspected
+    lost when
+    - one of its callbacks ran for `hook_timeout_ms` (LowLevelHooksTimeout)
+      or longer; overruns of `budget_ms` are recorded;
+    - the OS saw user input (GetLastInputInfo) more than `input_grace`
+      seconds ago that none of the hooks saw. Only the keyboard and mouse
+      hooks together see every input, so this needs both; each hook silent
+      since before that input is reinstalled. An idle user gives no input,
+      so nothing is ever suspected while idle.
+    Suspected hooks are reinstalled; reinstalling a live hook is harmless.
+
+    check() performs one pass and takes the current time from `clock` (also
+    used to time callbacks, so it must be high resolution) and the input age
+    from `last_input_age`, so the fault paths can be driven deterministically
+    (see core/sim_backend.py).
+
+    Started with a Scheduler, checks are a timer every `check_interval`
+    seconds (sooner after a timed-out callback) instead of a thread ticking.
+    """
+    def __init__(self, budget_ms=50.0, hook_timeout_ms=300.0, check_interval=5.0, input_grace=0.5,
+                 clock=time.perf_counter, last_input_age=last_input_age):
+        self.budget_ms = budget_ms
+        self.hook_timeout_ms = hook_timeout_ms
+        self.check_interval = check_interval
+        self.input_grace = input_grace
+        self.clock = clock
+        self.last_input_age = last_input_age
+
+        self.monitors = {}
+        self.incidents = collections.deque(maxlen=200)
+        self.running = False
+        self.scheduler = None
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, settings):
+        settings = settings or {}
+        return cls(
+            budget_ms=float(settings.get("budget_ms", 50.0)),
+            hook_timeout_ms=float(settings.get("hook_timeout_ms", 300.0)),
+            check_interval=float(settings.get("check_interval_s", 5.0)),
+            input_grace=float(settings.get("input_grace_s", 0.5)),
+        )
+
+    def register(self, name, reinstall):
+        monitor = HookMonitor(name, reinstall, self)
+        self.monitors[name] = monitor
+        if self.running and self.scheduler is not None:
+            self._schedule_check()
+        return monitor
+
+    def unregister(self, name):
+        self.monitors.pop(name, None)
+
+    def record(self, hook_name, kind, detail=None):
+        # Called from hook threads too: deque.append is atomic, formatting happens in the log flusher
+        self.incidents.append((time.time(), hook_name, kind, detail))
+        if kind == SLOW_CALLBACK:
+            log.warning("%s hook callback took %sms (budget %sms)", hook_name, detail, self.budget_ms)
+        elif kind == REINSTALLED:
+            log.warning("%s hook reinstalled", hook_name)
+        else:
+            log.error("%s hook incident: %s %s", hook_name, kind, detail or "")
+
+    def check(self):
+        """One watchdog pass over all monitors."""
+        now = self.clock()
+        monitors = list(self.monitors.values())
+        age = self.last_input_age() if INPUT_HOOKS <= self.monitors.keys() else None
+        # Beats within the tick resolution of that input count as having seen it
+        if (age is not None and age >= self.input_grace
+                and all(m.last_beat < now - age - TICK_SLACK for m in monitors)):
+            for monitor in monitors:
+                if monitor.suspect is None:
+                    monitor.suspect = f"missed input {age:.2f}s ago"
+        for monitor in monitors:
+            if monitor.suspect is not None:
+                reason, monitor.suspect = monitor.suspect, None
+                self.record(monitor.name, HOOK_LOST, reason)
+                self._reinstall(monitor)
+
+    def _reinstall(self, monitor):
+        try:
+            monitor.reinstall()
+            monitor.reinstalls += 1
+            monitor.last_beat = self.clock()
+            self.record(monitor.name, REINSTALLED)
+        except Exception as e:
+            self.record(monitor.name, REINSTALL_FAILED, str(e))
+
+    def start(self, scheduler=None):
+        if self.running:
+            return
+        self.running = True
+        self.scheduler = scheduler
+        if scheduler is not None:
+            self._schedule_check()
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="babel-hook-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def next_check_in(self):
+        """Seconds until the next check, None without monitors."""
+        monitors = list(self.monitors.values())
+        if not monitors:
+            return None
+        return 0.0 if any(m.suspect is not None for m in monitors) else self.check_interval
+
+    def wake(self):
+        """Checks as soon as possible (from a hook thread: a callback timed out)."""
+        if self.running and self.scheduler is not None:
+            self._schedule_check()
+
+    def _schedule_check(self):
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.running:
+                return
+            delay = self.next_check_in()
+            if delay is not None:
+                self._timer = self.scheduler.call_later(delay, self._scheduled_check)
+
+    def _scheduled_check(self):
+        if not self.running:
+            return
+        self.check()
+        self._schedule_check()
+
+    def _run(self):
+        while self.running:
+            self.check()
+            self._stop_event.wait(self.check_interval)
+
+    def summary(self):
+        """JSON-friendly state for the control channel."""
+        return {
+            "budget_ms": self.budget_ms,
+            "hook_timeout_ms": self.hook_timeout_ms,
+            "hooks": {
+                name: {
+                    "callbacks": m.callbacks,
+                    "slow_callbacks": m.slow_callbacks,
+                    "max_callback_ms": round(m.max_callback_ms, 2),
+                    "reinstalls": m.reinstalls,
+                    "seconds_since_beat": round(self.clock() - m.last_beat, 2),
+                }
+                for name, m in self.monitors.items()
+            },
+            "incidents": [
+                {"time": t, "hook": hook, "kind": kind, "detail": detail}
+                for t, hook, kind, detail in list(self.incidents)
+            ],
+        }
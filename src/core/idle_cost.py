@@ -0,0 +1,150 @@
+import sys
+import threading
+import time
+import psutil
+
+# Thread name -> component. Threads Babel starts itself are named "babel-<component>".
+THREAD_COMPONENTS = {
+    "MainThread": "tray",
+    "babel-scheduler": "scheduler",
+    "babel-log-flusher": "logger",
+    "babel-lifecycle": "lifecycle",
+    "babel-hook-watchdog": "watchdog",
+    "babel-control": "control",
+    "babel-control-client": "control",
+    "babel-web": "web",
+    "babel-mouse-hook": "mouse",
+    "babel-hook-events": "hook_process",
+    "babel-editor": "tray",
+}
+
+
+def component_of(thread_name):
+    """Component owning a thread. Unnamed threads (e.g. the `keyboard` package's listeners) are "other"."""
+    return THREAD_COMPONENTS.get(thread_name, "other")
+
+
+def _os_wakeups(tid):
+    """
+    Times the thread went to sleep and was woken again (voluntary context
+    switches), or None where the OS doesn't tell (only Linux exposes it per thread).
+    """
+    try:
+        with open(f"/proc/self/task/{tid}/status") as status:
+            for line in status:
+                if line.startswith("voluntary_ctxt_switches"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class IdleMonitor:
+    """
+    CPU time and wakeups per internal thread, grouped by component.
+
+    CPU comes from the OS per thread (psutil). Wakeups come from the OS
+    where it counts them per thread (Linux); everywhere else from the
+    counters components report themselves (add_source), e.g. the
+    scheduler's wakeups. Both are reported when both exist.
+
+    sample() returns rates over the window since the previous sample, so
+    polling it (control channel, tray) costs nothing in between. OS CPU
+    times tick in 10-15ms steps: use windows of several seconds.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.sources = {} # component -> callable returning a cumulative wakeup count
+        self._process = psutil.Process()
+        self._os_wakeups = sys.platform.startswith("linux")
+        self._lock = threading.Lock()
+        self._last_time = clock()
+        self._last_threads = self._read_threads()[0] # tid -> (cpu_s, wakeups)
+        self._last_reported = {}
+
+    def add_source(self, component, counter):
+        self.sources[component] = counter
+        try:
+            self._last_reported[component] = int(counter()) # Rates start now, not at zero
+        except Exception:
+            pass
+
+    def _read_sources(self):
+        reported = {}
+        for component, counter in list(self.sources.items()):
+            try:
+                reported[component] = int(counter())
+            except Exception:
+                continue # Component not running (e.g. no process watcher)
+        return reported
+
+    def _read_threads(self):
+        names = {t.native_id: t.name for t in threading.enumerate() if t.native_id is not None}
+        threads = {}
+        for info in self._process.threads():
+            wakeups = _os_wakeups(info.id) if self._os_wakeups else None
+            threads[info.id] = (info.user_time + info.system_time, wakeups)
+        return threads, names
+
+    def sample(self):
+        """JSON-friendly snapshot: CPU % and wakeups/s per component and thread since the last sample."""
+        with self._lock:
+            now = self.clock()
+            threads, names = self._read_threads()
+            reported = self._read_sources()
+            window = max(now - self._last_time, 1e-9)
+
+            components = {}
+            rows = []
+            for tid, (cpu, wakeups) in threads.items():
+                last_cpu, last_wakeups = self._last_threads.get(tid, (0.0, 0))
+                name = names.get(tid, f"native-{tid}")
+                component = component_of(names.get(tid, ""))
+                cpu_pct = max(cpu - last_cpu, 0.0) / window * 100.0
+                row = {"name": name, "component": component, "cpu_pct": round(cpu_pct, 3)}
+                entry = components.setdefault(component, {"threads": 0, "cpu_pct": 0.0})
+                entry["threads"] += 1
+                entry["cpu_pct"] += cpu_pct
+                if wakeups is not None:
+                    rate = max(wakeups - (last_wakeups or 0), 0) / window
+                    row["wakeups_per_s"] = round(rate, 2)
+                    entry["wakeups_per_s"] = entry.get("wakeups_per_s", 0.0) + rate
+                rows.append(row)
+
+            for component, count in reported.items():
+                rate = max(count - self._last_reported.get(component, 0), 0) / window
+                entry = components.setdefault(component, {"threads": 0, "cpu_pct": 0.0})
+                entry["reported_wakeups_per_s"] = round(rate, 2)
+
+            for entry in components.values():
+                entry["cpu_pct"] = round(entry["cpu_pct"], 3)
+                if "wakeups_per_s" in entry:
+                    entry["wakeups_per_s"] = round(entry["wakeups_per_s"], 2)
+
+            self._last_time = now
+            self._last_threads = threads
+            self._last_reported = reported
+
+        # Reported counters overlap (the process watcher polls on the scheduler thread): only add them up without OS counts
+        key = "wakeups_per_s" if self._os_wakeups else "reported_wakeups_per_s"
+        total_wakeups = sum(e.get(key, 0.0) for e in components.values())
+        return {
+            "window_s": round(window, 3),
+            "wakeup_source": "os" if self._os_wakeups else "reported",
+            "cpu_pct": round(sum(e["cpu_pct"] for e in components.values()), 3),
+            "wakeups_per_s": round(total_wakeups, 2),
+            "components": components,
+            "threads": sorted(rows, key=lambda r: (r["component"], r["name"])),
+        }
+
+
+def format_summary(snapshot):
+    """One line per component, busiest first (tray notification, CLI)."""
+    lines = [f"{snapshot['cpu_pct']:.2f}% CPU, {snapshot['wakeups_per_s']:.1f} wakeups/s "
+             f"over {snapshot['window_s']:.0f}s"]
+    ordered = sorted(snapshot["components"].items(), key=lambda item: -item[1]["cpu_pct"])
+    for component, entry in ordered:
+        wakeups = entry.get("wakeups_per_s", entry.get("reported_wakeups_per_s"))
+        rate = "" if wakeups is None else f", {wakeups:.1f}/s"
+        lines.append(f"{component}: {entry['cpu_pct']:.2f}%{rate}")
+    return "\n".join(lines)
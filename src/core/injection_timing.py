@@ -0,0 +1,142 @@
+import queue
+import time
+from collections import namedtuple
+
+# How one app wants injected chords paced (seconds). The steps InjectionModule.compile builds:
+#   modifiers down, [gap] key down, [gap] key up, [settle] modifiers up, [settle] restore held modifiers
+# restore_modifiers: re-press modifiers the user still physically holds after the chord.
+InjectionTiming = namedtuple("InjectionTiming", "gap settle restore_modifiers")
+
+# The pacing every app got before timing profiles: safe for Photoshop, slow for everything else
+DEFAULT_TIMING = InjectionTiming(0.02, 0.01, True)
+
+DEFAULT_CANDIDATES_MS = (0, 1, 2, 5, 10, 15, 20, 30, 50)
+
+
+def timing_from_config(entry, base=DEFAULT_TIMING):
+    """{"gap_ms": 20, "settle_ms": 10, "restore_modifiers": true} -> InjectionTiming. Missing keys keep `base`."""
+    return InjectionTiming(entry.get("gap_ms", base.gap * 1000) / 1000.0,
+                           entry.get("settle_ms", base.settle * 1000) / 1000.0,
+                           bool(entry.get("restore_modifiers", base.restore_modifiers)))
+
+
+def timing_to_config(timing):
+    return {"gap_ms": round(timing.gap * 1000, 3), "settle_ms": round(timing.settle * 1000, 3),
+            "restore_modifiers": timing.restore_modifiers}
+
+
+class TimingRegistry:
+    """
+    Injection timing per app, from the app registry in semantic_config.json:
+
+        "system_definitions": {"apps": {
+            "photoshop": {"injection": {"gap_ms": 20, "settle_ms": 10, "restore_modifiers": true}},
+            "figma": {"injection": {...}, "web": {"injection": {"gap_ms": 0, "settle_ms": 0}}}
+        }}
+
+    "web" overrides the app's entry when it is detected through the browser
+    bridge. Apps without an entry get DEFAULT_TIMING. Built once per config
+    load; get() returns the same InjectionTiming object for the same app, so
+    it can be compared by identity and used as a cache key.
+    """
+    def __init__(self, apps=None):
+        self.timings = {}
+        for app, entry in (apps or {}).items():
+            desktop = timing_from_config(entry.get("injection", {}))
+            self.timings[(app.lower(), False)] = desktop
+            web = entry.get("web", {}).get("injection")
+            self.timings[(app.lower(), True)] = timing_from_config(web, desktop) if web is not None else desktop
+
+    @classmethod
+    def from_definitions(cls, definitions):
+        return cls(definitions.get("apps", {}))
+
+    def get(self, app, web=False):
+        if not app:
+            return DEFAULT_TIMING
+        return self.timings.get((app.lower(), web), DEFAULT_TIMING)
+
+
+class AckTarget:
+    """
+    What calibrate() injects into: told which chord comes next, then reports
+    whether the app acted on it. Implementations watch the real app (or a
+    stand-in, see utils/calibrate_injection.py).
+    """
+    def expect(self, command):
+        raise NotImplementedError
+
+    def acknowledged(self, timeout):
+        """True if the expected chord was acted on, False if it was dropped or mangled."""
+        raise NotImplementedError
+
+
+class QueueAckTarget(AckTarget):
+    """AckTarget fed from another thread: the watcher calls ack(ok) once per chord."""
+    def __init__(self):
+        self.command = None
+        self._acks = queue.Queue()
+
+    def expect(self, command):
+        self.command = command
+        while not self._acks.empty():
+            self._acks.get_nowait() # Late answers of an earlier trial
+
+    def ack(self, ok):
+        self._acks.put(bool(ok))
+
+    def acknowledged(self, timeout):
+        try:
+            return self._acks.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+
+def run_trials(injector, macros, target, command, timing, trials, timeout=1.0):
+    """
+    Injects `command` `trials` times with `timing`, one at a time, on the
+    MacroPlayer `macros`. Stops at the first dropped chord.
+    Returns (acked, [latency_s of each acked chord]).
+    """
+    steps = injector.compile(command, timing)
+    latencies = []
+    for _ in range(trials):
+        target.expect(command)
+        done = queue.Queue()
+        start = time.perf_counter()
+        macros.play(steps, done.put)
+        error = done.get(timeout=timeout + 1)
+        if error is not None or not target.acknowledged(timeout):
+            break
+        latencies.append(time.perf_counter() - start)
+    return len(latencies), latencies
+
+
+def calibrate(injector, macros, target, command="ctrl+j", candidates_ms=DEFAULT_CANDIDATES_MS, trials=20,
+              restore_modifiers=True, timeout=1.0, progress=None):
+    """
+    Smallest reliable timing for `target`: the first gap (with the largest
+    settle) at which every trial is acknowledged, then the first settle
+    with that gap. Candidates are tried in ascending order.
+    progress(timing, acked, trials) is called after each candidate.
+    Returns (InjectionTiming or None if even the largest candidates drop chords, [trial results]).
+    """
+    candidates = sorted(candidates_ms)
+    results = []
+
+    def reliable(gap_ms, settle_ms):
+        timing = InjectionTiming(gap_ms / 1000.0, settle_ms / 1000.0, restore_modifiers)
+        acked, latencies = run_trials(injector, macros, target, command, timing, trials, timeout)
+        latencies.sort()
+        results.append({"gap_ms": gap_ms, "settle_ms": settle_ms, "acked": acked, "trials": trials,
+                        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None})
+        if progress:
+            progress(timing, acked, trials)
+        return acked == trials
+
+    slowest = candidates[-1]
+    gap = next((g for g in candidates if reliable(g, slowest)), None)
+    if gap is None:
+        return None, results
+    settle = next((s for s in candidates if s == slowest or reliable(gap, s)), slowest)
+    return InjectionTiming(gap / 1000.0, settle / 1000.0, restore_modifiers), results
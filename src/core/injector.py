@@ -1,65 +1,226 @@
-import keyboard
+import collections
+import threading
 import time
+import sys
+from core.backend import keyboard, windll
+from core.logger import get_logger
+from core.keymap import shared_keymaps, KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP
+from core.injection_timing import DEFAULT_TIMING
+from core import tracing
+
+log = get_logger("inject")
+
+# mouse_event flags per button name (core/gestures.py): (down, up, mouseData)
+MOUSEEVENTF_MOVE, MOUSEEVENTF_ABSOLUTE, MOUSEEVENTF_VIRTUALDESK = 0x0001, 0x8000, 0x4000
+MOUSE_BUTTONS = {
+    "lbutton": (0x0002, 0x0004, 0), "rbutton": (0x0008, 0x0010, 0), "mbutton": (0x0020, 0x0040, 0),
+    "xbutton1": (0x0080, 0x0100, 1), "xbutton2": (0x0080, 0x0100, 2),
+}
+# Same buttons in the `mouse` package (non-Windows fallback)
+MOUSE_PACKAGE_BUTTONS = {"lbutton": "left", "rbutton": "right", "mbutton": "middle", "xbutton1": "x", "xbutton2": "x2"}
 
 class InjectionModule:
-    def inject(self, command):
+    def __init__(self, keymap=None):
+        # Layout-specific key table (core/keymap.py). The observer swaps it when the input language changes.
+        self.keymap = keymap or shared_keymaps().current()
+        self._steps = {} # (layout_id, command, timing) -> compiled steps
+
+    def inject(self, command, timing=None):
         """
-        Injects the translated command.
+        Injects the translated command, sleeping between steps in the calling thread.
         Args:
             command (str): The shortcut string (e.g. 'ctrl+j')
+            timing (InjectionTiming): pacing of the target app (core/injection_timing.py), default DEFAULT_TIMING
+        The observer plays the same steps on its scheduler instead (MacroPlayer).
         """
         # Small delay to ensure original key release doesn't interfere?
         # <50ms constraint.
-        # keyboard.send transmits both press    def inject(self, command):
         try:
             if not command:
                 return
+            for delay, func, args in self.compile(command, timing):
+                if delay:
+                    time.sleep(delay)
+                func(*args)
+        except Exception as e:
+            log.error("Injection Failed: %s", e)
+            self.fallback(command)
 
+    def compile(self, command, timing=None):
+        """
+        Injection steps of `command` as [(delay_before_s, func, args)], cached per layout and timing.
+        Codes come pre-resolved from the keymap: no name lookups when playing them.
+        """
+        timing = timing or DEFAULT_TIMING
+        cache_key = (self.keymap.layout_id, command, timing)
+        steps = self._steps.get(cache_key)
+        if steps is None:
+            chord = self.keymap.chord(command)
+            if hasattr(keyboard, "send_chord"):
+                # Linux backend: the whole chord, modifier restore included, is one uinput write
+                steps = [(0.0, keyboard.send_chord, (tuple(mod.scan for mod in chord.modifiers), chord.key.scan))]
+                self._steps[cache_key] = steps
+                return steps
             # Explicit Injection with Restoration
-            modifiers, key = self._parse_combo(command)
-            
             # 1. Force Press modifiers
-            for mod in modifiers:
-                keyboard.press(mod)
-            time.sleep(0.02) 
-            
-            # 2. Key Click
-            keyboard.press(key)
-            time.sleep(0.02)
-            keyboard.release(key)
-            time.sleep(0.01)
-                
-            # 3. Release synthesized modifiers
-            for mod in reversed(modifiers):
-                keyboard.release(mod)
-            time.sleep(0.01)
-
+            steps = [(0.0, self._press, (mod,)) for mod in chord.modifiers]
+            # 2. Key Click (gap: how long the app needs between two events of a chord)
+            steps.append((timing.gap, self._press, (chord.key,)))
+            steps.append((timing.gap, self._release, (chord.key,)))
+            # 3. Release synthesized modifiers (settle: until the app has seen the key before they go)
+            delay = timing.settle
+            for mod in reversed(chord.modifiers):
+                steps.append((delay, self._release, (mod,)))
+                delay = 0.0
             # 4. ROBUST RESTORE
-            import ctypes
-            user32 = ctypes.windll.user32
-            
-            # Check and Restore Ctrl
-            if (user32.GetAsyncKeyState(0x11) & 0x8000) != 0:
-                ctypes.windll.user32.keybd_event(0x11, 0, 0, 0) # VK_CONTROL Down
-            
-            # Check and Restore Shift
-            if (user32.GetAsyncKeyState(0x10) & 0x8000) != 0:
-                ctypes.windll.user32.keybd_event(0x10, 0, 0, 0) # VK_SHIFT Down
-
-            # Check and Restore Alt
-            if (user32.GetAsyncKeyState(0x12) & 0x8000) != 0:
-                ctypes.windll.user32.keybd_event(0x12, 0, 0, 0) # VK_MENU Down
-                
-            # print(f"DEBUG: Injected {command} and restored modifiers")
+            if timing.restore_modifiers:
+                steps.append((delay + timing.settle, self._restore_modifiers, ()))
+            self._steps[cache_key] = steps
+        return steps
+
+    def fallback(self, command):
+        """Last resort when the explicit injection failed."""
+        try:
+            keyboard.send(command)
+        except:
+            pass
+
+    def _restore_modifiers(self):
+        user32 = windll.user32
+
+        # Check and Restore Ctrl
+        if (user32.GetAsyncKeyState(0x11) & 0x8000) != 0:
+            user32.keybd_event(0x11, 0, 0, 0) # VK_CONTROL Down
+
+        # Check and Restore Shift
+        if (user32.GetAsyncKeyState(0x10) & 0x8000) != 0:
+            user32.keybd_event(0x10, 0, 0, 0) # VK_SHIFT Down
+
+        # Check and Restore Alt
+        if (user32.GetAsyncKeyState(0x12) & 0x8000) != 0:
+            user32.keybd_event(0x12, 0, 0, 0) # VK_MENU Down
+
+    def press_key(self, name):
+        """Presses a single key by name (e.g. a modifier held during zoom)."""
+        self._press(self.keymap.key(name))
+
+    def release_key(self, name):
+        self._release(self.keymap.key(name))
+
+    def press_button(self, name):
+        """Presses a mouse button by name ('mbutton', ...), held by a drag gesture."""
+        if sys.platform == "win32":
+            down, _, data = MOUSE_BUTTONS[name]
+            windll.user32.mouse_event(down, 0, 0, data, 0)
+        else:
+            from core.backend import mouse
+            mouse.press(MOUSE_PACKAGE_BUTTONS[name])
+
+    def release_button(self, name):
+        if sys.platform == "win32":
+            _, up, data = MOUSE_BUTTONS[name]
+            windll.user32.mouse_event(up, 0, 0, data, 0)
+        else:
+            from core.backend import mouse
+            mouse.release(MOUSE_PACKAGE_BUTTONS[name])
+
+    def move_to(self, x, y):
+        """Moves the pointer to screen coordinates (x, y) as injected input."""
+        if sys.platform == "win32":
+            user32 = windll.user32
+            # Absolute moves are 0..65535 across the virtual desktop (SM_XVIRTUALSCREEN .. SM_CYVIRTUALSCREEN)
+            left, top = user32.GetSystemMetrics(76), user32.GetSystemMetrics(77)
+            width, height = max(user32.GetSystemMetrics(78) - 1, 1), max(user32.GetSystemMetrics(79) - 1, 1)
+            flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+            user32.mouse_event(flags, (x - left) * 65535 // width, (y - top) * 65535 // height, 0, 0)
+        else:
+            from core.backend import mouse
+            mouse.move(x, y, absolute=True)
+
+    def _press(self, code):
+        if code.vk and sys.platform == "win32":
+            flags = KEYEVENTF_EXTENDEDKEY if code.extended else 0
+            windll.user32.keybd_event(code.vk, code.scan, flags, 0)
+        else:
+            keyboard.press(code.scan)
+
+    def _release(self, code):
+        if code.vk and sys.platform == "win32":
+            flags = KEYEVENTF_KEYUP | (KEYEVENTF_EXTENDEDKEY if code.extended else 0)
+            windll.user32.keybd_event(code.vk, code.scan, flags, 0)
+        else:
+            keyboard.release(code.scan)
+
+
+class MacroPlayer:
+    """
+    Plays compiled injection steps (InjectionModule.compile) on the scheduler
+    instead of sleeping in the calling thread: each gap between two steps is
+    a timer, so a hook callback returns as soon as the macro is queued.
+
+    Macros play one at a time, in the order they were queued.
+    on_done(error) runs on the scheduler thread once the last step ran
+    (error is None) or a step raised (the remaining steps are skipped).
+    """
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self._queue = collections.deque()
+        self._playing = False
+        self._lock = threading.Lock()
+        self.tracer = tracing.get_tracer()
+
+    def play(self, steps, on_done=None):
+        queued_at = time.perf_counter() if self.tracer.enabled else None # Start of the "queued" span
+        with self._lock:
+            self._queue.append((steps, on_done, queued_at))
+            if self._playing:
+                return
+            self._playing = True
+        self.scheduler.call_soon(self._next_macro)
+
+    def _next_macro(self):
+        with self._lock:
+            if not self._queue:
+                self._playing = False
+                return
+            steps, on_done, queued_at = self._queue.popleft()
+        if queued_at is not None:
+            self.tracer.async_span("queued", "inject", self.tracer.next_id(), queued_at, None, {"steps": len(steps)})
+        if steps and steps[0][0]:
+            self.scheduler.call_later(steps[0][0], self._play_from, steps, 0, on_done)
+        else:
+            self._play_from(steps, 0, on_done)
+
+    def _play_from(self, steps, index, on_done):
+        """Runs steps[index] and every following step without a delay, then waits for the next one."""
+        tracer = self.tracer
+        try:
+            while index < len(steps):
+                delay, func, args = steps[index]
+                if tracer.enabled:
+                    start = time.perf_counter()
+                    func(*args)
+                    tracer.complete(getattr(func, "__name__", "step").strip("_"), "inject", start, None,
+                                    {"step": index, "delay_ms": round(delay * 1000, 2),
+                                     "keys": [getattr(arg, "name", str(arg)) for arg in args]})
+                else:
+                    func(*args)
+                index += 1
+                if index < len(steps) and steps[index][0]:
+                    self.scheduler.call_later(steps[index][0], self._play_from, steps, index, on_done)
+                    return
         except Exception as e:
-            # Fallback
-            print(f"Injection Failed: {e}")
+            self._finish(on_done, e)
+            return
+        self._finish(on_done, None)
+
+    def _finish(self, on_done, error):
+        if on_done is not None:
             try:
-                keyboard.send(command)
-            except:
-                pass
-
-    def _parse_combo(self, command):
-        """Simple splitter. 'ctrl+shift+z' -> (['ctrl', 'shift'], 'z')"""
-        parts = command.split('+')
-        return parts[:-1], parts[-1]
+                on_done(error)
+            except Exception as e:
+                log.error("Macro completion failed: %s", e)
+        self._next_macro()
+
+    def pending(self):
+        return len(self._queue) + (1 if self._playing else 0)
@@ -0,0 +1,184 @@
+import sys
+import ctypes
+from collections import namedtuple
+from core.backend import keyboard, windll
+from core.logger import get_logger
+from core.gestures import is_mouse_trigger
+
+log = get_logger("keymap")
+
+# One physical key as the OS wants it for injection. `modifiers` names the modifiers the
+# layout needs held to type `name` with that key ('#' is shift+3 on a US layout).
+KeyCode = namedtuple("KeyCode", "name scan vk extended modifiers", defaults=((),))
+
+# A parsed combo such as 'ctrl+shift+z': modifiers (tuple of KeyCode) + main key (KeyCode)
+Chord = namedtuple("Chord", "name modifiers key")
+
+MAPVK_VK_TO_VSC = 0
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+
+# Layout independent keys: name -> virtual-key code
+NAMED_VKS = {
+    "ctrl": 0x11, "shift": 0x10, "alt": 0x12, "windows": 0x5B,
+    "esc": 0x1B, "escape": 0x1B, "space": 0x20, "enter": 0x0D, "tab": 0x09,
+    "backspace": 0x08, "delete": 0x2E, "insert": 0x2D,
+    "home": 0x24, "end": 0x23, "page up": 0x21, "page down": 0x22,
+    "left": 0x25, "up": 0x26, "right": 0x27, "down": 0x28,
+}
+NAMED_VKS.update({f"f{i}": 0x6F + i for i in range(1, 25)})
+
+# Keys that need KEYEVENTF_EXTENDEDKEY when injected
+EXTENDED_VKS = {0x5B, 0x2E, 0x2D, 0x24, 0x23, 0x21, 0x22, 0x25, 0x26, 0x27, 0x28}
+
+MODIFIERS = ("ctrl", "shift", "alt", "windows")
+
+# VkKeyScanEx high byte: shift state the character needs (ctrl+alt is AltGr)
+SHIFT_STATE_BITS = ((1, "shift"), (2, "ctrl"), (4, "alt"))
+
+
+def _setup_user32():
+    if sys.platform != "win32":
+        return None
+    user32 = windll.user32
+    user32.VkKeyScanExW.restype = ctypes.c_short
+    user32.VkKeyScanExW.argtypes = [ctypes.c_wchar, ctypes.c_void_p]
+    user32.MapVirtualKeyExW.restype = ctypes.c_uint
+    user32.MapVirtualKeyExW.argtypes = [ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p]
+    user32.GetKeyboardLayout.restype = ctypes.c_void_p
+    user32.GetKeyboardLayout.argtypes = [ctypes.c_ulong]
+    user32.GetWindowThreadProcessId.restype = ctypes.c_ulong
+    user32.GetWindowThreadProcessId.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    user32.GetForegroundWindow.restype = ctypes.c_void_p
+    return user32
+
+
+_user32 = _setup_user32()
+
+
+class KeyMap:
+    """
+    Name -> code resolution for ONE keyboard layout, cached.
+
+    Everything is resolved the first time a name is seen (ideally at profile
+    compile time via compile()), so hook callbacks and injections only do dict
+    lookups. Characters such as 'ä' or '#' are resolved through the layout
+    itself (VkKeyScanEx / MapVirtualKeyEx), not through the tables `keyboard`
+    built for whatever layout was active when it was imported. A character
+    the layout only types with shift / AltGr carries those modifiers, one it
+    cannot type at all raises ValueError.
+    """
+    def __init__(self, layout_id):
+        self.layout_id = layout_id
+        self._keys = {}      # name -> KeyCode
+        self._chords = {}    # combo -> Chord
+        self._triggers = {}  # combo -> parsed hotkey for keyboard.add_hotkey
+
+    def key(self, name):
+        code = self._keys.get(name)
+        if code is None:
+            code = self._resolve(name)
+            self._keys[name] = code
+        return code
+
+    def chord(self, combo):
+        """
+        'ctrl+shift+z' -> Chord(modifiers=(ctrl, shift), key=z). Modifiers the
+        layout needs for the key itself are added: 'ctrl+#' on a US layout is
+        Chord(modifiers=(ctrl, shift), key=3).
+        """
+        chord = self._chords.get(combo)
+        if chord is None:
+            parts = combo.lower().split('+')
+            key = self.key(parts[-1])
+            names = parts[:-1] + [m for m in key.modifiers if m not in parts[:-1]]
+            chord = Chord(combo, tuple(self.key(m) for m in names), key)
+            self._chords[combo] = chord
+        return chord
+
+    def trigger(self, combo):
+        """
+        Hotkey for keyboard.add_hotkey/remove_hotkey: a flat tuple of the
+        modifier names followed by the scan codes of the other keys, e.g.
+        ('ctrl', 32). keyboard.parse_hotkey reads a flat tuple as ONE step with
+        one key per element (names go through its tables, numbers are scan
+        codes), so layout dependent keys need no name lookup. It is hashable,
+        so it also works as the removal handle. Never wrap it in more tuples:
+        parse_hotkey flattens any length-1 hotkey into a single key.
+        """
+        parsed = self._triggers.get(combo)
+        if parsed is None:
+            parts = combo.lower().split('+')
+            keys = [self.key(p) for p in parts if p not in MODIFIERS]
+            # A character typed with shift/AltGr only fires with those held
+            names = [p for p in parts if p in MODIFIERS]
+            names += [m for key in keys for m in key.modifiers if m not in names]
+            # Modifiers by name: keyboard lists both sides (left/right ctrl), layout independent
+            parsed = tuple(names) + tuple(key.scan for key in keys)
+            self._triggers[combo] = parsed
+        return parsed
+
+    def compile(self, combos):
+        """Resolves a batch of combos up front (profile compile / context switch)."""
+        for combo in combos:
+            if combo and not is_mouse_trigger(combo):
+                # Sequences ("alt+l, u") are hooked and replayed one stroke at a time
+                for stroke in combo.split(", "):
+                    try:
+                        self.chord(stroke)
+                        self.trigger(stroke)
+                    except Exception as e:
+                        log.warning("Cannot resolve '%s' on layout %s: %s", stroke, self.layout_id, e)
+
+    def _resolve(self, name):
+        if _user32 is not None:
+            hkl = self.layout_id or None
+            vk = NAMED_VKS.get(name)
+            modifiers = ()
+            if vk is None and len(name) == 1:
+                result = _user32.VkKeyScanExW(name, hkl)
+                if result == -1:
+                    raise ValueError(f"'{name}' cannot be typed on this keyboard layout")
+                vk = result & 0xFF
+                shift_state = (result >> 8) & 0xFF
+                modifiers = tuple(m for bit, m in SHIFT_STATE_BITS if shift_state & bit)
+            if vk:
+                scan = _user32.MapVirtualKeyExW(vk, MAPVK_VK_TO_VSC, hkl)
+                return KeyCode(name, scan, vk, vk in EXTENDED_VKS, modifiers)
+
+        # Fallback: keyboard's own tables
+        return KeyCode(name, keyboard.key_to_scan_codes(name)[0], NAMED_VKS.get(name, 0), False)
+
+
+class LayoutKeymaps:
+    """Keeps one KeyMap per keyboard layout id (HKL on Windows, 0 elsewhere)."""
+    def __init__(self):
+        self._maps = {}
+
+    def current_layout_id(self):
+        """Layout of the foreground window's thread (the one our injections land in)."""
+        if _user32 is None:
+            return 0
+        try:
+            thread_id = _user32.GetWindowThreadProcessId(_user32.GetForegroundWindow(), None)
+            return _user32.GetKeyboardLayout(thread_id) or 0
+        except Exception:
+            return 0
+
+    def get(self, layout_id):
+        keymap = self._maps.get(layout_id)
+        if keymap is None:
+            keymap = KeyMap(layout_id)
+            self._maps[layout_id] = keymap
+            log.info("Keyboard layout %s: new key table", hex(layout_id) if layout_id else layout_id)
+        return keymap
+
+    def current(self):
+        return self.get(self.current_layout_id())
+
+
+_shared = LayoutKeymaps()
+
+
+def shared_keymaps():
+    return _shared
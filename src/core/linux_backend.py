@@ -0,0 +1,941 @@
+"""
+Linux input backend: evdev capture, uinput output.
+
+Stands in for the Windows-only pieces (`keyboard`, `mouse`, `win32gui`,
+`win32process`, `windll`, see core/backend.py) the same way sim_backend
+does, but on real
+devices: keyboards and mice under /dev/input are grabbed (EVIOCGRAB), so
+every event reaches Babel first, and whatever Babel lets through or injects
+is written to one uinput virtual device. The observer, keymap, gesture and
+sequence code run unchanged, on the same compiled tables as on Windows.
+
+- Hotkeys are matched per key-down with one dict lookup on (key code,
+  held modifiers). Suppressed keys (and their key-ups) are not forwarded.
+- Mouse frames are turned into the low-level hook messages mouse_hook.py
+  expects (WM_MOUSEMOVE with an accumulated pointer position, button and
+  wheel messages), so the wheel zoom and button gestures work as they are.
+- Output is batched: a forwarded frame, or one whole injected chord
+  (modifiers, key down/up, modifiers restored), is a single write() with a
+  single SYN_REPORT.
+- Foreground app: X11 (_NET_ACTIVE_WINDOW via python-xlib), sway or
+  Hyprland IPC, or, when none of them is available, the first running
+  process named in config "linux": {"app": ...}. All optional.
+
+Key codes: Linux key codes of the main block are the PC set-1 scan codes
+the Windows build injects, so a KeyCode.scan means the same key on both.
+Characters are resolved through a small per-layout table (config "linux":
+{"layout": "de"}), since the real layout lives in the compositor.
+
+Usage (before importing any core module), as main.py does on Linux:
+    from core import linux_backend
+    backend = linux_backend.install()
+    ...
+    backend.start(config_manager.config.get("linux", {}))
+"""
+import ctypes
+import errno
+import fcntl
+import glob
+import json
+import os
+import queue
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from core import backend
+from core.logger import get_logger
+
+log = get_logger("linux")
+
+# struct input_event: timeval (two longs), type, code, value
+INPUT_EVENT = struct.Struct("llHHi")
+
+EV_SYN, EV_KEY, EV_REL = 0x00, 0x01, 0x02
+SYN_REPORT = 0
+REL_X, REL_Y, REL_HWHEEL, REL_WHEEL = 0x00, 0x01, 0x06, 0x08
+BTN_LEFT, BTN_RIGHT, BTN_MIDDLE, BTN_SIDE, BTN_EXTRA = 0x110, 0x111, 0x112, 0x113, 0x114
+KEY_A = 30
+KEY_MAX_KEYBOARD = 0xFF # Codes above are buttons (BTN_*)
+
+
+def _ioc(direction, kind, number, size):
+    return (direction << 30) | (size << 16) | (ord(kind) << 8) | number
+
+
+EVIOCGRAB = _ioc(1, 'E', 0x90, 4)
+UI_SET_EVBIT = _ioc(1, 'U', 100, 4)
+UI_SET_KEYBIT = _ioc(1, 'U', 101, 4)
+UI_SET_RELBIT = _ioc(1, 'U', 102, 4)
+UI_DEV_SETUP = _ioc(1, 'U', 3, 92) # struct uinput_setup
+UI_DEV_CREATE = _ioc(0, 'U', 1, 0)
+UI_DEV_DESTROY = _ioc(0, 'U', 2, 0)
+UINPUT_SETUP = struct.Struct("HHHH80sI") # input_id, name, ff_effects_max
+BUS_VIRTUAL = 0x06
+
+
+def EVIOCGNAME(length):
+    return _ioc(2, 'E', 0x06, length)
+
+
+def EVIOCGBIT(ev, length):
+    return _ioc(2, 'E', 0x20 + ev, length)
+
+
+def UI_GET_SYSNAME(length):
+    return _ioc(2, 'U', 44, length)
+
+
+# --- Key names (US positions) ---
+
+KEY_CODES = {
+    "esc": 1, "escape": 1, "-": 12, "=": 13, "backspace": 14, "tab": 15, "[": 26, "]": 27, "enter": 28,
+    "ctrl": 29, "left ctrl": 29, ";": 39, "'": 40, "`": 41, "shift": 42, "left shift": 42, "\\": 43,
+    ",": 51, ".": 52, "/": 53, "right shift": 54, "alt": 56, "left alt": 56, "space": 57, "caps lock": 58,
+    "f11": 87, "f12": 88, "right ctrl": 97, "right alt": 100, "alt gr": 100,
+    "home": 102, "up": 103, "page up": 104, "left": 105, "right": 106, "end": 107, "down": 108,
+    "page down": 109, "insert": 110, "delete": 111, "windows": 125, "left windows": 125, "right windows": 126,
+}
+KEY_CODES.update({c: 2 + i for i, c in enumerate("1234567890")})
+KEY_CODES.update({c: 16 + i for i, c in enumerate("qwertyuiop")})
+KEY_CODES.update({c: 30 + i for i, c in enumerate("asdfghjkl")})
+KEY_CODES.update({c: 44 + i for i, c in enumerate("zxcvbnm")})
+KEY_CODES.update({f"f{i}": 58 + i for i in range(1, 11)})
+KEY_CODES.update({f"f{i}": 170 + i for i in range(13, 25)})
+
+# Characters that sit elsewhere on other layouts ("layout" in the "linux" config)
+LAYOUTS = {
+    "us": {},
+    "de": {"z": 44, "y": 21, "ß": 12, "ü": 26, "+": 27, "ö": 39, "ä": 40, "^": 41, "#": 43, "-": 53, "<": 86},
+}
+
+# Both sides of a modifier, as `keyboard` lists them for a hotkey
+MODIFIER_CODES = {"ctrl": (29, 97), "shift": (42, 54), "alt": (56, 100), "windows": (125, 126)}
+MODIFIER_BITS = {code: 1 << i for i, name in enumerate(MODIFIER_CODES) for code in MODIFIER_CODES[name]}
+# Event names (reverse lookup) use keyboard's naming: left side plain, right side prefixed
+CODE_NAMES = {code: name for name, code in KEY_CODES.items()}
+CODE_NAMES.update({29: "ctrl", 42: "shift", 56: "alt", 125: "windows", 100: "alt gr", 1: "esc"})
+
+# Virtual keys the engine asks GetAsyncKeyState/keybd_event about
+VK_CODES = {0x11: (29, 97), 0x10: (42, 54), 0x12: (56, 100), 0x5B: (125,), 0x5C: (126,), 0x20: (57,)}
+
+# Button names of the `mouse` package -> BTN_*
+MOUSE_BUTTON_CODES = {"left": BTN_LEFT, "right": BTN_RIGHT, "middle": BTN_MIDDLE, "x": BTN_SIDE, "x2": BTN_EXTRA}
+
+# BTN_* -> (down message, up message, mouseData high word) of a low-level mouse hook
+WM_MOUSEMOVE, WM_MOUSEWHEEL, WM_MOUSEHWHEEL = 0x0200, 0x020A, 0x020E
+BUTTON_MESSAGES = {
+    BTN_LEFT: (0x0201, 0x0202, 0), BTN_RIGHT: (0x0204, 0x0205, 0), BTN_MIDDLE: (0x0207, 0x0208, 0),
+    BTN_SIDE: (0x020B, 0x020C, 1), BTN_EXTRA: (0x020B, 0x020C, 2),
+}
+WHEEL_DELTA = 120
+LLMHF_INJECTED = 0x00000001
+WM_QUIT = 0x0012
+
+
+def pack_frame(events):
+    """[(type, code, value)] -> bytes of input_events ending in one SYN_REPORT."""
+    pack = INPUT_EVENT.pack
+    return b"".join([pack(0, 0, kind, code, value) for kind, code, value in events] + [pack(0, 0, EV_SYN, SYN_REPORT, 0)])
+
+
+def _test_bit(bits, bit):
+    return bool(bits[bit // 8] & (1 << (bit % 8)))
+
+
+# --- Devices ---
+
+class InputDevice:
+    """One evdev source: /dev/input/eventN (grabbed) or any fd delivering input_events (loopback)."""
+    def __init__(self, fd, path, name, grab=True):
+        self.fd = fd
+        self.path = path
+        self.name = name
+        self.grabbed = False
+        self.pending = [] # Events of the frame being read, up to its SYN_REPORT
+        self.partial = b""
+        if grab:
+            fcntl.ioctl(fd, EVIOCGRAB, 1)
+            self.grabbed = True
+
+    @classmethod
+    def open(cls, path):
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            return cls(fd, path, device_name(fd))
+        except Exception:
+            os.close(fd)
+            raise
+
+    def close(self):
+        try:
+            if self.grabbed:
+                fcntl.ioctl(self.fd, EVIOCGRAB, 0)
+        except OSError:
+            pass
+        os.close(self.fd)
+
+
+def device_name(fd):
+    buf = bytearray(256)
+    try:
+        fcntl.ioctl(fd, EVIOCGNAME(len(buf)), buf)
+    except OSError:
+        return ""
+    return bytes(buf).split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+def device_kind(fd):
+    """'keyboard', 'mouse' or None, from the device's capability bits."""
+    try:
+        evbits = bytearray(4)
+        fcntl.ioctl(fd, EVIOCGBIT(0, len(evbits)), evbits)
+        keybits = bytearray(96)
+        if _test_bit(evbits, EV_KEY):
+            fcntl.ioctl(fd, EVIOCGBIT(EV_KEY, len(keybits)), keybits)
+        if _test_bit(evbits, EV_KEY) and _test_bit(keybits, KEY_A) and _test_bit(keybits, KEY_CODES["z"]):
+            return "keyboard"
+        if _test_bit(evbits, EV_REL) and _test_bit(keybits, BTN_LEFT):
+            relbits = bytearray(2)
+            fcntl.ioctl(fd, EVIOCGBIT(EV_REL, len(relbits)), relbits)
+            if _test_bit(relbits, REL_X):
+                return "mouse"
+    except OSError:
+        pass
+    return None
+
+
+def discover_devices(exclude_names=()):
+    """Paths of the keyboards and mice under /dev/input (our own virtual device excluded)."""
+    found = []
+    for path in sorted(glob.glob("/dev/input/event*")):
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            continue
+        try:
+            if device_name(fd) not in exclude_names and device_kind(fd):
+                found.append(path)
+        finally:
+            os.close(fd)
+    return found
+
+
+class UInputDevice:
+    """
+    The virtual keyboard + mouse everything is re-emitted through.
+
+    write() takes a whole frame (or chord) and issues ONE write() with one
+    SYN_REPORT at the end: the kernel delivers it to clients as one report.
+    """
+    def __init__(self, fd, name="babel-virtual-input", setup=True):
+        self.fd = fd
+        self.name = name
+        self.writes = 0
+        self.events = 0
+        if setup:
+            for ev in (EV_KEY, EV_REL):
+                fcntl.ioctl(fd, UI_SET_EVBIT, ev)
+            for code in list(range(1, KEY_MAX_KEYBOARD + 1)) + list(BUTTON_MESSAGES):
+                fcntl.ioctl(fd, UI_SET_KEYBIT, code)
+            for code in (REL_X, REL_Y, REL_HWHEEL, REL_WHEEL):
+                fcntl.ioctl(fd, UI_SET_RELBIT, code)
+            fcntl.ioctl(fd, UI_DEV_SETUP, UINPUT_SETUP.pack(BUS_VIRTUAL, 0x1209, 0xBAB1, 1, name.encode()[:79], 0))
+            fcntl.ioctl(fd, UI_DEV_CREATE)
+
+    @classmethod
+    def create(cls, name="babel-virtual-input", path="/dev/uinput"):
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            return cls(fd, name)
+        except Exception:
+            os.close(fd)
+            raise
+
+    def sysname(self):
+        """'input42': the device under /sys/devices/virtual/input (its event node is in there)."""
+        buf = bytearray(64)
+        fcntl.ioctl(self.fd, UI_GET_SYSNAME(len(buf)), buf)
+        return bytes(buf).split(b"\0", 1)[0].decode()
+
+    def event_node(self):
+        nodes = glob.glob(f"/sys/devices/virtual/input/{self.sysname()}/event*")
+        return f"/dev/input/{os.path.basename(nodes[0])}" if nodes else None
+
+    def write(self, events):
+        if not events:
+            return
+        os.write(self.fd, pack_frame(events))
+        self.writes += 1
+        self.events += len(events)
+
+    def close(self):
+        try:
+            fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+        except OSError:
+            pass
+        os.close(self.fd)
+
+
+# --- Foreground app ---
+
+class X11Foreground:
+    """_NET_ACTIVE_WINDOW -> _NET_WM_PID (python-xlib, optional)."""
+    def __init__(self):
+        from Xlib import display
+        self.display = display.Display()
+        self.root = self.display.screen().root
+        self.active_atom = self.display.intern_atom("_NET_ACTIVE_WINDOW")
+        self.pid_atom = self.display.intern_atom("_NET_WM_PID")
+
+    def pid(self):
+        from Xlib import X
+        active = self.root.get_full_property(self.active_atom, X.AnyPropertyType)
+        if not active or not active.value[0]:
+            return 0
+        window = self.display.create_resource_object("window", active.value[0])
+        prop = window.get_full_property(self.pid_atom, X.AnyPropertyType)
+        return int(prop.value[0]) if prop else 0
+
+
+class CompositorForeground:
+    """Focused window's pid from a Wayland compositor's IPC tool (sway: swaymsg, Hyprland: hyprctl)."""
+    COMMANDS = {
+        "sway": ["swaymsg", "-t", "get_tree", "-r"],
+        "hyprland": ["hyprctl", "activewindow", "-j"],
+    }
+
+    def __init__(self, compositor, min_interval=0.1):
+        self.compositor = compositor
+        self.command = self.COMMANDS[compositor]
+        if shutil.which(self.command[0]) is None:
+            raise FileNotFoundError(self.command[0])
+        self.min_interval = min_interval # A poll forks a process: reuse answers for this long
+        self._cached = (0.0, 0)
+
+    def pid(self):
+        now = time.monotonic()
+        stamp, pid = self._cached
+        if now - stamp < self.min_interval:
+            return pid
+        try:
+            data = json.loads(subprocess.run(self.command, capture_output=True, timeout=1).stdout or b"{}")
+            pid = self._focused_pid(data) if self.compositor == "sway" else int(data.get("pid") or 0)
+        except Exception:
+            pid = 0
+        self._cached = (now, pid)
+        return pid
+
+    @classmethod
+    def _focused_pid(cls, node):
+        if node.get("focused") and node.get("pid"):
+            return node["pid"]
+        for child in node.get("nodes", []) + node.get("floating_nodes", []):
+            pid = cls._focused_pid(child)
+            if pid:
+                return pid
+        return 0
+
+
+class RunningAppForeground:
+    """No foreground query available: the first running process named `app` counts as focused."""
+    def __init__(self, app, min_interval=1.0):
+        self.app = (app or "").lower()
+        self.min_interval = min_interval
+        self._cached = (float("-inf"), 0)
+
+    def pid(self):
+        if not self.app:
+            return 0
+        now = time.monotonic()
+        stamp, pid = self._cached
+        if now - stamp < self.min_interval:
+            return pid
+        import psutil
+        pid = next((p.pid for p in psutil.process_iter(["name"]) if self.app in (p.info["name"] or "").lower()), 0)
+        self._cached = (now, pid)
+        return pid
+
+
+def make_foreground(settings):
+    """config "linux": {"foreground": "auto" | "x11" | "sway" | "hyprland" | "none", "app": ...}"""
+    kind = settings.get("foreground", "auto")
+    candidates = [kind] if kind != "auto" else (
+        (["x11"] if os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY") else []) +
+        (["sway"] if os.environ.get("SWAYSOCK") else []) +
+        (["hyprland"] if os.environ.get("HYPRLAND_INSTANCE_SIGNATURE") else []))
+    for candidate in candidates:
+        try:
+            if candidate == "x11":
+                return X11Foreground()
+            if candidate in CompositorForeground.COMMANDS:
+                return CompositorForeground(candidate)
+        except Exception as e:
+            log.warning("Foreground query '%s' unavailable: %s", candidate, e)
+    return RunningAppForeground(settings.get("app"))
+
+
+# --- `keyboard` package API ---
+
+class KeyEvent:
+    __slots__ = ("name", "event_type", "scan_code", "time", "is_injected")
+
+    def __init__(self, name, event_type, scan_code, injected=False):
+        self.name = name
+        self.event_type = event_type
+        self.scan_code = scan_code
+        self.time = time.time()
+        self.is_injected = injected
+
+
+class _Listener:
+    """keyboard._listener stand-in: the watchdog replaces it to reinstall the hook (here: re-grab)."""
+    def __init__(self):
+        if _backend is not None and _backend.running:
+            _backend.regrab()
+
+
+class EvdevKeyboard:
+    """The subset of the `keyboard` package API that Babel uses, on grabbed evdev keyboards."""
+    _KeyboardListener = _Listener
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._listener = None
+        self.layout = dict(KEY_CODES)
+        self.code_names = dict(CODE_NAMES)
+        self.hotkeys = {}     # parsed hotkey -> [(code, mask)]
+        self.index = {}       # (key code, modifier mask) -> (callback, args, suppress)
+        self.raw_hooks = []   # (callback, suppress)
+        self.held = set()     # physically held key codes
+        self.swallowed = set() # codes whose down was suppressed: their up (and repeats) too
+        self.lock = threading.Lock()
+
+    def set_layout(self, name):
+        overlay = LAYOUTS.get(name, {})
+        self.layout = dict(KEY_CODES)
+        self.layout.update(overlay)
+        self.code_names = dict(CODE_NAMES)
+        self.code_names.update({code: char for char, code in overlay.items()})
+
+    # --- keyboard API ---
+
+    def key_to_scan_codes(self, key, error_if_missing=True):
+        if isinstance(key, int):
+            return (key,)
+        if isinstance(key, (list, tuple)):
+            return sum((self.key_to_scan_codes(k, error_if_missing) for k in key), ())
+        key = str(key).lower()
+        if key in MODIFIER_CODES:
+            return MODIFIER_CODES[key]
+        code = self.layout.get(key)
+        if code is None:
+            if error_if_missing:
+                raise ValueError(f"Key {key!r} is not mapped to any known key.")
+            return ()
+        return (code,)
+
+    def parse_hotkey(self, hotkey):
+        # The real parser's rules: hotkey shapes keyboard mangles break here too
+        return backend.parse_hotkey(hotkey, self.key_to_scan_codes)
+
+    def add_hotkey(self, hotkey, callback, args=(), suppress=False, timeout=1, trigger_on_release=False):
+        parsed = self.parse_hotkey(hotkey)
+        *modifiers, keys = parsed[0]
+        mask = 0
+        for codes in modifiers:
+            mask |= MODIFIER_BITS.get(codes[0], 0)
+        entries = [(code, mask) for code in keys]
+        with self.lock:
+            self._remove(parsed)
+            for entry in entries:
+                self.index[entry] = (callback, tuple(args), suppress)
+            self.hotkeys[parsed] = entries
+        return hotkey
+
+    def remove_hotkey(self, hotkey):
+        with self.lock:
+            if not self._remove(self.parse_hotkey(hotkey)):
+                raise KeyError(hotkey)
+
+    def _remove(self, parsed):
+        entries = self.hotkeys.pop(parsed, None)
+        for entry in entries or ():
+            self.index.pop(entry, None)
+        return entries is not None
+
+    def unhook_all_hotkeys(self):
+        with self.lock:
+            self.hotkeys.clear()
+            self.index.clear()
+
+    def unhook_all(self):
+        with self.lock:
+            self.hotkeys.clear()
+            self.index.clear()
+            self.raw_hooks = []
+
+    def hook(self, callback, suppress=False, on_remove=None):
+        with self.lock:
+            self.raw_hooks = self.raw_hooks + [(callback, suppress)]
+        return callback
+
+    def unhook(self, callback):
+        with self.lock:
+            self.raw_hooks = [(c, s) for c, s in self.raw_hooks if c is not callback]
+
+    def is_pressed(self, key):
+        codes = self.key_to_scan_codes(key, error_if_missing=False)
+        return any(code in self.held for code in codes)
+
+    def press(self, key):
+        self.backend.output.write([(EV_KEY, self._code(key), 1)])
+
+    def release(self, key):
+        self.backend.output.write([(EV_KEY, self._code(key), 0)])
+
+    def send(self, hotkey, do_press=True, do_release=True):
+        """
+        Taps a combo. Goes through the reader like injected input passes the
+        Windows LL hook: raw hooks see it, hotkeys don't.
+        """
+        codes = [self._code(k) for k in str(hotkey).lower().split('+')]
+        events = [(EV_KEY, c, 1) for c in codes] if do_press else []
+        events += [(EV_KEY, c, 0) for c in reversed(codes)] if do_release else []
+        self.backend.inject_through_hooks(events)
+
+    def send_chord(self, modifiers, key):
+        """
+        One chord (scan codes) in a single uinput write and SYN. Modifiers the
+        user physically holds that aren't part of the chord are lifted for it
+        and put back in the same frame; chord modifiers already held are left alone.
+        """
+        held = self.held
+        held_mods = [c for c in held if c in MODIFIER_BITS]
+        chord_bits = 0
+        for code in modifiers:
+            chord_bits |= MODIFIER_BITS.get(code, 0)
+        lifted = [c for c in held_mods if not MODIFIER_BITS[c] & chord_bits]
+        pressed = [c for c in modifiers if not any(h in held for h in MODIFIER_CODES_BY_BIT[MODIFIER_BITS[c]])]
+        events = [(EV_KEY, c, 0) for c in lifted] + [(EV_KEY, c, 1) for c in pressed]
+        events += [(EV_KEY, key, 1), (EV_KEY, key, 0)]
+        events += [(EV_KEY, c, 0) for c in reversed(pressed)] + [(EV_KEY, c, 1) for c in lifted]
+        self.backend.output.write(events)
+
+    def _code(self, key):
+        return key if isinstance(key, int) else self.key_to_scan_codes(key)[0]
+
+    # --- Reader side ---
+
+    def process(self, code, value, injected=False):
+        """One EV_KEY event from a grabbed keyboard (reader thread). Returns True to forward it."""
+        if value == 0:
+            self.held.discard(code)
+            allowed = self._run_raw_hooks(code, "up", injected)
+            if code in self.swallowed:
+                self.swallowed.discard(code)
+                return False
+            return allowed
+        if code in self.swallowed:
+            return False # Auto-repeat of a suppressed key
+        if value == 1:
+            self.held.add(code)
+        if not self._run_raw_hooks(code, "down", injected):
+            self.swallowed.add(code)
+            return False
+        if injected or value != 1:
+            return True
+        mask = 0
+        for held in self.held:
+            mask |= MODIFIER_BITS.get(held, 0)
+        entry = self.index.get((code, mask))
+        if entry is None:
+            return True
+        callback, args, suppress = entry
+        try:
+            callback(*args)
+        except Exception as e:
+            log.error("Hotkey callback failed: %s", e)
+        if suppress:
+            self.swallowed.add(code)
+            return False
+        return True
+
+    def _run_raw_hooks(self, code, event_type, injected):
+        hooks = self.raw_hooks
+        if not hooks:
+            return True
+        event = KeyEvent(self.code_names.get(code, str(code)), event_type, code, injected)
+        allowed = True
+        for callback, suppress in hooks:
+            try:
+                if callback(event) is False and suppress:
+                    allowed = False
+            except Exception as e:
+                log.error("Key hook failed: %s", e)
+        return allowed
+
+
+MODIFIER_CODES_BY_BIT = {MODIFIER_BITS[codes[0]]: codes for codes in MODIFIER_CODES.values()}
+
+
+# --- `mouse` package API ---
+
+class EvdevMouse:
+    """The subset of the `mouse` package API that Babel uses: output through uinput."""
+    def __init__(self, backend):
+        self.backend = backend
+
+    def move(self, x, y, absolute=True, duration=0):
+        backend = self.backend
+        if absolute:
+            dx, dy = x - backend.emitted[0], y - backend.emitted[1]
+        else:
+            dx, dy = x, y
+        backend.emitted = (backend.emitted[0] + dx, backend.emitted[1] + dy)
+        events = ([(EV_REL, REL_X, dx)] if dx else []) + ([(EV_REL, REL_Y, dy)] if dy else [])
+        backend.output.write(events)
+
+    def wheel(self, delta=1):
+        steps = int(round(delta))
+        if steps:
+            self.backend.output.write([(EV_REL, REL_WHEEL, steps)])
+
+    def press(self, button="left"):
+        self.backend.output.write([(EV_KEY, MOUSE_BUTTON_CODES[button], 1)])
+
+    def release(self, button="left"):
+        self.backend.output.write([(EV_KEY, MOUSE_BUTTON_CODES[button], 0)])
+
+
+# --- ctypes.windll / win32gui / win32process stand-ins ---
+
+class _User32:
+    def __init__(self, backend):
+        self.backend = backend
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    # Low-level mouse hook (core/mouse_hook.py): procs are called from the reader thread
+    def SetWindowsHookExA(self, id_hook, proc, hmod, thread_id):
+        return self.backend.install_mouse_hook(proc)
+
+    SetWindowsHookExW = SetWindowsHookExA
+
+    def UnhookWindowsHookEx(self, hook_id):
+        self.backend.remove_mouse_hook(hook_id)
+        return 1
+
+    def CallNextHookEx(self, hook_id, n_code, w_param, l_param):
+        return 0
+
+    def _queue(self, thread_id):
+        with self._lock:
+            return self._queues.setdefault(thread_id, queue.Queue())
+
+    def GetMessageW(self, msg_ref, hwnd, msg_min, msg_max):
+        return 0 if self._queue(threading.get_ident() & 0xFFFFFFFF).get() == WM_QUIT else 1
+
+    def PostThreadMessageW(self, thread_id, message, w_param, l_param):
+        self._queue(thread_id).put(message)
+        return 1
+
+    def TranslateMessage(self, msg_ref):
+        return 0
+
+    def DispatchMessageW(self, msg_ref):
+        return 0
+
+    def GetAsyncKeyState(self, vk):
+        held = self.backend.keyboard.held
+        return 0x8000 if any(code in held for code in VK_CODES.get(vk, ())) else 0
+
+    def keybd_event(self, vk, scan, flags, extra):
+        codes = VK_CODES.get(vk)
+        if codes:
+            self.backend.output.write([(EV_KEY, codes[0], 0 if flags & 0x0002 else 1)])
+
+    def GetForegroundWindow(self):
+        return self.backend.foreground_pid()
+
+
+class _Kernel32:
+    def GetCurrentThreadId(self):
+        return threading.get_ident() & 0xFFFFFFFF
+
+
+class _Shell32:
+    def IsUserAnAdmin(self):
+        return int(os.access("/dev/uinput", os.W_OK))
+
+    def ShellExecuteW(self, *args):
+        raise OSError("no elevation on Linux: grant access to /dev/input and /dev/uinput (input group / udev rule)")
+
+
+class _WinDLL:
+    def __init__(self, backend):
+        self.user32 = _User32(backend)
+        self.kernel32 = _Kernel32()
+        self.shell32 = _Shell32()
+
+
+class _Win32Gui:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def GetForegroundWindow(self):
+        # The window handle is the focused process id (0: nothing known)
+        return self.backend.foreground_pid()
+
+
+class _Win32Process:
+    def GetWindowThreadProcessId(self, hwnd):
+        return (0, hwnd)
+
+
+# --- Backend ---
+
+class LinuxBackend:
+    """Owns the grabbed devices, the reader thread and the uinput output device."""
+    def __init__(self):
+        self.keyboard = EvdevKeyboard(self)
+        self.mouse = EvdevMouse(self)
+        self.windll = _WinDLL(self)
+        self.win32gui = _Win32Gui(self)
+        self.win32process = _Win32Process()
+        self.output = None
+        self.devices = {} # fd -> InputDevice
+        self.device_paths = None # Explicit paths (config "devices"), else discovered
+        self.foreground = None
+        self.running = False
+        self.pointer = (0, 0) # Accumulated hardware motion, as reported to the mouse hooks
+        self.emitted = (0, 0) # Where the virtual device has been moved to
+        self._mouse_hooks = {}
+        self._hook_ids = iter(range(1, 1 << 30))
+        self._thread = None
+        self._wake_r, self._wake_w = os.pipe()
+        self._injected = queue.SimpleQueue() # Frames to run through the hooks (send())
+        self._lock = threading.Lock()
+        self.counters = {"frames": 0, "forwarded": 0, "suppressed": 0}
+
+    def start(self, settings=None, devices=None, output=None):
+        """
+        Grabs the input devices and creates the virtual output device.
+        devices/output: ready InputDevice / UInputDevice objects instead (loopback benchmarks).
+        """
+        settings = settings or {}
+        self.keyboard.set_layout(settings.get("layout", "us"))
+        self.foreground = make_foreground(settings)
+        self.output = output or UInputDevice.create(settings.get("name", "babel-virtual-input"))
+        self.device_paths = settings.get("devices")
+        if devices is None:
+            devices = self._open_devices()
+        for device in devices:
+            self.devices[device.fd] = device
+        log.info("Linux backend: %d input device(s), output %s, foreground via %s", len(self.devices),
+                 self.output.name, type(self.foreground).__name__)
+        self.running = True
+        self._thread = threading.Thread(target=self._read_loop, name="babel-evdev", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        os.write(self._wake_w, b"q")
+        self._thread.join(timeout=1)
+        for device in self.devices.values():
+            device.close()
+        self.devices.clear()
+        self.output.close()
+
+    def _open_devices(self):
+        paths = self.device_paths or discover_devices(exclude_names=(self.output.name,))
+        devices = []
+        for path in paths:
+            try:
+                devices.append(InputDevice.open(path))
+            except OSError as e:
+                log.error("Cannot grab %s: %s (is the user in the 'input' group?)", path, e)
+        return devices
+
+    def regrab(self):
+        """Releases and re-opens the discovered devices (watchdog reinstall, hot-plugged devices)."""
+        with self._lock:
+            opened = [d for d in self.devices.values() if d.path]
+            for device in opened:
+                del self.devices[device.fd]
+                device.close()
+            for device in self._open_devices():
+                self.devices[device.fd] = device
+        os.write(self._wake_w, b"r")
+
+    def foreground_pid(self):
+        try:
+            return self.foreground.pid() if self.foreground else 0
+        except Exception:
+            return 0
+
+    def install_mouse_hook(self, proc):
+        with self._lock:
+            hook_id = next(self._hook_ids)
+            hooks = dict(self._mouse_hooks)
+            hooks[hook_id] = proc
+            self._mouse_hooks = hooks
+        return hook_id
+
+    def remove_mouse_hook(self, hook_id):
+        with self._lock:
+            hooks = dict(self._mouse_hooks)
+            hooks.pop(hook_id, None)
+            self._mouse_hooks = hooks
+
+    def inject_through_hooks(self, events):
+        """Runs `events` through the hooks as injected input (reader thread), then out."""
+        self._injected.put(events)
+        os.write(self._wake_w, b"i")
+
+    # --- Reader thread ---
+
+    def _read_loop(self):
+        size = INPUT_EVENT.size
+        while self.running:
+            fds = list(self.devices) + [self._wake_r]
+            try:
+                readable, _, _ = select.select(fds, [], [])
+            except (OSError, ValueError):
+                continue # A device went away between listing and select
+            for fd in readable:
+                if fd == self._wake_r:
+                    os.read(self._wake_r, 64)
+                    while not self._injected.empty():
+                        self._process_frame(self._injected.get(), injected=True)
+                    continue
+                device = self.devices.get(fd)
+                if device is None:
+                    continue
+                try:
+                    data = device.partial + os.read(fd, size * 64)
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EINTR):
+                        continue
+                    log.warning("Input device %s gone: %s", device.path or device.name, e)
+                    with self._lock:
+                        self.devices.pop(fd, None)
+                    device.close()
+                    continue
+                if not data:
+                    continue
+                whole = len(data) - len(data) % size
+                device.partial = data[whole:]
+                for _, _, kind, code, value in INPUT_EVENT.iter_unpack(data[:whole]):
+                    if kind == EV_SYN:
+                        if code == SYN_REPORT and device.pending:
+                            frame, device.pending = device.pending, []
+                            self._process_frame(frame)
+                    elif kind == EV_KEY or kind == EV_REL:
+                        device.pending.append((kind, code, value))
+
+    def _process_frame(self, frame, injected=False):
+        """One SYN_REPORT worth of events: through the hooks, survivors forwarded in one write."""
+        self.counters["frames"] += 1
+        out = []
+        dx = dy = wheel = hwheel = 0
+        buttons = []
+        keyboard = self.keyboard
+        for kind, code, value in frame:
+            if kind == EV_KEY and code <= KEY_MAX_KEYBOARD:
+                if keyboard.process(code, value, injected):
+                    out.append((kind, code, value))
+                else:
+                    self.counters["suppressed"] += 1
+            elif kind == EV_KEY:
+                buttons.append((code, value))
+            elif code == REL_X:
+                dx += value
+            elif code == REL_Y:
+                dy += value
+            elif code == REL_WHEEL:
+                wheel += value
+            elif code == REL_HWHEEL:
+                hwheel += value
+        if dx or dy or buttons or wheel or hwheel or (injected and not out and frame):
+            out.extend(self._mouse_frame(dx, dy, buttons, wheel, hwheel, injected))
+        if out:
+            self.counters["forwarded"] += 1
+            if not injected or any(kind == EV_KEY for kind, _, _ in out):
+                self.output.write([e for e in out if e[0] != EV_REL or e[2]])
+
+    def _mouse_frame(self, dx, dy, buttons, wheel, hwheel, injected):
+        """Mouse part of a frame as low-level hook messages. Returns the events to forward."""
+        hooks = list(self._mouse_hooks.values())
+        flags = LLMHF_INJECTED if injected else 0
+        out = []
+        x, y = self.pointer = (self.pointer[0] + dx, self.pointer[1] + dy)
+        if dx or dy or (injected and not buttons and not wheel):
+            if self._call_hooks(hooks, WM_MOUSEMOVE, 0, x, y, flags):
+                out += [(EV_REL, REL_X, dx), (EV_REL, REL_Y, dy)]
+                self.emitted = (self.emitted[0] + dx, self.emitted[1] + dy)
+            else:
+                self.counters["suppressed"] += 1
+        for code, value in buttons:
+            messages = BUTTON_MESSAGES.get(code)
+            if messages is None or self._call_hooks(hooks, messages[0 if value else 1], messages[2], x, y, flags):
+                out.append((EV_KEY, code, value))
+            else:
+                self.counters["suppressed"] += 1
+        for message, code, steps in ((WM_MOUSEWHEEL, REL_WHEEL, wheel), (WM_MOUSEHWHEEL, REL_HWHEEL, hwheel)):
+            if steps:
+                if self._call_hooks(hooks, message, steps * WHEEL_DELTA, x, y, flags):
+                    out.append((EV_REL, code, steps))
+                else:
+                    self.counters["suppressed"] += 1
+        return out
+
+    @staticmethod
+    def _call_hooks(hooks, msg, data, x, y, flags):
+        """Newest hook first, like the OS. False if one blocked the event."""
+        if not hooks:
+            return True
+        from core.mouse_hook import MSLLHOOKSTRUCT
+        info = MSLLHOOKSTRUCT()
+        info.pt.x = x
+        info.pt.y = y
+        info.mouseData = (data & 0xFFFF) << 16
+        info.flags = flags
+        pointer = ctypes.pointer(info)
+        for proc in reversed(hooks):
+            if proc(0, msg, pointer):
+                return False
+        return True
+
+    def mouse_hook_count(self):
+        return len(self._mouse_hooks)
+
+    def summary(self):
+        return dict(self.counters, devices=len(self.devices), output_writes=self.output.writes if self.output else 0,
+                    output_events=self.output.events if self.output else 0)
+
+
+_backend = None
+
+
+def install():
+    """
+    Makes the LinuxBackend the platform core modules talk to (core/backend.py)
+    and returns it. Idempotent. Must run before core modules that import the
+    platform APIs; devices are only opened by start().
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    _backend = LinuxBackend()
+    backend.use(_backend)
+    return _backend
+
+
+def get_backend():
+    return _backend
@@ -0,0 +1,262 @@
+import collections
+import os
+import sys
+import threading
+import time
+import atexit
+from pathlib import Path
+
+# Levels (same numbers as the stdlib so they read naturally in config)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVEL_VALUES = {name: value for value, name in LEVEL_NAMES.items()}
+
+
+def _noop(*args, **kwargs):
+    """Bound in place of a disabled level. Nothing is formatted or stored."""
+    pass
+
+
+class Channel:
+    """
+    A per-category logger handed out by get_logger().
+
+    Level methods are plain attributes that get swapped between a recorder and
+    _noop whenever the hub is reconfigured, so a disabled call costs one
+    attribute lookup and an empty call - no level checks, no string formatting.
+    Guard expensive argument construction with `if log.debug_enabled:`.
+    """
+    __slots__ = ("category", "hub", "debug", "info", "warning", "error", "debug_enabled")
+
+    def __init__(self, category, hub):
+        self.category = category
+        self.hub = hub
+        self.apply_level(hub.level_for(category))
+
+    def apply_level(self, threshold):
+        self.debug_enabled = threshold <= DEBUG
+        self.debug = self._recorder(DEBUG) if threshold <= DEBUG else _noop
+        self.info = self._recorder(INFO) if threshold <= INFO else _noop
+        self.warning = self._recorder(WARNING) if threshold <= WARNING else _noop
+        self.error = self._recorder(ERROR) if threshold <= ERROR else _noop
+
+    def _recorder(self, level):
+        hub = self.hub
+        append = hub.buffer.append
+        wake = hub._wake_event.set
+        category = self.category
+        now = time.time
+
+        def record(msg, *args):
+            # deque.append is atomic under the GIL: no lock on the calling thread.
+            # Formatting is deferred to the flusher thread.
+            append((now(), level, category, msg, args))
+            if hub.flusher_idle:
+                wake()
+        return record
+
+
+class LogHub:
+    """
+    Collects records from every Channel into an in-memory ring buffer and
+    flushes them from a background thread into a size-rotated log file.
+
+    Hook callbacks only ever pay for a deque append. If the flusher falls
+    behind, the oldest records are overwritten rather than blocking anyone.
+    With nothing buffered the flusher sleeps until the next record arrives.
+    """
+    def __init__(self, capacity=8192):
+        self.buffer = collections.deque(maxlen=capacity)
+        self.default_level = INFO
+        self.category_levels = {}
+        self.channels = {}
+
+        self.log_path = None
+        self.max_bytes = 1024 * 1024
+        self.backup_count = 3
+        self.console = True
+        self.flush_interval = 0.5 # seconds
+
+        self.running = False
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self.flusher_idle = False # Set while the flusher waits for a record
+        self.wakeups = 0
+        self._file = None
+        self._io_lock = threading.Lock() # Serialises flushes (flusher thread vs shutdown)
+
+    def level_for(self, category):
+        return self.category_levels.get(category, self.default_level)
+
+    def get_logger(self, category):
+        channel = self.channels.get(category)
+        if channel is None:
+            channel = Channel(category, self)
+            self.channels[category] = channel
+        return channel
+
+    def configure(self, settings=None, project_root="."):
+        """
+        Applies the "logging" block of config.json.
+        Example:
+            {
+                "level": "INFO",
+                "categories": {"observer": "DEBUG"},
+                "file": "logs/babel.log",
+                "max_bytes": 1048576,
+                "backup_count": 3,
+                "console": true
+            }
+        """
+        settings = settings or {}
+        self.default_level = LEVEL_VALUES.get(str(settings.get("level", "INFO")).upper(), INFO)
+        self.category_levels = {
+            cat: LEVEL_VALUES.get(str(lvl).upper(), INFO)
+            for cat, lvl in settings.get("categories", {}).items()
+        }
+
+        log_file = settings.get("file", os.path.join("logs", "babel.log"))
+        log_path = Path(project_root) / log_file if log_file else None
+        with self._io_lock:
+            if log_path != self.log_path and self._file:
+                self._file.close()
+                self._file = None
+            self.log_path = log_path
+        self.max_bytes = int(settings.get("max_bytes", self.max_bytes))
+        self.backup_count = int(settings.get("backup_count", self.backup_count))
+        # pythonw has no console: sys.stdout is None there
+        self.console = bool(settings.get("console", True)) and sys.stdout is not None
+
+        for category, channel in self.channels.items():
+            channel.apply_level(self.level_for(category))
+
+    def start(self):
+        """Starts the flusher thread."""
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="babel-log-flusher", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stops the flusher and writes out everything still buffered."""
+        self.running = False
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        self.flush()
+        with self._io_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _flush_loop(self):
+        while self.running:
+            if not self.buffer:
+                self.flusher_idle = True
+                self._wake_event.clear()
+                # Re-check: a record may have landed before the flag was visible
+                if not self.buffer and self.running:
+                    self._wake_event.wait()
+                    self.wakeups += 1
+                self.flusher_idle = False
+                continue
+            # Batch whatever else arrives within flush_interval
+            self._stop_event.wait(self.flush_interval)
+            self.wakeups += 1
+            self.flush()
+
+    def flush(self):
+        """Drains the ring buffer. Runs on the flusher thread (or at shutdown)."""
+        with self._io_lock:
+            lines = []
+            popleft = self.buffer.popleft
+            while True:
+                try:
+                    record = popleft()
+                except IndexError:
+                    break
+                lines.append(self._format(record))
+
+            if not lines:
+                return
+
+            text = "\n".join(lines) + "\n"
+            if self.console:
+                try:
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                except Exception:
+                    pass
+            if self.log_path:
+                self._write_file(text)
+
+    def _format(self, record):
+        timestamp, level, category, msg, args = record
+        if args:
+            try:
+                msg = msg % args
+            except Exception:
+                msg = f"{msg} {args!r}"
+        clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        millis = int((timestamp % 1) * 1000)
+        return f"{clock}.{millis:03d} {LEVEL_NAMES.get(level, level):<7} [{category}] {msg}"
+
+    def _write_file(self, text):
+        try:
+            if self._file is None:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.log_path, "a", encoding="utf-8")
+            self._file.write(text)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except Exception:
+            # Logging must never take the app down
+            pass
+
+    def _rotate(self):
+        """babel.log -> babel.log.1 -> ... -> babel.log.<backup_count>"""
+        self._file.close()
+        self._file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_path}.{index}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+
+
+# Process-wide hub. Modules call get_logger() at import time.
+_hub = LogHub()
+atexit.register(_hub.shutdown)
+
+
+def get_logger(category):
+    return _hub.get_logger(category)
+
+
+def configure(settings=None, project_root="."):
+    _hub.configure(settings, project_root)
+
+
+def start():
+    _hub.start()
+
+
+def shutdown():
+    _hub.shutdown()
+
+
+def get_hub():
+    return _hub
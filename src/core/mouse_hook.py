@@ -3,14 +3,19 @@ import ctypes.wintypes
 from ctypes.wintypes import HINSTANCE, HHOOK, LPARAM, WPARAM, MSG
 import atexit
 import threading
+from core.backend import windll, WINFUNCTYPE
+from core.logger import get_logger
+
+log = get_logger("mouse")
 
 # Windows Constants
 WH_MOUSE_LL = 14
 WM_MOUSEWHEEL = 0x020A
 WM_MOUSEHWHEEL = 0x020E
+LLMHF_INJECTED = 0x00000001
 
-user32 = ctypes.windll.user32
-kernel32 = ctypes.windll.kernel32
+user32 = windll.user32
+kernel32 = windll.kernel32
 
 LRESULT = ctypes.c_longlong if ctypes.sizeof(ctypes.c_void_p) == 8 else ctypes.c_long
 
@@ -25,16 +30,18 @@ class MSLLHOOKSTRUCT(ctypes.Structure):
 
 # Callback signature: LRESULT (int, WPARAM, LPARAM)
 # Windows callbacks use stdcall (WINFUNCTYPE)
-CMPFUNC = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, WPARAM, ctypes.POINTER(MSLLHOOKSTRUCT))
+CMPFUNC = WINFUNCTYPE(LRESULT, ctypes.c_int, WPARAM, ctypes.POINTER(MSLLHOOKSTRUCT))
 
 class LowLevelMouseHook:
-    def __init__(self, callback):
+    def __init__(self, callback, monitor=None):
         """
         callback: function(event_type, event_data) -> bool
         If callback returns True, the event is ALLOWED.
         If callback returns False, the event is BLOCKED.
+        monitor: optional HookMonitor (core/hook_watchdog.py). Every callback is
+        then timed and counted as a heartbeat.
         """
-        self.callback = callback
+        self.callback = monitor.timed(callback) if monitor else callback
         self.hook_id = None
         self.thread_id = None
         self.thread = None
@@ -53,7 +60,8 @@ class LowLevelMouseHook:
                     'msg': wParam,
                     'delta': (ctypes.c_short(struct.mouseData >> 16).value),
                     'x': struct.pt.x,
-                    'y': struct.pt.y
+                    'y': struct.pt.y,
+                    'injected': struct.flags & LLMHF_INJECTED # Synthesised (SendInput/mouse_event), ours included
                 }
                 
                 should_allow = self.callback(event_info)
@@ -61,13 +69,13 @@ class LowLevelMouseHook:
                      # To block, return non-zero. 
                      return 1 
         except Exception as e:
-            print(f"Hook Callback Error: {e}")
+            log.error("Hook Callback Error: %s", e)
 
         return user32.CallNextHookEx(self.hook_id, nCode, wParam, lParam)
 
     def start(self):
         self.running = True
-        self.thread = threading.Thread(target=self._msg_loop, daemon=True)
+        self.thread = threading.Thread(target=self._msg_loop, name="babel-mouse-hook", daemon=True)
         self.thread.start()
 
     def stop(self):
@@ -75,6 +83,12 @@ class LowLevelMouseHook:
         if self.thread_id:
             user32.PostThreadMessageW(self.thread_id, 0x0012, 0, 0) # WM_QUIT
         self.thread.join(timeout=1)
+        self.thread_id = None
+
+    def restart(self):
+        """Removes and re-installs the hook on a fresh message-loop thread."""
+        self.stop()
+        self.start()
 
     def _msg_loop(self):
         self.thread_id = kernel32.GetCurrentThreadId()
@@ -85,10 +99,10 @@ class LowLevelMouseHook:
         
         if not self.hook_id:
             error = ctypes.GetLastError()
-            print(f"CRITICAL: Failed to install mouse hook. Error Code: {error}")
+            log.error("Failed to install mouse hook. Error Code: %s", error)
             return
             
-        print(f"DEBUG: Mouse Hook installed. ID={self.hook_id}")
+        log.debug("Mouse Hook installed. ID=%s", self.hook_id)
         
         msg = MSG()
         
@@ -103,7 +117,7 @@ class LowLevelMouseHook:
                 user32.TranslateMessage(ctypes.byref(msg))
                 user32.DispatchMessageW(ctypes.byref(msg))
         except Exception as e:
-            print(f"CRITICAL: Mouse hook died: {e}")
+            log.error("Mouse hook died: %s", e)
         finally:
             # print("DEBUG: Mouse Hook Message Loop Ended")
             pass
@@ -1,8 +1,30 @@
-import keyboard
 import threading
 import time
+import collections
+import os
+import psutil
+from core.backend import keyboard, windll
 from core.web_listener import WebContextListener
 from core.action_mapper import ActionMapper
+from core.hook_watchdog import HookWatchdog, last_input_age
+from core.keymap import shared_keymaps
+from core.context_snapshot import ContextSnapshot
+from core.injector import MacroPlayer
+from core.scheduler import Scheduler
+from core.idle_cost import IdleMonitor
+from core import flight_recorder
+from core import tracing
+from core.profiler import SamplingProfiler
+from core.flight_recorder import FlightRecorder
+from core.shadow import ShadowReport
+from core.keymap import MODIFIERS
+from core.gestures import GestureTranslator, is_mouse_trigger
+from core.injection_timing import TimingRegistry
+from core.sequences import SequenceTrie, SequenceMatcher, MODIFIER_NAMES, SEPARATOR, is_sequence, normalize_chord
+from core import logger
+from core.logger import get_logger
+
+log = get_logger("observer")
 
 class InputObserver:
     def __init__(self, context_manager, config_manager, injection_module):
@@ -16,89 +38,337 @@ class InputObserver:
         
         # Web Context Listener
         self.web_listener = WebContextListener()
+        self.web_listener.on_text_entry = self._on_bridge_text_entry
 
-        # Context Caching
-        self.is_active_context = False
-        self._context_thread = None
-        self._zoom_thread = None
-        self.active_app_name = None
-        
-        # Semantic Mapping State
-        self.mapping_lookup = {} # trigger(str) -> output(str)
-        self.active_context_lock = threading.Lock()
+        # Text entry: while a text field of the target app has focus, keys pass through untranslated
+        # (keyboard hotkeys disarmed). Web apps: reported by the bridge; desktop apps: caret heuristic.
+        text_entry = config_manager.config.get("text_entry", {})
+        self.text_entry_bridge = text_entry.get("bridge", True)
+        self.text_entry_desktop = text_entry.get("desktop", True)
+        self.text_entry_caret = text_entry.get("caret", False) # Any caret, not only edit controls (opt-in)
+
+        # Context Caching: active flag, app, lookup and key table live in one immutable
+        # snapshot, replaced by reference (readers never lock, see core/context_snapshot.py)
+        self.keymaps = shared_keymaps() # Scan-code tables per keyboard layout
+        self.snapshot = ContextSnapshot(0, None, False, {}, self.keymaps.current())
+        self._snapshot_lock = threading.Lock() # Serialises writers only
+
+        # Every deadline (context polling, zoom gestures, injection steps, watchdog
+        # checks) is a timer on this one thread; it sleeps until the next one is due
+        self.scheduler = Scheduler()
+        self.clock = self.scheduler.clock
+        self.macros = MacroPlayer(self.scheduler)
+        # Context polling: every `interval_s` while input arrives, backing off (doubling) to
+        # `idle_interval_s` while there is none and nothing changes; input wakes it again
+        context_poll = config_manager.config.get("context_poll", {})
+        self.context_poll_interval = context_poll.get("interval_s", 0.05) # seconds
+        self.context_poll_idle_interval = context_poll.get("idle_interval_s", 1.0) # seconds
+        self._context_timer = None
+        self._context_resting = False # Backed off: the next input event wakes the poll
+        self._context_lock = threading.Lock() # Timer swaps: scheduler thread vs start/stop
+        self._context_last_state = None
+        self._context_last_app = None
         
         # Debounce State
         self.last_trigger_times = {} # key -> timestamp
         self.debounce_interval = 0.25 # seconds
 
         # State tracking for Zoom continuity
-        self.last_ctrl_wheel_time = 0
+        self.last_ctrl_wheel_time = float("-inf")
+        self.zoom_sticky_timeout = 1.0 # seconds without wheel input that end a gesture
         self.zoom_lock = threading.Lock()
         self.zoom_buffer = 0
-        self.zoom_active = False
+        self.zoom_phase = None # None, "starting", "held" or "ending" (see _zoom_begin)
+        self.zoom_rule = None # (trigger_mod, output_mod) of the gesture in progress
+        self._zoom_keys = None
+        self._zoom_flush_timer = None
         self.trigger_held = False # Track physical state
+
+        # Counters for the control channel's metrics command
+        self.metrics = collections.Counter()
+        self.registered_triggers = set()
+
+        # Suppressing hotkeys are only installed ("armed") while a target app is focused,
+        # so keys typed anywhere else never reach Babel. Config "arm_on_focus": false keeps them always on.
+        self.arm_on_focus = config_manager.config.get("arm_on_focus", True)
+        self.hooks_armed = False
+        self._arm_lock = threading.RLock() # Context polls and control channel both re-arm
+        self._arm_generation = 0 # Bumped by every arm/disarm: injections in flight re-hook only within theirs
+        self._live_hotkeys = set() # Chords with a keyboard hotkey registered right now
+        self._injecting = collections.Counter() # Chord -> injections in flight that hold its hotkey off
+
+        # Hook health: times every callback, reinstalls hooks Windows dropped (never injects input)
+        watchdog_settings = config_manager.config.get("watchdog", {})
+        self.watchdog_enabled = watchdog_settings.get("enabled", True)
+        self.watchdog = HookWatchdog.from_config(watchdog_settings)
+        self.keyboard_monitor = self.watchdog.register("keyboard", self._reinstall_keyboard_hook)
+        self._timed_hotkey_handler = self.keyboard_monitor.timed(self._handle_dynamic_hotkey)
+        self._heartbeat_hook = None
+
+        # Multi-stroke triggers ("alt+l, u", config "sequences"): first strokes are hooked like any
+        # trigger, a blocking key hook exists only while a prefix is live (core/sequences.py)
+        sequence_settings = config_manager.config.get("sequences", {})
+        self.sequence_timeout = sequence_settings.get("timeout", 1.0) # seconds between strokes
+        self.sequence_timeouts = {k.lower(): v for k, v in sequence_settings.get("timeouts", {}).items()}
+        self.sequences = SequenceMatcher(SequenceTrie(), self.scheduler, self._on_sequence_match, self._on_sequence_fail)
+        self._sequence_starts = set() # First strokes, hooked with _timed_sequence_handler
+        self._sequence_claimed = set() # Triggers matched through the trie instead of their own hotkey
+        self._sequence_plain = {} # normalized chord -> plain trigger
+        self._sequence_hook = None
+        self._sequence_swallowed = set() # Keys whose down was suppressed: suppress their up too
+        self._timed_sequence_handler = self.keyboard_monitor.timed(self._on_sequence_start)
+
+        # Mouse button gestures ("mbutton", "ctrl+xbutton1", "space+drag"; config "gestures"): compiled per
+        # context into snapshot.gestures, run in the mouse hook. Drag motion is coalesced to frame_rate.
+        gesture_settings = config_manager.config.get("gestures", {})
+        self.gestures = GestureTranslator(self.scheduler, self.injection_module, self._gesture_send,
+                                          frame_interval=1.0 / gesture_settings.get("frame_rate", 120))
+        self.gestures.on_decision = self._on_gesture_decision
+
+        # Injection pacing per app (gap, modifier settle, restore), from the app registry in
+        # semantic_config.json; the focused app's timing is published in the snapshot
+        self.injection_timings = TimingRegistry.from_definitions(config_manager.get_system_definitions())
+        self._context_web = False # Current app was detected through the browser bridge
+
+        # Optional isolated hook process (config: "isolated_hooks"). When set, this
+        # process only resolves context and publishes compiled tables to it.
+        self.hook_host = None
+
+        # Optional fleet profile sync (config "sync", core/profile_sync.py), set by main.py
+        self.profile_sync = None
+
+        # Headless mode (main.py --headless, core/daemon.py): set while the Daemon runs
+        self.daemon = None
+
+        # Deep idle: no target app (or browser) running -> hooks removed, context polling stopped.
+        # Driven by the process watcher (config: "lifecycle").
+        self.process_watcher = None
+        self.deep_idle = False
+
+        # Flight recorder: one fixed-size binary record per hook decision, always on (config: "flight_recorder")
+        self.flight = FlightRecorder.from_config(config_manager.config.get("flight_recorder", {}))
+
+        # Pipeline tracing: opt-in spans exported as Chrome trace-event JSON (tray, control channel "trace")
+        self.tracer = tracing.get_tracer()
+
+        # Sampling profiler: stacks of every thread for a few seconds on demand (tray, control channel "profile")
+        self.profiler = SamplingProfiler.from_config(config_manager.config.get("profiler", {}))
+
+        # Fleet telemetry: flight records aggregated into counters and histograms, spooled
+        # and uploaded by its own thread (config: "telemetry", core/telemetry.py)
+        self.telemetry = None
+
+        # Shadow mode: hooks observe only (no suppression, no injection) and what Babel would
+        # have done goes to a ShadowReport. Config "shadow_mode", main.py --shadow, tray, control channel.
+        self.shadow = False
+        self.shadow_report = None
+        if config_manager.config.get("shadow_mode", False):
+            self.set_shadow_mode(True)
+
+        # Idle cost: CPU and wakeups per internal thread (control channel "idle_cost", tray)
+        self.idle_monitor = IdleMonitor()
+        self.idle_monitor.add_source("scheduler", lambda: self.scheduler.wakeups)
+        self.idle_monitor.add_source("lifecycle", lambda: self.process_watcher.wakeups)
+        self.idle_monitor.add_source("logger", lambda: logger.get_hub().wakeups)
+        self.idle_monitor.add_source("sync", lambda: self.profile_sync.wakeups)
+        self.idle_monitor.add_source("telemetry", lambda: self.telemetry.wakeups)
+
+        self.injection_module.keymap = self.keymap
         
     def log_debug(self, msg):
-        print(f"[OBSERVER]: {msg}")
+        log.debug("%s", msg)
 
-    def _monitor_context(self):
-        """Polls context every 0.1s to update status without blocking hooks."""
-        last_state = None
-        last_app = None
-        
-        while self.running:
-            try:
-                # Semantic Targets are derived from system definitions (photoshop, figma, etc.)
-                targets = self.config_manager.get_semantic_targets()
-                
-                # Check Web Context First
-                web_app = self.web_listener.get_active_web_app()
-                
-                detected_app = None
+    # --- Published context (one ContextSnapshot, see __init__) ---
+
+    def _publish_snapshot(self, **changes):
+        """Publishes a new snapshot with `changes` applied. Hooks see all of them or none."""
+        with self._snapshot_lock:
+            snapshot = self.snapshot.replace(**changes)
+            self.snapshot = snapshot
+        return snapshot
+
+    @property
+    def is_active_context(self):
+        return self.snapshot.active
 
-                active = False
+    @is_active_context.setter
+    def is_active_context(self, active):
+        self._publish_snapshot(active=active)
+
+    @property
+    def active_app_name(self):
+        return self.snapshot.app
+
+    @active_app_name.setter
+    def active_app_name(self, app):
+        self._publish_snapshot(app=app)
+
+    @property
+    def mapping_lookup(self):
+        return self.snapshot.lookup
+
+    @mapping_lookup.setter
+    def mapping_lookup(self, lookup):
+        self._publish_snapshot(lookup=lookup)
+
+    @property
+    def keymap(self):
+        return self.snapshot.keymap
+
+    @keymap.setter
+    def keymap(self, keymap):
+        self._publish_snapshot(keymap=keymap)
+
+    def _start_context_polling(self):
+        """
+        Polls context on a scheduler timer without blocking hooks: every
+        `context_poll_interval` while there is input, backing off to
+        `context_poll_idle_interval` while there is none.
+        """
+        with self._context_lock:
+            if self._context_timer is None:
+                # Re-evaluate context and hooks from scratch (first start, or woken from deep idle)
+                self._context_last_state = None
+                self._context_last_app = None
+                self._context_resting = False
+                self._context_timer = self.scheduler.every(self.context_poll_interval, self._context_tick, first=0)
+
+    def _stop_context_polling(self):
+        with self._context_lock:
+            if self._context_timer is not None:
+                self._context_timer.cancel()
+                self._context_timer = None
+            self._context_resting = False
+
+    def _context_tick(self):
+        """Timed context poll (scheduler thread). Sets the interval until the next one."""
+        snapshot = self.snapshot
+        self._poll_context()
+        timer = self._context_timer
+        if timer is None:
+            return
+        if self.snapshot is not snapshot or self._input_within(timer.interval):
+            timer.interval = self.context_poll_interval
+        else:
+            # The foreground rarely changes without input: no input, no need to look often
+            timer.interval = min(timer.interval * 2, self.context_poll_idle_interval)
+        self._context_resting = timer.interval > self.context_poll_interval
+
+    def _input_within(self, seconds):
+        """True if the user gave keyboard or mouse input in the last `seconds`."""
+        age = last_input_age()
+        if age is not None:
+            return age < seconds
+        # No OS idle timer (Linux): the local hooks' heartbeats
+        now = self.watchdog.clock()
+        return any(now - monitor.last_beat < seconds for monitor in list(self.watchdog.monitors.values()))
+
+    def _wake_context_polling(self):
+        """Input arrived while the poll was backed off (hook thread): poll now, then at full rate."""
+        self._context_resting = False
+        if self.scheduler.running:
+            self.scheduler.call_soon(self._restart_context_timer)
+
+    def _restart_context_timer(self):
+        with self._context_lock:
+            if self._context_timer is not None:
+                self._context_timer.cancel()
+                self._context_timer = self.scheduler.every(self.context_poll_interval, self._context_tick, first=0)
+
+    def _on_key_event(self, event):
+        """Passive listener on every key event: watchdog heartbeat, wakes a backed-off context poll."""
+        self.keyboard_monitor.beat()
+        if self._context_resting:
+            self._wake_context_polling()
+
+    def _poll_context(self):
+        """One context poll. Runs on the scheduler thread."""
+        last_state = self._context_last_state
+        last_app = self._context_last_app
+        self.metrics["context_polls"] += 1
+        try:
+            # Semantic Targets are derived from system definitions (photoshop, figma, etc.)
+            targets = self.config_manager.get_semantic_targets()
+            
+            # Check Web Context First
+            web_app = self.web_listener.get_active_web_app()
+            
+            detected_app = None
+
+            active = False
+            if web_app:
+                # Check if the detected web app matches any of our targets
+                active = any(t.lower() in web_app.lower() for t in targets) or (web_app == "figma" and "figma" in targets)
+                if active:
+                    detected_app = next((t for t in targets if t.lower() in web_app.lower()), web_app)
+            else:
+                # Fallback to Desktop Window Check
+                active = self.context_manager.is_target_active(targets)
+                # We need to know WHICH app to ask ActionMapper.
+                # ContextManager needs to return the app name, but currently returns Bool.
+                # For now, we trust ActionMapper to handle generic "photoshop" if Active is True and process is photoshop.
+                # TODO: Update ContextManager to return the active app name.
+                # HACK for now: iterate targets and check.
+                if active:
+                    # Find which one
+                    for t in targets:
+                        if self.context_manager.is_target_active([t]):
+                            detected_app = t
+                            break
+            
+            self._context_web = bool(web_app)
+
+            editing = False
+            if active:
                 if web_app:
-                    # Check if the detected web app matches any of our targets
-                    active = any(t.lower() in web_app.lower() for t in targets) or (web_app == "figma" and "figma" in targets)
-                    if active:
-                        detected_app = next((t for t in targets if t.lower() in web_app.lower()), web_app)
+                    editing = bool(self.text_entry_bridge and self.web_listener.text_entry)
+                elif self.text_entry_desktop:
+                    editing = self.context_manager.is_text_entry_focused(self.text_entry_caret)
+
+            # Input language changed (e.g. Alt+Shift): swap tables before anything else resolves keys
+            layout_id = self.keymaps.current_layout_id()
+            if layout_id != self.keymap.layout_id:
+                self._switch_layout(layout_id)
+
+    # Update Mappings if Context Changed
+            snapshot = self.snapshot
+            if active and detected_app and detected_app != last_app:
+                 log.debug("Context switch detected: %s -> %s. Updating mappings.", last_app, detected_app)
+                 # The new app's lookup goes out in the same snapshot as its active and editing flags
+                 self._update_mappings_for_context(detected_app, active=True, editing=editing)
+                 last_app = detected_app
+            else:
+                 timing = self.injection_timings.get(detected_app, self._context_web)
+                 if (active != snapshot.active or detected_app != snapshot.app or timing is not snapshot.timing
+                         or editing != snapshot.editing):
+                     self._publish_snapshot(active=active, app=detected_app, timing=timing, editing=editing)
+
+            snapshot = self.snapshot
+            state = (snapshot.active, snapshot.editing)
+            if state != last_state:
+                if last_state is None or snapshot.active != last_state[0]:
+                    log.info("Context changed to %s (App: %s)", 'ACTIVE' if snapshot.active else 'INACTIVE', detected_app)
                 else:
-                    # Fallback to Desktop Window Check
-                    active = self.context_manager.is_target_active(targets)
-                    # We need to know WHICH app to ask ActionMapper.
-                    # ContextManager needs to return the app name, but currently returns Bool.
-                    # For now, we trust ActionMapper to handle generic "photoshop" if Active is True and process is photoshop.
-                    # TODO: Update ContextManager to return the active app name.
-                    # HACK for now: iterate targets and check.
-                    if active:
-                        # Find which one
-                        for t in targets:
-                            if self.context_manager.is_target_active([t]):
-                                detected_app = t
-                                break
+                    log.debug("Text entry %s in %s", "focused" if snapshot.editing else "left", detected_app)
+                    self.metrics["text_entry_switches"] += 1
+                last_state = state
+                if self.hook_host is None:
+                    self._sync_armed()
+                self._publish_table()
                 
-                self.is_active_context = active
-                self.active_app_name = detected_app
-
-        # Update Mappings if Context Changed
-                if active and detected_app and detected_app != last_app:
-                     print(f"DEBUG: Context switch detected: {last_app} -> {detected_app}. Updating mappings.")
-                     self._update_mappings_for_context(detected_app)
-                     last_app = detected_app
-
-                if self.is_active_context != last_state:
-                    print(f"Context changed to {'ACTIVE' if self.is_active_context else 'INACTIVE'} (App: {detected_app})")
-                    last_state = self.is_active_context
-                    
-            except Exception as e:
-                print(f"Error in context thread: {e}")
-            time.sleep(0.05) # Faster polling 
+        except Exception as e:
+            log.error("Error in context poll: %s", e)
+        self._context_last_state = last_state
+        self._context_last_app = last_app
 
-    def _update_mappings_for_context(self, app_name):
+    def _update_mappings_for_context(self, app_name, active=None, editing=False):
         """
         Ask ActionMapper for new mappings and update lookup table.
+        With `active`, also switches the published app, active flag and
+        text entry state (same snapshot).
         """
-        print(f"DEBUG: Requesting mappings for {app_name}")
+        log.debug("Requesting mappings for %s", app_name)
+        start = time.perf_counter()
         raw_mappings = self.action_mapper.get_mappings_for_context(app_name)
         new_lookup = {}
         for rule in raw_mappings:
@@ -107,10 +377,74 @@ class InputObserver:
             output = rule['output']
             new_lookup[trigger] = output
             
-        with self.active_context_lock:
-            self.mapping_lookup = new_lookup
+        # Resolve every trigger/output of this context now, not on the first keystroke
+        self.keymap.compile(list(new_lookup) + list(new_lookup.values()))
+
+        timing = self.injection_timings.get(app_name, self._context_web)
+        if active is None:
+            self._publish_snapshot(lookup=new_lookup, timing=timing)
+        else:
+            self._publish_snapshot(lookup=new_lookup, app=app_name, active=active, editing=editing, timing=timing)
+        self.metrics["mapping_rebuilds"] += 1
+        if self.tracer.enabled:
+            self.tracer.complete("mapping rebuild", "context", start, None, {"app": app_name, "rules": len(new_lookup)})
+        self._publish_table()
         
-        print(f"DEBUG: Updated mappings for {app_name}: {new_lookup}")
+        log.debug("Updated mappings for %s: %s", app_name, new_lookup)
+
+    def _on_bridge_text_entry(self, editing):
+        """Bridge reported a text field focus change (web listener thread): re-evaluate context now."""
+        if self.text_entry_bridge and self._context_timer is not None and self.scheduler.running:
+            self.scheduler.call_soon(self._poll_context)
+
+    def _publish_table(self):
+        """Pushes the compiled active-context table to the isolated hook process, if any."""
+        if self.hook_host is None:
+            return
+        snapshot = self.snapshot
+        self.hook_host.publish_table({
+            "triggers": sorted(self.registered_triggers),
+            "active": snapshot.active,
+            "editing": snapshot.editing,
+            "app": snapshot.app,
+            "lookup": snapshot.lookup,
+            "layout": snapshot.keymap.layout_id,
+            "timing": list(snapshot.timing) if snapshot.timing else None,
+            "idle": self.deep_idle,
+            "shadow": self.shadow,
+        })
+
+    def _switch_layout(self, layout_id):
+        """Swaps in the (cached) key table of another keyboard layout and re-hooks with it."""
+        log.info("Keyboard layout changed: %#x -> %#x", self.keymap.layout_id, layout_id)
+        self.keymap = self.keymaps.get(layout_id)
+        self.injection_module.keymap = self.keymap
+        self.metrics["layout_switches"] += 1
+        self.reload_profile()
+
+    def _on_hook_process_event(self, kind, trigger, latency_us, flags):
+        from core.hook_process import FLAG_TRANSLATED, FLAG_ACTIVE, FLAG_SHADOW, FLAG_DEBOUNCED
+        self.metrics["hotkeys"] += 1
+        if flags & FLAG_DEBOUNCED:
+            self.metrics["debounced"] += 1
+        elif not flags & FLAG_ACTIVE:
+            self.metrics["passthrough_inactive"] += 1
+        elif flags & FLAG_TRANSLATED:
+            self.metrics["translated"] += 1
+        self.metrics["hook_process_us_total"] += latency_us
+        report = self.shadow_report
+        if flags & FLAG_SHADOW and report is not None:
+            # The hook process decided (and only observed): account it in this process's report
+            snapshot = self.snapshot
+            if flags & FLAG_DEBOUNCED:
+                decision, output = flight_recorder.DEBOUNCED, None
+            elif not flags & FLAG_ACTIVE:
+                decision, output = flight_recorder.PASS_INACTIVE, None
+            elif flags & FLAG_TRANSLATED:
+                decision, output = flight_recorder.TRANSLATED, snapshot.lookup.get(trigger)
+            else:
+                decision, output = flight_recorder.PASS_UNMAPPED, None
+            report.record(decision, snapshot.app, trigger, output, latency_us * 1000)
 
     def start(self):
         """Starts listening."""
@@ -121,38 +455,130 @@ class InputObserver:
         
         # Start Web Listener
         self.web_listener.start()
+
+        if self.config_manager.config.get("isolated_hooks", False) and self.hook_host is None:
+            from core.hook_process import HookProcessHost
+            # The hook process logs to its own file: two writers can't share one rotation
+            logging_settings = dict(self.config_manager.config.get("logging", {}))
+            logging_settings["file"] = os.path.join("logs", "babel-hooks.log")
+            settings = {
+                "watchdog": self.config_manager.config.get("watchdog", {}),
+                "logging": logging_settings,
+                "project_root": str(self.config_manager.project_root),
+                "arm_on_focus": self.arm_on_focus,
+                "flight_recorder": self.config_manager.config.get("flight_recorder", {}),
+                "sequences": self.config_manager.config.get("sequences", {}),
+            }
+            self.hook_host = HookProcessHost(settings, self._on_hook_process_event)
+            self.hook_host.start()
+            # Hooks registered before start() (main.py does that) move to the hook process
+            self._remove_local_hooks()
         
         # Register Hooks (One-time setup for all configured triggers)
         self.register_hotkeys()
         
-        # Re-initialize threads here to allow restarts
-        if self._context_thread is None or not self._context_thread.is_alive():
-            self._context_thread = threading.Thread(target=self._monitor_context, daemon=True)
-            self._context_thread.start()
+        # Re-started here to allow restarts
+        self.scheduler.start()
+        self._start_context_polling()
         
-        # Worker thread (daemon) for processing zoom buffer
-        self._zoom_thread = threading.Thread(target=self._zoom_worker, daemon=True)
-        self._zoom_thread.start()
+        if self.hook_host is None and self.watchdog_enabled:
+            # With a hook process, zoom gestures and the hook watchdog run next to the hooks, over there.
+            self.watchdog.start(self.scheduler)
+
+        self._start_process_watcher()
+        self._start_telemetry()
+        if self.config_manager.config.get("tracing", {}).get("enabled", False):
+            self.set_tracing(True)
+
+    def _start_telemetry(self):
+        settings = self.config_manager.config.get("telemetry", {})
+        if not settings.get("enabled", False):
+            return
+        if self.telemetry is None:
+            from core.telemetry import Telemetry
+            self.telemetry = Telemetry.from_config(self.flight, settings, self.config_manager.project_root,
+                                                   self.action_mapper.get_action_for_trigger,
+                                                   lambda: list(self.watchdog.incidents))
+        self.telemetry.start()
+
+    def _start_process_watcher(self):
+        settings = self.config_manager.config.get("lifecycle", {})
+        if not settings.get("enabled", True):
+            return
+        if self.process_watcher is None:
+            from core.process_watcher import ProcessWatcher
+            targets = self.config_manager.get_semantic_targets()
+            self.process_watcher = ProcessWatcher.from_config(targets, self._on_targets_changed, settings)
+        self.process_watcher.start(self.scheduler)
+        if not self.process_watcher.running_targets:
+            self._enter_deep_idle()
+
+    def _on_targets_changed(self, running):
+        """Process watcher callback: sleep when the last target exits, wake when one starts."""
+        if running and self.deep_idle:
+            start = time.perf_counter()
+            self._exit_deep_idle()
+            self.metrics["wake_us_last"] = int((time.perf_counter() - start) * 1e6)
+        elif not running and not self.deep_idle:
+            self._enter_deep_idle()
+
+    def _enter_deep_idle(self):
+        with self._arm_lock:
+            if self.deep_idle or not self.running:
+                return
+            log.info("No target app running: entering deep idle")
+            self.deep_idle = True
+            self._stop_context_polling()
+            self._publish_snapshot(active=False, app=None, editing=False)
+            self.watchdog.stop()
+            if self.hook_host:
+                self._publish_table()
+            else:
+                self._remove_local_hooks()
+            self.metrics["deep_idle_entries"] += 1
+
+    def _exit_deep_idle(self):
+        with self._arm_lock:
+            if not self.deep_idle:
+                return
+            log.info("Target app started: leaving deep idle")
+            self.deep_idle = False
+            if self.hook_host:
+                self._publish_table()
+            else:
+                self.register_hotkeys()
+                if self.watchdog_enabled:
+                    self.watchdog.start(self.scheduler)
+            self._start_context_polling()
 
     def stop(self):
         """Stops listening and waits for threads to exit."""
         self.running = False
-        
+        self._stop_context_polling()
+
+        if self.process_watcher:
+            self.process_watcher.stop()
+        if self.profile_sync:
+            self.profile_sync.stop()
+        if self.telemetry:
+            self.telemetry.stop()
+        if self.profiler.running:
+            self.profiler.stop()
+        self.watchdog.stop()
+
+        if self.hook_host:
+            self.hook_host.stop()
+            self.hook_host = None
+
         # Unhook Global Inputs
-        keyboard.unhook_all()
-        if hasattr(self, '_mouse_hook'):
-            self._mouse_hook.stop()
-            del self._mouse_hook
+        self._remove_local_hooks()
 
-        # Wait for threads to finish (graceful shutdown)
-        if self._context_thread and self._context_thread.is_alive():
-            self._context_thread.join(timeout=1.0)
-            
-        if hasattr(self, '_zoom_thread') and self._zoom_thread.is_alive():
-            self._zoom_thread.join(timeout=1.0)
-            
-        self._context_thread = None
-        self._zoom_thread = None
+        # Wait for the scheduler thread to finish (graceful shutdown)
+        self.scheduler.stop()
+
+        if self.shadow:
+            # End of a shadow run: leave the report behind
+            self._finish_shadow_report()
 
     def register_hotkeys(self):
         """
@@ -164,115 +590,629 @@ class InputObserver:
         
         triggers = self.action_mapper.get_all_configured_triggers()
         self.registered_triggers = set(triggers.keys()) # Keep track of what we hooked
-        
-        need_mouse = False
-        for trigger_key, meta in triggers.items():
-            if 'wheel' in trigger_key:
-                need_mouse = True
+        self.keymap.compile(triggers.keys())
+
+        if self.hook_host:
+            # Hooks live in the hook process
+            self._publish_table()
+            return
+
+        self._install_hooks()
+
+    def _install_hooks(self):
+        self._compile_sequences()
+        # Passive listener on every key event: proves the keyboard hook is still delivering
+        if self._heartbeat_hook is None:
+            self._heartbeat_hook = keyboard.hook(self._on_key_event)
+        self._sync_armed()
+
+    def _sync_armed(self):
+        """
+        Arms the suppressing hooks when a target app is focused, disarms them otherwise.
+        While one of its text fields has focus only the mouse hook stays: typing never reaches Babel.
+        """
+        with self._arm_lock:
+            snapshot = self.snapshot
+            if not self.arm_on_focus or (snapshot.active and not snapshot.editing):
+                self._arm_hooks()
             else:
-                self._register_single_hotkey(trigger_key)
+                self._disarm_hooks(keep_mouse=snapshot.active)
+
+    def _arm_hooks(self):
+        if self.hooks_armed:
+            return
+        start = time.perf_counter()
+        need_mouse = any(is_mouse_trigger(trigger_key) for trigger_key in self.registered_triggers)
+        for chord in self._hooked_chords():
+            self._register_single_hotkey(chord)
+
+        if need_mouse:
+            self._ensure_mouse_hook()
+        self.hooks_armed = True
+        self._arm_generation += 1
+        self.metrics["arms"] += 1
+        self.metrics["arm_us_total"] += int((time.perf_counter() - start) * 1e6)
+
+    def _disarm_hooks(self, keep_mouse=False):
+        if not self.hooks_armed:
+            if not keep_mouse:
+                self._remove_mouse_hook() # Left in place while a text field had focus
+            return
+        start = time.perf_counter()
+        for chord in self._hooked_chords():
+            self._remove_single_hotkey(chord)
+        self.sequences.cancel()
+        self._remove_sequence_hook()
+        if not keep_mouse:
+            self._remove_mouse_hook()
+        self.hooks_armed = False
+        self._arm_generation += 1
+        self.metrics["disarms"] += 1
+        self.metrics["disarm_us_total"] += int((time.perf_counter() - start) * 1e6)
 
-        if need_mouse and not hasattr(self, '_mouse_hook'):
+    def _hooked_chords(self):
+        """Chords with a hotkey of their own while armed: plain triggers and the first strokes of sequences."""
+        chords = [t for t in self.registered_triggers if not is_mouse_trigger(t) and t not in self._sequence_claimed]
+        return chords + sorted(self._sequence_starts)
+
+    def _compile_sequences(self):
+        trie = SequenceTrie(self.registered_triggers, self.sequence_timeout, self.sequence_timeouts)
+        self.sequences.cancel()
+        self.sequences.trie = trie
+        self._sequence_starts = trie.starts()
+        self._sequence_plain = {normalize_chord(t): t for t in self.registered_triggers
+                                if not is_mouse_trigger(t) and not is_sequence(t)}
+        self._sequence_claimed = {t for t in self.registered_triggers
+                                  if is_sequence(t) or normalize_chord(t) in self._sequence_starts}
+
+    def _ensure_mouse_hook(self):
+        if not hasattr(self, '_mouse_hook'):
             from core.mouse_hook import LowLevelMouseHook
-            self._mouse_hook = LowLevelMouseHook(self._on_low_level_mouse)
+            monitor = self.watchdog.register("mouse", self._reinstall_mouse_hook)
+            self._mouse_hook = LowLevelMouseHook(self._on_low_level_mouse, monitor)
             self._mouse_hook.start()
-            print("Mouse hook started.")
+            log.info("Mouse hook started.")
+
+    def _remove_local_hooks(self):
+        keyboard.unhook_all()
+        self._live_hotkeys.clear()
+        self._heartbeat_hook = None
+        self.sequences.cancel()
+        self._sequence_hook = None
+        self.hooks_armed = False
+        self._remove_mouse_hook()
+
+    def _remove_mouse_hook(self):
+        if hasattr(self, '_mouse_hook'):
+            self._mouse_hook.stop()
+            del self._mouse_hook
+            self.watchdog.unregister("mouse")
+            # The button-up of a gesture in progress will never be seen: release its output now
+            self.gestures.cancel()
+
+    def _reinstall_keyboard_hook(self):
+        """Called by the watchdog when the keyboard hook stopped delivering events."""
+        keyboard.unhook_all()
+        self._live_hotkeys.clear()
+        self._heartbeat_hook = None
+        self.hooks_armed = False
+        # `keyboard` owns one OS hook per listener: a fresh listener installs a new one
+        if hasattr(keyboard, '_KeyboardListener'):
+            keyboard._listener = keyboard._KeyboardListener()
+        self.reload_profile()
+
+    def _reinstall_mouse_hook(self):
+        """Called by the watchdog when the mouse hook stopped delivering events."""
+        if hasattr(self, '_mouse_hook'):
+            self._mouse_hook.restart()
+
+    def reload_profile(self):
+        """
+        Re-registers hotkeys for the (new) active profile without stopping
+        the observer threads. Used by profile switches and config reloads.
+        """
+        with self._arm_lock:
+            try:
+                keyboard.unhook_all_hotkeys()
+            except Exception as e:
+                log.error("Failed to unhook hotkeys: %s", e)
+            self._live_hotkeys.clear()
+            self.hooks_armed = False
+            self.register_hotkeys()
+        self.injection_timings = TimingRegistry.from_definitions(self.config_manager.get_system_definitions())
+        if self.active_app_name:
+            self._update_mappings_for_context(self.active_app_name)
+        if self.shadow_report:
+            self.shadow_report.set_profile(self.config_manager.config.get("active_profile"))
+        self.metrics["profile_reloads"] += 1
+
+    def apply_settings_delta(self, action_names):
+        """
+        Applies an in-memory settings change to the touched actions only:
+        re-hooks the triggers that changed and patches the active lookup.
+        """
+        old_triggers, new_triggers = self.action_mapper.recompile_actions(action_names)
+        still_used = self.action_mapper.get_configured_trigger_keys()
+
+        if self.hook_host:
+            self.registered_triggers = set(still_used)
+            if self.active_app_name:
+                self._update_mappings_for_context(self.active_app_name) # publishes
+            else:
+                self._publish_table()
+            self.metrics["settings_deltas"] += 1
+            return
+
+        with self._arm_lock:
+            # Sequences share first-stroke hotkeys: re-hook everything around a change that touches them
+            touched = [t for t in list(old_triggers.values()) + list(new_triggers.values()) if t]
+            resequence = any(is_sequence(t) or normalize_chord(t) in self._sequence_starts for t in touched)
+            rehook = resequence and self.hooks_armed
+            if rehook:
+                self._disarm_hooks()
+            for trigger_key in set(old_triggers.values()):
+                if trigger_key and trigger_key not in still_used and trigger_key in self.registered_triggers:
+                    self.registered_triggers.discard(trigger_key)
+                    if self.hooks_armed and not is_mouse_trigger(trigger_key):
+                        self._remove_single_hotkey(trigger_key)
+
+            for trigger_key in set(new_triggers.values()):
+                if trigger_key and trigger_key not in self.registered_triggers:
+                    self.registered_triggers.add(trigger_key)
+                    if not self.hooks_armed:
+                        continue # Hooked by the next _arm_hooks()
+                    if is_mouse_trigger(trigger_key):
+                        self._ensure_mouse_hook()
+                    else:
+                        self._register_single_hotkey(trigger_key)
+            if resequence:
+                self._compile_sequences()
+            if rehook:
+                self._arm_hooks()
+
+        if self.active_app_name:
+            self._update_mappings_for_context(self.active_app_name)
+        self.metrics["settings_deltas"] += 1
+
+    def apply_fleet_changes(self, action_names, app_names):
+        """
+        Hot-applies a fleet sync update (core/profile_sync.py): the actions whose
+        resolved setting changed go through apply_settings_delta, changed app
+        entries re-publish the focused app's injection timing.
+        """
+        if action_names:
+            self.apply_settings_delta(action_names)
+        if app_names:
+            self.injection_timings = TimingRegistry.from_definitions(self.config_manager.get_system_definitions())
+            timing = self.injection_timings.get(self.snapshot.app, self._context_web)
+            if timing is not self.snapshot.timing:
+                self._publish_snapshot(timing=timing)
+                self._publish_table()
+        self.metrics["fleet_updates"] += 1
+
+    def get_status(self):
+        snapshot = self.snapshot
+        lookup = dict(snapshot.lookup)
+        return {
+            "running": self.running,
+            "context_id": snapshot.context_id,
+            "active_context": snapshot.active,
+            "text_entry": snapshot.editing,
+            "active_app": snapshot.app,
+            "active_profile": self.config_manager.config.get("active_profile"),
+            "web_app": self.web_listener.get_active_web_app(),
+            "registered_triggers": sorted(self.registered_triggers),
+            "mapping_lookup": lookup,
+            "mouse_hook": hasattr(self, '_mouse_hook'),
+            "hooks_armed": self.hooks_armed,
+            "deep_idle": self.deep_idle,
+            "shadow": self.shadow,
+        }
+
+    def get_metrics(self):
+        metrics = dict(self.metrics)
+        if metrics.get("injections"):
+            metrics["inject_us_avg"] = metrics["inject_us_total"] // metrics["injections"]
+        metrics["watchdog"] = self.watchdog.summary()
+        metrics["scheduler"] = self.scheduler.summary()
+        metrics["flight_recorder"] = self.flight.summary()
+        metrics["gesture_motion"] = self.gestures.summary()
+        metrics["tracing"] = self.tracer.summary()
+        metrics["profiler"] = self.profiler.summary()
+        metrics["bridge_text_entry_reports"] = self.web_listener.text_entry_reports
+        if self.hook_host:
+            metrics["hook_process"] = self.hook_host.summary()
+        if self.process_watcher:
+            metrics["lifecycle"] = self.process_watcher.summary()
+        if self.profile_sync:
+            metrics["sync"] = self.profile_sync.summary()
+        if self.telemetry:
+            metrics["telemetry"] = self.telemetry.summary()
+        if self.daemon:
+            metrics["daemon"] = self.daemon.summary()
+        metrics["deep_idle"] = self.deep_idle
+        try:
+            metrics["rss_bytes"] = psutil.Process().memory_info().rss
+        except Exception:
+            pass
+        return metrics
+
+    def dump_flight_recording(self, path=None):
+        """
+        Writes the flight recorder ring to `path` (default logs/flight-<time>.bfr).
+        With an isolated hook process, that process writes its own ring next to it.
+        """
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(str(self.config_manager.project_root), "logs", f"flight-{stamp}.bfr")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        count = self.flight.dump(path, {"process": "main", "profile": self.config_manager.config.get("active_profile")})
+        result = {"path": path, "records": count}
+        if self.hook_host:
+            hooks_path = path[:-len(".bfr")] + "-hooks.bfr" if path.endswith(".bfr") else path + "-hooks"
+            self.hook_host.dump_flight(hooks_path)
+            result["hook_process_path"] = hooks_path
+        log.info("Flight recording (%d records) written to %s", count, path)
+        return result
+
+    def set_tracing(self, enabled, path=None):
+        """
+        Starts or stops pipeline tracing (core/tracing.py). Stopping writes the
+        spans as Chrome trace-event JSON to `path` (default logs/trace-<time>.json)
+        and returns {"path", "spans", ...}; starting returns the tracer state.
+        """
+        tracer = self.tracer
+        if enabled:
+            if not tracer.enabled:
+                tracer.start(self.config_manager.config.get("tracing", {}).get("capacity"))
+                log.info("Tracing on (%d spans kept)", tracer.capacity)
+            return tracer.summary()
+        if not tracer.enabled and path is None:
+            return tracer.summary()
+        tracer.stop()
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(str(self.config_manager.project_root), "logs", f"trace-{stamp}.json")
+        spans = tracer.export(path, {"profile": self.config_manager.config.get("active_profile"),
+                                     "isolated_hooks": self.hook_host is not None})
+        log.info("Trace (%d spans) written to %s", spans, path)
+        return dict(tracer.summary(), path=path, spans=spans)
+
+    def start_profile(self, seconds=None, path=None, on_done=None):
+        """
+        Samples the stacks of all threads for `seconds` (default config "profiler")
+        into a collapsed-stack file, `path` or logs/profile-<time>.folded.
+        Returns at once; `on_done(result)` runs when the file is written.
+        """
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(str(self.config_manager.project_root), "logs", f"profile-{stamp}.folded")
+        seconds = seconds or self.profiler.seconds
+        if not self.profiler.start(path, seconds, on_done=on_done):
+            return dict(self.profiler.summary(), started=False)
+        log.info("Profiling all threads for %.1fs", seconds)
+        return {"started": True, "path": path, "seconds": seconds}
+
+    def set_shadow_mode(self, enabled):
+        """
+        Switches shadow mode on or off, re-hooking with or without suppression.
+        Switching it on starts a new ShadowReport; switching it off ends the
+        report and returns its summary (also written to logs/shadow-<time>.json).
+        """
+        with self._arm_lock:
+            if enabled == self.shadow:
+                return None
+            result = None
+            if enabled:
+                self.shadow_report = ShadowReport(self.config_manager.config.get("active_profile"))
+            else:
+                result = self._finish_shadow_report()
+            self.gestures.cancel() # A gesture held across the switch would be released by the other mode
+            self.gestures.shadow = enabled
+            self.shadow = enabled
+            log.info("Shadow mode %s", "on: observing only, nothing is suppressed or injected" if enabled else "off")
+            if self.hook_host:
+                self._publish_table()
+            elif self.hooks_armed:
+                # Hotkeys carry their suppress flag from registration
+                self._disarm_hooks()
+                self._arm_hooks()
+            self.metrics["shadow_switches"] += 1
+            return result
+
+    def get_shadow_report(self):
+        """Summary of the shadow run so far (None when shadow mode is off)."""
+        return self.shadow_report.summary() if self.shadow_report else None
+
+    def _finish_shadow_report(self):
+        report, self.shadow_report = self.shadow_report, None
+        if report is None:
+            return None
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(str(self.config_manager.project_root), "logs", f"shadow-{stamp}.json")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            summary = report.write(path)
+            summary["path"] = path
+            log.info("Shadow report written to %s", path)
+        except Exception as e:
+            log.error("Failed to write shadow report: %s", e)
+            summary = report.summary()
+        return summary
+
+    def get_idle_cost(self):
+        """CPU % and wakeups/s per component since the previous call (core/idle_cost.py)."""
+        snapshot = self.idle_monitor.sample()
+        snapshot["deep_idle"] = self.deep_idle
+        snapshot["hooks_armed"] = self.hooks_armed
+        return snapshot
 
     def _register_single_hotkey(self, trigger_key):
+        handler = self._timed_sequence_handler if trigger_key in self._sequence_starts else self._timed_hotkey_handler
         try:
              # Look up args=... carefully
-             keyboard.add_hotkey(trigger_key, self._handle_dynamic_hotkey, args=[trigger_key], suppress=True, trigger_on_release=False)
+             keyboard.add_hotkey(self.keymap.trigger(trigger_key), handler, args=[trigger_key], suppress=not self.shadow, trigger_on_release=False)
+             self._live_hotkeys.add(trigger_key)
         except Exception as e:
-             print(f"Failed to register hotkey {trigger_key}: {e}")
+             log.error("Failed to register hotkey %s: %s", trigger_key, e)
+
+    def _remove_single_hotkey(self, trigger_key):
+        self._live_hotkeys.discard(trigger_key)
+        try:
+            keyboard.remove_hotkey(self.keymap.trigger(trigger_key))
+        except Exception:
+            pass
 
     def _handle_dynamic_hotkey(self, trigger):
         """
         Runtime handler for keyboard hotkeys.
+        Returns None: the keyboard package lets the key through on a truthy return.
         """
-        current_time = time.time()
-        last_time = self.last_trigger_times.get(trigger, 0)
+        self._dispatch_hotkey(trigger)
+
+    def _dispatch_hotkey(self, trigger):
+        """Decides and acts on one hotkey press. Returns the flight recorder decision."""
+        start_ns = time.perf_counter_ns()
+        current_time = self.clock()
+        last_time = self.last_trigger_times.get(trigger, float("-inf"))
+        self.metrics["hotkeys"] += 1
+        # One snapshot for the whole decision: active flag and lookup always belong together
+        snapshot = self.snapshot
+        flags = (flight_recorder.FLAG_ARMED if self.hooks_armed else 0) | (flight_recorder.FLAG_DEEP_IDLE if self.deep_idle else 0)
+        if self.shadow:
+            flags |= flight_recorder.FLAG_SHADOW
         
         if (current_time - last_time) < self.debounce_interval:
              # Ignore (Machine Gun Prevention)
-             return
+             self.metrics["debounced"] += 1
+             cost_ns = time.perf_counter_ns() - start_ns
+             self.flight.record(flight_recorder.DEBOUNCED, trigger, snapshot.context_id, snapshot.app, None, flags, cost_ns)
+             if self.shadow:
+                 self.shadow_report.record(flight_recorder.DEBOUNCED, snapshot.app, trigger, None, cost_ns)
+             return flight_recorder.DEBOUNCED
              
         self.last_trigger_times[trigger] = current_time
 
         # 1. Check if we are in an active context
         # If not active, we still need to pass it through if we suppressed it!
-        if not self.is_active_context:
-            self._safe_inject(trigger)
-            return
+        if not snapshot.active:
+            self.metrics["passthrough_inactive"] += 1
+            cost_ns = time.perf_counter_ns() - start_ns
+            self.flight.record(flight_recorder.PASS_INACTIVE, trigger, snapshot.context_id, snapshot.app, None, flags, cost_ns)
+            if self.shadow:
+                # The key was never suppressed: nothing to pass through
+                self.shadow_report.record(flight_recorder.PASS_INACTIVE, snapshot.app, trigger, None, cost_ns)
+                return flight_recorder.PASS_INACTIVE
+            self._safe_inject(trigger, trigger, snapshot.context_id)
+            return flight_recorder.PASS_INACTIVE
+
+        # Typing in a text field (only reached with arm_on_focus off, or just before the disarm)
+        if snapshot.editing:
+            self.metrics["passthrough_editing"] += 1
+            cost_ns = time.perf_counter_ns() - start_ns
+            self.flight.record(flight_recorder.PASS_EDITING, trigger, snapshot.context_id, snapshot.app, None, flags, cost_ns)
+            if self.shadow:
+                self.shadow_report.record(flight_recorder.PASS_EDITING, snapshot.app, trigger, None, cost_ns)
+                return flight_recorder.PASS_EDITING
+            self._safe_inject(trigger, trigger, snapshot.context_id)
+            return flight_recorder.PASS_EDITING
 
         # 2. Look up the output for this trigger in the current context
-        output = None
-        with self.active_context_lock:
-            output = self.mapping_lookup.get(trigger)
+        output = snapshot.lookup.get(trigger)
             
         target = output if output else trigger
+        translated = output and output != trigger
+        self.metrics["translated" if translated else "passthrough_unmapped"] += 1
+        decision = flight_recorder.TRANSLATED if translated else flight_recorder.PASS_UNMAPPED
+        cost_ns = time.perf_counter_ns() - start_ns
+        self.flight.record(decision, trigger, snapshot.context_id, snapshot.app, output, flags, cost_ns)
+        if self.shadow:
+            self.shadow_report.record(decision, snapshot.app, trigger, output, cost_ns)
+            return decision
         
         # 3. Inject
-        self._safe_inject(target)
+        self._safe_inject(target, trigger, snapshot.context_id)
+        return decision
 
-    def _safe_inject(self, target):
+    def _safe_inject(self, target, trigger=None, context_id=0):
         """
         Injects the target command. 
         If target is one of our hooked triggers, we MUST unhook it temporarily 
         to avoid infinite loops (Hook -> Inject -> Hook).
         """
-        is_hooked = target in self.registered_triggers
-        
-        if is_hooked:
+        with self._arm_lock:
+            # Held off until the last injection of `target` in flight is done, re-hooked only if
+            # nothing re-armed or disarmed meanwhile (arming registers it again by itself)
+            generation = self._arm_generation
+            is_hooked = self.hooks_armed and (target in self._sequence_starts or
+                                              (target in self.registered_triggers and target not in self._sequence_claimed))
+            if is_hooked:
+                self._injecting[target] += 1
+                if target in self._live_hotkeys:
+                    self._remove_single_hotkey(target)
+
+        start = time.perf_counter()
+        if self.scheduler.running:
+            # Played on the scheduler: the hook thread doesn't wait out the step delays
             try:
-                keyboard.remove_hotkey(target)
-            except:
-                pass
-        
+                steps = self.injection_module.compile(target, self.snapshot.timing)
+            except Exception as e:
+                self._injection_done(target, is_hooked, start, e, trigger, context_id, generation)
+                return
+            self.macros.play(steps, lambda error: self._injection_done(target, is_hooked, start, error, trigger, context_id,
+                                                                      generation))
+            return
+
         # Inject
+        error = None
         try:
-            self.injection_module.inject(target)
+            self.injection_module.inject(target, self.snapshot.timing)
         except Exception as e:
-            print(f"Injection error: {e}")
+            error = e
+        self._injection_done(target, is_hooked, start, error, trigger, context_id, generation)
+
+    def _injection_done(self, target, is_hooked, start, error, trigger=None, context_id=0, generation=0):
+        if error is not None:
+            self.metrics["injection_errors"] += 1
+            log.error("Injection error: %s", error)
+            self.injection_module.fallback(target)
+        elapsed_us = int((time.perf_counter() - start) * 1e6)
+        self.metrics["injections"] += 1
+        self.metrics["inject_us_total"] += elapsed_us
+        if elapsed_us > self.metrics["inject_us_max"]:
+            self.metrics["inject_us_max"] = elapsed_us
+        self.flight.record(flight_recorder.INJECT_FAILED if error is not None else flight_recorder.INJECTED,
+                           trigger or target, context_id, None, target,
+                           flight_recorder.FLAG_ARMED if self.hooks_armed else 0, elapsed_us * 1000)
             
-        # Re-hook if needed
+        # Re-hook if needed (unless a focus change or reload re-armed or disarmed us meanwhile)
         if is_hooked:
-            # Short sleep to ensure OS processed the injection? 
-            # inject() already has sleeps, so usually fine.
-            self._register_single_hotkey(target)
+            with self._arm_lock:
+                self._injecting[target] -= 1
+                if self._injecting[target] > 0:
+                    return # Another injection of it is still playing
+                del self._injecting[target]
+                if self.hooks_armed and generation == self._arm_generation and target not in self._live_hotkeys:
+                    self._register_single_hotkey(target)
+
+    # --- Multi-stroke triggers: a prefix is live between its first stroke and a match, a miss or the timeout ---
+
+    def _on_sequence_start(self, stroke):
+        """Hotkey of a sequence's first stroke."""
+        if self.sequences.live:
+            return # Shadow mode (nothing suppressed): the live key hook already took this key
+        snapshot = self.snapshot
+        if not snapshot.active or snapshot.editing:
+            # Outside target apps (or typing in one) nothing is buffered: straight through, like any trigger
+            self._handle_dynamic_hotkey(self._sequence_plain.get(stroke, stroke))
+            return
+        if self.sequences.start(stroke):
+            self.metrics["sequence_prefixes"] += 1
+            self.flight.record(flight_recorder.SEQUENCE_PREFIX, stroke, snapshot.context_id, snapshot.app, None,
+                               flight_recorder.FLAG_SHADOW if self.shadow else flight_recorder.FLAG_ARMED)
+            if self._sequence_hook is None:
+                self._sequence_hook = keyboard.hook(self._on_sequence_key, suppress=not self.shadow)
+
+    def _on_sequence_key(self, event):
+        """Blocking key hook, installed only while a prefix is live. Returns False to suppress the key."""
+        name = (event.name or "").lower()
+        if event.event_type == "up":
+            if name in self._sequence_swallowed:
+                self._sequence_swallowed.discard(name)
+                return self.shadow
+            return True
+        if name in MODIFIER_NAMES or not self.sequences.live:
+            return True
+        stroke = normalize_chord("+".join([m for m in MODIFIERS if keyboard.is_pressed(m)] + [name]))
+        if not self.sequences.feed(stroke) or self.shadow:
+            return True
+        # Consumed: continued the prefix, completed it, or broke it and is replayed after it
+        self._sequence_swallowed.add(name)
+        return False
+
+    def _on_sequence_match(self, trigger, strokes):
+        self._sequence_ended()
+        snapshot = self.snapshot
+        if snapshot.active and trigger in snapshot.lookup:
+            self.metrics["sequences_matched"] += 1
+            self._handle_dynamic_hotkey(trigger)
+        else:
+            # No rule for it in this app: the user typed plain keys after all
+            self._sequence_replay(strokes)
+
+    def _on_sequence_fail(self, trigger, strokes, extra):
+        self._sequence_ended()
+        if trigger is not None:
+            # The buffered strokes are a trigger of their own ("alt+l" next to "alt+l, u")
+            self._handle_dynamic_hotkey(trigger)
+        else:
+            self._sequence_replay(strokes)
+        if extra is not None and not self.shadow:
+            # The key that broke the prefix was suppressed too: it goes after the replay
+            plain = self._sequence_plain.get(extra)
+            if plain is not None and plain in self.registered_triggers:
+                self._handle_dynamic_hotkey(plain)
+            else:
+                self._sequence_replay((extra,))
+
+    def _sequence_replay(self, strokes):
+        """Sends buffered strokes on unchanged, in order (injections play FIFO)."""
+        snapshot = self.snapshot
+        self.metrics["sequences_replayed"] += 1
+        flags = flight_recorder.FLAG_SHADOW if self.shadow else flight_recorder.FLAG_ARMED
+        self.flight.record(flight_recorder.SEQUENCE_REPLAYED, SEPARATOR.join(strokes), snapshot.context_id,
+                           snapshot.app, None, flags)
+        if self.shadow:
+            self.shadow_report.record(flight_recorder.SEQUENCE_REPLAYED, snapshot.app, SEPARATOR.join(strokes))
+            return
+        for stroke in strokes:
+            self._safe_inject(stroke, stroke, snapshot.context_id)
+
+    def _sequence_ended(self):
+        if not self.sequences.live and self._sequence_hook is not None:
+            # Not from inside the hook callback that is running right now
+            self.scheduler.call_soon(self._remove_sequence_hook)
+
+    def _remove_sequence_hook(self):
+        hook = self._sequence_hook
+        if hook is None or self.sequences.live:
+            return
+        self._sequence_hook = None
+        try:
+            keyboard.unhook(hook)
+        except Exception:
+            pass
 
     def _on_low_level_mouse(self, event_info):
         from core.mouse_hook import WM_MOUSEWHEEL, WM_MOUSEHWHEEL
-        
+        if self._context_resting:
+            self._wake_context_polling()
+
         if event_info['msg'] != WM_MOUSEWHEEL and event_info['msg'] != WM_MOUSEHWHEEL:
-             return True
+            # Moves and buttons: gesture table of the active context. Releases and drag motion of
+            # a gesture already held are handled even if the context changed since it began.
+            try:
+                snapshot = self.snapshot
+                return self.gestures.handle(event_info, snapshot.gestures if snapshot.active else None)
+            except Exception as e:
+                log.error("CRITICAL ERROR IN MOUSE HOOK: %s", e)
+                return True
 
         try:
-            if not self.is_active_context:
+            start_ns = time.perf_counter_ns()
+            snapshot = self.snapshot
+            if not snapshot.active:
                 return True 
             
-            # Identify active wheel rule from lookup
-            wheel_rule_trigger = None
-            wheel_rule_output = None
-            
-            with self.active_context_lock:
-                # Find any trigger in lookup that contains 'wheel'
-                # Optimization: Could cache the wheel rule separately
-                for trig, out in self.mapping_lookup.items():
-                    if 'wheel' in trig:
-                        wheel_rule_trigger = trig
-                        wheel_rule_output = out
-                        break
-            
-            if not wheel_rule_trigger:
+            # Wheel rule of the active context, parsed when the snapshot was built:
+            # e.g. "ctrl+wheel" -> "alt+wheel" is ('ctrl', 'alt')
+            wheel_rule = snapshot.wheel_rule
+            if wheel_rule is None:
                 return True
-
-            # Parse rule: e.g. "ctrl+wheel" -> "alt+wheel"
-            trigger_mod = wheel_rule_trigger.replace('+wheel', '').strip().lower()
-            output_mod = wheel_rule_output.replace('+wheel', '').strip().lower()
+            trigger_mod, output_mod = wheel_rule
             
             # ZOOM HYBRID LOGIC
-            import ctypes
-            user32 = ctypes.windll.user32
+            user32 = windll.user32
             
             def is_mod_pressed(mod_name):
                 if mod_name == 'ctrl': return (user32.GetAsyncKeyState(0x11) & 0x8000) != 0
@@ -283,76 +1223,117 @@ class InputObserver:
             trigger_pressed = is_mod_pressed(trigger_mod)
             output_pressed = is_mod_pressed(output_mod)
             
-            current_time = time.time()
-            is_sticky = (current_time - self.last_ctrl_wheel_time) < 1.0 
+            current_time = self.clock()
+            is_sticky = (current_time - self.last_ctrl_wheel_time) < self.zoom_sticky_timeout
 
-            if (trigger_pressed or is_sticky or self.zoom_active):
+            if (trigger_pressed or is_sticky or self.zoom_phase is not None):
                 self.last_ctrl_wheel_time = current_time
                 
                 if output_pressed:
                     return True
+                elif self.shadow:
+                    # Observe only: the wheel step goes through untouched, no gesture starts
+                    cost_ns = time.perf_counter_ns() - start_ns
+                    self.flight.record(flight_recorder.WHEEL_SUPPRESSED, "wheel", snapshot.context_id, snapshot.app,
+                                       output_mod, flight_recorder.FLAG_ARMED | flight_recorder.FLAG_SHADOW, cost_ns)
+                    self.shadow_report.record(flight_recorder.WHEEL_SUPPRESSED, snapshot.app, trigger_mod + "+wheel",
+                                              output_mod + "+wheel", cost_ns)
+                    return True
                 else:
+                    self.metrics["wheel_suppressed"] += 1
+                    self.flight.record(flight_recorder.WHEEL_SUPPRESSED, "wheel", snapshot.context_id, snapshot.app,
+                                       output_mod, flight_recorder.FLAG_ARMED)
+                    begin = False
                     with self.zoom_lock:
                         self.zoom_buffer += event_info['delta']
-                        self.zoom_active = True 
-                        self.zoom_trigger_key = trigger_mod
-                        self.zoom_output_key = output_mod
+                        if self.zoom_phase is None:
+                            self.zoom_phase = "starting"
+                            self.zoom_rule = wheel_rule
+                            begin = True
+                        elif self.zoom_phase == "held" and self._zoom_flush_timer is None:
+                            self._zoom_flush_timer = self.scheduler.call_soon(self._zoom_flush)
+                    if begin:
+                        self.scheduler.call_soon(self._zoom_begin)
                     return False 
             
             return True 
             
         except Exception as e:
-            print(f"CRITICAL ERROR IN MOUSE HOOK: {e}")
+            log.error("CRITICAL ERROR IN MOUSE HOOK: %s", e)
             return True
 
-    def _zoom_worker(self):
-        """
-        Runs continuously. Checks for active zoom state.
-        """
-        import mouse
-        import ctypes
-        user32 = ctypes.windll.user32
+    # --- Mouse button gestures (core/gestures.py) ---
+
+    def _gesture_send(self, rule):
+        """Keyboard output of a button gesture, e.g. 'xbutton1' -> 'ctrl+z' (scheduler thread)."""
+        self._safe_inject(rule.chord, rule.trigger, self.snapshot.context_id)
+
+    def _on_gesture_decision(self, rule, begin, cost_ns):
+        snapshot = self.snapshot
+        decision = flight_recorder.GESTURE_BEGIN if begin else flight_recorder.GESTURE_END
+        flags = flight_recorder.FLAG_ARMED | (flight_recorder.FLAG_SHADOW if self.shadow else 0)
+        self.metrics["gestures" if begin else "gestures_ended"] += 1
+        self.flight.record(decision, rule.trigger, snapshot.context_id, snapshot.app, rule.output, flags, cost_ns)
+        report = self.shadow_report
+        if report is not None and begin:
+            report.record(decision, snapshot.app, rule.trigger, rule.output, cost_ns)
+
+    # --- Zoom gesture: a chain of scheduler timers, nothing runs between wheel events ---
+
+    def _zoom_begin(self):
+        """First wheel step of a gesture: swap the trigger modifier for the output one."""
+        trigger, output = self.zoom_rule or ('ctrl', 'alt')
+        self._zoom_keys = (trigger, output)
+        self.flight.record(flight_recorder.ZOOM_BEGIN, trigger + "+wheel", self.snapshot.context_id, None, output)
+        self.injection_module.release_key(trigger)
+        self.scheduler.call_later(0.02, self._zoom_hold)
+
+    def _zoom_hold(self):
+        self.injection_module.press_key(self._zoom_keys[1])
+        self.scheduler.call_later(0.02, self._zoom_flush, True)
+
+    def _zoom_flush(self, first=False):
+        """Replays the buffered wheel delta. Wheel events coalesce until this runs."""
+        from core.backend import mouse
+        with self.zoom_lock:
+            delta_to_apply = self.zoom_buffer
+            self.zoom_buffer = 0
+            self.zoom_phase = "held"
+            self._zoom_flush_timer = None
+        if delta_to_apply != 0:
+            steps = delta_to_apply / 120.0
+            mouse.wheel(steps) 
+        if first:
+            self.scheduler.call_at(self.last_ctrl_wheel_time + self.zoom_sticky_timeout, self._zoom_check_idle)
+
+    def _zoom_check_idle(self):
+        # Re-armed lazily: wheel events only bump last_ctrl_wheel_time, they never touch this timer
+        deadline = self.last_ctrl_wheel_time + self.zoom_sticky_timeout
+        if self.clock() < deadline:
+            self.scheduler.call_at(deadline, self._zoom_check_idle)
+            return
+        with self.zoom_lock:
+            self.zoom_phase = "ending"
+            if self._zoom_flush_timer is not None:
+                self._zoom_flush_timer.cancel()
+                self._zoom_flush_timer = None
+        self.injection_module.release_key(self._zoom_keys[1])
+        self.scheduler.call_later(0.02, self._zoom_end)
+
+    def _zoom_end(self):
+        user32 = windll.user32
+        trigger = self._zoom_keys[0]
+        trigger_vk = 0x11
+        if trigger == 'alt': trigger_vk = 0x12
+        if trigger == 'shift': trigger_vk = 0x10
+
+        if (user32.GetAsyncKeyState(trigger_vk) & 0x8000) != 0:
+            self.injection_module.press_key(trigger)
+        else:
+            self.injection_module.release_key(trigger)
         
-        while self.running:
-            if not self.zoom_active:
-                time.sleep(0.01)
-                continue
-                
-            trigger = getattr(self, 'zoom_trigger_key', 'ctrl')
-            output = getattr(self, 'zoom_output_key', 'alt')
-            
-            keyboard.release(trigger)
-            time.sleep(0.02)
-            keyboard.press(output)
-            time.sleep(0.02)
-            
-            trigger_vk = 0x11
-            if trigger == 'alt': trigger_vk = 0x12
-            if trigger == 'shift': trigger_vk = 0x10
-
-            while self.running:
-                delta_to_apply = 0
-                with self.zoom_lock:
-                    delta_to_apply = self.zoom_buffer
-                    self.zoom_buffer = 0
-                
-                if delta_to_apply != 0:
-                    steps = delta_to_apply / 120.0
-                    mouse.wheel(steps) 
-                
-                if delta_to_apply == 0 and (time.time() - self.last_ctrl_wheel_time) > 1.0:
-                    self.zoom_active = False
-                    break
-                
-                time.sleep(0.005) 
-            
-            keyboard.release(output)
-            time.sleep(0.02)
-            
-            if (user32.GetAsyncKeyState(trigger_vk) & 0x8000) != 0:
-                keyboard.press(trigger)
-            else:
-                keyboard.release(trigger)
-            
-            with self.zoom_lock:
-                self.zoom_buffer = 0
+        with self.zoom_lock:
+            self.zoom_buffer = 0
+            self.zoom_phase = None
+        self.metrics["zoom_gestures"] += 1
+        self.flight.record(flight_recorder.ZOOM_END, trigger + "+wheel", self.snapshot.context_id, None, self._zoom_keys[1])
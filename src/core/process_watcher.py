@@ -0,0 +1,209 @@
+import sys
+import threading
+import psutil
+from core.logger import get_logger
+
+log = get_logger("lifecycle")
+
+# Browsers host the web versions of the target apps (reported by babel_bridge)
+DEFAULT_BROWSERS = ["chrome", "msedge", "firefox", "brave", "opera", "vivaldi"]
+
+
+def process_key(name):
+    """Case-folded executable name without directory or ".exe": "C:\\...\\Photoshop.exe" -> "photoshop"."""
+    base = name.replace("\\", "/").rsplit("/", 1)[-1].casefold()
+    return base[:-4] if base.endswith(".exe") else base
+
+
+# WMI: NextEvent timed out (not an error, just nothing happened)
+WBEM_E_TIMED_OUT = -2147209215
+
+
+class ProcessWatcher:
+    """
+    Keeps the set of running target processes (design apps and browsers).
+
+    Windows: process start/stop notifications from WMI (Win32_ProcessTrace),
+    so a launch is seen as soon as it happens. Fallback (and elsewhere): an
+    incremental snapshot diff every `poll_interval` seconds; only PIDs that
+    appeared since the last snapshot get their name looked up. Given a
+    Scheduler, the snapshot backend is a periodic timer instead of a thread.
+
+    on_change(running) is called from the watcher (or scheduler) thread with the new
+    {pid: name} dict whenever the set of running targets changes.
+    """
+    def __init__(self, targets, on_change, poll_interval=1.0, use_events=True,
+                 list_pids=psutil.pids, process_name=None):
+        self.targets = frozenset(process_key(t) for t in targets)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.use_events = use_events and sys.platform == "win32"
+        self.list_pids = list_pids
+        self.process_name = process_name or (lambda pid: psutil.Process(pid).name())
+
+        self.running_targets = {} # pid -> name
+        self.backend = None
+        self.running = False
+        self._known_pids = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._timer = None
+        self._stop_event = threading.Event()
+
+        self.wakeups = 0
+        self.events = 0
+
+    @classmethod
+    def from_config(cls, targets, on_change, settings):
+        settings = settings or {}
+        return cls(
+            list(targets) + settings.get("browsers", DEFAULT_BROWSERS),
+            on_change,
+            poll_interval=float(settings.get("poll_interval_s", 1.0)),
+            use_events=settings.get("events", True),
+        )
+
+    def matches(self, name):
+        """Exact executable name: "Figma Helper.exe" or "notphotoshop" are not "figma" / "photoshop"."""
+        return process_key(name) in self.targets
+
+    def start(self, scheduler=None):
+        """Takes the initial snapshot synchronously, then watches in the background."""
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self.scan()
+        if scheduler is not None and not self.use_events:
+            self.backend = "snapshot"
+            self._timer = scheduler.every(self.poll_interval, self._poll)
+            return
+        target = self._run_events if self.use_events else self._run_snapshots
+        self._thread = threading.Thread(target=target, name="babel-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    # --- Notifications (event backend, or anything else that learns about a process) ---
+
+    def process_started(self, pid, name):
+        self.events += 1
+        if not self.matches(name):
+            return
+        with self._lock:
+            self._known_pids.add(pid)
+            changed = pid not in self.running_targets
+            self.running_targets[pid] = name
+            running = dict(self.running_targets)
+        if changed:
+            log.info("Target started: %s (pid %s)", name, pid)
+            self.on_change(running)
+
+    def process_exited(self, pid):
+        self.events += 1
+        with self._lock:
+            self._known_pids.discard(pid)
+            name = self.running_targets.pop(pid, None)
+            running = dict(self.running_targets)
+        if name is not None:
+            log.info("Target exited: %s (pid %s)", name, pid)
+            self.on_change(running)
+
+    # --- Snapshot backend ---
+
+    def scan(self):
+        """One incremental snapshot diff. Returns True if the running targets changed."""
+        pids = set(self.list_pids())
+        with self._lock:
+            started = pids - self._known_pids
+            exited = self._known_pids - pids
+            self._known_pids = pids
+            changed = False
+            for pid in exited:
+                if self.running_targets.pop(pid, None) is not None:
+                    changed = True
+            for pid in started:
+                try:
+                    name = self.process_name(pid)
+                except Exception:
+                    continue # Gone already, or not ours to inspect
+                if self.matches(name):
+                    self.running_targets[pid] = name
+                    changed = True
+            running = dict(self.running_targets)
+        if changed:
+            log.info("Running targets: %s", sorted(set(running.values())) or "none")
+            self.on_change(running)
+        return changed
+
+    def _run_snapshots(self):
+        self.backend = "snapshot"
+        while self.running:
+            if self._stop_event.wait(self.poll_interval):
+                break
+            self._poll()
+
+    def _poll(self):
+        self.wakeups += 1
+        try:
+            self.scan()
+        except Exception as e:
+            log.error("Process snapshot failed: %s", e)
+
+    # --- WMI event backend ---
+
+    def _run_events(self):
+        try:
+            import pythoncom
+            import pywintypes
+            import win32com.client
+            pythoncom.CoInitialize()
+            wmi = win32com.client.GetObject("winmgmts:")
+            # Parent class of Win32_ProcessStartTrace / Win32_ProcessStopTrace: one subscription for both
+            subscription = wmi.ExecNotificationQuery("SELECT * FROM Win32_ProcessTrace")
+        except Exception as e:
+            log.warning("Process notifications unavailable (%s), falling back to snapshots", e)
+            self._run_snapshots()
+            return
+
+        self.backend = "wmi"
+        # Catch up on anything that changed while we were subscribing
+        self.scan()
+        try:
+            while self.running:
+                try:
+                    # The timeout only exists so stop() is noticed
+                    event = subscription.NextEvent(1000)
+                except pywintypes.com_error as e:
+                    self.wakeups += 1
+                    if e.hresult == WBEM_E_TIMED_OUT:
+                        continue
+                    log.error("Process notification failed: %s. Falling back to snapshots", e)
+                    self._run_snapshots()
+                    return
+                self.wakeups += 1
+                kind = event.Path_.Class
+                if kind == "Win32_ProcessStartTrace":
+                    self.process_started(int(event.ProcessID), event.ProcessName)
+                elif kind == "Win32_ProcessStopTrace":
+                    self.process_exited(int(event.ProcessID))
+        finally:
+            pythoncom.CoUninitialize()
+
+    def summary(self):
+        with self._lock:
+            running = sorted(set(self.running_targets.values()))
+        return {
+            "backend": self.backend,
+            "running_targets": running,
+            "wakeups": self.wakeups,
+            "events": self.events,
+        }
@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from core.logger import get_logger
+
+log = get_logger("sync")
+
+
+class ProfileSyncClient:
+    """
+    Optional fleet sync: fetches profiles and the app registry from an HTTP
+    endpoint and lays them over the local config (ConfigManager.apply_fleet).
+
+    Protocol (GET <url>[?since=<version>], JSON):
+      - If-None-Match carries the ETag of the last applied version; an
+        unchanged fleet answers 304 with no body.
+      - With `since`, the server may answer with a delta against that version:
+          {"version": "v42", "base": "v41", "profiles": {name: profile or null}, "apps": {...}}
+        null removes an entry. Without `since` (or if the server can't diff),
+        the whole layer: {"version": "v42", "full": true, "profiles": {...}, "apps": {...}}
+      - A delta whose base isn't our version is dropped and the full layer refetched.
+      - gzip responses are accepted.
+
+    Every applied version goes to a local cache file first (temp file, fsync,
+    replace), so a restart uses the last fleet state without the network.
+    load_cache() is the only thing that runs at startup; fetching happens on
+    the "babel-sync" thread, every `interval_s`. An update is hot-applied:
+    on_applied(action_names, app_names) receives the actions whose resolved
+    setting changed in the active profile and the changed app entries (the
+    observer recompiles just those, like a control channel delta).
+
+    config "sync": {"url": "https://config.example/babel/fleet", "interval_s": 300, "timeout_s": 5,
+                    "cache": "cache/fleet.json"}
+    """
+    def __init__(self, config_manager, settings, on_applied=None):
+        self.config_manager = config_manager
+        self.url = settings["url"]
+        self.interval_s = settings.get("interval_s", 300)
+        self.timeout_s = settings.get("timeout_s", 5)
+        self.cache_path = os.path.join(str(config_manager.project_root), settings.get("cache", os.path.join("cache", "fleet.json")))
+        self.on_applied = on_applied
+        self.version = None
+        self.etag = None
+        self.layer = {"profiles": {}, "apps": {}}
+        self.running = False
+        self.wakeups = 0
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock() # One fetch at a time (thread, control channel "sync")
+        self.stats = {"requests": 0, "not_modified": 0, "full": 0, "delta": 0, "errors": 0,
+                      "bytes_in": 0, "applied": 0, "apply_ms_last": None, "apply_ms_max": 0.0, "last_error": None}
+
+    # --- Local cache ---
+
+    def load_cache(self, notify=False):
+        """Applies the cached fleet layer, if any. Local file only: safe at startup."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log.error("Fleet cache %s unreadable, ignoring it: %s", self.cache_path, e)
+            return False
+        self.version = cached.get("version")
+        self.etag = cached.get("etag")
+        self.layer = {"profiles": cached.get("profiles", {}), "apps": cached.get("apps", {})}
+        self._apply_layer(self.layer, full=True, notify=notify)
+        log.info("Fleet layer %s loaded from cache (%d profiles, %d apps)", self.version,
+                 len(self.layer["profiles"]), len(self.layer["apps"]))
+        return True
+
+    def _write_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "etag": self.etag, "profiles": self.layer["profiles"],
+                       "apps": self.layer["apps"]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cache_path) # Readers see the old file or the new one, never half of it
+
+    # --- Background thread ---
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="babel-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout_s + 1)
+
+    def _run(self):
+        while self.running:
+            self.wakeups += 1
+            self.fetch_once()
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+
+    # --- Fetch ---
+
+    def fetch_once(self):
+        """One conditional fetch. Returns "not_modified", "full", "delta" or "error"."""
+        with self._lock:
+            try:
+                return self._fetch(use_delta=True)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                log.warning("Fleet sync failed: %s", e)
+                return "error"
+
+    def _fetch(self, use_delta):
+        url = self.url
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        if self.version is not None:
+            headers["If-None-Match"] = self.etag or f'"{self.version}"'
+            if use_delta:
+                url += ("&" if "?" in url else "?") + urllib.parse.urlencode({"since": self.version})
+        self.stats["requests"] += 1
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout_s) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                encoding = response.headers.get("Content-Encoding")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self.stats["not_modified"] += 1
+                return "not_modified"
+            raise
+        received = time.perf_counter()
+        self.stats["bytes_in"] += len(body)
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        payload = json.loads(body)
+
+        full = bool(payload.get("full"))
+        if not full and payload.get("base") != self.version:
+            log.info("Fleet delta based on %s, we have %s: fetching the full layer", payload.get("base"), self.version)
+            return self._fetch(use_delta=False)
+
+        update = {"profiles": payload.get("profiles", {}), "apps": payload.get("apps", {})}
+        if full:
+            self.layer = {kind: dict(entries) for kind, entries in update.items()}
+        else:
+            for kind, entries in update.items():
+                for name, entry in entries.items():
+                    if entry is None:
+                        self.layer[kind].pop(name, None)
+                    else:
+                        self.layer[kind][name] = entry
+        self.version = payload.get("version")
+        self.etag = etag
+        self._write_cache()
+        self._apply_layer(update, full, notify=True)
+
+        elapsed_ms = (time.perf_counter() - received) * 1000
+        kind = "full" if full else "delta"
+        self.stats[kind] += 1
+        self.stats["applied"] += 1
+        self.stats["apply_ms_last"] = round(elapsed_ms, 3)
+        self.stats["apply_ms_max"] = round(max(self.stats["apply_ms_max"], elapsed_ms), 3)
+        log.info("Fleet layer %s applied (%s, %d bytes, %.1f ms)", self.version, kind, len(body), elapsed_ms)
+        return kind
+
+    def _apply_layer(self, update, full, notify):
+        config_manager = self.config_manager
+        before = dict(config_manager.get_user_profile().get("settings", {}))
+        changed = config_manager.apply_fleet(update, full=full)
+        after = config_manager.get_user_profile().get("settings", {})
+        actions = {name for name in set(before) | set(after) if before.get(name) != after.get(name)}
+        if notify and self.on_applied and (actions or changed["apps"]):
+            self.on_applied(actions, changed["apps"])
+        return actions
+
+    def summary(self):
+        return dict(self.stats, version=self.version, url=self.url, running=self.running)
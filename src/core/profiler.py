@@ -0,0 +1,155 @@
+import collections
+import os
+import sys
+import threading
+import time
+from core.logger import get_logger
+
+log = get_logger("profiler")
+
+# Leaf frames in these files are a thread blocked waiting (Event.wait, select, queue.get, ...)
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "socket.py", "socketserver.py", "base_events.py")
+
+
+def frame_label(code):
+    """Flame graph node for one function: name (file:first line)."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """
+    On-demand wall-clock sampling profiler for the running instance.
+
+    While a run is active, the "babel-profiler" thread wakes every `interval`
+    seconds, takes the current stack of every other thread
+    (sys._current_frames(): hooks, scheduler, context, WebSocket loop, tray,
+    ...) and counts identical stacks. At the end of the run (after `seconds`,
+    or stop()) the counts are written in collapsed-stack format, one
+    "thread;outer;...;inner count" line per stack, which flamegraph.pl,
+    speedscope and Perfetto read directly.
+
+    Nothing runs between runs: no thread, no hook and no sys.setprofile, so
+    an idle profiler costs nothing.
+
+    config "profiler": {"interval_ms": 5, "seconds": 10}
+    """
+    def __init__(self, interval=0.005, seconds=10.0):
+        self.interval = interval
+        self.seconds = seconds
+        self.running = False
+        self.last = None # Result of the previous run
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, settings):
+        return cls(float(settings.get("interval_ms", 5)) / 1000.0, float(settings.get("seconds", 10)))
+
+    def start(self, path, seconds=None, interval=None, on_done=None):
+        """
+        Starts a run writing to `path` and returns immediately. `on_done(result)`
+        is called from the profiler thread once the file is written.
+        Returns False if a run is already active.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="babel-profiler", daemon=True,
+                args=(path, float(seconds or self.seconds), float(interval or self.interval), on_done))
+            self._thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        """Ends the active run early (its samples are still written). Returns its result."""
+        thread = self._thread
+        self._stop.set()
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+        return self.last
+
+    def _run(self, path, seconds, interval, on_done):
+        own = threading.get_ident()
+        current_frames = sys._current_frames
+        clock = time.perf_counter
+        stacks = collections.Counter() # (thread ident, (code, ...) outermost first) -> samples
+        names = {}
+        samples = 0
+        sampling = 0.0
+        started = clock()
+        deadline = started + seconds
+        try:
+            while not self._stop.is_set():
+                tick = clock()
+                if tick >= deadline:
+                    break
+                for ident, frame in current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    stacks[(ident, tuple(reversed(stack)))] += 1
+                    if ident not in names:
+                        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                frame = None
+                samples += 1
+                sampling += clock() - tick
+                self._stop.wait(max(0.0, interval - (clock() - tick)))
+            elapsed = clock() - started
+            result = self._write(path, stacks, names, samples, elapsed, sampling, interval)
+        except Exception as e:
+            log.error("Profiler run failed: %s", e)
+            result = {"path": None, "error": str(e)}
+        self.last = result
+        self.running = False
+        if on_done:
+            on_done(result)
+
+    def _write(self, path, stacks, names, samples, elapsed, sampling, interval):
+        labels = {}
+        lines = collections.Counter()
+        threads = collections.Counter()
+        busy = collections.Counter() # Leaf function -> samples, threads blocked waiting excluded
+        idle = 0
+        for (ident, stack), count in stacks.items():
+            thread = names.get(ident, f"thread-{ident}").replace(";", ",").replace(" ", "_")
+            frames = []
+            for code in stack:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                frames.append(label)
+            lines[";".join([thread] + frames)] += count
+            threads[thread] += count
+            if stack and os.path.basename(stack[-1].co_filename) not in IDLE_FILES:
+                busy[frames[-1]] += count
+            else:
+                idle += count
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for line, count in sorted(lines.items()):
+                f.write(f"{line} {count}\n")
+        result = {
+            "path": path,
+            "samples": samples,
+            "seconds": round(elapsed, 3),
+            "rate_hz": round(samples / elapsed, 1) if elapsed else 0.0,
+            "interval_ms": interval * 1000.0,
+            "sample_us": round(sampling / samples * 1e6, 1) if samples else 0.0,
+            "stacks": len(lines),
+            "threads": dict(threads.most_common()),
+            "idle_samples": idle,
+            "top": [[label, count] for label, count in busy.most_common(10)],
+        }
+        log.info("Profile (%d samples, %d stacks) written to %s", samples, len(lines), path)
+        return result
+
+    def summary(self):
+        return {"running": self.running, "interval_ms": self.interval * 1000.0, "seconds": self.seconds,
+                "last": self.last}
@@ -0,0 +1,310 @@
+import threading
+import time
+from core import tracing
+from core.logger import get_logger
+
+log = get_logger("scheduler")
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS          # 64 slots per level
+SLOT_MASK = SLOTS - 1
+LEVELS = 4                      # 64^4 ticks: ~4.6 hours at 1 ms, later deadlines wait in `overflow`
+
+
+class Timer:
+    """Handle returned by Scheduler.call_at/call_later/every. cancel() is O(1) and idempotent."""
+    __slots__ = ("deadline", "expires", "callback", "args", "interval", "level", "slot", "scheduler", "cancelled")
+
+    def __init__(self, scheduler, deadline, callback, args, interval=None):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.expires = 0
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.level = None
+        self.slot = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel (Varghese & Lauck) with integer ticks.
+
+    A timer lives on the level of the highest 6-bit digit in which its expiry
+    tick differs from the current tick, in the slot named by that digit. So
+    every timer on level L expires after every timer on the levels below it,
+    and the earliest deadline is always in the first non-empty slot of the
+    lowest non-empty level. When the current tick enters a new block of level
+    L, that level's slot is cascaded (its timers move down). Insert and cancel
+    are O(1); slots are dicts so timers due on the same tick fire in insertion
+    order.
+
+    Not thread safe: Scheduler serialises access.
+    """
+    def __init__(self):
+        self.tick = 0
+        self.levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.counts = [0] * LEVELS
+        self.overflow = {}
+        self.size = 0
+
+    def insert(self, timer):
+        expires = timer.expires
+        if expires <= self.tick:
+            expires = timer.expires = self.tick + 1 # Due already: next tick
+        diff = expires ^ self.tick
+        level = (diff.bit_length() - 1) // SLOT_BITS
+        if level >= LEVELS:
+            timer.level = LEVELS
+            timer.slot = None
+            self.overflow[timer] = None
+        else:
+            slot = (expires >> (level * SLOT_BITS)) & SLOT_MASK
+            timer.level = level
+            timer.slot = slot
+            self.levels[level][slot][timer] = None
+            self.counts[level] += 1
+        self.size += 1
+
+    def remove(self, timer):
+        if timer.level is None:
+            return # Not scheduled (fired, cancelled or never inserted)
+        if timer.level == LEVELS:
+            present = self.overflow.pop(timer, 1) is None
+        else:
+            present = self.levels[timer.level][timer.slot].pop(timer, 1) is None
+            if present:
+                self.counts[timer.level] -= 1
+        if present:
+            self.size -= 1
+        timer.level = None
+
+    def advance(self, target, due):
+        """Moves the wheel to tick `target`, appending expired timers to `due`."""
+        while self.tick < target:
+            # Skip whole blocks when the lower levels are empty
+            lowest = 0
+            while lowest < LEVELS and self.counts[lowest] == 0:
+                lowest += 1
+            if lowest == 0:
+                # Next occupied slot of level 0, or the end of its block (cascade point)
+                level0 = self.levels[0]
+                next_tick = min(target, (self.tick | SLOT_MASK) + 1)
+                for tick in range(self.tick + 1, next_tick):
+                    if level0[tick & SLOT_MASK]:
+                        next_tick = tick
+                        break
+            else:
+                span = 1 << (SLOT_BITS * min(lowest, LEVELS))
+                next_tick = min(target, (self.tick | (span - 1)) + 1)
+            self.tick = next_tick
+            self._cascade()
+            if self.counts[0]:
+                slot = self.levels[0][self.tick & SLOT_MASK]
+                if slot:
+                    for timer in slot:
+                        timer.level = None
+                        due.append(timer)
+                    self.counts[0] -= len(slot)
+                    self.size -= len(slot)
+                    slot.clear()
+
+    def _cascade(self):
+        tick = self.tick
+        if tick & ((1 << (SLOT_BITS * LEVELS)) - 1) == 0 and self.overflow:
+            timers = list(self.overflow)
+            self.overflow.clear()
+            self.size -= len(timers)
+            for timer in timers:
+                self.insert(timer)
+        # Highest boundary first, so its timers can cascade further down right away
+        for level in range(LEVELS - 1, 0, -1):
+            if tick & ((1 << (SLOT_BITS * level)) - 1):
+                continue
+            slot = self.levels[level][(tick >> (SLOT_BITS * level)) & SLOT_MASK]
+            if not slot:
+                continue
+            timers = list(slot)
+            slot.clear()
+            self.counts[level] -= len(timers)
+            self.size -= len(timers)
+            for timer in timers:
+                self.insert(timer)
+
+    def next_expiry(self):
+        """Tick of the earliest pending timer (or the cascade that brings it closer), None if empty."""
+        tick = self.tick
+        for level in range(LEVELS):
+            if not self.counts[level]:
+                continue
+            shift = SLOT_BITS * level
+            current = (tick >> shift) & SLOT_MASK
+            for offset in range(1 if level == 0 else 0, SLOTS):
+                slot = self.levels[level][(current + offset) & SLOT_MASK]
+                if slot:
+                    return min(timer.expires for timer in slot)
+        if self.overflow:
+            span = 1 << (SLOT_BITS * LEVELS)
+            return (tick | (span - 1)) + 1
+        return None
+
+
+class ManualClock:
+    """Injectable clock for deterministic runs: time only moves when told to."""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.now
+
+
+class Scheduler:
+    """
+    One thread owning every deadline of the engine (context polling, zoom
+    gestures, injection steps, watchdog probes, sequence timeouts, ...).
+
+    The thread sleeps exactly until the next deadline, so with nothing
+    scheduled it never wakes. Callbacks run on the scheduler thread and must
+    be short; they may schedule or cancel timers.
+
+    `clock` is injectable. With a ManualClock, don't start() the thread: move
+    the clock and call advance() to fire whatever became due, deterministically.
+    """
+    def __init__(self, clock=time.monotonic, resolution=0.001):
+        self.clock = clock
+        self.resolution = resolution
+        self.origin = clock()
+        self.wheel = TimerWheel()
+        self.running = False
+
+        self.wakeups = 0
+        self.fired = 0
+        self._cond = threading.Condition()
+        self._sleep_until = None # Tick the thread is sleeping until (None: indefinitely)
+        self._thread = None
+        self.tracer = tracing.get_tracer() # Every callback is a span while tracing, with how late it fired
+
+    def _tick_at(self, when):
+        # Round up: a timer never fires before its deadline (give or take float error)
+        ticks = (when - self.origin) / self.resolution
+        tick = int(ticks)
+        return tick if ticks - tick < 1e-6 else tick + 1
+
+    def _now_tick(self):
+        return int((self.clock() - self.origin) / self.resolution)
+
+    # --- Scheduling API (any thread) ---
+
+    def call_at(self, deadline, callback, *args):
+        return self._add(Timer(self, deadline, callback, args))
+
+    def call_later(self, delay, callback, *args):
+        return self._add(Timer(self, self.clock() + delay, callback, args))
+
+    def call_soon(self, callback, *args):
+        return self._add(Timer(self, self.clock(), callback, args))
+
+    def every(self, interval, callback, *args, first=None):
+        """Runs callback every `interval` seconds (first run after `first`, default interval)."""
+        delay = interval if first is None else first
+        return self._add(Timer(self, self.clock() + delay, callback, args, interval))
+
+    def cancel(self, timer):
+        with self._cond:
+            timer.cancelled = True
+            self.wheel.remove(timer)
+
+    def _add(self, timer):
+        with self._cond:
+            timer.expires = self._tick_at(timer.deadline)
+            self.wheel.insert(timer)
+            # Only wake the thread if this deadline is earlier than what it sleeps for
+            if self.running and (self._sleep_until is None or timer.expires < self._sleep_until):
+                self._sleep_until = timer.expires
+                self._cond.notify()
+        return timer
+
+    # --- Driving ---
+
+    def advance(self, now=None):
+        """Fires every timer due at `now` (default: clock()). Returns the number fired."""
+        if now is None:
+            now = self.clock()
+        target = int((now - self.origin) / self.resolution)
+        fired = 0
+        while True:
+            due = []
+            with self._cond:
+                self.wheel.advance(target, due)
+            if not due:
+                return fired
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                fired += 1
+                self._run(timer)
+                if timer.interval is not None and not timer.cancelled:
+                    # Fixed rate; if we fell behind, continue from now instead of bursting
+                    timer.deadline = max(timer.deadline + timer.interval, now)
+                    self._add(timer)
+
+    def _run(self, timer):
+        self.fired += 1
+        tracer = self.tracer
+        start = None
+        if tracer.enabled:
+            late_ms = round((self.clock() - timer.deadline) * 1000, 3)
+            start = time.perf_counter()
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:
+            log.error("Scheduled callback %s failed: %s", getattr(timer.callback, "__name__", timer.callback), e)
+        if start is not None:
+            name = getattr(timer.callback, "__qualname__", None) or getattr(timer.callback, "__name__", "timer")
+            tracer.complete(name, "scheduler", start, None, {"late_ms": late_ms})
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="babel-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _loop(self):
+        while self.running:
+            self.advance()
+            with self._cond:
+                if not self.running:
+                    break
+                expiry = self.wheel.next_expiry()
+                self._sleep_until = expiry
+                if expiry is None:
+                    timeout = None
+                else:
+                    timeout = self.origin + expiry * self.resolution - self.clock()
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                    self.wakeups += 1
+                self._sleep_until = None
+
+    def pending(self):
+        return self.wheel.size
+
+    def summary(self):
+        return {"pending": self.wheel.size, "fired": self.fired, "wakeups": self.wakeups}
@@ -0,0 +1,179 @@
+import threading
+from core.keymap import MODIFIERS
+
+# "alt+l, u": strokes are separated by comma + space, so "ctrl+," stays a single chord
+SEPARATOR = ", "
+
+# Key names that are only ever held for another key: never a stroke of their own
+MODIFIER_NAMES = {"ctrl", "shift", "alt", "windows", "alt gr", "left ctrl", "right ctrl", "left shift",
+                  "right shift", "left alt", "right alt", "left windows", "right windows"}
+
+
+def is_sequence(trigger):
+    return SEPARATOR in trigger
+
+
+def normalize_chord(chord):
+    """'Shift+Ctrl+K' -> 'ctrl+shift+k': modifiers in one fixed order, so held keys and profile text compare equal."""
+    parts = [p.strip() for p in chord.lower().split('+') if p.strip()]
+    modifiers = [m for m in MODIFIERS if m in parts]
+    keys = [p for p in parts if p not in MODIFIERS]
+    return "+".join(modifiers + keys[-1:])
+
+
+def strokes_of(trigger):
+    return tuple(normalize_chord(stroke) for stroke in trigger.split(SEPARATOR))
+
+
+class _Node:
+    __slots__ = ("children", "trigger", "timeout")
+
+    def __init__(self):
+        self.children = {} # stroke -> _Node
+        self.trigger = None # Trigger key completed at this node (a plain trigger that is also a prefix)
+        self.timeout = 0.0 # Longest timeout of the sequences continuing below this node
+
+
+class SequenceTrie:
+    """
+    Multi-stroke triggers ("alt+l, u") compiled into a trie of strokes.
+
+    Plain triggers that are also the first stroke of a sequence end at an
+    inner node: they fire when the sequence fails. Each sequence can have
+    its own timeout (seconds between strokes); a node waits for the longest
+    one still reachable from it.
+    """
+    def __init__(self, triggers=(), default_timeout=1.0, timeouts=None):
+        self.root = _Node()
+        self.count = 0
+        timeouts = timeouts or {}
+        sequences = [t for t in triggers if is_sequence(t) and 'wheel' not in t]
+        for trigger in sequences:
+            self.add(trigger, timeouts.get(trigger, default_timeout))
+        # Plain triggers colliding with a first stroke have to go through the matcher too
+        for trigger in triggers:
+            if not is_sequence(trigger):
+                node = self.root.children.get(normalize_chord(trigger))
+                if node is not None:
+                    node.trigger = trigger
+
+    def add(self, trigger, timeout):
+        node = self.root
+        for stroke in strokes_of(trigger):
+            node = node.children.setdefault(stroke, _Node())
+            node.timeout = max(node.timeout, timeout)
+        node.trigger = trigger
+        self.count += 1
+
+    def starts(self):
+        """First strokes: the chords hooked as ordinary hotkeys."""
+        return set(self.root.children)
+
+
+class SequenceMatcher:
+    """
+    Incremental matcher over a SequenceTrie: its whole state is one node and
+    the strokes buffered on the way there, so each key costs one dict lookup
+    however many sequences exist.
+
+    start() is called by the first-stroke hotkey, feed() for every later
+    stroke while a prefix is live. Outcomes are reported outside the lock:
+      on_match(trigger, strokes)        - a sequence completed
+      on_fail(trigger, strokes, extra)  - no continuation (extra: the stroke that
+                                          broke it, None on timeout or when it
+                                          starts a new prefix); trigger is the plain
+                                          trigger ending at the node, if any
+    A scheduler timer per live prefix ends it after the node's timeout.
+    """
+    def __init__(self, trie, scheduler, on_match, on_fail):
+        self.trie = trie
+        self.scheduler = scheduler
+        self.on_match = on_match
+        self.on_fail = on_fail
+        self.node = None
+        self.buffer = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def live(self):
+        return self.node is not None
+
+    def start(self, stroke):
+        """First stroke (hotkey fired). Returns True when a prefix is now live."""
+        with self._lock:
+            if self.node is not None:
+                outcome = self._advance(stroke)
+            else:
+                node = self.trie.root.children.get(stroke)
+                if node is None:
+                    return False
+                self.node = node
+                self.buffer = [stroke]
+                self._rearm(node)
+                return True
+        self._report(outcome)
+        return self.node is not None
+
+    def feed(self, stroke):
+        """A later stroke. Returns False when no prefix was live (the stroke isn't ours)."""
+        with self._lock:
+            if self.node is None:
+                return False
+            outcome = self._advance(stroke)
+        self._report(outcome)
+        return True
+
+    def cancel(self):
+        """Drops a live prefix without reporting (hooks removed, profile reloaded)."""
+        with self._lock:
+            self._reset()
+
+    def _advance(self, stroke):
+        child = self.node.children.get(stroke)
+        if child is None:
+            restart = self.trie.root.children.get(stroke)
+            outcome = (self.on_fail, self.node.trigger, tuple(self.buffer), None if restart else stroke)
+            self._reset()
+            if restart is not None:
+                # The breaking stroke begins another sequence
+                self.node = restart
+                self.buffer = [stroke]
+                self._rearm(restart)
+            return outcome
+        self.buffer.append(stroke)
+        if not child.children:
+            outcome = (self.on_match, child.trigger, tuple(self.buffer))
+            self._reset()
+            return outcome
+        self.node = child
+        self._rearm(child)
+        return None
+
+    def _rearm(self, node):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.scheduler.call_later(node.timeout, self._expire, node)
+
+    def _reset(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.node = None
+        self.buffer = []
+
+    def _expire(self, node):
+        with self._lock:
+            if self.node is not node:
+                return # Advanced or reset while this timer was firing
+            outcome = (self.on_fail, self.node.trigger, tuple(self.buffer), None)
+            self._timer = None
+            self.node = None
+            self.buffer = []
+        self._report(outcome)
+
+    @staticmethod
+    def _report(outcome):
+        if outcome is not None:
+            callback, *args = outcome
+            callback(*args)
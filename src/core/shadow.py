@@ -0,0 +1,165 @@
+import collections
+import json
+import threading
+import time
+import psutil
+from core import flight_recorder
+
+
+def _bucket(ns):
+    """Histogram bucket of a cost: 4 buckets per power of two (~25% wide)."""
+    if ns < 4:
+        return max(ns, 0)
+    bits = ns.bit_length()
+    return bits * 4 + ((ns >> (bits - 3)) & 3)
+
+
+def _bucket_upper(index):
+    """Largest cost (ns) falling into bucket `index`."""
+    if index < 4:
+        return index
+    bits, sub = divmod(index, 4)
+    return ((5 + sub) << (bits - 3)) - 1
+
+
+class CostHistogram:
+    """Log-bucketed decision costs: constant memory however long shadow mode runs."""
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def to_dict(self):
+        """Compact JSON form (telemetry batches): sparse buckets only."""
+        return {"buckets": {str(index): count for index, count in self.counts.items()},
+                "count": self.count, "total_ns": self.total_ns, "max_ns": self.max_ns}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts.update({int(index): count for index, count in data["buckets"].items()})
+        histogram.count = data["count"]
+        histogram.total_ns = data["total_ns"]
+        histogram.max_ns = data["max_ns"]
+        return histogram
+
+    def percentile(self, pct):
+        """Upper bound (ns) of the bucket holding the pct-th percentile."""
+        if not self.count:
+            return 0
+        rank = self.count * pct / 100.0
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_ns / self.count / 1000, 2),
+            "p50_us": round(self.percentile(50) / 1000, 2),
+            "p99_us": round(self.percentile(99) / 1000, 2),
+            "max_us": round(self.max_ns / 1000, 2),
+        }
+
+
+class ShadowReport:
+    """
+    What Babel would have done while running in shadow mode.
+
+    In shadow mode the hooks never suppress or inject; the observer runs the
+    full decision pipeline on live input and hands each would-be decision to
+    record() instead. The report keeps counts per decision, per translated
+    (profile, app, trigger, output) and per unmapped trigger, a cost
+    histogram per decision and the process CPU time over the whole run, so
+    a profile can be checked against real usage and Babel's overhead
+    measured before anything is switched on for real.
+    """
+    def __init__(self, profile=None):
+        self.profile = profile
+        self.started = time.time()
+        self._started_perf = time.perf_counter()
+        self._process = psutil.Process()
+        self._cpu_start = self._cpu_seconds()
+        self.decisions = collections.Counter() # decision code -> count
+        self.translations = collections.Counter() # (profile, app, trigger, output) -> count
+        self.unmapped = collections.Counter() # (app, trigger) -> count: hooked, but no rule in that app
+        self.costs = collections.defaultdict(CostHistogram) # decision code -> histogram
+        self._lock = threading.Lock() # Keyboard and mouse hooks record from different threads
+
+    def _cpu_seconds(self):
+        try:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        except Exception:
+            return 0.0
+
+    def record(self, decision, app, trigger, output=None, cost_ns=0):
+        with self._lock:
+            self.decisions[decision] += 1
+            self.costs[decision].add(cost_ns)
+            if decision in (flight_recorder.TRANSLATED, flight_recorder.WHEEL_SUPPRESSED, flight_recorder.GESTURE_BEGIN):
+                self.translations[(self.profile, app, trigger, output)] += 1
+            elif decision == flight_recorder.PASS_UNMAPPED:
+                self.unmapped[(app, trigger)] += 1
+
+    def set_profile(self, profile):
+        """Later decisions belong to `profile` (profile switched while shadowing)."""
+        self.profile = profile
+
+    def summary(self):
+        """JSON-friendly report. Can be taken at any time; the run continues."""
+        names = flight_recorder.DECISION_NAMES
+        with self._lock:
+            duration = max(time.perf_counter() - self._started_perf, 1e-9)
+            cpu = max(self._cpu_seconds() - self._cpu_start, 0.0)
+            return {
+                "started": self.started,
+                "duration_s": round(duration, 3),
+                "profile": self.profile,
+                "events": sum(self.decisions.values()),
+                "cpu_pct": round(cpu / duration * 100.0, 3),
+                "decisions": {names.get(code, str(code)): count for code, count in sorted(self.decisions.items())},
+                "decision_cost": {names.get(code, str(code)): histogram.summary()
+                                  for code, histogram in sorted(self.costs.items())},
+                "would_translate": [
+                    {"profile": profile, "app": app, "trigger": trigger, "output": output, "count": count}
+                    for (profile, app, trigger, output), count in self.translations.most_common()],
+                "unmapped": [{"app": app, "trigger": trigger, "count": count}
+                             for (app, trigger), count in self.unmapped.most_common()],
+            }
+
+    def write(self, path):
+        summary = self.summary()
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=4)
+        return summary
+
+
+def format_summary(summary, top=5):
+    """A few lines for the tray notification and the CLI."""
+    lines = [f"{summary['events']} events in {summary['duration_s']:.1f}s, {summary['cpu_pct']:.2f}% CPU"]
+    for name, cost in summary["decision_cost"].items():
+        if cost["count"]:
+            lines.append(f"{name}: {cost['count']} (p50 {cost['p50_us']:.1f} us, p99 {cost['p99_us']:.1f} us)")
+    for entry in summary["would_translate"][:top]:
+        lines.append(f"{entry['app']}: {entry['trigger']} -> {entry['output']} x{entry['count']}")
+    return "\n".join(lines)
@@ -0,0 +1,417 @@
+"""
+Simulated platform backend.
+
+Stands in for the Windows-only pieces (`keyboard`, `mouse`, `win32gui`,
+`win32process`, `windll`, see core/backend.py) so the real engine code can
+run on Linux:
+hooks get installed, hotkeys fire, injections are recorded and faults
+(e.g. Windows silently removing a low-level hook) can be triggered on demand.
+
+Usage (before importing any core module):
+    from core import sim_backend
+    sim = sim_backend.install()
+    ...
+    sim.keyboard.tap("ctrl+d")
+    sim.drop_mouse_hook()
+"""
+import ctypes
+import ctypes.wintypes
+import itertools
+import os
+import queue
+import threading
+import time
+from core import backend
+
+WM_QUIT = 0x0012
+WM_MOUSEMOVE = 0x0200
+WH_MOUSE_LL = 14
+
+MODIFIER_VKS = {"ctrl": 0x11, "shift": 0x10, "alt": 0x12, "space": 0x20, "windows": 0x5B}
+LLMHF_INJECTED = 0x00000001
+_SCAN_CODES = {"ctrl": 29, "shift": 42, "alt": 56, "esc": 1, "space": 57, "f24": 118}
+
+
+class _SimListener:
+    """Mirrors keyboard._listener: replacing it models reinstalling the OS hook."""
+    def __init__(self):
+        self.alive = True
+
+
+def _tick():
+    """GetTickCount(): milliseconds, wrapping at 2**32."""
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+class SimulatedKeyboard:
+    """Implements the subset of the `keyboard` package API that Babel uses."""
+    _KeyboardListener = _SimListener
+
+    def __init__(self):
+        self._listener = _SimListener()
+        self.hotkeys = {}      # hotkey -> (callback, args)
+        self.suppressing = set() # hotkeys registered with suppress=True
+        self.raw_hooks = []    # callbacks receiving every key event
+        self.held = set()      # keys currently held down (physically or injected)
+        self.injected = []     # [('press'|'release'|'send', key)]
+        self.scan_names = {v: k for k, v in _SCAN_CODES.items()} # scan code -> name, for readable records
+        self.last_input = 0    # Tick of the last key event, hooked or not (GetLastInputInfo)
+        self.lock = threading.Lock()
+
+    # --- keyboard API ---
+
+    def parse_hotkey(self, hotkey):
+        # The real parser's rules: hotkey shapes keyboard mangles break here too
+        return backend.parse_hotkey(hotkey, self.key_to_scan_codes)
+
+    def add_hotkey(self, hotkey, callback, args=(), suppress=False, timeout=1, trigger_on_release=False):
+        with self.lock:
+            key = self._key(hotkey)
+            self.hotkeys[key] = (callback, tuple(args))
+            if suppress:
+                self.suppressing.add(key)
+            else:
+                self.suppressing.discard(key)
+        return hotkey
+
+    def remove_hotkey(self, hotkey):
+        with self.lock:
+            key = self._key(hotkey)
+            self.suppressing.discard(key)
+            if self.hotkeys.pop(key, None) is None:
+                raise KeyError(hotkey)
+
+    def unhook_all_hotkeys(self):
+        with self.lock:
+            self.hotkeys.clear()
+            self.suppressing.clear()
+
+    def unhook_all(self):
+        with self.lock:
+            self.hotkeys.clear()
+            self.suppressing.clear()
+            self.raw_hooks.clear()
+
+    def hook(self, callback, suppress=False, on_remove=None):
+        with self.lock:
+            self.raw_hooks.append(callback)
+        return callback
+
+    def unhook(self, callback):
+        with self.lock:
+            if callback in self.raw_hooks:
+                self.raw_hooks.remove(callback)
+
+    def press(self, key):
+        key = self.scan_names.get(key, key)
+        self.injected.append(("press", key))
+        self.held.add(key)
+        self._dispatch_raw(key, "down")
+
+    def release(self, key):
+        key = self.scan_names.get(key, key)
+        self.injected.append(("release", key))
+        self.held.discard(key)
+        self._dispatch_raw(key, "up")
+
+    def send(self, hotkey, do_press=True, do_release=True):
+        self.injected.append(("send", hotkey))
+        self._dispatch_raw(hotkey, "down")
+
+    def is_pressed(self, key):
+        return key in self.held
+
+    def key_to_scan_codes(self, key, error_if_missing=True):
+        if isinstance(key, int):
+            return (key,)
+        if isinstance(key, (list, tuple)):
+            return sum((self.key_to_scan_codes(k) for k in key), ())
+        key = str(key).lower()
+        if key in _SCAN_CODES:
+            return (_SCAN_CODES[key],)
+        # Stable fake scan codes for everything else
+        code = 1000 + sum(ord(c) * 31 ** i for i, c in enumerate(key)) % 100000
+        self.scan_names[code] = key
+        return (code,)
+
+    # --- Simulation helpers ---
+
+    def tap(self, hotkey):
+        """
+        Simulates the user pressing `hotkey`. Runs the registered callback
+        synchronously, like the suppressing hook thread would.
+        Returns True if a hotkey callback handled it.
+        """
+        self._dispatch_raw(hotkey, "down")
+        if not self._listener.alive:
+            return False
+        with self.lock:
+            entry = self.hotkeys.get(self._key(hotkey))
+        if entry is None:
+            return False
+        callback, args = entry
+        callback(*args)
+        return True
+
+    def drop_hook(self):
+        """Models Windows silently removing the keyboard hook (LowLevelHooksTimeout)."""
+        self._listener.alive = False
+
+    def reset_injected(self):
+        self.injected = []
+
+    def _dispatch_raw(self, name, event_type):
+        self.last_input = _tick()
+        if not self._listener.alive:
+            return
+        event = SimKeyEvent(name, event_type)
+        for callback in list(self.raw_hooks):
+            callback(event)
+
+    def _key(self, hotkey):
+        # Names and pre-parsed scan-code tuples (core/keymap.py) address the same hotkey
+        return self.parse_hotkey(hotkey)
+
+
+class SimKeyEvent:
+    __slots__ = ("name", "event_type", "scan_code", "time")
+
+    def __init__(self, name, event_type):
+        self.name = name
+        self.event_type = event_type
+        self.scan_code = 0
+        self.time = time.time()
+
+
+class SimulatedMouse:
+    """Implements the subset of the `mouse` package API that Babel uses."""
+    def __init__(self, system):
+        self.system = system
+        self.wheel_steps = []
+        self.moves = []   # [(x, y)] injected pointer moves
+        self.buttons = [] # [('press'|'release', button)] injected button events
+
+    def wheel(self, delta=1):
+        self.wheel_steps.append(delta)
+
+    def move(self, x, y, absolute=True, duration=0):
+        self.moves.append((x, y))
+        self.system.emit_mouse(WM_MOUSEMOVE, x=x, y=y, flags=LLMHF_INJECTED)
+
+    def press(self, button="left"):
+        self.buttons.append(("press", button))
+
+    def release(self, button="left"):
+        self.buttons.append(("release", button))
+
+
+class _SimUser32:
+    def __init__(self, system):
+        self.system = system
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    # Hooks
+    def SetWindowsHookExA(self, id_hook, proc, hmod, thread_id):
+        return self.system.install_mouse_hook(proc)
+
+    SetWindowsHookExW = SetWindowsHookExA
+
+    def UnhookWindowsHookEx(self, hook_id):
+        self.system.remove_mouse_hook(hook_id)
+        return 1
+
+    def CallNextHookEx(self, hook_id, n_code, w_param, l_param):
+        return 0
+
+    # Message loop
+    def _queue(self, thread_id):
+        with self._lock:
+            return self._queues.setdefault(thread_id, queue.Queue())
+
+    def GetMessageW(self, msg_ref, hwnd, msg_min, msg_max):
+        message = self._queue(self.system.current_thread_id()).get()
+        return 0 if message == WM_QUIT else 1
+
+    def PostThreadMessageW(self, thread_id, message, w_param, l_param):
+        self._queue(thread_id).put(message)
+        return 1
+
+    def TranslateMessage(self, msg_ref):
+        return 0
+
+    def DispatchMessageW(self, msg_ref):
+        return 0
+
+    # Input state / injection
+    def GetAsyncKeyState(self, vk):
+        for name, code in MODIFIER_VKS.items():
+            if code == vk and name in self.system.keyboard.held:
+                return 0x8000
+        return 0
+
+    def keybd_event(self, vk, scan, flags, extra):
+        self.system.keyboard.injected.append(("keybd_event", vk))
+
+    def mouse_event(self, flags, dx, dy, data, extra):
+        self.system.emit_mouse(WM_MOUSEMOVE, flags=LLMHF_INJECTED)
+
+    def GetForegroundWindow(self):
+        return self.system.foreground_hwnd
+
+    def GetLastInputInfo(self, info_ref):
+        info_ref._obj.dwTime = max(self.system.keyboard.last_input, self.system.last_mouse_input)
+        return 1
+
+
+class _SimKernel32:
+    def __init__(self, system):
+        self.system = system
+
+    def GetCurrentThreadId(self):
+        return self.system.current_thread_id()
+
+    def GetTickCount(self):
+        return _tick()
+
+
+class _SimShell32:
+    def IsUserAnAdmin(self):
+        return 1
+
+    def ShellExecuteW(self, *args):
+        return 42
+
+
+class _SimWinDLL:
+    def __init__(self, system):
+        self.user32 = _SimUser32(system)
+        self.kernel32 = _SimKernel32(system)
+        self.shell32 = _SimShell32()
+
+
+class _SimWin32Gui:
+    def __init__(self, system):
+        self.system = system
+
+    def GetForegroundWindow(self):
+        return self.system.foreground_hwnd
+
+    def GetGUIThreadInfo(self, thread_id):
+        # (flags, hwndActive, hwndFocus, hwndCapture, hwndMenuOwner, hwndMoveSize, hwndCaret, rcCaret)
+        system = self.system
+        focus = 2 if system.focus_class else 0
+        return (0, system.foreground_hwnd, focus, 0, 0, 0, system.caret_hwnd, (0, 0, 0, 0))
+
+    def GetClassName(self, hwnd):
+        return self.system.focus_class
+
+
+class _SimWin32Process:
+    def __init__(self, system):
+        self.system = system
+
+    def GetWindowThreadProcessId(self, hwnd):
+        return (1, self.system.foreground_pid)
+
+
+class SimulatedSystem:
+    """Owns the simulated devices and the installed low-level mouse hooks."""
+    def __init__(self):
+        self.keyboard = SimulatedKeyboard()
+        self.mouse = SimulatedMouse(self)
+        self.windll = _SimWinDLL(self)
+        self.win32gui = _SimWin32Gui(self)
+        self.win32process = _SimWin32Process(self)
+
+        self.foreground_hwnd = 1
+        self.foreground_pid = os.getpid()
+        self.focus_class = ""  # Window class of the focused control ("Edit": a text field)
+        self.caret_hwnd = 0     # Window owning the caret (0: none)
+
+        self.processes = {}     # pid -> executable name (see ProcessWatcher)
+        self._pids = itertools.count(50000)
+
+        self._mouse_hooks = {}  # hook_id -> proc
+        self.last_mouse_input = 0 # Tick of the last mouse event, hooked or not
+        self._hook_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start_process(self, name):
+        pid = next(self._pids)
+        self.processes[pid] = name
+        return pid
+
+    def exit_process(self, pid):
+        self.processes.pop(pid, None)
+
+    def list_pids(self):
+        return list(self.processes)
+
+    def process_name(self, pid):
+        return self.processes[pid]
+
+    def current_thread_id(self):
+        return threading.get_ident() & 0xFFFFFFFF
+
+    def install_mouse_hook(self, proc):
+        with self._lock:
+            hook_id = next(self._hook_ids)
+            self._mouse_hooks[hook_id] = proc
+        return hook_id
+
+    def remove_mouse_hook(self, hook_id):
+        with self._lock:
+            self._mouse_hooks.pop(hook_id, None)
+
+    def drop_mouse_hook(self):
+        """Models Windows silently removing every low-level mouse hook."""
+        with self._lock:
+            self._mouse_hooks.clear()
+
+    def mouse_hook_count(self):
+        return len(self._mouse_hooks)
+
+    def emit_mouse(self, msg, delta=0, x=0, y=0, flags=0):
+        """
+        Delivers a mouse event to the installed hooks, newest first (like the OS).
+        flags: MSLLHOOKSTRUCT flags (LLMHF_INJECTED for synthesised input).
+        Returns False if a hook blocked it.
+        """
+        from ctypes import pointer
+        from core.mouse_hook import MSLLHOOKSTRUCT
+
+        struct = MSLLHOOKSTRUCT()
+        struct.pt.x = x
+        struct.pt.y = y
+        struct.mouseData = (delta & 0xFFFF) << 16
+        struct.flags = flags
+        self.last_mouse_input = _tick()
+        with self._lock:
+            procs = list(reversed(list(self._mouse_hooks.values())))
+        for proc in procs:
+            if proc(0, msg, pointer(struct)):
+                return False
+        return True
+
+
+_system = None
+
+
+def install():
+    """
+    Makes the SimulatedSystem the platform core modules talk to
+    (core/backend.py) and returns it. Idempotent. Must run before core
+    modules that import the platform APIs.
+    """
+    global _system
+    if _system is not None:
+        return _system
+
+    _system = SimulatedSystem()
+    backend.use(_system)
+    return _system
+
+
+def get_system():
+    return _system
@@ -0,0 +1,400 @@
+import collections
+import gzip
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.request
+from core import flight_recorder
+from core.shadow import CostHistogram
+from core.logger import get_logger
+
+log = get_logger("telemetry")
+
+BATCH_VERSION = 1
+
+# Decisions counted as drops: the user pressed a trigger and nothing (or the fallback) happened
+DROP_DECISIONS = (flight_recorder.DEBOUNCED, flight_recorder.INJECT_FAILED)
+
+
+def _merge_counts(into, counts):
+    """Adds nested {key: int or {key: ...}} counters into `into`."""
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            _merge_counts(into.setdefault(key, {}), value)
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class UsageAggregator:
+    """
+    Turns flight recorder records into one telemetry batch: counters per
+    decision, action, context, drop and hook incident, and log-bucketed
+    latency histograms (core/shadow.py CostHistogram) per action and context.
+
+    Fed from the telemetry thread with records_since() slices of the ring,
+    so the hooks do no more than the flight record they already write.
+    """
+    def __init__(self, flight, action_of=None):
+        self.flight = flight
+        self.action_of = action_of or (lambda trigger: None) # trigger -> action name
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.records = 0
+        self.decisions = collections.Counter()
+        self.actions = collections.Counter()
+        self.contexts = collections.defaultdict(collections.Counter)
+        self.drops = collections.Counter()
+        self.incidents = collections.Counter()
+        self.histograms = {"decision_us": collections.defaultdict(CostHistogram),  # per action, hook decision cost
+                           "inject_us": collections.defaultdict(CostHistogram),    # per action, whole injection
+                           "context_us": collections.defaultdict(CostHistogram)}   # per app, every decision
+
+    def add(self, rows):
+        string = self.flight.string
+        names = flight_recorder.DECISION_NAMES
+        actions = {}
+        for _, _, _, event, app, rule, decision, _, cost_ns in rows:
+            name = names.get(decision, str(decision))
+            self.decisions[name] += 1
+            if decision in DROP_DECISIONS:
+                self.drops[name] += 1
+            if decision == flight_recorder.TRANSLATED or decision == flight_recorder.INJECTED:
+                action = actions.get(event)
+                if action is None:
+                    trigger = string(event)
+                    action = actions[event] = self.action_of(trigger) or trigger
+                if decision == flight_recorder.TRANSLATED:
+                    self.actions[action] += 1
+                    self.histograms["decision_us"][action].add(cost_ns)
+                else:
+                    self.histograms["inject_us"][action].add(cost_ns)
+            if app:
+                app_name = string(app)
+                self.contexts[app_name][name] += 1
+                self.histograms["context_us"][app_name].add(cost_ns)
+        self.records += len(rows)
+
+    def empty(self):
+        return not (self.records or self.drops or self.incidents)
+
+    def batch(self, client_id):
+        """The batch since the last reset, as a JSON-friendly dict."""
+        return {
+            "v": BATCH_VERSION,
+            "client": client_id,
+            "from": round(self.started, 3),
+            "to": round(time.time(), 3),
+            "records": self.records,
+            "counters": {
+                "decisions": dict(self.decisions),
+                "actions": dict(self.actions),
+                "contexts": {app: dict(counts) for app, counts in self.contexts.items()},
+                "drops": dict(self.drops),
+                "incidents": dict(self.incidents),
+            },
+            "histograms": {kind: {key: histogram.to_dict() for key, histogram in histograms.items()}
+                           for kind, histograms in self.histograms.items()},
+        }
+
+
+class Spool:
+    """
+    Append-only local spool of telemetry batches, one JSON line each.
+
+    Lines go to current.jsonl; past `max_file_bytes` it is sealed (renamed
+    to <time_ns>.jsonl) and a new one started. Sealed segments wait there
+    for the uploader. When they exceed `max_total_bytes` the oldest are
+    deleted and counted as dropped, so an unreachable collector costs a
+    bounded amount of disk.
+    """
+    def __init__(self, directory, max_file_bytes=256 * 1024, max_total_bytes=4 * 1024 * 1024):
+        self.directory = str(directory)
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.current_path = os.path.join(self.directory, "current.jsonl")
+        self.stats = {"batches": 0, "bytes": 0, "sealed": 0, "dropped_segments": 0, "dropped_bytes": 0}
+
+    def append(self, batch):
+        line = (json.dumps(batch, separators=(",", ":")) + "\n").encode("utf-8")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.current_path, "ab") as f:
+            f.write(line)
+            size = f.tell()
+        self.stats["batches"] += 1
+        self.stats["bytes"] += len(line)
+        if size >= self.max_file_bytes:
+            self.seal()
+
+    def seal(self):
+        """Closes the current segment (if it has data). Returns its sealed path or None."""
+        try:
+            if os.path.getsize(self.current_path) == 0:
+                return None
+        except FileNotFoundError:
+            return None
+        path = os.path.join(self.directory, f"{time.time_ns():020d}.jsonl")
+        os.replace(self.current_path, path)
+        self.stats["sealed"] += 1
+        self._enforce_cap()
+        return path
+
+    def sealed(self):
+        """Sealed segment paths, oldest first."""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(".jsonl") and name[0].isdigit())
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _enforce_cap(self):
+        segments = [(path, os.path.getsize(path)) for path in self.sealed()]
+        total = sum(size for _, size in segments)
+        for path, size in segments:
+            if total <= self.max_total_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.stats["dropped_segments"] += 1
+            self.stats["dropped_bytes"] += size
+            log.warning("Telemetry spool over %d bytes: dropped %s", self.max_total_bytes, os.path.basename(path))
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def pending_bytes(self):
+        total = 0
+        for path in self.sealed() + [self.current_path]:
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
+
+
+class Telemetry:
+    """
+    Fleet telemetry (config "telemetry"): every `flush_interval_s` the
+    "babel-telemetry" thread reads the flight records written since the
+    last flush, aggregates them (UsageAggregator) and appends one batch to
+    the local Spool. Every `upload_interval_s` (first upload at a random
+    point of the interval, so a fleet started together doesn't upload
+    together) it seals the spool and POSTs each segment, gzipped, to the
+    collector; a segment is deleted once the collector accepted it and
+    kept for the next round otherwise.
+
+    Nothing runs on hook threads: the hooks keep writing flight records and
+    this thread reads the ring behind them. Records overwritten before a
+    flush are counted as drops ("flight_lost"). With isolated hooks, the
+    decisions are recorded in the hook process and are not included.
+
+    config "telemetry": {"enabled": true, "collector": "https://telemetry.example/babel",
+                         "flush_interval_s": 60, "upload_interval_s": 3600,
+                         "spool_dir": "logs/telemetry", "max_file_kb": 256, "max_spool_kb": 4096}
+    """
+    def __init__(self, flight, spool, collector=None, client_id=None, flush_interval=60.0, upload_interval=3600.0,
+                 timeout=10.0, action_of=None, incidents=None):
+        self.flight = flight
+        self.spool = spool
+        self.collector = collector
+        self.client_id = client_id or socket.gethostname()
+        self.flush_interval = flush_interval
+        self.upload_interval = upload_interval
+        self.timeout = timeout
+        self.aggregator = UsageAggregator(flight, action_of)
+        self.incidents = incidents # -> [(time, hook, kind, detail)], e.g. the watchdog's incident log
+        self.running = False
+        self.wakeups = 0
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock() # Spool and stats: flush/upload from the thread, stop() and the control channel
+        self._upload_lock = threading.Lock() # One upload at a time; held across network round trips
+        self._next_seq = flight.summary()["written"] # Decisions from before telemetry started are not reported
+        self._last_incident = time.time()
+        self.stats = {"flushes": 0, "records": 0, "flight_lost": 0, "uploads": 0, "upload_errors": 0,
+                      "uploaded_batches": 0, "uploaded_bytes": 0, "raw_bytes": 0, "flush_us_last": 0,
+                      "last_error": None}
+
+    @classmethod
+    def from_config(cls, flight, settings, project_root, action_of=None, incidents=None):
+        directory = os.path.join(str(project_root), settings.get("spool_dir", os.path.join("logs", "telemetry")))
+        spool = Spool(directory, int(settings.get("max_file_kb", 256)) * 1024, int(settings.get("max_spool_kb", 4096)) * 1024)
+        return cls(flight, spool, settings.get("collector"), settings.get("client_id"),
+                   float(settings.get("flush_interval_s", 60)), float(settings.get("upload_interval_s", 3600)),
+                   float(settings.get("timeout_s", 10)), action_of, incidents)
+
+    # --- Thread ---
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="babel-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread and spools what was collected so far (no upload: exit must not wait on the network)."""
+        self.running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        now = time.monotonic()
+        next_flush = now + self.flush_interval
+        next_upload = now + random.uniform(0, self.upload_interval)
+        while self.running:
+            self._wake.wait(max(0.0, min(next_flush, next_upload) - time.monotonic()))
+            self._wake.clear()
+            if not self.running:
+                break
+            self.wakeups += 1
+            now = time.monotonic()
+            if now >= next_flush:
+                self.flush()
+                next_flush = now + self.flush_interval
+            if now >= next_upload:
+                if self.collector:
+                    self.upload()
+                next_upload = now + self.upload_interval
+
+    # --- Work ---
+
+    def flush(self):
+        """Aggregates the new flight records into a batch and spools it. Returns the batch or None."""
+        with self._lock:
+            start = time.perf_counter_ns()
+            aggregator = self.aggregator
+            rows, self._next_seq, lost = self.flight.records_since(self._next_seq)
+            aggregator.add(rows)
+            if lost:
+                aggregator.drops["flight_lost"] += lost
+                self.stats["flight_lost"] += lost
+            if self.incidents:
+                for at, _, kind, _ in self.incidents():
+                    if at > self._last_incident:
+                        aggregator.incidents[kind] += 1
+                        self._last_incident = at
+            if aggregator.empty():
+                return None
+            batch = aggregator.batch(self.client_id)
+            try:
+                self.spool.append(batch)
+            except OSError as e:
+                log.error("Telemetry spool write failed: %s", e)
+                return None
+            finally:
+                aggregator.reset()
+            self.stats["flushes"] += 1
+            self.stats["records"] += len(rows)
+            self.stats["flush_us_last"] = (time.perf_counter_ns() - start) // 1000
+            return batch
+
+    def upload(self):
+        """
+        Seals the spool and sends every segment, oldest first. Returns the
+        number of segments sent. The network round trips run outside the
+        lock, so flush() (and stop()) never wait on the collector.
+        """
+        with self._upload_lock:
+            with self._lock:
+                self.spool.seal()
+                segments = self.spool.sealed()
+            sent = 0
+            for index, path in enumerate(segments):
+                try:
+                    with open(path, "rb") as f:
+                        raw = f.read()
+                except FileNotFoundError:
+                    continue # Dropped by the spool cap meanwhile
+                body = gzip.compress(raw)
+                request = urllib.request.Request(self.collector, data=body, method="POST", headers={
+                    "Content-Type": "application/x-ndjson", "Content-Encoding": "gzip", "X-Babel-Client": self.client_id})
+                try:
+                    with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                        response.read()
+                except Exception as e:
+                    with self._lock:
+                        self.stats["upload_errors"] += 1
+                        self.stats["last_error"] = str(e)
+                    log.warning("Telemetry upload failed, keeping %d segments: %s", len(segments) - index, e)
+                    break
+                with self._lock:
+                    self.spool.remove(path)
+                    sent += 1
+                    self.stats["uploaded_batches"] += raw.count(b"\n")
+                    self.stats["uploaded_bytes"] += len(body)
+                    self.stats["raw_bytes"] += len(raw)
+            with self._lock:
+                self.stats["uploads"] += 1
+            return sent
+
+    def summary(self):
+        return dict(self.stats, collector=self.collector, client=self.client_id, spool=dict(self.spool.stats),
+                    pending_bytes=self.spool.pending_bytes(), running=self.running)
+
+
+class Aggregate:
+    """
+    Collector side: merges batches from any number of clients. Counters add
+    up; histograms merge bucket by bucket, so fleet percentiles come out the
+    same as if every sample had been recorded on one machine.
+    """
+    def __init__(self):
+        self.clients = set()
+        self.batches = 0
+        self.records = 0
+        self.rejected = 0
+        self.counters = {}
+        self.histograms = collections.defaultdict(lambda: collections.defaultdict(CostHistogram))
+        self._lock = threading.Lock()
+
+    def add(self, batch):
+        if batch.get("v") != BATCH_VERSION:
+            self.rejected += 1
+            return
+        histograms = {kind: {key: CostHistogram.from_dict(data) for key, data in entries.items()}
+                      for kind, entries in batch.get("histograms", {}).items()}
+        with self._lock:
+            self.clients.add(batch.get("client"))
+            self.batches += 1
+            self.records += batch.get("records", 0)
+            _merge_counts(self.counters, batch.get("counters", {}))
+            for kind, entries in histograms.items():
+                for key, histogram in entries.items():
+                    self.histograms[kind][key].merge(histogram)
+
+    def add_lines(self, data):
+        """Adds every batch of an uploaded segment (bytes, one JSON batch per line). Returns the count."""
+        added = 0
+        for line in data.splitlines():
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                self.rejected += 1 # Torn last line of a segment
+                continue
+            self.add(batch)
+            added += 1
+        return added
+
+    def summary(self, top=10):
+        with self._lock:
+            return {
+                "clients": len(self.clients),
+                "batches": self.batches,
+                "records": self.records,
+                "rejected": self.rejected,
+                "counters": self.counters,
+                "latency": {kind: {key: histogram.summary() for key, histogram in
+                                   sorted(entries.items(), key=lambda item: -item[1].count)[:top]}
+                            for kind, entries in self.histograms.items()},
+            }
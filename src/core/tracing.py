@@ -0,0 +1,133 @@
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+
+def _noop(*args):
+    """Bound in place of the span recorders while tracing is off."""
+    pass
+
+
+class Tracer:
+    """
+    Opt-in pipeline tracing, each span tagged with the thread that ran it:
+    hook callbacks (HookMonitor.timed), every scheduler callback with how
+    late it fired (context polls, zoom cycles, drag frames, macro steps),
+    mapping rebuilds, the time a macro waited in the queue and each
+    injection step. export() writes Chrome trace-event JSON, which opens in
+    Perfetto (ui.perfetto.dev) or chrome://tracing.
+
+    Like logger.Channel, complete() and async_span() are attributes swapped
+    between a recorder and _noop, so instrumented code costs an empty call
+    while tracing is off. Guard argument dicts with `if tracer.enabled:`.
+    A recorded span is one tuple appended to a deque bounded at `capacity`
+    (atomic under the GIL, no lock); the oldest spans fall out first.
+
+    Times are time.perf_counter() seconds; `end` defaults to now.
+        complete(name, category, start, end=None, args=None)        - span on the calling thread
+        async_span(name, category, span_id, start, end=None, args=None) - span not tied to one
+            thread (a macro waiting in the queue), drawn on its own track
+    """
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.enabled = False
+        self.events = collections.deque(maxlen=capacity)
+        self.thread_names = {}
+        self.started = None
+        self._count = itertools.count()
+        self.recorded = 0 # Spans since start(), including those that fell out of the buffer
+        self._ids = itertools.count(1)
+        self.complete = _noop
+        self.async_span = _noop
+
+    def next_id(self):
+        """Id pairing the two ends of an async span."""
+        return next(self._ids)
+
+    def start(self, capacity=None):
+        """Starts a new trace (the previous one is discarded)."""
+        if capacity:
+            self.capacity = int(capacity)
+        self.events = collections.deque(maxlen=self.capacity)
+        self.thread_names = {}
+        self._count = itertools.count()
+        self.recorded = 0
+        self.started = time.perf_counter()
+        self.complete = self._recorder("X")
+        self.async_span = self._recorder("b")
+        self.enabled = True
+
+    def stop(self):
+        """Stops recording. The spans stay until export() or the next start()."""
+        self.enabled = False
+        self.complete = _noop
+        self.async_span = _noop
+
+    def _recorder(self, phase):
+        append = self.events.append
+        count = self._count
+        names = self.thread_names
+        get_ident = threading.get_ident
+        clock = time.perf_counter
+        tracer = self
+
+        if phase == "X":
+            def record(name, category, start, end=None, args=None):
+                tid = get_ident()
+                if tid not in names:
+                    names[tid] = threading.current_thread().name
+                tracer.recorded = next(count) + 1
+                append(("X", name, category, tid, start, end if end is not None else clock(), args, None))
+        else:
+            def record(name, category, span_id, start, end=None, args=None):
+                tracer.recorded = next(count) + 1
+                append(("b", name, category, 0, start, end if end is not None else clock(), args, span_id))
+        return record
+
+    def export(self, path, metadata=None):
+        """Writes the buffered spans as Chrome trace-event JSON. Returns the number of spans."""
+        events = list(self.events)
+        base = self.started or 0.0
+        pid = os.getpid()
+        tids = {}
+        trace = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "Project Babel"}}]
+        for ident, name in list(self.thread_names.items()):
+            tids[ident] = len(tids) + 1
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[ident], "args": {"name": name}})
+        for phase, name, category, ident, start, end, args, span_id in events:
+            ts = round((start - base) * 1e6, 3)
+            if phase == "X":
+                event = {"name": name, "cat": category, "ph": "X", "ts": ts, "dur": round((end - start) * 1e6, 3),
+                         "pid": pid, "tid": tids.get(ident, 0)}
+                if args:
+                    event["args"] = args
+                trace.append(event)
+            else:
+                begin = {"name": name, "cat": category, "ph": "b", "id": span_id, "ts": ts, "pid": pid, "tid": 0}
+                if args:
+                    begin["args"] = args
+                trace.append(begin)
+                trace.append({"name": name, "cat": category, "ph": "e", "id": span_id,
+                              "ts": round((end - base) * 1e6, 3), "pid": pid, "tid": 0})
+        recorded = self.recorded
+        other = {"recorded": recorded, "dropped": recorded - len(events), "capacity": self.capacity}
+        other.update(metadata or {})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": other}, f)
+        return len(events)
+
+    def summary(self):
+        recorded = self.recorded
+        return {"enabled": self.enabled, "capacity": self.capacity, "buffered": len(self.events),
+                "recorded": recorded, "dropped": max(recorded - len(self.events), 0)}
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
@@ -3,11 +3,17 @@ import websockets
 import json
 import threading
 import time
+from core.logger import get_logger
+
+log = get_logger("web")
 
 class WebContextListener:
     def __init__(self, port=6789):
         self.port = port
         self.current_web_app = None
+        self.text_entry = False # Bridge: a text field has focus in the active tab
+        self.text_entry_reports = 0
+        self.on_text_entry = None # on_text_entry(editing), called from the listener thread on each change
         self.last_update_time = 0
         self.running = False
         self._loop = None
@@ -19,9 +25,9 @@ class WebContextListener:
             return
             
         self.running = True
-        self._thread = threading.Thread(target=self._run_server, daemon=True)
+        self._thread = threading.Thread(target=self._run_server, name="babel-web", daemon=True)
         self._thread.start()
-        print(f"WebContextListener started on port {self.port}")
+        log.info("WebContextListener started on port %s", self.port)
 
     def stop(self):
         """Stops the server."""
@@ -50,7 +56,7 @@ class WebContextListener:
             self._loop.run_until_complete(start_server)
             self._loop.run_forever()
         except Exception as e:
-            print(f"WebContextListener Error: {e}")
+            log.error("WebContextListener Error: %s", e)
 
     async def _handler(self, websocket):
         """Handles incoming WebSocket connections."""
@@ -66,11 +72,24 @@ class WebContextListener:
                         self.current_web_app = app
                     
                     self.last_update_time = time.time()
-                    
+
+                elif data.get("event") == "text_entry":
+                    # Sent by the bridge on transitions only (debounced in its content script)
+                    self.text_entry_reports += 1
+                    self._set_text_entry(bool(data.get("editing")))
+
         except websockets.exceptions.ConnectionClosed:
             pass
         except Exception as e:
-            print(f"Web Handler Error: {e}")
+            log.error("Web Handler Error: %s", e)
         finally:
             # Reset state when connection drops (Extension unloaded/Browser closed)
             self.current_web_app = None
+            self._set_text_entry(False)
+
+    def _set_text_entry(self, editing):
+        if editing == self.text_entry:
+            return
+        self.text_entry = editing
+        if self.on_text_entry:
+            self.on_text_entry(editing)
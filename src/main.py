@@ -1,7 +1,12 @@
-import keyboard
+import sys
+if sys.platform.startswith("linux"):
+    # evdev/uinput in place of keyboard, mouse and the win32 modules (core/linux_backend.py)
+    from core import linux_backend
+    linux_backend.install()
+from core.backend import keyboard
 import time
 import ctypes
-import sys
+from core import logger
 
 # Deferred Code Imports to allow logging of ImportError
 # from core.observer import InputObserver
@@ -15,12 +20,17 @@ def is_admin():
     except:
         return False
 
+_log = logger.get_logger("main")
+
 def log_debug(msg):
-    print(msg)
+    _log.info("%s", msg)
 
 def main():
+    logger.start()
     log_debug("Starting Main...")
-    if not is_admin():
+    # Headless (--headless or config "headless"): engine, hooks and control channel only, no tray (core/daemon.py)
+    headless = "--headless" in sys.argv
+    if sys.platform == "win32" and not is_admin():
         log_debug("Not admin, requesting elevation...")
         try:
             # Re-run the program with admin rights
@@ -44,11 +54,29 @@ def main():
         except ImportError as e:
             log_debug(f"IMPORT ERROR: {e}")
             print(f"FAILED TO IMPORT DEPENDENCIES: {e}")
-            input("Press Enter to exit...")
+            if not headless:
+                input("Press Enter to exit...")
             return
 
         config_manager = ConfigManager(".") # Root is current dir
+        logger.configure(config_manager.config.get("logging"), config_manager.project_root)
+        headless = headless or config_manager.config.get("headless", False)
+
+        if sys.platform.startswith("linux"):
+            try:
+                linux_backend.get_backend().start(config_manager.config.get("linux", {}))
+            except OSError as e:
+                log_debug(f"Linux backend failed: {e}")
+                print(f"Cannot open /dev/uinput or the input devices ({e}). Add your user to the 'input' group or run as root.")
+                return
         
+        # Fleet profiles: the cached layer applies now (local file), fetching starts with the observer
+        profile_sync = None
+        if config_manager.config.get("sync", {}).get("url"):
+            from core.profile_sync import ProfileSyncClient
+            profile_sync = ProfileSyncClient(config_manager, config_manager.config["sync"])
+            profile_sync.load_cache()
+
         context_manager = ContextManager()
         injection_module = InjectionModule()
         
@@ -56,14 +84,36 @@ def main():
         
         # Start observer
         observer = InputObserver(context_manager, config_manager, injection_module)
+        if "--shadow" in sys.argv:
+            # Observe only: nothing is suppressed or injected, a report is written on exit
+            observer.set_shadow_mode(True)
         observer.register_hotkeys()
         observer.start() 
+        if profile_sync:
+            profile_sync.on_applied = observer.apply_fleet_changes
+            observer.profile_sync = profile_sync
+            profile_sync.start()
+        
+        # Local control channel (editor, utils/babel_ctl.py)
+        control_server = None
+        if config_manager.config.get("control_channel", True):
+            from core.control_channel import ControlServer
+            control_server = ControlServer(config_manager, observer, config_manager.config.get("control_address"))
+            control_server.start()
+
+        if headless:
+            # No UI module is ever imported: blocks until babel_ctl.py shutdown, SIGTERM or Ctrl+C
+            from core.daemon import Daemon
+            Daemon.from_config(observer, control_server, config_manager.config.get("daemon")).run()
+            log_debug("Headless instance stopped.")
+            return
         
         log_debug("Observer Started. Initializing Tray...")
 
         # Initialize UI
         from ui.tray_icon import TrayIcon
-        tray = TrayIcon(config_manager, observer)
+        control_address = control_server.address if control_server and control_server.running else None
+        tray = TrayIcon(config_manager, observer, control_address)
         
         log_debug("Tray Initialized. Entering Main Loop...")
         print("\n" + "="*50)
@@ -89,7 +139,8 @@ def main():
         err = traceback.format_exc()
         log_debug(f"CRITICAL ERROR: {err}")
         print(f"CRITICAL ERROR: {e}")
-        input("Press Enter to crash exit...") # Keep window open
+        if not headless:
+            input("Press Enter to crash exit...") # Keep window open
 
 if __name__ == "__main__":
     try:
@@ -99,4 +150,5 @@ if __name__ == "__main__":
     except Exception as e:
         import traceback
         traceback.print_exc()
-        input("Press Enter to exit...")
+        if "--headless" not in sys.argv:
+            input("Press Enter to exit...")
@@ -5,12 +5,21 @@ import os
 import sys
 from pathlib import Path
 
+# Launched as a script by the tray: make src/ importable for the control client
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.control_channel import (
+    ControlClient, ControlError, EDITOR_EXIT_SAVED_TO_DISK, EDITOR_EXIT_CANCELLED, EDITOR_EXIT_APPLIED_LIVE
+)
+
 class EditorWindow:
-    def __init__(self, file_path, profile_name="custom.json"):
+    def __init__(self, file_path, profile_name="custom.json", control_address=None):
         self.file_path = Path(file_path)
         self.profile_name = profile_name
+        self.control_address = control_address
         self.root = None
         self.full_config_data = {} # Store full config to preserve other parts
+        self.original_settings = {} # Settings as loaded, to compute the delta on save
+        self.exit_code = EDITOR_EXIT_CANCELLED
         
     def show(self):
         self.root = tk.Tk()
@@ -76,11 +85,14 @@ class EditorWindow:
                 profiles = self.full_config_data.get("profiles", {})
                 target_profile = profiles.get(self.profile_name, {})
                 settings = target_profile.get("settings", {})
+                self.original_settings = dict(settings)
+                parents = target_profile.get("parents")
+                header = f"// Inherits from {', '.join([parents] if isinstance(parents, str) else parents)}: list only what differs.\n" if parents else ""
                 
                 if not settings:
-                     return f"// Profile '{self.profile_name}' not found or empty.\n{{\n}}"
+                     return f"{header}// Profile '{self.profile_name}' not found or empty.\n{{\n}}"
 
-                return json.dumps(settings, indent=4)
+                return header + json.dumps(settings, indent=4)
             except Exception as e:
                 return f"// Error loading file: {e}\n{{\n}}"
         else:
@@ -96,6 +108,14 @@ class EditorWindow:
         try:
             # Validate JSON
             new_settings = json.loads(clean_content)
+
+            # Preferred path: hand only the changed entries to the running instance,
+            # which recompiles the touched actions in memory and persists the file.
+            if self.control_address and self._send_delta(new_settings):
+                self.exit_code = EDITOR_EXIT_APPLIED_LIVE
+                messagebox.showinfo("Success", f"Profile '{self.profile_name}' applied!")
+                self.root.destroy()
+                return
             
             # Update full config
             if "profiles" not in self.full_config_data:
@@ -110,6 +130,7 @@ class EditorWindow:
             with open(self.file_path, 'w', encoding='utf-8') as f:
                 json.dump(self.full_config_data, f, indent=4)
             
+            self.exit_code = EDITOR_EXIT_SAVED_TO_DISK
             messagebox.showinfo("Success", f"Profile '{self.profile_name}' saved successfully!")
             self.root.destroy()
             
@@ -118,14 +139,38 @@ class EditorWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Could not save file:\n{e}")
 
+    def _send_delta(self, new_settings):
+        """Sends changed/removed entries over the control channel. Returns False if the instance is unreachable."""
+        changed = {k: v for k, v in new_settings.items() if self.original_settings.get(k) != v}
+        removed = [k for k in self.original_settings if k not in new_settings]
+        try:
+            with ControlClient(self.control_address) as client:
+                client.request(
+                    "apply_profile_delta",
+                    profile=self.profile_name,
+                    settings=changed,
+                    removed=removed,
+                    activate=True
+                )
+            return True
+        except ControlError:
+            raise # The instance refused the change (e.g. a centrally managed profile): the file must not get it either
+        except Exception as e:
+            # Fall back to writing the file; the tray reloads it from disk
+            print(f"Control channel unavailable ({e}), saving to disk instead.")
+            return False
+
 if __name__ == "__main__":
+    control_address = None
     if len(sys.argv) > 1:
         target_file = sys.argv[1]
         profile = sys.argv[2] if len(sys.argv) > 2 else "custom.json"
+        control_address = sys.argv[3] if len(sys.argv) > 3 else None
     else:
         # Default fallback (mainly for testing)
         target_file = "semantic_config.json"
         profile = "custom.json"
         
-    app = EditorWindow(target_file, profile)
+    app = EditorWindow(target_file, profile, control_address)
     app.show()
+    sys.exit(app.exit_code)
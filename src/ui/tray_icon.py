@@ -3,11 +3,17 @@ from pystray import MenuItem as item
 from PIL import Image, ImageDraw
 import threading
 import os
+from core import logger
+from core.logger import get_logger
+
+log = get_logger("tray")
 
 class TrayIcon:
-    def __init__(self, config_manager, observer):
+    def __init__(self, config_manager, observer, control_address=None):
         self.config_manager = config_manager
         self.observer = observer
+        # Address of the running ControlServer. The editor sends its changes there.
+        self.control_address = control_address
         self.icon = None
         self._setup_icon()
 
@@ -53,6 +59,11 @@ class TrayIcon:
             pystray.Menu.SEPARATOR,
             item('Edit Custom Config', self._open_editor),
             item('Reload Config', self._reload_config),
+            item('Shadow Mode', self._toggle_shadow_mode, checked=lambda item: self.observer.shadow),
+            item('Idle Cost', self._show_idle_cost),
+            item('Save Flight Recording', self._dump_flight_recording),
+            item('Trace Pipeline', self._toggle_tracing, checked=lambda item: self.observer.tracer.enabled),
+            item('Profile Threads', self._toggle_profile, checked=lambda item: self.observer.profiler.running),
             item('Exit', self._exit_app)
         )
         
@@ -64,7 +75,7 @@ class TrayIcon:
              icon_path = os.path.join(os.path.dirname(__file__), '..', 'assets', 'icon.png')
              icon_image = Image.open(icon_path)
         except Exception as e:
-             print(f"Failed to load icon: {e}. generating default.")
+             log.warning("Failed to load icon: %s. generating default.", e)
              icon_image = self._create_image(64, 64, 'yellow', 'blue')
         
         self.icon = pystray.Icon("Project Babel", icon_image, "Project Babel", menu)
@@ -84,18 +95,28 @@ class TrayIcon:
         # Script path: src/ui/editor_window.py
         script_path = os.path.join(os.path.dirname(__file__), 'editor_window.py')
         
-        print(f"Tray: Spawning editor for {semantic_path} [{target_profile}]")
+        log.info("Spawning editor for %s [%s]", semantic_path, target_profile)
         
         def run_and_reload():
+            from core.control_channel import EDITOR_EXIT_APPLIED_LIVE, EDITOR_EXIT_SAVED_TO_DISK
             try:
                 # Use subprocess to run the script
-                # Pass both FILE and PROFILE
-                result = subprocess.run([sys.executable, script_path, str(semantic_path), target_profile])
+                # Pass FILE, PROFILE and (if available) the control channel address
+                args = [sys.executable, script_path, str(semantic_path), target_profile]
+                if self.control_address:
+                    args.append(self.control_address)
+                result = subprocess.run(args)
                 
-                print(f"Tray: Editor process ended with code {result.returncode}")
+                log.info("Editor process ended with code %s", result.returncode)
                 
-                if result.returncode == 0:
-                     print("Tray: Editor saved. Switching to Custom Profile...")
+                if result.returncode == EDITOR_EXIT_APPLIED_LIVE:
+                     # The running instance already recompiled the changed actions
+                     log.info("Editor applied changes through the control channel.")
+                     if hasattr(self.icon, 'update_menu'):
+                         self.icon.update_menu()
+
+                elif result.returncode == EDITOR_EXIT_SAVED_TO_DISK:
+                     log.info("Editor saved. Switching to Custom Profile...")
                      
                      # Reload changed config from disk
                      self.config_manager.load_semantic_config()
@@ -108,42 +129,108 @@ class TrayIcon:
                          self.icon.update_menu()
 
                 else:
-                     print("Tray: Editor cancelled (no changes).")
+                     log.info("Editor cancelled (no changes).")
                 
             except Exception as e:
-                print(f"Error running editor process: {e}")
+                log.error("Error running editor process: %s", e)
 
         # Run in a thread so we don't block the tray
-        t = threading.Thread(target=run_and_reload, daemon=True)
+        t = threading.Thread(target=run_and_reload, name="babel-editor", daemon=True)
         t.start()
 
 
     def _set_profile(self, profile_name):
         try:
-            print(f"Tray: Switching to {profile_name}")
+            log.info("Switching to %s", profile_name)
             self.config_manager.set_active_profile(profile_name)
-            # Force re-registration of hotkeys in observer
-            self.observer.stop()
-            self.observer.register_hotkeys()
-            self.observer.start()
+            # Re-register hotkeys in place (threads keep running)
+            self.observer.reload_profile()
         except KeyboardInterrupt:
             pass
         except Exception as e:
-            print(f"Error switching profile: {e}")
+            log.error("Error switching profile: %s", e)
 
     def _reload_config(self):
-        print("Tray: Reloading Config...")
+        log.info("Reloading Config...")
         self.config_manager.load_config()
         self.config_manager.load_semantic_config()
         
-        self.observer.stop()
-        self.observer.register_hotkeys()
-        self.observer.start()
+        self.observer.reload_profile()
+
+    def _show_idle_cost(self):
+        """Shows CPU and wakeups per component since the last look and saves the full snapshot."""
+        import json
+        from core.idle_cost import format_summary
+        try:
+            snapshot = self.observer.get_idle_cost()
+            path = os.path.join(str(self.config_manager.project_root), "logs", "idle_cost.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(snapshot, f, indent=4)
+            log.info("Idle cost snapshot written to %s", path)
+            self.icon.notify(format_summary(snapshot), "Project Babel: idle cost")
+        except Exception as e:
+            log.error("Error sampling idle cost: %s", e)
+
+    def _toggle_shadow_mode(self):
+        """Observe-only mode. Switching it off shows what Babel would have done and saves the report."""
+        from core.shadow import format_summary
+        try:
+            summary = self.observer.set_shadow_mode(not self.observer.shadow)
+            if summary:
+                self.icon.notify(format_summary(summary), "Project Babel: shadow run")
+            else:
+                self.icon.notify("Shadow mode: keys are observed, never suppressed or translated", "Project Babel")
+            if hasattr(self.icon, 'update_menu'):
+                self.icon.update_menu()
+        except Exception as e:
+            log.error("Error switching shadow mode: %s", e)
+
+    def _dump_flight_recording(self):
+        try:
+            result = self.observer.dump_flight_recording()
+            self.icon.notify(f"{result['records']} decisions saved to {result['path']}", "Project Babel")
+        except Exception as e:
+            log.error("Error saving flight recording: %s", e)
+
+    def _toggle_tracing(self):
+        """Records pipeline spans; switching it off saves them for Perfetto / chrome://tracing."""
+        try:
+            result = self.observer.set_tracing(not self.observer.tracer.enabled)
+            if result.get("path"):
+                self.icon.notify(f"{result['spans']} spans saved to {result['path']}", "Project Babel: trace")
+            else:
+                self.icon.notify("Tracing: switch it off again to save the trace", "Project Babel")
+            if hasattr(self.icon, 'update_menu'):
+                self.icon.update_menu()
+        except Exception as e:
+            log.error("Error switching tracing: %s", e)
+
+    def _toggle_profile(self):
+        """Samples every thread for the configured seconds; clicking again ends the run early."""
+        try:
+            if self.observer.profiler.running:
+                self.observer.profiler.stop()
+                return
+            result = self.observer.start_profile(on_done=self._profile_done)
+            if result.get("started"):
+                self.icon.notify(f"Profiling all threads for {result['seconds']:g}s", "Project Babel")
+            if hasattr(self.icon, 'update_menu'):
+                self.icon.update_menu()
+        except Exception as e:
+            log.error("Error starting the profiler: %s", e)
+
+    def _profile_done(self, result):
+        if result.get("path"):
+            self.icon.notify(f"{result['samples']} samples saved to {result['path']}", "Project Babel: profile")
+        if hasattr(self.icon, 'update_menu'):
+            self.icon.update_menu()
 
     def _exit_app(self):
-        print("Tray: Exiting...")
+        log.info("Exiting...")
         self.observer.stop()
         self.icon.stop()
+        logger.shutdown() # os._exit skips atexit, flush the log ring first
         os._exit(0) # Force exit ensuring threads kill
 
     def run(self):
@@ -0,0 +1,118 @@
+"""
+Command line client for the control channel of a running Project Babel instance.
+
+Usage:
+    python src/utils/babel_ctl.py status
+    python src/utils/babel_ctl.py metrics
+    python src/utils/babel_ctl.py idle              # CPU % and wakeups/s per component since the last call
+    python src/utils/babel_ctl.py flight [path]     # dump the decision flight recorder (decode: utils/decode_flight.py)
+    python src/utils/babel_ctl.py shadow [on|off]   # observe-only mode; "off" ends the run and prints its report
+    python src/utils/babel_ctl.py trace [on|off] [path]  # pipeline spans; "off" writes a Chrome trace (Perfetto)
+    python src/utils/babel_ctl.py profile [seconds] [path]  # sample all threads, wait, write a collapsed-stack file
+    python src/utils/babel_ctl.py profile stop      # end a running profile early
+    python src/utils/babel_ctl.py reload
+    python src/utils/babel_ctl.py sync              # fetch the fleet profile layer now
+    python src/utils/babel_ctl.py switch custom.json
+    python src/utils/babel_ctl.py set duplicate=photoshop "layer_up=custom: ctrl+up" [--profile custom.json]
+    python src/utils/babel_ctl.py ping [count]      # round-trip latency
+    python src/utils/babel_ctl.py shutdown          # stop a headless instance (main.py --headless)
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core.control_channel import ControlClient, ControlError
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+def ping(client, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.request("ping")
+        samples.append((time.perf_counter() - start) * 1e6)
+    print(f"{count} round trips: "
+          f"p50={_percentile(samples, 50):.0f}us p99={_percentile(samples, 99):.0f}us max={max(samples):.0f}us")
+
+
+def profile_run(client, seconds, path):
+    """Starts a profile and waits for it, so the result can be printed."""
+    started = client.request("profile", seconds=seconds, path=path)
+    if not started.get("started"):
+        return started
+    print(f"Profiling for {seconds:g}s -> {started['path']}")
+    time.sleep(seconds)
+    state = client.request("profile")
+    while state["running"]:
+        time.sleep(0.2)
+        state = client.request("profile")
+    return state["last"]
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 2
+
+    command, args = argv[0], argv[1:]
+    profile = None
+    if "--profile" in args:
+        index = args.index("--profile")
+        profile = args[index + 1]
+        args = args[:index] + args[index + 2:]
+
+    try:
+        with ControlClient() as client:
+            if command == "ping":
+                ping(client, int(args[0]) if args else 100)
+                return 0
+            if command == "switch":
+                result = client.request("switch_profile", profile=args[0])
+            elif command == "set":
+                settings = dict(arg.split("=", 1) for arg in args)
+                result = client.request("apply_profile_delta", profile=profile, settings=settings)
+            elif command == "idle":
+                result = client.request("idle_cost")
+            elif command == "flight":
+                result = client.request("flight_dump", path=os.path.abspath(args[0]) if args else None)
+            elif command == "shadow":
+                if args and args[0] not in ("on", "off"):
+                    print("Usage: babel_ctl.py shadow [on|off]")
+                    return 2
+                result = client.request("shadow", enabled=(args[0] == "on") if args else None)
+            elif command == "trace":
+                if args and args[0] not in ("on", "off"):
+                    print("Usage: babel_ctl.py trace [on|off] [path]")
+                    return 2
+                path = os.path.abspath(args[1]) if len(args) > 1 else None
+                result = client.request("trace", enabled=(args[0] == "on") if args else None, path=path)
+            elif command == "profile":
+                if args and args[0] == "stop":
+                    result = client.request("profile", stop=True)
+                else:
+                    result = profile_run(client, float(args[0]) if args else 10.0,
+                                         os.path.abspath(args[1]) if len(args) > 1 else None)
+            elif command in ("status", "metrics", "reload", "sync", "shutdown"):
+                result = client.request(command)
+            else:
+                print(f"Unknown command: {command}")
+                return 2
+    except ControlError as e:
+        print(f"Error: {e}")
+        return 1
+    except (OSError, EOFError) as e:
+        print(f"Project Babel is not running (or the control channel is disabled): {e}")
+        return 1
+
+    print(json.dumps(result, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,133 @@
+"""
+Finds the smallest injection timing (gap between chord events, modifier
+settle time) an app reliably accepts, and optionally stores it in the app
+registry of semantic_config.json.
+
+Each candidate timing is tried with a number of chords against a target
+that acknowledges every chord it acted on; the first gap (then settle) at
+which none is dropped wins. The target here is a local stand-in app that
+watches the injected keys through a keyboard hook and drops chords paced
+faster than it was told to need (--standin GAP_MS,SETTLE_MS). Outside
+Windows it runs on the simulated backend.
+
+Usage:
+    python src/utils/calibrate_injection.py --standin 15,5
+    python src/utils/calibrate_injection.py figma --web --standin 0,0 --write
+    python src/utils/calibrate_injection.py photoshop --standin 15,5 --trials 50 --candidates 0,5,10,15,20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if sys.platform != "win32":
+    from core import sim_backend
+    sim_backend.install()
+
+from core.backend import keyboard
+from core.injection_timing import QueueAckTarget, DEFAULT_CANDIDATES_MS, DEFAULT_TIMING, calibrate, timing_to_config
+from core.injector import InjectionModule, MacroPlayer
+from core.scheduler import Scheduler
+
+
+class StandInApp(QueueAckTarget):
+    """
+    Stand-in for an app that drops chords arriving too fast. A chord is
+    acknowledged when its key went down at least `min_gap` after the last
+    modifier, stayed down at least `min_gap`, and the modifiers were
+    released no sooner than `min_settle` after the key.
+    """
+    def __init__(self, min_gap, min_settle):
+        super().__init__()
+        self.min_gap = min_gap
+        self.min_settle = min_settle
+        self.modifiers = set()
+        self.key = None
+        self._times = {}
+        self._hook = keyboard.hook(self._on_key)
+
+    def close(self):
+        keyboard.unhook(self._hook)
+
+    def expect(self, command):
+        super().expect(command)
+        parts = command.lower().split('+')
+        self.modifiers = set(parts[:-1])
+        self.key = parts[-1]
+        self._times = {}
+
+    def _on_key(self, event):
+        now = time.perf_counter()
+        name = (event.name or "").lower()
+        if self.key is None or (name != self.key and name not in self.modifiers):
+            return
+        self._times.setdefault((name, event.event_type), now)
+        done = (self.key, "up") in self._times and all((m, "up") in self._times for m in self.modifiers)
+        if done:
+            key, self.key = self.key, None
+            self.ack(self._judge(key))
+
+    def _judge(self, key):
+        times = self._times
+        key_down, key_up = times.get((key, "down")), times[(key, "up")]
+        if key_down is None or key_up - key_down < self.min_gap:
+            return False
+        for modifier in self.modifiers:
+            down, up = times.get((modifier, "down")), times[(modifier, "up")]
+            if down is None or key_down - down < self.min_gap or up - key_up < self.min_settle:
+                return False
+        return True
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Calibrate per-app injection timing against an acknowledging target.")
+    parser.add_argument("app", nargs="?", default="standin", help="app registry entry to write (with --write)")
+    parser.add_argument("--web", action="store_true", help="calibrate the app's browser (bridge) entry")
+    parser.add_argument("--standin", required=True, help="GAP_MS,SETTLE_MS the stand-in app needs")
+    parser.add_argument("--command", default="ctrl+j", help="chord to inject (default ctrl+j)")
+    parser.add_argument("--trials", type=int, default=20, help="chords per candidate, all must be acknowledged")
+    parser.add_argument("--candidates", help="comma separated milliseconds (default %s)" % ",".join(map(str, DEFAULT_CANDIDATES_MS)))
+    parser.add_argument("--no-restore", action="store_true", help="don't restore held modifiers after a chord")
+    parser.add_argument("--write", action="store_true", help="store the result in src/config/semantic_config.json")
+    args = parser.parse_args(argv)
+
+    gap_ms, settle_ms = (float(v) for v in args.standin.split(","))
+    candidates = [float(v) for v in args.candidates.split(",")] if args.candidates else DEFAULT_CANDIDATES_MS
+    scheduler = Scheduler()
+    scheduler.start()
+    target = StandInApp(gap_ms / 1000.0, settle_ms / 1000.0)
+
+    def progress(timing, acked, trials):
+        print(f"  gap {timing.gap * 1000:5.1f} ms  settle {timing.settle * 1000:5.1f} ms  "
+              f"{acked}/{trials} {'ok' if acked == trials else 'dropped'}")
+
+    print(f"Calibrating {args.command!r} against a stand-in needing gap {gap_ms} ms, settle {settle_ms} ms")
+    try:
+        timing, results = calibrate(InjectionModule(), MacroPlayer(scheduler), target, args.command, candidates,
+                                    args.trials, not args.no_restore, progress=progress)
+    finally:
+        target.close()
+        scheduler.stop()
+    if timing is None:
+        print("No candidate was reliable. Try larger --candidates.")
+        return 1
+
+    chord_ms = lambda t: (2 * t.gap + (2 if t.restore_modifiers else 1) * t.settle) * 1000
+    print(f"\nResult: {timing_to_config(timing)}")
+    print(f"Delay per chord: {chord_ms(DEFAULT_TIMING):.0f} ms (default) -> {chord_ms(timing):.0f} ms")
+
+    if args.write:
+        from config.config_manager import ConfigManager
+        config_manager = ConfigManager(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+        entry = config_manager.semantic_data.setdefault("system_definitions", {}).setdefault("apps", {}).setdefault(args.app, {})
+        if args.web:
+            entry = entry.setdefault("web", {})
+        entry["injection"] = timing_to_config(timing)
+        config_manager.save_semantic_config()
+        print(f"Written to the app registry: {args.app}{' (web)' if args.web else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""
+Decodes a flight recording written by the tray ("Save Flight Recording") or
+`babel_ctl.py flight`.
+
+Usage:
+    python src/utils/decode_flight.py logs/flight-20250101-120000.bfr
+    python src/utils/decode_flight.py <file> --event ctrl+d      # one trigger only
+    python src/utils/decode_flight.py <file> --last 50
+    python src/utils/decode_flight.py <file> --json              # one JSON object per line
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core.flight_recorder import decode
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Decode a Babel flight recording.")
+    parser.add_argument("path")
+    parser.add_argument("--event", help="only records of this trigger (e.g. ctrl+d)")
+    parser.add_argument("--last", type=int, help="only the last N records")
+    parser.add_argument("--json", action="store_true", help="JSON lines instead of a table")
+    args = parser.parse_args(argv)
+
+    header, records = decode(args.path)
+    if args.event:
+        records = [r for r in records if r["event"] == args.event.lower()]
+    if args.last:
+        records = records[-args.last:]
+
+    if args.json:
+        for record in records:
+            print(json.dumps(record))
+        return 0
+
+    print(f"{args.path}: {header.get('process', '?')} process, profile {header.get('profile')}, "
+          f"{header['written']} decisions recorded, {len(records)} shown")
+    for r in records:
+        stamp = time.strftime("%H:%M:%S", time.localtime(r["time"])) + f".{int(r['time'] * 1000) % 1000:03d}"
+        rule = f" -> {r['rule']}" if r["rule"] else ""
+        state = "armed" if r["armed"] else "unarmed"
+        if r.get("shadow"):
+            state += " shadow"
+        print(f"{stamp}  ctx {r['context_id']:<5} {r['app'] or '-':<12} {r['event']:<16} "
+              f"{r['decision']:<16}{rule:<20} {r['duration_ns'] / 1000:>9.1f} us  {state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""
+Stand-in telemetry collector: accepts the gzipped spool segments Babel
+uploads (config "telemetry": {"collector": ...}), merges counters and
+latency histograms across every client and serves the fleet summary.
+
+    POST /          one spool segment (gzip, one JSON batch per line) -> 204
+    GET  /summary   merged counters and per action / context latency percentiles
+
+Usage:
+    python src/utils/telemetry_collector.py                 # listens on 127.0.0.1:8765
+    python src/utils/telemetry_collector.py --port 9000 --dump fleet.json
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core.telemetry import Aggregate
+
+
+class CollectorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128 # A fleet uploads in bursts; the default backlog of 5 refuses connections
+
+
+def make_server(host="127.0.0.1", port=8765, aggregate=None):
+    """Collector HTTP server (not started). Returns (server, aggregate)."""
+    aggregate = aggregate or Aggregate()
+    stats = {"requests": 0, "bytes": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            stats["requests"] += 1
+            stats["bytes"] += len(body)
+            try:
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                aggregate.add_lines(body)
+            except (OSError, EOFError):
+                self._reply(400)
+                return
+            self._reply(204)
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/summary":
+                self._reply(404)
+                return
+            self._reply(200, json.dumps(dict(aggregate.summary(), received=dict(stats))).encode("utf-8"))
+
+        def _reply(self, code, body=b""):
+            self.send_response(code)
+            self.send_header("Content-Length", str(len(body)))
+            if body:
+                self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = CollectorServer((host, port), Handler)
+    server.received = stats
+    return server, aggregate
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Stand-in collector for Babel fleet telemetry.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dump", help="write the merged summary to this file on exit")
+    args = parser.parse_args(argv)
+
+    server, aggregate = make_server(args.host, args.port)
+    print(f"Collecting on http://{args.host}:{server.server_address[1]}/ (summary: GET /summary, Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    summary = aggregate.summary()
+    print(f"{summary['clients']} clients, {summary['batches']} batches, {summary['records']} decisions")
+    if args.dump:
+        with open(args.dump, "w") as f:
+            json.dump(summary, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,745 @@
+"""
+Offline analysis of recorded input traces, for tuning profiles across the
+studio: how often each action is used per app, how many presses a profile
+translates, repeat bursts (the same shortcut pressed again and again) and
+zoom burst lengths.
+
+A trace is a directory of columnar NumPy arrays, one element per event,
+memory-mapped on open so weeks of events never have to fit in memory:
+    time_ns.npy  int64   wall-clock time
+    chord.npy    uint16  index into "chords" of trace.json ("ctrl+d", "wheel" for a zoom wheel step)
+    app.npy      uint16  index into "apps" of trace.json ("" when no target app was focused)
+Traces are built from flight recordings (tray "Save Flight Recording",
+`babel_ctl.py flight`); these hold only shortcuts and wheel steps, never
+typed text. Events of chords no profile hooked at recording time are not
+in them.
+
+`analyse` runs every profile over the trace with the engine's semantics:
+the lookup of each (app, chord) is compiled once through ActionMapper into
+a table, so deciding a chunk of events is a few array lookups. Hooked
+chords, arm-on-focus, debounce and identity rules behave as in
+InputObserver._handle_dynamic_hotkey; multi-stroke sequences and text
+entry are not modelled. `--verify N` replays N events through the real
+InputObserver (simulated backend) and compares every decision.
+
+Needs NumPy (not a dependency of Babel itself).
+
+Usage:
+    python src/utils/trace_analysis.py import traces/studio logs/flight-*.bfr
+    python src/utils/trace_analysis.py analyse traces/studio
+    python src/utils/trace_analysis.py analyse traces/studio --profile custom.json --json report.json
+    python src/utils/trace_analysis.py analyse traces/studio --verify 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("trace_analysis.py needs NumPy: pip install numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# The engine only ever runs here to verify a sample: never against real input
+from core import sim_backend
+sim = sim_backend.install()
+
+from config.config_manager import ConfigManager
+from core import flight_recorder
+from core import logger
+from core.action_mapper import ActionMapper
+from core.gestures import is_mouse_trigger
+from core.sequences import is_sequence, normalize_chord, strokes_of
+
+TRACE_VERSION = 1
+COLUMNS = {"time_ns": np.int64, "chord": np.uint16, "app": np.uint16}
+WHEEL_CHORD = "wheel"
+
+# Offline decisions besides the engine's own (flight_recorder codes)
+UNHOOKED = 0    # chord not hooked by the profile, or hooks disarmed: Babel never sees it
+SEQUENCE = 253  # first stroke of a multi-stroke trigger: not modelled
+WHEEL = 254     # wheel step (zoom bursts)
+DECISION_NAMES = {**flight_recorder.DECISION_NAMES, UNHOOKED: "unhooked", SEQUENCE: "sequence", WHEEL: "wheel"}
+KEY_DECISIONS = (flight_recorder.TRANSLATED, flight_recorder.PASS_UNMAPPED, flight_recorder.PASS_INACTIVE,
+                 flight_recorder.DEBOUNCED, flight_recorder.PASS_EDITING)
+
+# flight_recorder.RECORD as a NumPy record (no padding), per record format: version 1 dumps still import
+_RECORD_FIELDS = [("seq", "<u4"), ("time", "<u8"), ("context_id", "<u4"), ("event", "<u2"), ("app", "<u2"),
+                  ("rule", "<u2"), ("decision", "u1"), ("flags", "u1")]
+RECORD_DTYPES = {"<IQIHHHBBQ": np.dtype(_RECORD_FIELDS + [("duration_ns", "<u8")]),
+                 "<IQIHHHBBI": np.dtype(_RECORD_FIELDS + [("duration_us", "<u4")])}
+
+NO_TIME = -(1 << 62) # "never": far enough back that any gap is long, close enough not to overflow
+BURST_BINS = 1024    # Burst lengths are histogrammed; longer bursts land in the last bin
+
+
+class Trace:
+    """Columns of one trace directory (memory-mapped) and its string tables."""
+    def __init__(self, directory, columns, chords, apps, meta=None):
+        self.directory = directory
+        self.time_ns = columns["time_ns"]
+        self.chord = columns["chord"]
+        self.app = columns["app"]
+        self.chords = chords
+        self.apps = apps
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.time_ns)
+
+    @classmethod
+    def open(cls, directory):
+        with open(os.path.join(directory, "trace.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != TRACE_VERSION:
+            raise ValueError(f"{directory}: unsupported trace version {meta.get('version')}")
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        return cls(directory, columns, meta["chords"], meta["apps"], meta)
+
+    @classmethod
+    def create(cls, directory, count, chords, apps, meta=None):
+        """New trace of `count` events with writable memory-mapped columns; fill them, then call close()."""
+        os.makedirs(directory, exist_ok=True)
+        columns = {name: np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+",
+                                                   dtype=dtype, shape=(count,))
+                   for name, dtype in COLUMNS.items()}
+        return cls(directory, columns, list(chords), list(apps), meta)
+
+    def close(self):
+        """Flushes written columns and writes trace.json."""
+        for column in (self.time_ns, self.chord, self.app):
+            if isinstance(column, np.memmap):
+                column.flush()
+        meta = dict(self.meta, version=TRACE_VERSION, events=len(self), chords=self.chords, apps=self.apps)
+        with open(os.path.join(self.directory, "trace.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def chunks(self, size):
+        for start in range(0, len(self), size):
+            stop = min(start + size, len(self))
+            yield (np.asarray(self.time_ns[start:stop]), np.asarray(self.chord[start:stop]),
+                   np.asarray(self.app[start:stop]))
+
+
+# --- Import ---
+
+def read_flight_events(path):
+    """
+    Key presses and wheel steps of one flight recording, oldest first:
+    (base_ns, perf_ns, [chord], [app]). perf_ns are the recorder's
+    perf_counter_ns stamps; base_ns + perf_ns is the wall-clock time.
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != flight_recorder.MAGIC:
+            raise ValueError(f"{path} is not a Babel flight recording")
+        (length,) = flight_recorder.HEADER_LENGTH.unpack(f.read(flight_recorder.HEADER_LENGTH.size))
+        header = json.loads(f.read(length))
+    dtype = RECORD_DTYPES.get(header["record_format"])
+    if dtype is None:
+        raise ValueError(f"{path}: unknown record format {header['record_format']}")
+    base_ns = int(header["created"] * 1e9) - int(header["perf_ns"])
+    offset = 4 + flight_recorder.HEADER_LENGTH.size + length
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count <= 0:
+        return base_ns, np.empty(0, np.int64), [], []
+    records = np.memmap(path, dtype, mode="r", offset=offset, shape=(count,))
+    wheel = records["decision"] == flight_recorder.WHEEL_SUPPRESSED
+    keep = np.isin(records["decision"], KEY_DECISIONS) | wheel
+    records, wheel = records[keep], wheel[keep]
+    strings = header["strings"]
+    text = np.array(strings + ["?"], dtype=object) # 0xFFFF: the recorder's string table was full
+    chords = np.where(wheel, WHEEL_CHORD, text[np.minimum(records["event"], len(strings)).astype(np.intp)])
+    apps = text[np.minimum(records["app"], len(strings)).astype(np.intp)]
+    return base_ns, records["time"].astype(np.int64), list(chords), list(apps)
+
+
+def import_flight(directory, paths):
+    """
+    Appends the events of flight recordings to the trace in `directory`
+    (created if missing). Returns (events added, events in the trace).
+
+    Dumps of one session overlap (the ring is dumped again and again), and
+    each turns perf_counter into wall-clock time with its own slightly
+    different base. Dumps whose bases agree within a second share one clock
+    (same boot): they keep the first base and are deduplicated on the raw
+    perf_counter stamps, which are exact.
+    """
+    chords, apps = [""], [""]
+    parts = []
+    meta = {"source": "flight recordings"}
+    if os.path.exists(os.path.join(directory, "trace.json")):
+        existing = Trace.open(directory)
+        chords, apps, meta = list(existing.chords), list(existing.apps), dict(existing.meta)
+        parts.append((np.array(existing.time_ns), np.array(existing.chord), np.array(existing.app)))
+        del existing
+    chord_ids = {name: i for i, name in enumerate(chords)}
+    app_ids = {name: i for i, name in enumerate(apps)}
+
+    def intern(table, ids, name):
+        index = ids.get(name)
+        if index is None:
+            index = ids[name] = len(table)
+            table.append(name)
+        return index
+
+    loaded = []
+    for path in paths:
+        base_ns, perf_ns, event_chords, event_apps = read_flight_events(path)
+        if len(perf_ns):
+            loaded.append((base_ns + int(perf_ns[0]), base_ns, perf_ns, event_chords, event_apps))
+    loaded.sort(key=lambda item: item[0])
+    last_time = int(parts[0][0][-1]) if parts and len(parts[0][0]) else NO_TIME
+    clock_base, last_perf = meta.get("clock_base_ns"), meta.get("last_perf_ns", NO_TIME)
+    added = 0
+    for _, base_ns, perf_ns, event_chords, event_apps in loaded:
+        if clock_base is not None and abs(base_ns - clock_base) < 1_000_000_000:
+            new = perf_ns > last_perf
+        else:
+            clock_base = base_ns
+            new = perf_ns + base_ns > last_time
+        if not new.any():
+            continue
+        times = perf_ns + clock_base
+        chord_column = np.array([intern(chords, chord_ids, c) for c in event_chords], dtype=np.uint16)
+        app_column = np.array([intern(apps, app_ids, a) for a in event_apps], dtype=np.uint16)
+        parts.append((times[new], chord_column[new], app_column[new]))
+        last_time, last_perf = int(times[-1]), int(perf_ns[-1])
+        added += int(new.sum())
+    meta.update(clock_base_ns=clock_base, last_perf_ns=last_perf)
+
+    staging = directory + ".new"
+    trace = Trace.create(staging, sum(len(part[0]) for part in parts), chords, apps, meta)
+    position = 0
+    for times, chord_column, app_column in parts:
+        end = position + len(times)
+        trace.time_ns[position:end] = times
+        trace.chord[position:end] = chord_column
+        trace.app[position:end] = app_column
+        position = end
+    trace.close()
+    count = len(trace)
+    del trace
+    os.makedirs(directory, exist_ok=True)
+    for filename in [f"{name}.npy" for name in COLUMNS] + ["trace.json"]:
+        os.replace(os.path.join(staging, filename), os.path.join(directory, filename))
+    os.rmdir(staging)
+    return added, count
+
+
+# --- Profiles as lookup tables ---
+
+class CompiledProfile:
+    """
+    One profile compiled against a trace's string tables, with the engine's
+    semantics (ActionMapper rules, last rule of a trigger wins). Everything
+    but debounce depends only on the (app, chord) of an event, so the tables
+    are flat over its key, app * len(chords) + chord:
+        decision[key]          what the engine does with the event, debounce aside
+        reaches[key]           the event reaches a Babel callback (and so counts for debounce)
+        action[key]            index into `actions` of the matching rule, -1 for none
+        trigger_action[chord]  action the chord is the trigger of (any app), -1 for none
+    """
+    def __init__(self, config_manager, profile, chords, apps, arm_on_focus=True):
+        self.profile = profile
+        previous = config_manager.config.get("active_profile")
+        config_manager.config["active_profile"] = profile # In memory only, never saved
+        try:
+            mapper = ActionMapper(config_manager)
+            triggers = mapper.get_all_configured_triggers()
+            targets = config_manager.get_semantic_targets()
+            # The engine asks for the rules of the first target the focused app matches (InputObserver._poll_context)
+            detected = [next((t for t in targets if app and t.lower() in app.lower()), None) for app in apps]
+            rules = {target: mapper.get_mappings_for_context(target) for target in set(detected) if target}
+        finally:
+            config_manager.config["active_profile"] = previous
+
+        self.actions = sorted({meta["action"] for meta in triggers.values()} |
+                              {rule["action"] for app_rules in rules.values() for rule in app_rules})
+        action_ids = {name: i for i, name in enumerate(self.actions)}
+        chord_ids = {chord: i for i, chord in enumerate(chords)}
+        self.triggers = {meta["action"]: trigger for trigger, meta in triggers.items()}
+        sequence_starts = {strokes_of(trigger)[0] for trigger in triggers if is_sequence(trigger)}
+
+        # Chords a multi-stroke trigger starts with go to the sequence matcher instead (InputObserver._hooked_chords)
+        sequence = np.array([normalize_chord(chord) in sequence_starts for chord in chords], dtype=bool)
+        hooked = np.array([chord in triggers and not is_mouse_trigger(chord) and not is_sequence(chord)
+                           and not claimed for chord, claimed in zip(chords, sequence)], dtype=bool)
+        wheel = np.array([chord.endswith(WHEEL_CHORD) for chord in chords], dtype=bool)
+        active = np.array([target is not None for target in detected], dtype=bool)
+        action = np.full((len(apps), len(chords)), -1, dtype=np.int16)
+        translates = np.zeros((len(apps), len(chords)), dtype=bool)
+        for app_index in np.flatnonzero(active):
+            for rule in rules[detected[app_index]]: # Same order as InputObserver._update_mappings_for_context: last wins
+                chord_index = chord_ids.get(rule["input"].lower())
+                if chord_index is not None:
+                    action[app_index, chord_index] = action_ids[rule["action"]]
+                    translates[app_index, chord_index] = rule["output"] != rule["input"].lower()
+
+        # Hotkeys are only armed while a target app is focused, unless arm_on_focus is off
+        reaches = hooked[None, :] & (active[:, None] | (not arm_on_focus))
+        decision = np.full(reaches.shape, UNHOOKED, dtype=np.uint8)
+        decision[:, sequence] = SEQUENCE
+        decision[:, wheel] = WHEEL
+        decision[reaches] = np.where(~active[:, None], flight_recorder.PASS_INACTIVE,
+                                     np.where(translates, flight_recorder.TRANSLATED,
+                                              flight_recorder.PASS_UNMAPPED))[reaches]
+        self.decision = decision.ravel()
+        self.reaches = reaches.ravel()
+        self.action = action.ravel()
+        self.sequence = sequence
+        self.trigger_action = np.full(len(chords), -1, dtype=np.int16)
+        for trigger, meta in triggers.items():
+            if trigger in chord_ids:
+                self.trigger_action[chord_ids[trigger]] = action_ids[meta["action"]]
+
+
+def debounce(group, times, interval, last_accepted):
+    """
+    Debounce of the engine over presses sorted by group (chord), then time:
+    a press is dropped when it comes less than `interval` after the last
+    press that was *not* dropped. last_accepted[group] carries that time
+    across chunks and is updated. Returns the dropped mask.
+
+    Vectorised as a walk over runs: a press more than `interval` after the
+    previous one always passes, so only the presses inside runs of close
+    presses need the greedy step, and all runs advance together.
+    """
+    n = len(times)
+    dropped = np.zeros(n, dtype=bool)
+    if not n:
+        return dropped
+    first = np.ones(n, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    previous = np.empty(n, dtype=np.int64)
+    previous[1:] = times[:-1]
+    previous[first] = last_accepted[group[first]]
+    passes = (times - previous) >= interval
+    dropped[first & ~passes] = True # First press of a group: decided by the carried time alone
+
+    starts = np.flatnonzero(first | passes)
+    ends = np.append(starts[1:], n)
+    anchor = np.where(passes[starts], times[starts], last_accepted[group[starts]])
+    position = starts + 1
+    live = np.flatnonzero(position < ends)
+    while len(live):
+        index = position[live]
+        ok = (times[index] - anchor[live]) >= interval
+        dropped[index[~ok]] = True
+        anchor[live[ok]] = times[index[ok]]
+        position[live] += 1
+        live = live[position[live] < ends[live]]
+
+    accepted = np.flatnonzero(~dropped)
+    if len(accepted):
+        groups = group[accepted]
+        last = np.append(groups[1:] != groups[:-1], True)
+        last_accepted[groups[last]] = times[accepted[last]]
+    return dropped
+
+
+class Bursts:
+    """
+    Bursts of presses per group (same group, each less than `gap` after the
+    previous one), continued across chunks: the open burst of each group is
+    carried until a later press ends it or finish() is called.
+    """
+    def __init__(self, groups, gap):
+        self.gap = gap
+        self.last = np.full(groups, NO_TIME, dtype=np.int64)
+        self.start = np.zeros(groups, dtype=np.int64)
+        self.length = np.zeros(groups, dtype=np.int64)
+        self.count = np.zeros(groups, dtype=np.int64)    # Closed bursts of 2+ presses
+        self.presses = np.zeros(groups, dtype=np.int64)  # Presses in those bursts
+        self.longest = np.zeros(groups, dtype=np.int64)
+        self.histogram = np.zeros(BURST_BINS, dtype=np.int64)
+        self.durations = [] # ns of closed bursts of 2+ presses
+
+    def add(self, group, times):
+        """Presses sorted by group, then time."""
+        n = len(times)
+        if not n:
+            return
+        first = np.ones(n, dtype=bool)
+        first[1:] = group[1:] != group[:-1]
+        previous = np.empty(n, dtype=np.int64)
+        previous[1:] = times[:-1]
+        previous[first] = self.last[group[first]]
+        new = (times - previous) >= self.gap
+
+        starts = np.flatnonzero(new | first)
+        ends = np.append(starts[1:], n)
+        segment_group = group[starts]
+        length = ends - starts
+        carried = ~new[starts] # Group's first segment continues the burst left open by the last chunk
+        length[carried] += self.length[segment_group[carried]]
+        begin = times[starts]
+        begin[carried] = self.start[segment_group[carried]]
+        last_segment = np.ones(len(starts), dtype=bool)
+        last_segment[:-1] = first[ends[:-1]]
+
+        # Open bursts a new burst of their group ends, then the bursts that end inside this chunk.
+        # Single presses are most of them and never reported: they are dropped first.
+        ended = segment_group[first[starts] & ~carried]
+        ended = ended[self.length[ended] > 1]
+        self._close(ended, self.length[ended], self.last[ended] - self.start[ended])
+        closing = np.flatnonzero(~last_segment & (length > 1))
+        self._close(segment_group[closing], length[closing], times[ends[closing] - 1] - begin[closing])
+
+        keep = np.flatnonzero(last_segment)
+        open_groups = segment_group[keep]
+        self.length[open_groups] = length[keep]
+        self.start[open_groups] = begin[keep]
+        self.last[open_groups] = times[ends[keep] - 1]
+
+    def _close(self, group, length, duration):
+        """Records closed bursts of 2+ presses."""
+        if not len(group):
+            return
+        self.histogram += np.bincount(np.minimum(length, BURST_BINS - 1), minlength=BURST_BINS)
+        np.add.at(self.count, group, 1)
+        np.add.at(self.presses, group, length)
+        np.maximum.at(self.longest, group, length)
+        self.durations.append(duration)
+
+    def finish(self):
+        open_groups = np.flatnonzero(self.length > 1)
+        self._close(open_groups, self.length[open_groups], self.last[open_groups] - self.start[open_groups])
+        self.length[:] = 0
+
+    def length_percentiles(self):
+        """p50/p90/max length of closed bursts of 2+ presses."""
+        counts = self.histogram
+        total = counts.sum()
+        if not total:
+            return {"bursts": 0}
+        cumulative = np.cumsum(counts)
+        pick = lambda q: int(np.searchsorted(cumulative, q * total))
+        return {"bursts": int(total), "p50": pick(0.5), "p90": pick(0.9), "max": int(np.flatnonzero(counts)[-1])}
+
+
+class ProfileAnalysis:
+    """
+    One compiled profile over a trace, fed chunk by chunk. Only the events
+    that reach Babel are looked at (debounce, repeat bursts); everything
+    else is counted per key once for all profiles (TraceStats).
+    """
+    def __init__(self, compiled, nchords, debounce_ns, burst_ns):
+        self.compiled = compiled
+        self.debounce_ns = debounce_ns
+        self.dropped = np.zeros(len(compiled.decision), dtype=np.int64) # Debounced events per key
+        self.last_accepted = np.full(nchords, NO_TIME, dtype=np.int64)
+        self.bursts = Bursts(nchords, burst_ns)
+
+    def feed(self, times, chord, key, decisions=False):
+        """One chunk of events (time order). With `decisions`, returns the decision of every event."""
+        index = np.flatnonzero(self.compiled.reaches[key])
+        order = np.argsort(chord[index], kind="stable") # Radix sort on uint16: groups presses by chord
+        index = index[order]
+        chords, event_times = chord[index].astype(np.intp), times[index]
+        dropped = debounce(chords, event_times, self.debounce_ns, self.last_accepted)
+        self.bursts.add(chords, event_times)
+        self.dropped += np.bincount(key[index[dropped]], minlength=len(self.dropped))
+        if decisions:
+            decision = self.compiled.decision[key]
+            decision[index[dropped]] = flight_recorder.DEBOUNCED
+            return decision
+
+    def report(self, counts, apps, chords):
+        """`counts`: events per key over the whole trace (TraceStats.key_counts)."""
+        self.bursts.finish()
+        profile = self.compiled
+        kept = counts - self.dropped
+        decisions = np.bincount(profile.decision, weights=kept, minlength=256).astype(np.int64)
+        decisions[flight_recorder.DEBOUNCED] += self.dropped.sum()
+        translated, unmapped = flight_recorder.TRANSLATED, flight_recorder.PASS_UNMAPPED
+        rows = np.where(profile.action < 0, len(profile.actions), profile.action)
+        per_action = lambda values: np.bincount(rows, weights=values, minlength=len(profile.actions) + 1).astype(np.int64)
+        action_translated = per_action(np.where(profile.decision == translated, kept, 0))
+        action_identity = per_action(np.where(profile.decision == unmapped, kept, 0))
+        action_debounced = per_action(np.where(profile.action >= 0, self.dropped, 0))
+        # Presses of an action per app: its rule matched (translated, identity or debounced)
+        matched = np.where((profile.action >= 0) & profile.reaches, counts, 0).reshape(len(apps), len(chords))
+        action_by_chord = profile.action.reshape(len(apps), len(chords))
+
+        actions = {}
+        for index, name in enumerate(profile.actions):
+            presses = int(action_translated[index] + action_identity[index] + action_debounced[index])
+            per_app = matched.sum(axis=1, where=action_by_chord == index)
+            entry = {
+                "trigger": profile.triggers.get(name),
+                "presses": presses,
+                "translated": int(action_translated[index]),
+                "identity": int(action_identity[index]),
+                "debounced": int(action_debounced[index]),
+                "hit_rate": round(int(action_translated[index]) / presses, 4) if presses else None,
+                "apps": {apps[i] or "-": int(per_app[i]) for i in np.argsort(-per_app) if per_app[i]},
+            }
+            trigger_chords = np.flatnonzero(profile.trigger_action == index)
+            if len(trigger_chords):
+                chord = trigger_chords[0]
+                entry.update(repeat_bursts=int(self.bursts.count[chord]),
+                             presses_in_bursts=int(self.bursts.presses[chord]),
+                             longest_burst=int(self.bursts.longest[chord]))
+            actions[name] = entry
+        reached = int(decisions[list(KEY_DECISIONS)].sum())
+        return {
+            "profile": profile.profile,
+            "decisions": {DECISION_NAMES.get(code, str(code)): int(count) for code, count in enumerate(decisions) if count},
+            "reached_babel": reached,
+            "hit_rate": round(int(decisions[translated]) / reached, 4) if reached else None,
+            "repeat_bursts": self.bursts.length_percentiles(),
+            "actions": actions,
+        }
+
+
+class TraceStats:
+    """Profile-independent statistics: events per (app, chord) key, zoom bursts."""
+    def __init__(self, trace, zoom_gap_ns):
+        self.trace = trace
+        self.events = 0
+        self.first = None
+        self.last = None
+        self.key_counts = np.zeros(len(trace.apps) * len(trace.chords), dtype=np.int64)
+        self.wheel = np.array([chord.endswith(WHEEL_CHORD) for chord in trace.chords], dtype=bool)
+        self.zoom = Bursts(1, zoom_gap_ns)
+
+    def feed(self, times, chord, key):
+        if not len(times):
+            return
+        self.events += len(times)
+        self.first = int(times[0]) if self.first is None else self.first
+        self.last = int(times[-1])
+        self.key_counts += np.bincount(key, minlength=len(self.key_counts))
+        wheel_times = times[self.wheel[chord]]
+        self.zoom.add(np.zeros(len(wheel_times), dtype=np.intp), wheel_times)
+
+    def report(self, top=5):
+        self.zoom.finish()
+        trace = self.trace
+        matrix = self.key_counts.reshape(len(trace.apps), len(trace.chords))
+        apps = {}
+        for index in np.argsort(-matrix.sum(axis=1)):
+            total = int(matrix[index].sum())
+            if not total:
+                continue
+            ranked = np.argsort(-matrix[index])[:top]
+            apps[trace.apps[index] or "-"] = {
+                "events": total,
+                "top_chords": {trace.chords[c]: int(matrix[index, c]) for c in ranked if matrix[index, c]},
+            }
+        zoom = self.zoom.length_percentiles()
+        durations = np.concatenate(self.zoom.durations) if self.zoom.durations else np.empty(0)
+        if len(durations):
+            zoom["duration_ms_p50"] = round(float(np.percentile(durations, 50)) / 1e6, 1)
+            zoom["duration_ms_p90"] = round(float(np.percentile(durations, 90)) / 1e6, 1)
+        span = (self.last - self.first) / 1e9 if self.events else 0.0
+        return {"events": self.events, "span_days": round(span / 86400, 2), "apps": apps, "zoom_bursts": zoom}
+
+
+def event_keys(chord, app, nchords):
+    """Flat (app, chord) key of every event, the index into the compiled tables."""
+    key = app.astype(np.intp)
+    key *= nchords
+    key += chord
+    return key
+
+
+def analyse(trace, config_manager, profiles, chunk=1 << 20, debounce_ms=250.0, burst_ms=500.0, zoom_gap_ms=1000.0,
+            arm_on_focus=None):
+    """Runs `profiles` over the whole trace. Returns the report dict."""
+    if arm_on_focus is None:
+        arm_on_focus = config_manager.config.get("arm_on_focus", True)
+    nchords = len(trace.chords)
+    analyses = [ProfileAnalysis(CompiledProfile(config_manager, name, trace.chords, trace.apps, arm_on_focus),
+                                nchords, int(debounce_ms * 1e6), int(burst_ms * 1e6))
+                for name in profiles]
+    stats = TraceStats(trace, int(zoom_gap_ms * 1e6))
+    start = time.perf_counter()
+    for times, chord, app in trace.chunks(chunk):
+        key = event_keys(chord, app, nchords)
+        stats.feed(times, chord, key)
+        for analysis in analyses:
+            analysis.feed(times, chord, key)
+    elapsed = time.perf_counter() - start
+    return {
+        "trace": stats.report(),
+        "profiles": {analysis.compiled.profile: analysis.report(stats.key_counts, trace.apps, trace.chords)
+                     for analysis in analyses},
+        "seconds": round(elapsed, 3),
+        "events_per_second": int(len(trace) / elapsed) if elapsed else None,
+    }
+
+
+# --- Verification against the engine ---
+
+class _TraceContext:
+    """ContextManager stand-in: the focused app is whatever the trace says."""
+    def __init__(self):
+        self.app = ""
+
+    def is_target_active(self, target_list=None):
+        return bool(self.app) and any(t.lower() in self.app.lower() for t in (target_list or []))
+
+    def is_text_entry_focused(self, caret=False):
+        return False
+
+
+class _NoInjection:
+    def inject(self, command, timing=None):
+        pass
+
+    def compile(self, command, timing=None):
+        return []
+
+    def fallback(self, command):
+        pass
+
+
+def replay_online(config_manager, profile, trace, start, stop, debounce_ms=250.0):
+    """
+    Replays events [start, stop) through a real InputObserver on the
+    simulated backend (context polls on each app change, every key tapped
+    through the hotkey table). Returns the engine's decision per event.
+    """
+    from core.observer import InputObserver
+
+    previous = config_manager.config.get("active_profile")
+    config_manager.config["active_profile"] = profile
+    try:
+        context = _TraceContext()
+        observer = InputObserver(context, config_manager, _NoInjection())
+        observer.debounce_interval = debounce_ms / 1000.0
+        observer.text_entry_desktop = False
+        now = [0.0]
+        observer.clock = lambda: now[0]
+        sim.keyboard.unhook_all()
+        observer.register_hotkeys()
+        observer._poll_context()
+
+        times = np.asarray(trace.time_ns[start:stop])
+        chords = np.asarray(trace.chord[start:stop])
+        apps = np.asarray(trace.app[start:stop])
+        origin = int(times[0]) if len(times) else 0
+        flight = observer.flight
+        decisions = np.full(len(times), UNHOOKED, dtype=np.uint8)
+        key_decisions = set(KEY_DECISIONS)
+        for i in range(len(times)):
+            app = trace.apps[apps[i]]
+            if app != context.app:
+                context.app = app
+                observer._poll_context()
+            chord = trace.chords[chords[i]]
+            if chord.endswith(WHEEL_CHORD):
+                decisions[i] = WHEEL
+                continue
+            now[0] = (int(times[i]) - origin) / 1e9
+            seq = flight.summary()["written"]
+            sim.keyboard.tap(chord)
+            rows, _, _ = flight.records_since(seq)
+            decisions[i] = next((row[6] for row in rows if row[6] in key_decisions), UNHOOKED)
+        sim.keyboard.unhook_all()
+        return decisions
+    finally:
+        config_manager.config["active_profile"] = previous
+
+
+def verify(trace, config_manager, profile, count, debounce_ms=250.0, arm_on_focus=None):
+    """
+    Decides `count` events from the middle of the trace both ways (fresh
+    state on each side) and compares. Returns {"events", "mismatches", "examples"}.
+    """
+    if arm_on_focus is None:
+        arm_on_focus = config_manager.config.get("arm_on_focus", True)
+    start = max(0, len(trace) // 2 - count // 2)
+    stop = min(len(trace), start + count)
+    compiled = CompiledProfile(config_manager, profile, trace.chords, trace.apps, arm_on_focus)
+    analysis = ProfileAnalysis(compiled, len(trace.chords), int(debounce_ms * 1e6), 1)
+    chord = np.asarray(trace.chord[start:stop])
+    key = event_keys(chord, np.asarray(trace.app[start:stop]), len(trace.chords))
+    offline = analysis.feed(np.asarray(trace.time_ns[start:stop]), chord, key, decisions=True)
+    modelled = ~compiled.sequence[chord] # The engine buffers these in its sequence matcher: skipped
+    online = replay_online(config_manager, profile, trace, start, stop, debounce_ms)
+    wrong = np.flatnonzero((offline != online) & modelled)
+    examples = [{"event": int(start + i), "chord": trace.chords[trace.chord[start + i]],
+                 "app": trace.apps[trace.app[start + i]], "offline": DECISION_NAMES.get(int(offline[i])),
+                 "engine": DECISION_NAMES.get(int(online[i]))} for i in wrong[:5]]
+    return {"profile": profile, "events": int(stop - start), "mismatches": int(len(wrong)), "examples": examples}
+
+
+# --- CLI ---
+
+def print_report(report):
+    trace = report["trace"]
+    print(f"{trace['events']} events over {trace['span_days']} days, analysed in {report['seconds']}s "
+          f"({report['events_per_second'] or 0:,} events/s)")
+    for app, entry in trace["apps"].items():
+        chords = ", ".join(f"{chord} {count}" for chord, count in entry["top_chords"].items())
+        print(f"  {app:<12} {entry['events']:>12}  {chords}")
+    zoom = trace["zoom_bursts"]
+    if zoom.get("bursts"):
+        print(f"  zoom bursts: {zoom['bursts']}, steps p50 {zoom['p50']} p90 {zoom['p90']} max {zoom['max']}, "
+              f"duration p50 {zoom.get('duration_ms_p50')} ms p90 {zoom.get('duration_ms_p90')} ms")
+    for name, profile in report["profiles"].items():
+        hit = f"{profile['hit_rate']:.1%}" if profile["hit_rate"] is not None else "-"
+        print(f"\n{name}: {profile['reached_babel']} presses reached Babel, {hit} translated  {profile['decisions']}")
+        print(f"  {'action':<16} {'trigger':<16} {'presses':>10} {'translated':>10} {'identity':>9} {'debounced':>9} "
+              f"{'hit':>6} {'bursts':>7} {'longest':>7}  top app")
+        ranked = sorted(profile["actions"].items(), key=lambda item: -item[1]["presses"])
+        for action, entry in ranked:
+            hit = f"{entry['hit_rate']:.0%}" if entry["hit_rate"] is not None else "-"
+            top_app = next(iter(entry["apps"]), "-")
+            print(f"  {action:<16} {str(entry['trigger']):<16} {entry['presses']:>10} {entry['translated']:>10} "
+                  f"{entry['identity']:>9} {entry['debounced']:>9} {hit:>6} {entry.get('repeat_bursts', 0):>7} "
+                  f"{entry.get('longest_burst', 0):>7}  {top_app}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Offline analysis of recorded Babel input traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("import", help="append flight recordings to a trace")
+    add.add_argument("trace")
+    add.add_argument("recordings", nargs="+")
+    run = commands.add_parser("analyse", help="per-action statistics of every profile over a trace")
+    run.add_argument("trace")
+    run.add_argument("--root", default=".", help="Babel directory (config.json, profiles)")
+    run.add_argument("--profile", action="append", help="profile to run (default: all)")
+    run.add_argument("--json", help="write the full report to this file")
+    run.add_argument("--chunk", type=int, default=1 << 20, help="events per chunk")
+    run.add_argument("--debounce-ms", type=float, default=250.0)
+    run.add_argument("--burst-ms", type=float, default=500.0, help="max gap between presses of one repeat burst")
+    run.add_argument("--zoom-gap-ms", type=float, default=1000.0, help="max gap between wheel steps of one zoom")
+    run.add_argument("--verify", type=int, default=0, metavar="N",
+                     help="also replay N events through the engine and compare every decision")
+    args = parser.parse_args(argv)
+    logger.configure({"level": "WARNING", "file": None}) # The engine replayed by --verify would log every app switch
+
+    if args.command == "import":
+        added, total = import_flight(args.trace, args.recordings)
+        print(f"{added} events added, {total} in {args.trace}")
+        return 0
+
+    trace = Trace.open(args.trace)
+    config_manager = ConfigManager(args.root)
+    profiles = args.profile or list(config_manager.semantic_data.get("profiles", {}))
+    report = analyse(trace, config_manager, profiles, args.chunk, args.debounce_ms, args.burst_ms, args.zoom_gap_ms)
+    print_report(report)
+    status = 0
+    if args.verify:
+        report["verification"] = []
+        for profile in profiles:
+            result = verify(trace, config_manager, profile, args.verify, args.debounce_ms)
+            report["verification"].append(result)
+            print(f"verify {profile}: {result['events']} events, {result['mismatches']} differ from the engine")
+            for example in result["examples"]:
+                print(f"  {example}")
+            status = status or (1 if result["mismatches"] else 0)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))